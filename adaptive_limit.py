@@ -0,0 +1,230 @@
+import re
+import statistics
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Deque, Dict, Optional
+
+# azure-devops SDKの例外はステータスコードを属性として持たないため、メッセージからスロットリングを判定する
+# （例: "... Operation returned a 429 status code."）
+_THROTTLED_MESSAGE = re.compile(r"\b(?:429|503) status code|TooManyRequests|rate limit|throttl", re.IGNORECASE)
+
+
+def parse_retry_after(value: Optional[str], now: float = None) -> float:
+    """Retry-Afterヘッダーの値（秒数またはHTTP日付）を待つ秒数に変換（解釈できない場合は0）"""
+    if not value:
+        return 0.0
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+    return max(0.0, retry_at - (time.time() if now is None else now))
+
+
+def throttle_delay(error: BaseException) -> Optional[float]:
+    """例外がスロットリング（429・503）によるものであれば Retry-After の秒数（ヘッダーがなければ0）
+
+    requestsのHTTPErrorのように応答を持つ例外はステータスコードとヘッダーを、
+    それ以外はメッセージを調べます。スロットリングでない例外ではNoneを返します。
+    """
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None) or getattr(error, "status_code", None)
+    if status is not None:
+        if status not in (429, 503):
+            return None
+        headers = getattr(response, "headers", None) or {}
+        return parse_retry_after(headers.get("Retry-After"))
+    if _THROTTLED_MESSAGE.search(str(error)):
+        return 0.0
+    return None
+
+
+class AdaptiveLimit:
+    """AIMD（加算増加・乗算減少）で同時リクエスト数の上限（ウィンドウ）を調整するリミッター
+
+    ウィンドウを使い切った状態で応答が返るたびに 1/ウィンドウ ずつ増やし（ウィンドウ分の応答で+1）、
+    スロットリング（429・503）か遅延の急増を検出すると backoff 倍に減らします。1回の過負荷で
+    同時に失敗した複数のリクエストによって何度も減らさないよう、減少は直前の減少より後に
+    開始したリクエストの結果でのみ行います。Retry-Afterが指定された場合は、その時刻まで
+    新しいリクエストを開始しません。
+
+    遅延の急増は、直近 LATENCY_WINDOW 件の遅延の中央値が、基準値の latency_tolerance 倍を超えた
+    場合です（大きなファイル1件の遅延では反応しません）。基準値は BASELINE_PERIOD 秒ごとに取り直す
+    遅延の最小値で、同時リクエスト数とともに徐々に伸びる待ち時間に基準値が追従しないようにしつつ、
+    サーバー側の処理が恒常的に遅くなった場合は次の期間で新しい遅延を基準にします。
+    """
+
+    # 遅延の急増の判定に使う直近の応答数
+    LATENCY_WINDOW = 10
+    # 遅延の基準値（最小値）を取り直す間隔（秒）
+    BASELINE_PERIOD = 30.0
+
+    def __init__(
+        self,
+        initial: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        backoff: float = 0.5,
+        latency_tolerance: float = 2.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Args:
+            initial: ウィンドウの初期値（デフォルト: 8）
+            min_limit: ウィンドウの下限（デフォルト: 1）
+            max_limit: ウィンドウの上限（デフォルト: 64）
+            backoff: 減少時にウィンドウに掛ける係数（デフォルト: 0.5）
+            latency_tolerance: 遅延の中央値が基準値の何倍を超えたら減らすか（デフォルト: 2.0）
+            clock: 単調増加する時刻を返す関数（テストで差し替える）
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.clock = clock
+        self.window = float(min(max(initial, min_limit), max_limit))
+        self.in_flight = 0
+        self._condition = threading.Condition()
+        self._blocked_until = 0.0
+        self._last_decrease = float("-inf")
+        self._recent: Deque[float] = deque(maxlen=self.LATENCY_WINDOW)
+        self._baseline: Optional[float] = None
+        self._baseline_at = clock()
+        self._period_min: Optional[float] = None
+        self.throttled = 0
+        self.latency_spikes = 0
+        self.waits = 0
+
+    @property
+    def limit(self) -> int:
+        """現在同時に開始できるリクエスト数"""
+        return int(self.window)
+
+    def try_acquire(self) -> Optional[float]:
+        """空きがあれば1枠を確保してその開始時刻を返す（空きがない、またはRetry-After中ならNone）"""
+        with self._condition:
+            return self._try_acquire()
+
+    def _try_acquire(self) -> Optional[float]:
+        now = self.clock()
+        if now < self._blocked_until or self.in_flight >= self.limit:
+            return None
+        self.in_flight += 1
+        return now
+
+    def acquire(self) -> float:
+        """1枠が空くまで待って確保し、その開始時刻を返す"""
+        with self._condition:
+            started = self._try_acquire()
+            if started is not None:
+                return started
+            self.waits += 1
+            while started is None:
+                # Retry-After中は解除される時刻まで、それ以外は枠が返却されるまで待つ
+                blocked = self._blocked_until - self.clock()
+                self._condition.wait(blocked if blocked > 0 else None)
+                started = self._try_acquire()
+            return started
+
+    def release(self, started: float, throttled: bool = False, retry_after: float = 0.0, failed: bool = False) -> None:
+        """確保した枠を返却し、結果に応じてウィンドウを調整
+
+        Args:
+            started: acquire/try_acquireが返した開始時刻
+            throttled: スロットリングされた（429・503）
+            retry_after: 次のリクエストまで待つ秒数（Retry-After）
+            failed: スロットリング以外の理由で失敗した（遅延の計測に使わず、ウィンドウも変えない）
+        """
+        with self._condition:
+            now = self.clock()
+            self.in_flight -= 1
+            if throttled:
+                self.throttled += 1
+                if retry_after > 0:
+                    self._blocked_until = max(self._blocked_until, now + retry_after)
+                self._decrease(started, now)
+            elif not failed:
+                self._observe(started, now)
+            self._condition.notify_all()
+
+    def _observe(self, started: float, now: float) -> None:
+        """成功したリクエストの遅延を記録し、急増していれば減らし、そうでなければ増やす"""
+        latency = now - started
+        # 直前の減少より前に開始したリクエストの遅延は、減らす前のウィンドウによるものなので判定に使わない
+        if started > self._last_decrease:
+            self._recent.append(latency)
+        if self._baseline is not None and len(self._recent) == self.LATENCY_WINDOW:
+            if statistics.median(self._recent) > self._baseline * self.latency_tolerance:
+                self.latency_spikes += 1
+                self._decrease(started, now)
+                # 減らした後に開始したリクエストの遅延で改めて判定する
+                self._recent.clear()
+                return
+        self._period_min = latency if self._period_min is None else min(self._period_min, latency)
+        if self._baseline is None or latency < self._baseline:
+            self._baseline = latency
+        if now - self._baseline_at > self.BASELINE_PERIOD:
+            # 期間中の最小値を新しい基準値にする（サーバーが恒常的に遅くなった場合は基準値も上がる）
+            self._baseline = self._period_min
+            self._baseline_at = now
+            self._period_min = None
+        # 使い切っていないウィンドウは増やさない（負荷が低いときに上限だけが大きくならないように）
+        if self.in_flight + 1 >= self.limit:
+            self.window = min(self.max_limit, self.window + 1 / self.window)
+
+    def _decrease(self, started: float, now: float) -> bool:
+        """直前の減少より後に開始したリクエストの結果であればウィンドウを減らす"""
+        # 減少と同時刻に開始したリクエストは、減らす前のウィンドウで開始したものとみなす
+        if started <= self._last_decrease:
+            return False
+        self.window = max(float(self.min_limit), self.window * self.backoff)
+        self._last_decrease = now
+        return True
+
+    def slot(self) -> "_Slot":
+        """リクエスト1回分の枠（with文で使用。スロットリングの例外で抜けた場合はウィンドウを減らす）"""
+        return _Slot(self)
+
+    def stats(self) -> Dict[str, Any]:
+        """現在のウィンドウ・実行中のリクエスト数と、減少の原因ごとの回数を返す"""
+        with self._condition:
+            return {
+                "window": self.limit,
+                "in_flight": self.in_flight,
+                "min": self.min_limit,
+                "max": self.max_limit,
+                "throttled": self.throttled,
+                "latency_spikes": self.latency_spikes,
+                "waits": self.waits,
+                "baseline_ms": round(self._baseline * 1000, 1) if self._baseline is not None else None,
+            }
+
+
+class _Slot:
+    """AdaptiveLimitの1回分の枠（with文の終了時に例外を調べて返却する）"""
+
+    __slots__ = ("_limit", "_started")
+
+    def __init__(self, limit: AdaptiveLimit):
+        self._limit = limit
+        self._started = 0.0
+
+    def __enter__(self) -> "_Slot":
+        self._started = self._limit.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if exc is None:
+            self._limit.release(self._started)
+            return False
+        delay = throttle_delay(exc)
+        if delay is None:
+            self._limit.release(self._started, failed=True)
+        else:
+            self._limit.release(self._started, throttled=True, retry_after=delay)
+        return False
@@ -1,20 +1,131 @@
+import contextlib
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from client import AzureReposClient
-from typing import Dict, List
+from guid_index import GUID_REFERENCE_PATTERN, GuidIndex, GuidIndexCache, annotate_guids
+from memory_budget import MemoryBudget, MemoryBudgetExceeded, MemoryReservation
+from prefetcher import BlobPrefetcher, PrefetchJob
+from search_index import SearchIndexCache
+from typing import Dict, FrozenSet, Iterator, List, Optional, Tuple
+from snapshot_store import SnapshotKey, SnapshotStore
+from symbol_index import SymbolIndexCache, supports as supports_symbols
 from unified_diff_generator import UnifiedDiffGenerator
+import tracing
+
+# pull_request_scope() の中で取得したPRのメタデータ（(組織, プロジェクト, リポジトリ, PR ID) -> PR）
+_pull_requests: "contextvars.ContextVar[Optional[Dict]]" = contextvars.ContextVar("pull_requests", default=None)
+
+
+@contextlib.contextmanager
+def pull_request_scope() -> Iterator[None]:
+    """with文の中では、同じPRのメタデータを1回だけ取得する（ツール呼び出し1回分を囲んで使用）
+
+    応答キャッシュのバージョン確認とツール本体がそれぞれPRを取得すると、キャッシュミスのたびに
+    同じ取得が2回行われるため、ツール呼び出しの間だけ取得結果を共有します。
+    """
+    token = _pull_requests.set({})
+    try:
+        yield
+    finally:
+        _pull_requests.reset(token)
 
 """
 AzureReposClient からの応答を加工して、MCPとしての結果を返す。
 """
 class AzureReposArbiter:
 
-    def __init__(self, client: AzureReposClient, diff_generator: UnifiedDiffGenerator = None):
+    def __init__(
+        self,
+        client: AzureReposClient,
+        diff_generator: UnifiedDiffGenerator = None,
+        snapshot_store: SnapshotStore = None,
+        comments_max_age: float = 60,
+        server_diff_threshold: int = 256 * 1024,
+        prefetcher: BlobPrefetcher = None,
+        memory_budget: MemoryBudget = None,
+        search_indexes: SearchIndexCache = None,
+        guid_indexes: GuidIndexCache = None,
+        symbol_indexes: SymbolIndexCache = None
+    ):
         """
         Args:
             client: AzureReposClientのインスタンス
             diff_generator: UnifiedDiffGeneratorのインスタンス（省略時は新規作成）
+            snapshot_store: PRスナップショットの永続化ストア（省略時は永続化しない）
+            comments_max_age: 保存済みコメントスレッドを再利用する最大経過秒数（デフォルト: 60）
+            server_diff_threshold: この文字数以上のファイルはサーバー側の行差分ブロックから
+                差分を生成する（デフォルト: 256KB、0またはNoneで無効）
+            prefetcher: 変更概要を返した後に変更ファイルの内容を先読みする先読み器（省略時は先読みしない）
+            memory_budget: 取得中のファイル内容と生成した差分が確保するメモリ予算（省略時は制限しない）
+            search_indexes: PRバージョンごとのトライグラム索引のキャッシュ（省略時は新規作成）
+            guid_indexes: コミットごとのUnityのGUID索引のキャッシュ（省略時は新規作成）
+            symbol_indexes: ファイル内容ごとの宣言の索引のキャッシュ（get_symbolで使用。省略時は新規作成）
         """
         self.client = client
+        self.symbol_indexes = symbol_indexes or SymbolIndexCache()
         self.diff_generator = diff_generator or UnifiedDiffGenerator()
+        self.snapshot_store = snapshot_store
+        self.comments_max_age = comments_max_age
+        self.server_diff_threshold = server_diff_threshold
+        self.prefetcher = prefetcher
+        self.memory_budget = memory_budget
+        self.search_indexes = search_indexes or SearchIndexCache()
+        self.guid_indexes = guid_indexes or GuidIndexCache()
+    
+    def _get_merge_commits(self, pr: Dict) -> Tuple[Optional[str], Optional[str]]:
+        """PR情報からソース・ターゲットのコミットIDを取得
+        
+        Returns:
+            (source_commit, target_commit) のタプル（取得できない場合はNone）
+        """
+        # as_dict()の結果なのでsnake_caseのはずだが、念のため両方チェック
+        source_commit = pr.get("last_merge_source_commit", {}).get("commit_id") or \
+                        pr.get("lastMergeSourceCommit", {}).get("commitId")
+        target_commit = pr.get("last_merge_target_commit", {}).get("commit_id") or \
+                        pr.get("lastMergeTargetCommit", {}).get("commitId")
+        return source_commit, target_commit
+    
+    def _fetch_pull_request(self, organization: str, project: str, repo_id: str, pr_id: int) -> Dict:
+        """PRのメタデータを取得（pull_request_scope() の中では取得済みの結果を再利用する）"""
+        memo = _pull_requests.get()
+        if memo is None:
+            return self.client.get_pull_request(organization, project, repo_id, pr_id)
+        key = (organization, project, repo_id, pr_id)
+        if key not in memo:
+            memo[key] = self.client.get_pull_request(organization, project, repo_id, pr_id)
+        return memo[key]
+    
+    def _get_commit_diffs(
+        self,
+        organization: str,
+        project: str,
+        repo_id: str,
+        pr: Dict,
+        pr_id: int
+    ) -> Dict:
+        """PRのコミット差分情報を取得（スナップショットがあればディスクから読み出す）
+        
+        Returns:
+            コミット差分情報の辞書（コミットが特定できない場合は error を含む辞書）
+        """
+        source_commit, target_commit = self._get_merge_commits(pr)
+        if not source_commit or not target_commit:
+            return {"error": "Could not determine source/target commits for diff."}
+        
+        key = SnapshotKey(organization, project, repo_id, pr_id, source_commit, target_commit)
+        if self.snapshot_store is not None:
+            cached = self.snapshot_store.get(key, "commit_diffs")
+            if cached is not None:
+                return cached
+        
+        with tracing.span("get_commit_diffs", source_commit=source_commit, target_commit=target_commit) as span:
+            result = self.client.get_commit_diffs(organization, project, repo_id, source_commit, target_commit)
+            span.set(changes=len(result.get("changes", [])))
+        
+        if self.snapshot_store is not None:
+            self.snapshot_store.put(key, "commit_diffs", result)
+        return result
     
     def _normalize_change_type(self, change_type: str, source_server_item: str = None) -> str:
         """Azure DevOpsのchangeTypeを標準ステータスに変換
@@ -45,6 +156,20 @@ class AzureReposArbiter:
         else:
             return "modified"  # デフォルト
 
+    def get_pull_request_version(self, organization: str, project: str, repo_id: str, pr_id: int) -> Optional[str]:
+        """PRの内容を決定するバージョン（マージ元・マージ先のコミットIDの組）を取得
+        
+        PRのメタデータを1回取得するだけの軽量な呼び出しで、応答キャッシュの検証に使用します。
+        
+        Returns:
+            "<target_commit>..<source_commit>" 形式の文字列（コミットが特定できない場合はNone）
+        """
+        pr = self._fetch_pull_request(organization, project, repo_id, pr_id)
+        source_commit, target_commit = self._get_merge_commits(pr)
+        if not source_commit or not target_commit:
+            return None
+        return f"{target_commit}..{source_commit}"
+
     def get_pull_request(self, organization: str, project: str, repo_id: str, pr_id: int) -> Dict:
         """プルリクエストの詳細情報を取得し、必要な項目のみを抽出
         
@@ -57,7 +182,7 @@ class AzureReposArbiter:
         Returns:
             抽出されたプルリクエスト情報の辞書
         """
-        result = self.client.get_pull_request(organization, project, repo_id, pr_id)
+        result = self._fetch_pull_request(organization, project, repo_id, pr_id)
         
         # 必要なフィールドのリスト
         # ※ AIの混乱を防ぐため、マージ済みと誤認させる日付情報や状態情報を除外し、
@@ -84,26 +209,99 @@ class AzureReposArbiter:
         
         return extracted
 
-    def get_pull_request_change_summary(self, organization: str, project: str, repo_id: str, pr_id: int) -> Dict:
-        """プルリクエストの変更概要（ファイル一覧と変更タイプ）を取得
+    # FileDiffs APIの1回の呼び出しで問い合わせるファイル数
+    SERVER_DIFF_BATCH_SIZE = 50
+
+    # コンパクト形式で使用するステータスの短縮コード
+    COMPACT_STATUS_CODES = {"added": "A", "deleted": "D", "modified": "M", "renamed": "R"}
+
+    # 削除と追加の組をリネームとみなす行ハッシュのJaccard係数の下限（git diffの既定値50%に相当）
+    RENAME_SIMILARITY_THRESHOLD = 0.5
+
+    # リネーム候補の探索で、これより多くの削除ファイルに現れる行（"{" など）は手がかりにしない
+    RENAME_COMMON_LINE_LIMIT = 16
+
+    # メモリ予算を確保できずに差分を省略したファイルのエントリに付ける理由
+    MEMORY_BUDGET_OMITTED_REASON = "file contents exceed the server memory budget (see get_cache_stats)"
+
+    # 取得前にメモリ予算から確保する、変更前・変更後それぞれの内容のサイズの見積もり（取得後に実際のサイズに合わせる）
+    CONTENT_SIZE_ESTIMATE = 64 * 1024
+
+    def _compact_change_summary(self, summary: Dict) -> Dict:
+        """変更概要を列指向のコンパクト形式に変換
         
-        このメソッドは、PRに含まれるファイルの一覧と、それぞれの変更内容（追加、修正、削除など）
-        のメタデータを返します。コードの行単位の差分（Unified Diff）は含みません。
+        ディレクトリは一度だけ列挙してインデックスで参照し、ステータスは1文字のコードにします。
+        exists_in_base / exists_in_head はステータスから導出できるため、
+        item・元のchange_type・commit diffsの付随情報とともに省略します。
         
         Args:
-            organization: Azure DevOps組織名
-            project: プロジェクト名
-            repo_id: リポジトリID
-            pr_id: プルリクエストID
+            summary: get_pull_request_change_summary の通常形式の結果
             
         Returns:
-            フィルタリングされた変更概要情報の辞書
-            
-        Note:
-            - フォルダ（tree）を除外します
-            - .metaファイルを除外します
+            コンパクト形式の変更概要の辞書
         """
-        result = self.client.get_pull_request_diff(organization, project, repo_id, pr_id)
+        if "changes" not in summary:
+            return summary
+        
+        dirs = []
+        dir_index = {}
+        files = []
+        for change in summary["changes"]:
+            directory, _, name = change["path"].rpartition("/")
+            index = dir_index.get(directory)
+            if index is None:
+                index = dir_index[directory] = len(dirs)
+                dirs.append(directory)
+            row = [index, name, self.COMPACT_STATUS_CODES[change["status"]]]
+            # 省略可能な列（元のパス）は値がある場合のみ追加する
+            if change.get("original_path"):
+                row.append(change["original_path"])
+            files.append(row)
+        
+        return {
+            "format": "compact",
+            "status_codes": {code: status for status, code in self.COMPACT_STATUS_CODES.items()},
+            "columns": ["dir", "name", "status", "original_path"],
+            "dirs": dirs,
+            "files": files,
+        }
+
+    def _get_normalized_changes(
+        self,
+        organization: str,
+        project: str,
+        repo_id: str,
+        pr: Dict,
+        pr_id: int
+    ) -> Dict:
+        """フォルダと.metaファイルを除き、ステータスを標準化した変更一覧を取得
+        
+        削除と追加の組として報告されたリネームのうち、objectIdが一致する（内容が同一の）ものは
+        1つのリネームにまとめます。内容は取得しないため、類似度によるリネームの検出は
+        Unified Diffと行数でのみ行います。
+        正規化した結果はコミットの組ごとにスナップショットとして保存し、再起動後も
+        commit diffsの読み出しと正規化（リネームの検出を含む）を行わずに返します。
+        
+        Returns:
+            changesを正規化したコミット差分情報の辞書（コミットが特定できない場合は error を含む辞書）
+        """
+        source_commit, target_commit = self._get_merge_commits(pr)
+        key = SnapshotKey(organization, project, repo_id, pr_id, source_commit or "", target_commit or "")
+        if self.snapshot_store is not None and source_commit and target_commit:
+            cached = self.snapshot_store.get(key, "changes")
+            if cached is not None:
+                return cached
+        
+        # commit diffsの辞書は呼び出し元と共有している場合があるため、コピーを正規化する
+        result = dict(self._get_commit_diffs(organization, project, repo_id, pr, pr_id))
+        
+        # 削除と追加の組として報告された内容が同一のリネームをまとめる（メタデータのみで判定）
+        if "changes" in result and source_commit and target_commit:
+            file_changes = self._detect_renames(
+                organization, project, repo_id, list(self._iter_file_changes(result["changes"])),
+                source_commit, target_commit, similarity=False
+            )
+            result["changes"] = [change for change, _, _ in file_changes]
         
         # Filter out folders (trees) and .meta files
         if "changes" in result:
@@ -193,8 +391,91 @@ class AzureReposArbiter:
             #     print(f"[DEBUG] Filtered {original_count - filtered_count} items (folders/meta files) from diff")
 
         result.pop("change_counts", None)
+        if self.snapshot_store is not None and "changes" in result:
+            self.snapshot_store.put(key, "changes", result)
+        return result
+    
+    def get_pull_request_change_summary(
+        self,
+        organization: str,
+        project: str,
+        repo_id: str,
+        pr_id: int,
+        compact: bool = False
+    ) -> Dict:
+        """プルリクエストの変更概要（ファイル一覧と変更タイプ）を取得
+        
+        このメソッドは、PRに含まれるファイルの一覧と、それぞれの変更内容（追加、修正、削除など）
+        のメタデータを返します。コードの行単位の差分（Unified Diff）は含みません。
+        
+        Args:
+            organization: Azure DevOps組織名
+            project: プロジェクト名
+            repo_id: リポジトリID
+            pr_id: プルリクエストID
+            compact: Trueの場合は列指向のコンパクト形式で返す（デフォルト: False）
+            
+        Returns:
+            フィルタリングされた変更概要情報の辞書
+            
+        Note:
+            - フォルダ（tree）を除外します
+            - .metaファイルを除外します
+        """
+        pr = self._fetch_pull_request(organization, project, repo_id, pr_id)
+        
+        # 続くUnified Diffの取得に備え、変更ファイルの内容をバックグラウンドで読み込む
+        if self.prefetcher is not None:
+            diff_data = self._get_commit_diffs(organization, project, repo_id, pr, pr_id)
+            if "changes" in diff_data:
+                self.prefetch_pull_request_contents(organization, project, repo_id, pr, pr_id, diff_data["changes"])
+        
+        result = self._get_normalized_changes(organization, project, repo_id, pr, pr_id)
+        if compact:
+            return self._compact_change_summary(result)
         return result
 
+    def prefetch_pull_request_contents(
+        self,
+        organization: str,
+        project: str,
+        repo_id: str,
+        pr: Dict,
+        pr_id: int,
+        changes: List[Dict]
+    ) -> Optional[PrefetchJob]:
+        """変更ファイルの変更前後の内容をblob_cacheへ先読みするジョブを開始
+        
+        Args:
+            pr: プルリクエスト情報（マージ元・マージ先のコミットIDを含む）
+            changes: commit diffsのchangesのリスト
+            
+        Returns:
+            開始したジョブ（先読み器がない場合やコミットが特定できない場合はNone）
+        """
+        source_commit, target_commit = self._get_merge_commits(pr)
+        if self.prefetcher is None or not source_commit or not target_commit:
+            return None
+        
+        def load(change: Dict, change_type: str) -> int:
+            # 予算に空きがなければ待たずに先読みをやめる（要求された処理を優先する）。
+            # 読み込んだ内容はblob_cacheに移るため、確保は読み込みの間だけ保持する
+            with MemoryReservation(self.memory_budget, timeout=0) as reservation:
+                contents = self._load_reserved_contents(
+                    reservation, organization, project, repo_id, change, change_type, source_commit, target_commit
+                )
+            if contents is None:
+                raise MemoryBudgetExceeded()
+            return len(contents[0]) + len(contents[1])
+        
+        tasks = [
+            lambda change=change, change_type=change_type: load(change, change_type)
+            for change, _, change_type in self._iter_file_changes(changes)
+            if not self._is_content_unchanged(change)
+        ]
+        key = (organization, project, repo_id, pr_id, source_commit, target_commit)
+        return self.prefetcher.prefetch(key, tasks)
+
     def get_comments(self, organization: str, project: str, repo_id: str, pr_id: int) -> List[Dict]:
         """プルリクエストのコメントを取得し、メタデータを加工
         
@@ -207,7 +488,15 @@ class AzureReposArbiter:
         Returns:
             加工されたコメントスレッドのリスト
         """
-        result = self.client.get_comments(organization, project, repo_id, pr_id)
+        # コメントはコミットと無関係に更新されるため、PR単位で保存し経過時間で鮮度を判定する
+        key = SnapshotKey(organization, project, repo_id, pr_id)
+        result = None
+        if self.snapshot_store is not None:
+            result = self.snapshot_store.get(key, "threads", max_age=self.comments_max_age)
+        if result is None:
+            result = self.client.get_comments(organization, project, repo_id, pr_id)
+            if self.snapshot_store is not None:
+                self.snapshot_store.put(key, "threads", result)
 
         # 安全にキーを取得し、存在しない場合はNone（またはデフォルト値）を返す
         expected_keys = [
@@ -252,7 +541,237 @@ class AzureReposArbiter:
         result = self.client.get_file_content(organization, project, repo_id, path, version)
         return result
 
-    def get_pull_request_unified_diff(self, organization: str, project: str, repo_id: str, pr_id: int) -> str:
+    def list_files(
+        self,
+        organization: str,
+        project: str,
+        repo_id: str,
+        version: str = None,
+        path: str = "/",
+        pattern: str = None,
+        max_results: int = 1000
+    ) -> Dict:
+        """コミットのファイルを再帰的に列挙
+        
+        Args:
+            organization: Azure DevOps組織名
+            project: プロジェクト名
+            repo_id: リポジトリID
+            version: ブランチ名またはコミットID（省略時はデフォルトブランチ）
+            path: 列挙するディレクトリ（デフォルト: ルート）
+            pattern: 先頭の "/" を除いたパスに対するglob（例: "*.cs"）
+            max_results: 返すパスの最大数（デフォルト: 1000）
+            
+        Returns:
+            コミットID（commit_id）、パスのリスト（files）、打ち切ったか（truncated）を含む辞書
+        """
+        commit_id, tree = self.client.get_tree(organization, project, repo_id, version)
+        files, truncated = tree.list(path or "/", pattern=pattern, max_results=max_results)
+        return {"commit_id": commit_id, "files": files, "truncated": truncated}
+
+    def get_symbol(
+        self,
+        organization: str,
+        project: str,
+        repo_id: str,
+        path: str,
+        name: str,
+        version: str = None
+    ) -> Dict:
+        """ファイル内の宣言（メソッド・プロパティ・型など）の部分だけを取得
+        
+        Args:
+            organization: Azure DevOps組織名
+            project: プロジェクト名
+            repo_id: リポジトリID
+            path: ファイルパス（C#のみ）
+            name: 宣言の名前、または末尾が一致する修飾名（例: "Update"、"Player.Update"）
+            version: ブランチ名またはコミットID（省略時はデフォルトブランチ）
+            
+        Returns:
+            パス（path）、コミットID（commit_id）、一致した宣言のリスト（symbols。オーバーロードはすべて含み、
+            各要素は name, kind, start_line, end_line, content を持つ）を含む辞書。
+            一致する宣言がない場合は、ファイル内の宣言の修飾名のリスト（available）も含みます
+        """
+        if not supports_symbols(path):
+            return {"error": f"Symbols are only indexed for C# files: {path}"}
+        commit_id = self.client.resolve_commit(organization, project, repo_id, version)
+        content = self.client.get_file_content(organization, project, repo_id, path, commit_id)
+        # 索引はblobのobjectIdごとに保持するため、同じ内容への2回目以降の呼び出しでは走査しない
+        index = self.symbol_indexes.get(content)
+        lines = content.splitlines(keepends=True)
+        symbols = [
+            {
+                "name": symbol.qualified_name,
+                "kind": symbol.kind,
+                "start_line": symbol.start_line,
+                "end_line": symbol.end_line,
+                "content": "".join(lines[symbol.start_line - 1:symbol.end_line]),
+            }
+            for symbol in index.find(name)
+        ]
+        result = {"path": path, "commit_id": commit_id, "symbols": symbols}
+        if not symbols:
+            result["available"] = [symbol.qualified_name for symbol in index.symbols]
+        return result
+
+    def _iter_file_changes(self, changes: List[Dict]) -> Iterator[Tuple[Dict, str, str]]:
+        """フォルダと.metaファイルを除いたファイルの変更を列挙
+        
+        Args:
+            changes: commit diffsのchangesのリスト
+            
+        Yields:
+            (change, path, change_type) のタプル。change_typeは小文字の文字列
+        """
+        for change in changes:
+            item = change.get("item", {})
+            path = item.get("path", "")
+            
+            # change_typeはchangeTypeまたはchange_typeで返される可能性がある
+            change_type_raw = change.get("changeType") or change.get("change_type") or ""
+            # 文字列に変換（列挙型の場合があるため）
+            change_type = str(change_type_raw).lower()
+            
+            # git_object_typeはgitObjectTypeまたはgit_object_typeで返される可能性がある
+            git_object_type = item.get("gitObjectType") or item.get("git_object_type", "")
+            is_folder = item.get("isFolder", False)
+            
+            # フォルダと.metaファイルをスキップ
+            if git_object_type == "tree" or is_folder:
+                continue
+            if path.endswith(".meta"):
+                continue
+            
+            yield change, path, change_type
+
+    def _get_original_path(self, change: Dict, path: str) -> str:
+        """変更前のファイルパスを取得（リネームでない場合は path と同じ）
+        
+        originalPathがない場合は、リネームの移動元を示すsourceServerItemを使用します。
+        """
+        return (
+            change.get("originalPath") or change.get("original_path") or
+            change.get("sourceServerItem") or change.get("source_server_item") or path
+        )
+
+    @staticmethod
+    def _is_content_unchanged(change: Dict) -> bool:
+        """変更前後のblobのobjectIdが同じ（内容が同一）かを判定
+        
+        モード変更のみ・リネームのみの変更では、内容を取得せずに差分なしと判断できます。
+        """
+        item = change.get("item", {})
+        object_id = item.get("objectId") or item.get("object_id")
+        original_object_id = item.get("originalObjectId") or item.get("original_object_id")
+        return bool(object_id) and object_id == original_object_id
+
+    @staticmethod
+    def _content_sides(change_type: str) -> Tuple[bool, bool]:
+        """変更の種類から、変更前・変更後の内容がそれぞれ必要かを判定"""
+        # 削除、編集、リネームの場合は元の内容が、追加、編集、リネームの場合は変更後の内容が必要
+        needs_original = any(t in change_type for t in ["edit", "delete", "rename", "source_rename"])
+        needs_modified = any(t in change_type for t in ["edit", "add", "rename", "target_rename"])
+        return needs_original, needs_modified
+
+    def _load_change_contents(
+        self,
+        organization: str,
+        project: str,
+        repo_id: str,
+        change: Dict,
+        change_type: str,
+        source_commit: str,
+        target_commit: str
+    ) -> Tuple[str, str]:
+        """変更前後のファイル内容を取得
+        
+        Returns:
+            (original_content, modified_content) のタプル。存在しない側は空文字列
+        """
+        item = change.get("item", {})
+        path = item.get("path", "")
+        original_content = ""
+        modified_content = ""
+        
+        # 元のパス（リネーム用）
+        original_path = self._get_original_path(change, path)
+        
+        # blobのobjectId（キャッシュキーとして使用し、PR間で同じblobの再取得を避ける）
+        object_id = item.get("objectId") or item.get("object_id")
+        original_object_id = item.get("originalObjectId") or item.get("original_object_id")
+        
+        needs_original, needs_modified = self._content_sides(change_type)
+        if needs_original:
+            original_content = self.client.get_file_content_at_commit(
+                organization, project, repo_id, original_path, target_commit,
+                object_id=original_object_id
+            )
+        
+        if needs_modified:
+            modified_content = self.client.get_file_content_at_commit(
+                organization, project, repo_id, path, source_commit,
+                object_id=object_id
+            )
+        
+        return original_content, modified_content
+
+    def _load_reserved_contents(
+        self,
+        reservation: MemoryReservation,
+        organization: str,
+        project: str,
+        repo_id: str,
+        change: Dict,
+        change_type: str,
+        source_commit: str,
+        target_commit: str
+    ) -> Optional[Tuple[str, str]]:
+        """メモリ予算から見積もりのサイズを確保してから変更前後のファイル内容を取得し、確保を実際のサイズに合わせる
+        
+        サイズは取得するまで分からないため、必要な側ごとに CONTENT_SIZE_ESTIMATE を先に確保します。
+        同時に取得する呼び出しが予算の上限を超えうるのは、見積もりを超えた分を確保し直すまでの間だけです。
+        
+        Returns:
+            (original_content, modified_content) のタプル。確保したサイズ（両者の長さの合計）は
+            呼び出し側がreservation.releaseで解放する。空きを待ちきれなかった場合や内容が予算を
+            超える場合はNone（呼び出し側はそのファイルを概要のみにする）
+        """
+        estimate = self.CONTENT_SIZE_ESTIMATE * sum(self._content_sides(change_type))
+        if reservation.budget is not None:
+            # 予算より小さいファイルまで1件で予算を超えるとして断らないよう、見積もりは上限までにする
+            estimate = min(estimate, reservation.budget.max_bytes)
+        # メモリ予算の空きを待つ時間は、並列に処理している他の呼び出しによる直列化の箇所になる
+        with tracing.span("reserve_contents", bytes=estimate):
+            if not reservation.reserve(estimate):
+                return None
+        try:
+            contents = self._load_change_contents(
+                organization, project, repo_id, change, change_type, source_commit, target_commit
+            )
+        except BaseException:
+            reservation.release(estimate)
+            raise
+        size = len(contents[0]) + len(contents[1])
+        if size < estimate:
+            reservation.release(estimate - size)
+        elif size > estimate:
+            with tracing.span("reserve_contents", bytes=size - estimate):
+                if not reservation.reserve(size - estimate):
+                    reservation.release(estimate)
+                    return None
+        return contents
+
+    def get_pull_request_unified_diff(
+        self,
+        organization: str,
+        project: str,
+        repo_id: str,
+        pr_id: int,
+        ignore_whitespace: bool = False,
+        ignore_eol: bool = False,
+        annotate_unity_guids: bool = False
+    ) -> str:
         """プルリクエストの全ファイルのUnified Diffを取得
         
         Args:
@@ -260,6 +779,10 @@ class AzureReposArbiter:
             project: プロジェクト名
             repo_id: リポジトリID
             pr_id: プルリクエストID
+            ignore_whitespace: 空白の違いのみの変更を無視する（デフォルト: False）
+            ignore_eol: 改行コード（CRLF/LF）の違いのみの変更を無視する（デフォルト: False）
+            annotate_unity_guids: 差分に現れるUnityのGUIDの参照先のアセットのパスを
+                ファイルごとの差分の末尾に追加する（デフォルト: False）
         
         Returns:
             全ファイルのUnified Diffを結合した文字列
@@ -268,73 +791,680 @@ class AzureReposArbiter:
             - フォルダ（git_object_type == "tree"）は除外されます
             - .metaファイルは除外されます
             - 差分がないファイルは含まれません
+            - 空白・改行コードを無視する場合、サーバー側の行差分ブロックは使用しません
+              （サーバーは正規化せずに比較するため）
+            - メモリ予算を確保できなかったファイルは差分を省略したエントリとなり、
+              その場合はスナップショットを保存しません
         """
-        # PR情報と差分情報を取得
-        pr = self.client.get_pull_request(organization, project, repo_id, pr_id)
-        diff_data = self.client.get_pull_request_diff(organization, project, repo_id, pr_id)
-        
-        # コミットIDを取得
-        # as_dict()の結果なのでsnake_caseのはずだが、念のため両方チェック
-        source_commit = pr.get("last_merge_source_commit", {}).get("commit_id") or \
-                        pr.get("lastMergeSourceCommit", {}).get("commitId")
-        target_commit = pr.get("last_merge_target_commit", {}).get("commit_id") or \
-                        pr.get("lastMergeTargetCommit", {}).get("commitId")
+        # PR情報からコミットIDを取得
+        with tracing.span("get_pull_request", pr_id=pr_id):
+            pr = self._fetch_pull_request(organization, project, repo_id, pr_id)
+        source_commit, target_commit = self._get_merge_commits(pr)
         
         if not source_commit or not target_commit:
             return "# Error: Could not determine source/target commits for diff."
         
+        diff_generator = self.diff_generator.with_options(ignore_whitespace, ignore_eol)
+        snapshot_kind = self._file_diffs_kind(diff_generator)
+        
+        # 同じコミットの組・同じ比較オプションで生成済みの差分があればディスクから返す
+        key = SnapshotKey(organization, project, repo_id, pr_id, source_commit, target_commit)
+        if self.snapshot_store is not None:
+            with tracing.span("snapshot_get", kind=snapshot_kind) as span:
+                file_diffs = self.snapshot_store.get(key, snapshot_kind)
+                span.set(hit=file_diffs is not None)
+            if file_diffs is not None:
+                if annotate_unity_guids:
+                    file_diffs = self._annotate_unity_guids(
+                        organization, project, repo_id, pr, pr_id, source_commit, target_commit, file_diffs
+                    )
+                return "\n".join(d for d in file_diffs.values() if d)
+        
         # 変更ファイルのリストを取得
+        diff_data = self._get_commit_diffs(organization, project, repo_id, pr, pr_id)
         changes = diff_data.get("changes", [])
         
-        unified_diffs = []
+        file_diffs = {}
+        # サーバー側の行差分ブロックから生成する大きなファイル
+        server_side_changes = []
+        
+        # 削除と追加の組として報告されたリネームは、移動元との差分にする
+        with tracing.span("detect_renames"):
+            file_changes = self._detect_renames(
+                organization, project, repo_id, list(self._iter_file_changes(changes)), source_commit, target_commit
+            )
+        
+        # 取得中の内容と、応答を返すまで保持する生成済みの差分をメモリ予算から確保する
+        with MemoryReservation(self.memory_budget) as reservation:
+            for change, path, change_type in file_changes:
+                with tracing.span("file", path=path, change_type=change_type):
+                    original_path = self._get_original_path(change, path)
+                    
+                    # objectId（内容のハッシュ）が変更前後で同じファイルは内容を取得しない
+                    # （パスのみのリネームは "rename from"/"rename to" のヘッダーのみとなる）
+                    if self._is_content_unchanged(change):
+                        file_diffs[path] = diff_generator.generate_file_diff("", "", path, original_path=original_path)
+                        continue
+                    
+                    contents = self._load_reserved_contents(
+                        reservation, organization, project, repo_id, change, change_type, source_commit, target_commit
+                    )
+                    if contents is None:
+                        file_diffs[path] = diff_generator.generate_omitted_file_diff(
+                            path, self.MEMORY_BUDGET_OMITTED_REASON, original_path=original_path
+                        )
+                        continue
+                    original_content, modified_content = contents
+                    content_size = len(original_content) + len(modified_content)
+                    
+                    if not diff_generator.normalizes_lines and self._use_server_diff(original_content, modified_content):
+                        reservation.release(content_size)
+                        file_diffs[path] = ""  # ファイルの順序を保つための仮の値
+                        server_side_changes.append((change, path, change_type))
+                        continue
+                    
+                    # Unified Diffを生成
+                    with tracing.span("generate_file_diff", path=path, bytes=content_size) as span:
+                        file_diff = diff_generator.generate_file_diff(
+                            original_content=original_content,
+                            modified_content=modified_content,
+                            file_path=path,
+                            original_path=original_path
+                        )
+                        span.set(diff_bytes=len(file_diff))
+                    reservation.release(content_size)
+                    file_diffs[path] = self._reserve_file_diff(reservation, diff_generator, file_diff, path, original_path)
+            
+            if server_side_changes:
+                with tracing.span("server_side_diffs", files=len(server_side_changes)):
+                    self._generate_server_side_diffs(
+                        organization, project, repo_id, source_commit, target_commit, server_side_changes, file_diffs,
+                        reservation
+                    )
+            
+            if self.snapshot_store is not None and not reservation.degraded:
+                self.snapshot_store.put(key, snapshot_kind, file_diffs)
+            
+            # 注記は索引の状態に依存するため、スナップショットには注記前の差分を保存する
+            if annotate_unity_guids:
+                with tracing.span("annotate_unity_guids"):
+                    file_diffs = self._annotate_unity_guids(
+                        organization, project, repo_id, pr, pr_id, source_commit, target_commit, file_diffs
+                    )
+            
+            # 全ファイルのdiffを結合（差分がないファイルは含めない）
+            return "\n".join(d for d in file_diffs.values() if d)
+
+    def _annotate_unity_guids(
+        self,
+        organization: str,
+        project: str,
+        repo_id: str,
+        pr: Dict,
+        pr_id: int,
+        source_commit: str,
+        target_commit: str,
+        file_diffs: Dict[str, str]
+    ) -> Dict[str, str]:
+        """ファイルごとの差分に、現れるGUIDの参照先のアセットのパスを追加
+        
+        変更前はターゲットのコミットの索引を、変更後はそれにPRの.metaファイルの変更を反映した索引を使います。
+        GUIDの参照を含む差分がない場合は索引を作成しません。
+        """
+        if not any(GUID_REFERENCE_PATTERN.search(d) for d in file_diffs.values() if d):
+            return file_diffs
+        
+        target_index = self._get_guid_index(organization, project, repo_id, target_commit)
+        source_key = (organization, project, repo_id, target_commit, source_commit)
+        source_index = self.guid_indexes.get(source_key)
+        if source_index is None:
+            diff_data = self._get_commit_diffs(organization, project, repo_id, pr, pr_id)
+            if self._all_changes_included(diff_data):
+                source_index = target_index.copy()
+                self._apply_meta_changes(
+                    source_index, organization, project, repo_id, diff_data.get("changes", []), source_commit
+                )
+            else:
+                # 差分が一部の変更しか含まない場合は、ソースのコミットの索引で代用する
+                source_index = self._get_guid_index(organization, project, repo_id, source_commit)
+            self.guid_indexes.put(source_key, source_index)
+        
+        return {path: annotate_guids(d, source_index, target_index) if d else d for path, d in file_diffs.items()}
+
+    def _get_guid_index(self, organization: str, project: str, repo_id: str, commit_id: str) -> GuidIndex:
+        """コミットのGUID索引を取得
+        
+        索引済みのコミットがその祖先であれば、間のコミット差分に含まれる.metaファイルの変更だけを反映します。
+        そうでなければコミットの全.metaファイルを取得して作成します。
+        """
+        key = (organization, project, repo_id, commit_id)
+        index = self.guid_indexes.get(key)
+        if index is not None:
+            return index
+        
+        index = None
+        latest = self.guid_indexes.latest((organization, project, repo_id))
+        if latest is not None:
+            index = self._update_guid_index(organization, project, repo_id, latest[0][-1], latest[1], commit_id)
+        if index is None:
+            index = self._build_guid_index(organization, project, repo_id, commit_id)
+        self.guid_indexes.put(key, index)
+        return index
+
+    def _update_guid_index(
+        self,
+        organization: str,
+        project: str,
+        repo_id: str,
+        base_commit: str,
+        base_index: GuidIndex,
+        commit_id: str
+    ) -> Optional[GuidIndex]:
+        """base_commitの索引にcommit_idまでの.metaファイルの変更を反映した索引を作成
+        
+        Returns:
+            作成した索引（base_commitがcommit_idの祖先でない場合や、差分を取得できない・一部の変更しか
+            含まない場合はNone）
+        """
+        try:
+            diff_data = self.client.get_commit_diffs(organization, project, repo_id, commit_id, base_commit)
+        except Exception:
+            return None
+        # 差分はマージベースからの変更のため、マージベースが起点のコミットと一致する場合のみ使用できる
+        if (diff_data.get("common_commit") or diff_data.get("commonCommit")) != base_commit:
+            return None
+        if not self._all_changes_included(diff_data):
+            return None
+        index = base_index.copy()
+        self._apply_meta_changes(index, organization, project, repo_id, diff_data.get("changes", []), commit_id)
+        return index
+
+    def _build_guid_index(self, organization: str, project: str, repo_id: str, commit_id: str) -> GuidIndex:
+        """コミットの全.metaファイルをまとめて取得してGUID索引を作成
         
+        ファイル一覧のobjectIdで.metaファイルをget_blobsから一括で取得します。
+        取得できないファイルがあれば例外を送出し、不完全な索引は作成しません。
+        """
+        blob_ids = self.client.get_tree_blob_ids(organization, project, repo_id, commit_id)
+        meta_ids = {path: object_id for path, object_id in blob_ids.items() if path.endswith(".meta")}
+        contents = self.client.get_blobs(organization, project, repo_id, list(meta_ids.values()))
+        index = GuidIndex()
+        for path, object_id in meta_ids.items():
+            index.set_meta(path, contents[object_id])
+        return index
+
+    @staticmethod
+    def _all_changes_included(diff_data: Dict) -> bool:
+        """commit diffsの応答がすべての変更を含むか（allChangesIncludedがないバックエンドは常に含む）"""
+        included = diff_data.get("all_changes_included", diff_data.get("allChangesIncluded"))
+        return included is not False
+
+    def _apply_meta_changes(
+        self,
+        index: GuidIndex,
+        organization: str,
+        project: str,
+        repo_id: str,
+        changes: List[Dict],
+        commit_id: str
+    ) -> None:
+        """commit diffsのchangesのうち.metaファイルの変更を索引に反映（追加・変更は変更後の内容を取得）
+        
+        内容はobjectIdが分かるものをget_blobsでまとめて取得し、取得できなければ例外を送出します。
+        """
+        updates = []
         for change in changes:
             item = change.get("item", {})
             path = item.get("path", "")
-            
-            # change_typeはchangeTypeまたはchange_typeで返される可能性がある
-            change_type_raw = change.get("changeType") or change.get("change_type") or ""
-            # 文字列に変換（列挙型の場合があるため）
-            change_type = str(change_type_raw).lower()
-            
-            # git_object_typeはgitObjectTypeまたはgit_object_typeで返される可能性がある
             git_object_type = item.get("gitObjectType") or item.get("git_object_type", "")
-            is_folder = item.get("isFolder", False)
-            
-            # フォルダと.metaファイルをスキップ
-            if git_object_type == "tree" or is_folder:
+            if not path.endswith(".meta") or git_object_type == "tree" or item.get("isFolder", False):
                 continue
-            if path.endswith(".meta"):
+            change_type = str(change.get("changeType") or change.get("change_type") or "").lower()
+            source_server_item = change.get("sourceServerItem") or change.get("source_server_item")
+            if "rename" in change_type and source_server_item:
+                index.remove_meta(source_server_item)
+            if "delete" in change_type:
+                index.remove_meta(path)
                 continue
+            updates.append((path, item.get("objectId") or item.get("object_id")))
+        
+        contents = self.client.get_blobs(
+            organization, project, repo_id, [object_id for _, object_id in updates if object_id]
+        )
+        for path, object_id in updates:
+            if object_id:
+                index.set_meta(path, contents[object_id])
+            else:
+                index.set_meta(path, self.client._get_item_at_commit(organization, project, repo_id, path, commit_id))
+
+    def _reserve_file_diff(
+        self,
+        reservation: MemoryReservation,
+        diff_generator: UnifiedDiffGenerator,
+        file_diff: str,
+        path: str,
+        original_path: str
+    ) -> str:
+        """生成した差分のサイズを確保し、確保できない場合は差分を省略したエントリに置き換える"""
+        if reservation.reserve(len(file_diff)):
+            return file_diff
+        return diff_generator.generate_omitted_file_diff(
+            path, self.MEMORY_BUDGET_OMITTED_REASON, original_path=original_path
+        )
+
+    @staticmethod
+    def _file_diffs_kind(diff_generator: UnifiedDiffGenerator) -> str:
+        """比較オプションごとに区別したfile_diffsスナップショットの種類名"""
+        flags = ("w" if diff_generator.ignore_whitespace else "") + ("e" if diff_generator.ignore_eol else "")
+        return f"file_diffs:{flags}" if flags else "file_diffs"
+
+    def _detect_renames(
+        self,
+        organization: str,
+        project: str,
+        repo_id: str,
+        file_changes: List[Tuple[Dict, str, str]],
+        source_commit: str,
+        target_commit: str,
+        similarity: bool = True
+    ) -> List[Tuple[Dict, str, str]]:
+        """削除と追加の組として報告されたリネームを検出し、1つのリネームの変更にまとめる
+        
+        まずobjectIdが一致する組（内容が同一の移動）を対応付け、残りは行ハッシュのJaccard係数が
+        RENAME_SIMILARITY_THRESHOLD以上の組を類似度の高い順に対応付けます。削除・追加ファイルの
+        内容は差分の生成にも必要なため、類似度の推定で余分な取得は発生しません（blob_cacheを共有）。
+        
+        Args:
+            file_changes: _iter_file_changes が返す (change, path, change_type) のリスト
+            similarity: Falseの場合はobjectIdの一致のみで対応付け、内容を取得しない
+                （メタデータのみを返す変更概要で使用）
             
-            # 変更前後のファイル内容を取得
-            original_content = ""
-            modified_content = ""
-            
-            # 元のパス（リネーム用）
-            original_path = change.get("originalPath") or change.get("original_path") or path
-            
-            # 削除、編集、リネームの場合は元の内容が必要
-            if any(t in change_type for t in ["edit", "delete", "rename", "source_rename"]):
-                original_content = self.client.get_file_content_at_commit(
-                    organization, project, repo_id, original_path, target_commit
+        Returns:
+            リネームとみなした追加を移動元付きの変更に置き換え、対応する削除を除いたリスト
+        """
+        deleted = [i for i, (_, _, change_type) in enumerate(file_changes) if change_type == "delete"]
+        added = [i for i, (_, _, change_type) in enumerate(file_changes) if change_type == "add"]
+        if not deleted or not added:
+            return file_changes
+        
+        # 追加ファイルのインデックス -> 削除ファイルのインデックス
+        pairs: Dict[int, int] = {}
+        
+        # objectIdが一致する組は内容を取得せずに対応付ける
+        deleted_by_object_id: Dict[str, List[int]] = {}
+        for index in deleted:
+            item = file_changes[index][0].get("item", {})
+            original_object_id = item.get("originalObjectId") or item.get("original_object_id")
+            if original_object_id:
+                deleted_by_object_id.setdefault(original_object_id, []).append(index)
+        for index in added:
+            item = file_changes[index][0].get("item", {})
+            candidates = deleted_by_object_id.get(item.get("objectId") or item.get("object_id"))
+            if candidates:
+                pairs[index] = candidates.pop(0)
+        
+        paired_deleted = set(pairs.values())
+        remaining_deleted = [index for index in deleted if index not in paired_deleted]
+        remaining_added = [index for index in added if index not in pairs]
+        if similarity and remaining_deleted and remaining_added:
+            pairs.update(self._pair_similar_files(
+                organization, project, repo_id, file_changes, remaining_deleted, remaining_added,
+                source_commit, target_commit
+            ))
+        
+        if not pairs:
+            return file_changes
+        
+        renamed_sources = set(pairs.values())
+        result = []
+        for index, (change, path, change_type) in enumerate(file_changes):
+            if index in renamed_sources:
+                continue
+            if index in pairs:
+                source_change, source_path, _ = file_changes[pairs[index]]
+                source_item = source_change.get("item", {})
+                item = dict(change.get("item", {}))
+                item["originalObjectId"] = source_item.get("originalObjectId") or source_item.get("original_object_id")
+                change = {**change, "changeType": "rename", "sourceServerItem": source_path, "item": item}
+                change_type = "rename"
+            result.append((change, path, change_type))
+        return result
+
+    def _pair_similar_files(
+        self,
+        organization: str,
+        project: str,
+        repo_id: str,
+        file_changes: List[Tuple[Dict, str, str]],
+        deleted: List[int],
+        added: List[int],
+        source_commit: str,
+        target_commit: str
+    ) -> Dict[int, int]:
+        """内容が類似する削除ファイルと追加ファイルを対応付ける
+        
+        全組み合わせを比較せず、削除ファイルの行ハッシュの転置インデックスで共通の行を持つ
+        候補だけを求めてからJaccard係数を計算します。
+        
+        Returns:
+            {追加ファイルのインデックス: 削除ファイルのインデックス} の辞書
+        """
+        def signature(index: int) -> FrozenSet[int]:
+            change, _, change_type = file_changes[index]
+            # 内容は行ハッシュを求める間だけ保持する。予算を確保できないファイルはリネームの候補にしない
+            with MemoryReservation(self.memory_budget) as reservation:
+                contents = self._load_reserved_contents(
+                    reservation, organization, project, repo_id, change, change_type, source_commit, target_commit
                 )
+                if contents is None:
+                    return frozenset()
+                return self.diff_generator.line_signature(contents[0] or contents[1])
+        
+        deleted_signatures = {index: signature(index) for index in deleted}
+        postings: Dict[int, List[int]] = {}
+        for index, line_hashes in deleted_signatures.items():
+            for line_hash in line_hashes:
+                postings.setdefault(line_hash, []).append(index)
+        
+        scored = []
+        for added_index in added:
+            added_signature = signature(added_index)
+            candidates = set()
+            for line_hash in added_signature:
+                posting = postings.get(line_hash)
+                if posting and len(posting) <= self.RENAME_COMMON_LINE_LIMIT:
+                    candidates.update(posting)
+            for deleted_index in candidates:
+                score = self.diff_generator.similarity(deleted_signatures[deleted_index], added_signature)
+                if score >= self.RENAME_SIMILARITY_THRESHOLD:
+                    scored.append((score, added_index, deleted_index))
+        
+        # 類似度の高い組から順に、まだ対応付けられていないファイル同士を対応付ける
+        pairs: Dict[int, int] = {}
+        used = set()
+        for _, added_index, deleted_index in sorted(scored, key=lambda s: (-s[0], s[1], s[2])):
+            if added_index in pairs or deleted_index in used:
+                continue
+            pairs[added_index] = deleted_index
+            used.add(deleted_index)
+        return pairs
+
+    def _use_server_diff(self, original_content: str, modified_content: str) -> bool:
+        """サーバー側の行差分ブロックを使用するかをファイルサイズで判定
+        
+        両側に内容があり、どちらかがserver_diff_threshold以上の大きなファイルの場合のみ使用します。
+        行差分ブロックを提供しないクライアント（SERVER_SIDE_DIFFSがFalse）では使用しません。
+        """
+        if not self.server_diff_threshold or not getattr(self.client, "SERVER_SIDE_DIFFS", False):
+            return False
+        if not original_content or not modified_content:
+            return False
+        if original_content == modified_content:
+            return False
+        return max(len(original_content), len(modified_content)) >= self.server_diff_threshold
+
+    def _generate_server_side_diffs(
+        self,
+        organization: str,
+        project: str,
+        repo_id: str,
+        source_commit: str,
+        target_commit: str,
+        changes: List[Tuple[Dict, str, str]],
+        file_diffs: Dict[str, str],
+        reservation: MemoryReservation
+    ) -> None:
+        """サーバー側で計算された行差分ブロックをまとめて取得し、Unified Diffを生成
+        
+        SERVER_DIFF_BATCH_SIZE件ごとにFileDiffs APIを呼び出します。APIの呼び出しに失敗した場合や、
+        ブロックがファイル内容と整合しない場合は、そのファイルをdifflibで比較します。
+        
+        Args:
+            changes: (change, path, change_type) のタプルのリスト
+            file_diffs: 生成した差分を格納する {path: diff} の辞書
+            reservation: 内容と生成した差分のサイズを確保するメモリ予算
+        """
+        for start in range(0, len(changes), self.SERVER_DIFF_BATCH_SIZE):
+            batch = changes[start:start + self.SERVER_DIFF_BATCH_SIZE]
+            files = [(path, self._get_original_path(change, path)) for change, path, _ in batch]
+            try:
+                results = self.client.get_file_diffs(
+                    organization, project, repo_id, source_commit, target_commit, files
+                )
+                blocks_by_path = {r.get("path"): r.get("line_diff_blocks") or [] for r in results}
+            except Exception:
+                blocks_by_path = {}
             
-            # 追加、編集、リネームの場合は変更後の内容が必要
-            if any(t in change_type for t in ["edit", "add", "rename", "target_rename"]):
-                modified_content = self.client.get_file_content_at_commit(
-                    organization, project, repo_id, path, source_commit
+            for change, path, change_type in batch:
+                original_path = self._get_original_path(change, path)
+                # 内容は1回目の取得でblob_cacheに入っている
+                contents = self._load_reserved_contents(
+                    reservation, organization, project, repo_id, change, change_type, source_commit, target_commit
+                )
+                if contents is None:
+                    file_diffs[path] = self.diff_generator.generate_omitted_file_diff(
+                        path, self.MEMORY_BUDGET_OMITTED_REASON, original_path=original_path
+                    )
+                    continue
+                original_content, modified_content = contents
+                file_diff = None
+                blocks = blocks_by_path.get(path)
+                if blocks is not None:
+                    try:
+                        file_diff = self.diff_generator.generate_file_diff_from_blocks(
+                            original_content, modified_content, path, blocks, original_path=original_path
+                        )
+                    except ValueError:
+                        file_diff = None
+                if file_diff is None:
+                    file_diff = self.diff_generator.generate_file_diff(
+                        original_content=original_content,
+                        modified_content=modified_content,
+                        file_path=path,
+                        original_path=original_path
+                    )
+                reservation.release(len(original_content) + len(modified_content))
+                file_diffs[path] = self._reserve_file_diff(
+                    reservation, self.diff_generator, file_diff, path, original_path
                 )
+
+    def list_active_pull_request_ids(self, organization: str, project: str, repo_id: str, target_branch: str) -> List[int]:
+        """指定ブランチをマージ先とするアクティブなプルリクエストのID一覧を取得
+        
+        Args:
+            organization: Azure DevOps組織名
+            project: プロジェクト名
+            repo_id: リポジトリID
+            target_branch: マージ先ブランチ名（"main" または "refs/heads/main"）
             
-            # Unified Diffを生成
-            file_diff = self.diff_generator.generate_file_diff(
-                original_content=original_content,
-                modified_content=modified_content,
-                file_path=path
-            )
+        Returns:
+            プルリクエストIDのリスト
+        """
+        target_ref_name = target_branch if target_branch.startswith("refs/") else f"refs/heads/{target_branch}"
+        pull_requests = self.client.list_pull_requests(
+            organization, project, repo_id, target_ref_name=target_ref_name, status="active"
+        )
+        return [pr.get("pull_request_id") or pr.get("pullRequestId") for pr in pull_requests]
+
+    def iter_pull_request_reviews(
+        self,
+        organization: str,
+        project: str,
+        repo_id: str,
+        pr_ids: List[int],
+        include_diff: bool = True,
+        max_workers: int = 4,
+        compact: bool = False
+    ) -> Iterator[Dict]:
+        """複数のプルリクエストの変更概要とUnified Diffを並列に取得し、完了順に返す
+        
+        全PRで同じクライアント（接続とblobキャッシュ）と1つの上限付きワーカープールを
+        共有するため、スタックされたPR間で共通のblobは1度だけ取得されます。
+        呼び出し側が途中でジェネレーターを閉じた場合、未着手のPRは取り消し、処理中のPRは
+        Unified Diffを生成せずに終了します。
+        
+        Args:
+            organization: Azure DevOps組織名
+            project: プロジェクト名
+            repo_id: リポジトリID
+            pr_ids: プルリクエストIDのリスト（重複したIDは1度だけ処理し、結果も1件のみ返す）
+            include_diff: Unified Diffも取得するか（デフォルト: True）
+            max_workers: 同時に処理するPRの最大数（デフォルト: 4）
+            compact: 変更概要をコンパクト形式で返すか（デフォルト: False）
+            
+        Yields:
+            PRごとの結果の辞書（pull_request_id, summary, unified_diff）。
+            取得に失敗したPRは pull_request_id と error のみを含みます。
+        """
+        closed = threading.Event()
+        
+        def review(pr_id: int) -> Dict:
+            # 変更概要とUnified DiffでPRのメタデータを共有する
+            with pull_request_scope():
+                result = {
+                    "pull_request_id": pr_id,
+                    "summary": self.get_pull_request_change_summary(
+                        organization, project, repo_id, pr_id, compact=compact
+                    )
+                }
+                # 結果を受け取る呼び出し側がいなくなった場合は、最も重い差分の生成を省く
+                if include_diff and not closed.is_set():
+                    result["unified_diff"] = self.get_pull_request_unified_diff(
+                        organization, project, repo_id, pr_id
+                    )
+            return result
+        
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pr-review")
+        try:
+            review = tracing.bind(review)
+            futures = {executor.submit(review, pr_id): pr_id for pr_id in dict.fromkeys(pr_ids)}
+            for future in as_completed(futures):
+                try:
+                    yield future.result()
+                except Exception as e:
+                    # 1つのPRの失敗で全体を止めない
+                    yield {"pull_request_id": futures[future], "error": str(e)}
+        finally:
+            # 呼び出し側が途中で読み出しをやめた場合（close()・例外）は未着手のPRを取り消す
+            closed.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def get_pull_request_diff_stats(self, organization: str, project: str, repo_id: str, pr_id: int) -> Dict:
+        """プルリクエストのファイルごとの追加・削除行数を取得
+        
+        Unified Diffのテキストは生成せず、行数のみを数えます。
+        変更前後のobjectIdが同じファイル（モード変更やパスのみのリネームなど）は
+        内容を取得せずに0行として扱います。
+        
+        Args:
+            organization: Azure DevOps組織名
+            project: プロジェクト名
+            repo_id: リポジトリID
+            pr_id: プルリクエストID
             
-            if file_diff:  # 差分がある場合のみ追加
-                unified_diffs.append(file_diff)
+        Returns:
+            ファイルごとの行数（files）と合計（total_added, total_removed）を含む辞書
+        """
+        pr = self._fetch_pull_request(organization, project, repo_id, pr_id)
+        source_commit, target_commit = self._get_merge_commits(pr)
+        
+        if not source_commit or not target_commit:
+            return {"error": "Could not determine source/target commits for diff."}
+        
+        diff_data = self._get_commit_diffs(organization, project, repo_id, pr, pr_id)
+        
+        file_changes = self._detect_renames(
+            organization, project, repo_id, list(self._iter_file_changes(diff_data.get("changes", []))),
+            source_commit, target_commit
+        )
+        
+        files = []
+        with MemoryReservation(self.memory_budget) as reservation:
+            for change, path, change_type in file_changes:
+                source_server_item = change.get("sourceServerItem") or change.get("source_server_item")
+                entry = {"path": path, "status": self._normalize_change_type(change_type, source_server_item)}
+                
+                if self._is_content_unchanged(change):
+                    added, removed = 0, 0
+                else:
+                    contents = self._load_reserved_contents(
+                        reservation, organization, project, repo_id, change, change_type, source_commit, target_commit
+                    )
+                    if contents is None:
+                        # メモリ予算を確保できなかったファイルは行数を数えない
+                        files.append({**entry, "added": None, "removed": None, "omitted": True})
+                        continue
+                    added, removed = self.diff_generator.count_changes(*contents)
+                    reservation.release(len(contents[0]) + len(contents[1]))
+                
+                files.append({**entry, "added": added, "removed": removed})
+        
+        return {
+            "files": files,
+            "total_added": sum(f["added"] or 0 for f in files),
+            "total_removed": sum(f["removed"] or 0 for f in files),
+        }
+
+    def search_pull_request(
+        self,
+        organization: str,
+        project: str,
+        repo_id: str,
+        pr_id: int,
+        query: str,
+        include_base: bool = False,
+        case_sensitive: bool = True,
+        max_results: int = 100
+    ) -> Dict:
+        """プルリクエストの変更ファイルの内容を文字列で検索
+        
+        索引はソース・ターゲットのコミットの組ごとに保持し、まだ索引していないファイルだけを
+        取得して追加します。同じPRバージョンへの2回目以降の検索はファイルを取得しません。
+        
+        Args:
+            organization: Azure DevOps組織名
+            project: プロジェクト名
+            repo_id: リポジトリID
+            pr_id: プルリクエストID
+            query: 検索する文字列
+            include_base: 変更前（ターゲット側）の内容も検索する（デフォルト: False）
+            case_sensitive: 大文字・小文字を区別する（デフォルト: True）
+            max_results: 返す一致行の最大数（デフォルト: 100）
+            
+        Returns:
+            一致行（matches）、打ち切ったか（truncated）、検索したファイル数（files_searched）を含む辞書
+        """
+        pr = self._fetch_pull_request(organization, project, repo_id, pr_id)
+        source_commit, target_commit = self._get_merge_commits(pr)
+        
+        if not source_commit or not target_commit:
+            return {"error": "Could not determine source/target commits for diff."}
+        
+        diff_data = self._get_commit_diffs(organization, project, repo_id, pr, pr_id)
+        index = self.search_indexes.get((organization, project, repo_id, source_commit, target_commit))
+        
+        files = 0
+        for change, path, change_type in self._iter_file_changes(diff_data.get("changes", [])):
+            item = change.get("item", {})
+            if "delete" not in change_type:
+                files += 1
+                if ("head", path) not in index:
+                    index.add("head", path, self.client.get_file_content_at_commit(
+                        organization, project, repo_id, path, source_commit,
+                        object_id=item.get("objectId") or item.get("object_id")
+                    ))
+            if include_base and "add" not in change_type:
+                original_path = self._get_original_path(change, path)
+                files += 1
+                if ("base", original_path) not in index:
+                    index.add("base", original_path, self.client.get_file_content_at_commit(
+                        organization, project, repo_id, original_path, target_commit,
+                        object_id=item.get("originalObjectId") or item.get("original_object_id")
+                    ))
+        self.search_indexes.trim()
         
-        # 全ファイルのdiffを結合
-        return "\n".join(unified_diffs)
+        matches, truncated = index.search(
+            query, case_sensitive=case_sensitive, max_results=max_results,
+            sides=("head", "base") if include_base else ("head",)
+        )
+        return {"matches": matches, "truncated": truncated, "files_searched": files}
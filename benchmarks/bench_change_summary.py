@@ -0,0 +1,60 @@
+"""get_pull_request_change_summary の通常形式とコンパクト形式の比較ベンチマーク
+
+合成PRの変更概要を、FastMCPがツールの結果に使用するのと同じ方法
+（pydantic_core.to_json, indent=2）でシリアライズし、バイト数と所要時間を比較します。
+
+Usage:
+    python benchmarks/bench_change_summary.py [--profiles small medium huge] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pydantic_core
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from azure_arbiter import AzureReposArbiter
+from replay_client import PROFILES, ReplayAzureReposClient, generate_fixture
+
+
+def serialize(result) -> bytes:
+    return pydantic_core.to_json(result, fallback=str, indent=2)
+
+
+def best_of(repeat: int, fn, *args) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        samples.append((time.perf_counter() - start) * 1000.0)
+    return min(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", nargs="+", choices=sorted(PROFILES), default=["small", "medium", "huge"])
+    parser.add_argument("--repeat", type=int, default=5, help="試行回数（最小値を採用）")
+    args = parser.parse_args()
+
+    print(f"{'profile':10s} {'files':>6s} {'full KiB':>10s} {'compact KiB':>12s} {'ratio':>7s} "
+          f"{'full ms':>9s} {'compact ms':>11s}")
+    for profile in args.profiles:
+        with tempfile.TemporaryDirectory(prefix=f"bench-{profile}-") as fixture_dir:
+            generate_fixture(fixture_dir, profile)
+            arbiter = AzureReposArbiter(ReplayAzureReposClient(fixture_dir))
+            full = arbiter.get_pull_request_change_summary("o", "p", "r", 1)
+            compact = arbiter.get_pull_request_change_summary("o", "p", "r", 1, compact=True)
+
+            full_bytes = len(serialize(full))
+            compact_bytes = len(serialize(compact))
+            full_ms = best_of(args.repeat, serialize, full)
+            compact_ms = best_of(args.repeat, serialize, compact)
+            print(f"{profile:10s} {len(full['changes']):6d} {full_bytes / 1024:10.1f} {compact_bytes / 1024:12.1f} "
+                  f"{full_bytes / compact_bytes:6.1f}x {full_ms:9.2f} {compact_ms:11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""UnifiedDiffGenerator.generate_file_diff のマイクロベンチマーク
+
+大きなファイルに数行の変更を加えた場合の所要時間を、ファイル全体をdifflibで比較する場合
+（先頭・末尾の共通行を除かない従来の方法）と比較します。共通行を除く場合は、
+所要時間がほぼ行数に比例して増えることを確認できます。
+
+Usage:
+    python benchmarks/bench_diff_generator.py [--lines 1000 5000 20000 80000] [--repeat 5]
+"""
+import argparse
+import difflib
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from unified_diff_generator import UnifiedDiffGenerator
+
+
+def make_source(lines: int, seed: int) -> str:
+    rnd = random.Random(seed)
+    return "".join(
+        f"    var value{i} = Compute({rnd.randint(0, 10 ** 6)}, \"{rnd.choice('abcdef') * 4}\");\n"
+        for i in range(lines)
+    )
+
+
+def edit(content: str, edits: int, seed: int) -> str:
+    rnd = random.Random(seed)
+    lines = content.splitlines(keepends=True)
+    # 変更はファイル中央付近の狭い範囲にまとめる（小さな修正を想定）
+    center = len(lines) // 2
+    for _ in range(edits):
+        index = center + rnd.randint(-10, 10)
+        lines[index] = "    // edited\n" + lines[index]
+    return "".join(lines)
+
+
+def full_diff(generator: UnifiedDiffGenerator, original: str, modified: str) -> str:
+    """先頭・末尾の共通行を除かずにファイル全体を比較する（比較用の従来の方法）"""
+    original_lines = generator._split_lines(original)
+    modified_lines = generator._split_lines(modified)
+    opcodes = difflib.SequenceMatcher(None, original_lines, modified_lines).get_opcodes()
+    return generator._render(original_lines, modified_lines, opcodes, "a/f.cs", "b/f.cs")
+
+
+def best_of(repeat: int, fn, *args) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        samples.append((time.perf_counter() - start) * 1000.0)
+    return min(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", nargs="+", type=int, default=[1000, 5000, 20000, 80000])
+    parser.add_argument("--edits", type=int, default=3, help="1ファイルあたりの変更行数")
+    parser.add_argument("--repeat", type=int, default=5, help="試行回数（最小値を採用）")
+    args = parser.parse_args()
+
+    generator = UnifiedDiffGenerator()
+    print(f"{'lines':>8} {'full (ms)':>10} {'trimmed (ms)':>13} {'identical (ms)':>15} {'speedup':>8}")
+    for lines in args.lines:
+        original = make_source(lines, seed=lines)
+        modified = edit(original, args.edits, seed=lines)
+        assert generator.generate_file_diff(original, modified, "f.cs")
+
+        full_ms = best_of(args.repeat, full_diff, generator, original, modified)
+        trimmed_ms = best_of(args.repeat, generator.generate_file_diff, original, modified, "f.cs")
+        # 同一オブジェクトの比較にならないよう、同じ内容の別の文字列を用意する
+        identical = (original + "\n")[:-1]
+        identical_ms = best_of(args.repeat, generator.generate_file_diff, original, identical, "f.cs")
+        print(
+            f"{lines:>8} {full_ms:>10.2f} {trimmed_ms:>13.2f} {identical_ms:>15.3f} "
+            f"{full_ms / trimmed_ms:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
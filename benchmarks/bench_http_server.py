@@ -0,0 +1,133 @@
+"""HTTPモード（streamable-http）の複数クライアント負荷テスト
+
+1つのサーバープロセス（同一プロセス内のuvicorn）に複数のMCPセッションから同時に
+get_pull_request_unified_diff を呼び出し、ツールのワーカー数ごとにスループットと応答時間を報告します。
+Azure DevOpsの代わりにReplayAzureReposClientで遅延を模擬するため、ネットワークやPATは使用しません。
+各セッションは X-Azure-DevOps-PAT ヘッダーで --pats 種類のPATのいずれかを送り、
+同じPATのセッション間でのみ接続とblobキャッシュが共有されることも確認します。
+
+Usage:
+    python benchmarks/bench_http_server.py [--clients 16] [--requests 8] [--pats 2] [--workers 1 8]
+"""
+import argparse
+import logging
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+os.environ.setdefault("AZURE_DEVOPS_WARMUP", "0")
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import anyio
+import uvicorn
+from mcp import ClientSession
+from mcp.client.streamable_http import create_mcp_http_client, streamable_http_client
+
+import main
+from replay_client import PROFILES, ReplayAzureReposClient, generate_fixture
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int) -> uvicorn.Server:
+    config = uvicorn.Config(main.mcp.streamable_http_app(), host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, name="uvicorn", daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+async def run_client(url: str, pat: str, pr_ids, requests: int, latencies) -> None:
+    async with create_mcp_http_client(headers={main.PAT_HEADER: pat}) as http_client:
+        async with streamable_http_client(url, http_client=http_client) as (read, write, _):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                for index in range(requests):
+                    start = time.perf_counter()
+                    result = await session.call_tool("get_pull_request_unified_diff", {
+                        "id": pr_ids[index % len(pr_ids)],
+                        "organization": "o", "project": "p", "repository_id": "r",
+                    })
+                    latencies.append((time.perf_counter() - start) * 1000.0)
+                    if result.isError:
+                        raise RuntimeError(result.content[0].text)
+
+
+async def run_load(url: str, args, pr_ids):
+    latencies = []
+    async with anyio.create_task_group() as group:
+        for index in range(args.clients):
+            group.start_soon(run_client, url, f"pat-{index % args.pats}", pr_ids, args.requests, latencies)
+    return latencies
+
+
+def main_() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="small")
+    parser.add_argument("--prs", type=int, default=4, help="リクエストで巡回するPRの数")
+    parser.add_argument("--clients", type=int, default=16, help="同時に接続するMCPセッション数")
+    parser.add_argument("--requests", type=int, default=8, help="1セッションあたりの呼び出し回数")
+    parser.add_argument("--pats", type=int, default=2, help="セッションが使い分けるPATの種類")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 8], help="比較するツールのワーカー数")
+    parser.add_argument("--latency", type=float, default=0.02, help="1回のAPI呼び出しの遅延（秒）")
+    parser.add_argument("--response-cache", action="store_true", help="ツール応答キャッシュを有効にする")
+    args = parser.parse_args()
+
+    fixture_dir = tempfile.mkdtemp(prefix="bench-http-")
+    pr_ids = list(range(1, args.prs + 1))
+    for pr_id in pr_ids:
+        generate_fixture(fixture_dir, args.profile, pr_id=pr_id)
+
+    clients = []
+
+    def create_client(pat, blob_cache=None, pool=None, session=None):
+        client = ReplayAzureReposClient(fixture_dir, latency=args.latency, blob_cache=blob_cache)
+        clients.append(client)
+        return client
+
+    # セッションの開始・終了ごとのHTTPとMCPのログを抑える
+    logging.getLogger().setLevel(logging.WARNING)
+    main.create_client = create_client
+    if not args.response_cache:
+        main.response_cache.max_entries = 0
+
+    port = free_port()
+    server = start_server(port)
+    url = f"http://127.0.0.1:{port}/mcp"
+    print(f"profile={args.profile} prs={args.prs} clients={args.clients} requests={args.requests} "
+          f"pats={args.pats} latency={args.latency}s")
+    print(f"{'workers':>8s} {'total(s)':>9s} {'req/s':>8s} {'p50(ms)':>9s} {'p95(ms)':>9s} {'api_calls':>10s} {'pats':>5s}")
+    try:
+        for workers in args.workers:
+            # ワーカー数ごとに空のキャッシュから計測する
+            main.TOOL_WORKERS = workers
+            main._tool_limiter = None
+            with main._registry_lock:
+                for registry in main._registries.values():
+                    registry.close()
+                main._registries.clear()
+            main.response_cache.clear()
+            clients.clear()
+
+            start = time.perf_counter()
+            latencies = anyio.run(run_load, url, args, pr_ids)
+            total = time.perf_counter() - start
+            latencies.sort()
+            p95 = latencies[max(0, int(len(latencies) * 0.95) - 1)]
+            print(f"{workers:8d} {total:9.2f} {len(latencies) / total:8.1f} {statistics.median(latencies):9.1f} "
+                  f"{p95:9.1f} {sum(c.request_count for c in clients):10d} {len(main._registries):5d}")
+    finally:
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,83 @@
+"""レビューパイプライン全体のベンチマーク（記録済み・合成フィクスチャを使用）
+
+ReplayAzureReposClientでネットワークを模擬し、各プロファイルのPRに対して
+get_pull_request_change_summary / get_pull_request_unified_diff / get_comments を実行して、
+実行時間・API呼び出し回数・ピークメモリ・出力サイズを報告します。
+各計測はキャッシュが空の新しいクライアントで行います。
+
+Usage:
+    python benchmarks/bench_pipeline.py [--profiles small medium huge] [--latency 0.02] [--jitter 0.01]
+    python benchmarks/bench_pipeline.py --fixture <recorded_dir> --pr-id 354
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from azure_arbiter import AzureReposArbiter
+from replay_client import PROFILES, ReplayAzureReposClient, generate_fixture
+
+OPERATIONS = [
+    ("change_summary", lambda arbiter, pr_id: arbiter.get_pull_request_change_summary("o", "p", "r", pr_id)),
+    ("unified_diff", lambda arbiter, pr_id: arbiter.get_pull_request_unified_diff("o", "p", "r", pr_id)),
+    ("comments", lambda arbiter, pr_id: arbiter.get_comments("o", "p", "r", pr_id)),
+]
+
+
+def output_size(result) -> int:
+    if isinstance(result, str):
+        return len(result.encode("utf-8"))
+    return len(json.dumps(result, default=str).encode("utf-8"))
+
+
+def run_operation(fixture_dir: str, pr_id: int, operation, args, trace_memory: bool):
+    client = ReplayAzureReposClient(fixture_dir, latency=args.latency, jitter=args.jitter, seed=0)
+    arbiter = AzureReposArbiter(client)
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    result = operation(arbiter, pr_id)
+    elapsed = (time.perf_counter() - start) * 1000.0
+    peak = 0
+    if trace_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return elapsed, client.request_count, peak, output_size(result)
+
+
+def bench(label: str, fixture_dir: str, pr_id: int, args) -> None:
+    for name, operation in OPERATIONS:
+        elapsed, requests, _, size = run_operation(fixture_dir, pr_id, operation, args, trace_memory=False)
+        peak = 0
+        if not args.no_memory:
+            peak = run_operation(fixture_dir, pr_id, operation, args, trace_memory=True)[2]
+        print(f"{label:10s} {name:16s} {elapsed:10.1f} {requests:9d} {peak / 1024 / 1024:10.1f} {size / 1024:10.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", nargs="+", choices=sorted(PROFILES), default=["small", "medium", "huge"])
+    parser.add_argument("--fixture", help="記録済みフィクスチャのディレクトリ（指定時はプロファイルの代わりに使用）")
+    parser.add_argument("--pr-id", type=int, default=1, help="--fixture 使用時のPR ID")
+    parser.add_argument("--latency", type=float, default=0.0, help="1回のAPI呼び出しの遅延（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="遅延の揺らぎの最大値（秒）")
+    parser.add_argument("--no-memory", action="store_true", help="ピークメモリの計測（tracemalloc）を省略")
+    args = parser.parse_args()
+
+    print(f"{'profile':10s} {'operation':16s} {'wall ms':>10s} {'requests':>9s} {'peak MiB':>10s} {'out KiB':>10s}")
+    if args.fixture:
+        bench("recorded", args.fixture, args.pr_id, args)
+        return
+    for profile in args.profiles:
+        with tempfile.TemporaryDirectory(prefix=f"bench-{profile}-") as fixture_dir:
+            generate_fixture(fixture_dir, profile)
+            bench(profile, fixture_dir, 1, args)
+
+
+if __name__ == "__main__":
+    main()
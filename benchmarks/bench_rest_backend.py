@@ -0,0 +1,116 @@
+"""SDK経由とREST直接呼び出しの応答変換コストの比較ベンチマーク
+
+大きなコミット差分とコメントスレッド一覧の応答（JSON文字列）を生成し、
+以下の2つの経路で辞書に変換するまでのCPU時間を比較します（ネットワークは含みません）。
+- SDK:  json.loads -> msrestでモデルにデシリアライズ -> as_dict()
+- REST: json.loads -> to_sdk_dict（キー名の変換のみ）
+
+Usage:
+    python benchmarks/bench_rest_backend.py [--files 5000] [--threads 2000] [--repeat 3]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from msrest import Deserializer
+from azure.devops.v7_1.git import models
+
+from rest_client import to_sdk_dict
+
+SDK_MODELS = {k: v for k, v in models.__dict__.items() if isinstance(v, type)}
+
+
+def build_commit_diffs(files: int) -> str:
+    changes = [
+        {
+            "changeType": "edit",
+            "item": {
+                "path": f"/Assets/Scripts/Module{i // 50}/File{i}.cs",
+                "gitObjectType": "blob",
+                "objectId": f"{i:040x}",
+                "originalObjectId": f"{i + 1:040x}",
+                "commitId": "c" * 40,
+                "url": f"https://dev.azure.com/org/proj/_apis/git/repositories/repo/items/File{i}.cs",
+            },
+        }
+        for i in range(files)
+    ]
+    return json.dumps({"changeCounts": {"Edit": files}, "changes": changes, "commonCommit": "b" * 40})
+
+
+def build_threads(threads: int) -> str:
+    value = [
+        {
+            "id": i,
+            "publishedDate": "2024-01-02T03:04:05.123Z",
+            "lastUpdatedDate": "2024-01-02T03:04:05.123Z",
+            "status": "active",
+            "threadContext": {
+                "filePath": f"/Assets/Scripts/File{i}.cs",
+                "rightFileStart": {"line": i % 300 + 1, "offset": 1},
+                "rightFileEnd": {"line": i % 300 + 2, "offset": 1},
+            },
+            "comments": [
+                {
+                    "id": j,
+                    "parentCommentId": 0,
+                    "content": f"Comment {j} on thread {i}",
+                    "commentType": "text",
+                    "publishedDate": "2024-01-02T03:04:05.123Z",
+                    "author": {"displayName": "Reviewer", "uniqueName": "reviewer@example.com", "id": "u" * 36},
+                }
+                for j in range(3)
+            ],
+            "properties": {"CodeReviewThreadType": {"$type": "System.String", "$value": "Comment"}},
+        }
+        for i in range(threads)
+    ]
+    return json.dumps({"count": threads, "value": value})
+
+
+def sdk_path(model: str, raw: str, many: bool):
+    data = json.loads(raw)
+    deserializer = Deserializer(SDK_MODELS)
+    if many:
+        return [obj.as_dict() for obj in deserializer(f"[{model}]", data["value"])]
+    return deserializer(model, data).as_dict()
+
+
+def rest_path(raw: str, many: bool):
+    data = json.loads(raw)
+    return to_sdk_dict(data["value"] if many else data)
+
+
+def best_of(repeat: int, fn, *args) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        samples.append((time.perf_counter() - start) * 1000.0)
+    return min(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=5000, help="コミット差分の変更ファイル数")
+    parser.add_argument("--threads", type=int, default=2000, help="コメントスレッド数")
+    parser.add_argument("--repeat", type=int, default=3, help="試行回数（最小値を採用）")
+    args = parser.parse_args()
+
+    cases = [
+        ("GitCommitDiffs", build_commit_diffs(args.files), False),
+        ("GitPullRequestCommentThread", build_threads(args.threads), True),
+    ]
+    print(f"{'payload':30s} {'bytes':>10s} {'sdk ms':>10s} {'rest ms':>10s} {'speedup':>8s}")
+    for model, raw, many in cases:
+        sdk_ms = best_of(args.repeat, sdk_path, model, raw, many)
+        rest_ms = best_of(args.repeat, rest_path, raw, many)
+        print(f"{model:30s} {len(raw):10d} {sdk_ms:10.1f} {rest_ms:10.1f} {sdk_ms / rest_ms:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""MCPサーバーの起動時間ベンチマーク
+
+以下の2つを計測します。
+- サーバープロセスの起動から最初の list_tools 応答までの時間（stdio経由、複数回の中央値）
+- 主要モジュールのインポートコスト（python -X importtime の累積時間）
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 5]
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+import anyio
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+MODULES = [
+    "main",
+    "client",
+    "azure_arbiter",
+    "unified_diff_generator",
+    "models",
+    "mcp.server.fastmcp",
+    "azure.devops.connection",
+    "azure.devops.v7_1.git.models",
+    "msrest",
+]
+
+# ネットワークに接続しないダミー設定（list_toolsは設定値を使用しない）
+SERVER_ENV = {
+    "AZURE_DEVOPS_ORGANIZATION": "bench-org",
+    "AZURE_DEVOPS_PROJECT": "bench-project",
+    "AZURE_DEVOPS_REPOSITORY_ID": "bench-repo",
+    "AZURE_DEVOPS_PAT": "bench-pat",
+}
+
+
+def measure_import_cost(module: str) -> float:
+    """新しいプロセスでモジュールをインポートし、累積インポート時間（ミリ秒）を返す"""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    pattern = re.compile(r"import time:\s+\d+ \|\s+(\d+) \|\s*" + re.escape(module) + r"$")
+    for line in completed.stderr.splitlines():
+        match = pattern.match(line)
+        if match:
+            return int(match.group(1)) / 1000.0
+    return 0.0
+
+
+async def measure_time_to_list_tools() -> float:
+    """サーバーを起動し、最初のlist_tools応答が返るまでの時間（ミリ秒）を返す"""
+    params = StdioServerParameters(
+        command=sys.executable,
+        args=[os.path.join(ROOT, "main.py")],
+        cwd=ROOT,
+        env={**os.environ, **SERVER_ENV},
+    )
+    start = time.perf_counter()
+    async with stdio_client(params) as (read_stream, write_stream):
+        async with ClientSession(read_stream, write_stream) as session:
+            await session.initialize()
+            result = await session.list_tools()
+            elapsed = (time.perf_counter() - start) * 1000.0
+    assert result.tools, "list_tools returned no tools"
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="list_tools計測の試行回数")
+    args = parser.parse_args()
+
+    print("== Import cost (cumulative, ms) ==")
+    for module in MODULES:
+        print(f"{module:40s} {measure_import_cost(module):8.1f}")
+
+    print()
+    print("== Time to first list_tools response (ms) ==")
+    samples = [anyio.run(measure_time_to_list_tools) for _ in range(args.runs)]
+    print(f"median {statistics.median(samples):8.1f}  min {min(samples):8.1f}  max {max(samples):8.1f}  runs {len(samples)}")
+
+
+if __name__ == "__main__":
+    main()
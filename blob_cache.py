@@ -0,0 +1,92 @@
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional
+
+
+class BlobCache:
+    """ファイル内容（blob）のインメモリLRUキャッシュ
+
+    スレッドセーフであり、同じキーに対する同時取得は1回の読み込みにまとめられます
+    （single-flight）。スタックされた複数のPRで共有されるblobも1度だけ取得されます。
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        """
+        Args:
+            max_bytes: キャッシュに保持する内容の合計サイズ上限（文字数換算、デフォルト: 256MB）
+        """
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, str]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, threading.Event] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[str]:
+        """キャッシュから内容を取得（存在しない場合はNone）"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: str) -> None:
+        """内容をキャッシュに登録し、上限を超えた分を古い順に追い出す"""
+        size = len(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._entries[key] = value
+            self._size += size
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], str]) -> str:
+        """キャッシュにあればそれを返し、なければloaderで読み込んで登録
+
+        同じキーを別スレッドが読み込み中の場合は、その完了を待ってから結果を共有します。
+        loaderが例外を送出した場合は何もキャッシュせず、そのまま例外を送出します。
+        """
+        while True:
+            with self._lock:
+                value = self._entries.get(key)
+                if value is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                event = self._inflight.get(key)
+                if event is None:
+                    self.misses += 1
+                    event = threading.Event()
+                    self._inflight[key] = event
+                    break
+            # 他スレッドの読み込み完了を待ち、改めてキャッシュを確認する
+            event.wait()
+
+        try:
+            value = loader()
+            self.put(key, value)
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            event.set()
+
+    def stats(self) -> Dict[str, int]:
+        """ヒット数・ミス数・現在のエントリ数とサイズを返す"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+            }
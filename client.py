@@ -1,18 +1,155 @@
-from typing import List, Dict
-from azure.devops.connection import Connection
-from msrest.authentication import BasicAuthentication
-from azure.devops.v7_1.git.models import GitBaseVersionDescriptor, GitTargetVersionDescriptor, GitVersionDescriptor
+import contextlib
+import io
+import re
+import threading
+import time
+import zipfile
+from typing import ContextManager, List, Dict, Tuple
+from adaptive_limit import AdaptiveLimit
+from blob_cache import BlobCache
+from disk_blob_store import DiskBlobStore
+from file_tree import FileTree, FileTreeCache
+import tracing
+
+# Git FileDiffs API（POST .../git/repositories/{repositoryId}/FileDiffs）のロケーションID
+FILE_DIFFS_LOCATION_ID = "c4c5a7e6-e9f3-4730-a92b-84baacff694b"
+
+# 省略のないコミットID（40桁の16進数）。ブランチ名の解決を行わずにそのまま使用する
+COMMIT_ID_PATTERN = re.compile(r"[0-9a-fA-F]{40}")
+
+# ブランチとして解決できないバージョンを示すSDKの例外の種類（AzureDevOpsServiceError.type_key）
+REF_NOT_FOUND_TYPE_KEYS = frozenset(("GitUnresolvableToCommitException", "GitBranchNotFoundException"))
+
+
+class RefNotFoundError(LookupError):
+    """バージョン（ブランチ名）がリポジトリのブランチとして解決できない"""
+
+
+def read_blobs_zip(data: bytes) -> Dict[str, str]:
+    """Blobs API（GetBlobsZip）のzipを objectId -> 内容 の辞書に変換（各エントリ名がobjectId）"""
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        return {name: archive.read(name).decode("utf-8") for name in archive.namelist()}
+
+
+# azure-devops SDK（msrestとgitモデル）はインポートが重いため、実際にAPIを呼ぶ時点で読み込む。
+# これによりMCPサーバーの起動（list_toolsへの応答）がSDKの読み込みを待たずに済む。
+
+def warm_up() -> None:
+    """azure-devops SDKのモジュールを事前に読み込む
+
+    MCPのハンドシェイク後にバックグラウンドスレッドから呼ぶことで、
+    最初のツール呼び出しでのインポート待ちを短縮します。
+    """
+    import azure.devops.connection  # noqa: F401
+    import azure.devops.v7_1.git.git_client  # noqa: F401
+    import azure.devops.v7_1.git.models  # noqa: F401
+    import msrest.authentication  # noqa: F401
+
+class OrganizationPool:
+    """組織ごとの接続（SDKのGitクライアント）と同時リクエスト数の上限を管理するクラス
+
+    同じPATで作成した複数のAzureReposClient（リポジトリごと）で共有し、
+    組織ごとの接続を1つにまとめ、組織ごとに同時に発行するAPIリクエスト数を制限します。
+    """
+
+    def __init__(self, max_requests_per_org: int = 8, adaptive: bool = False, max_adaptive_requests: int = 64):
+        """
+        Args:
+            max_requests_per_org: 1つの組織に同時に発行するリクエスト数の上限（デフォルト: 8、0で無制限）。
+                adaptiveの場合は上限の初期値
+            adaptive: 上限を固定せず、応答の遅延とスロットリング（429・Retry-After）に応じて
+                組織ごとにAIMDで調整する（デフォルト: False）
+            max_adaptive_requests: adaptiveの場合に広げる上限の最大値（デフォルト: 64）
+        """
+        self.max_requests_per_org = max_requests_per_org
+        self.adaptive = adaptive
+        self.max_adaptive_requests = max(max_adaptive_requests, max_requests_per_org)
+        self.git_clients = {}
+        self.git_clients_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._limits: Dict[str, threading.BoundedSemaphore] = {}
+        self._adaptive_limits: Dict[str, AdaptiveLimit] = {}
+
+    def limit(self, organization: str) -> ContextManager:
+        """組織へのリクエスト1回分の枠（with文で使用し、上限に達している場合は空くまで待つ）
+
+        adaptiveの場合、with文の中で送出されたスロットリングの例外（429・503）で上限を狭めるため、
+        応答のステータスの確認（raise_for_status）はwith文の中で行います。
+        """
+        if not self.max_requests_per_org:
+            return contextlib.nullcontext()
+        with self._lock:
+            if self.adaptive:
+                adaptive_limit = self._adaptive_limits.get(organization)
+                if adaptive_limit is None:
+                    adaptive_limit = self._adaptive_limits[organization] = AdaptiveLimit(
+                        initial=self.max_requests_per_org, max_limit=self.max_adaptive_requests
+                    )
+                return adaptive_limit.slot()
+            semaphore = self._limits.get(organization)
+            if semaphore is None:
+                semaphore = self._limits[organization] = threading.BoundedSemaphore(self.max_requests_per_org)
+            return semaphore
+
+    def stats(self) -> Dict:
+        """接続済みの組織数と組織ごとの同時リクエスト数の上限（adaptiveの場合は組織ごとの現在の上限）を返す"""
+        with self._lock:
+            stats = {
+                "organizations": len(set(self.git_clients) | set(self._limits) | set(self._adaptive_limits)),
+                "max_requests_per_org": self.max_requests_per_org,
+            }
+            limits = dict(self._adaptive_limits)
+        if self.adaptive:
+            stats["adaptive"] = {organization: limit.stats() for organization, limit in limits.items()}
+        return stats
+
 
 class AzureReposClient:
-    def __init__(self, pat: str):
+    # サーバー側の行差分ブロック（get_file_diffs）を提供するか（提供しないクライアントはFalseにする）
+    SERVER_SIDE_DIFFS = True
+
+    # get_blobs で1回のリクエストにまとめるblobの数
+    BLOBS_BATCH_SIZE = 500
+
+    def __init__(
+        self,
+        pat: str,
+        blob_cache: BlobCache = None,
+        ref_cache_ttl: float = 30.0,
+        pool: OrganizationPool = None,
+        blob_store: DiskBlobStore = None,
+        trees: FileTreeCache = None
+    ):
         """AzureReposClientを初期化
         
         Args:
             pat: Azure DevOpsのPersonal Access Token (PAT)
+            blob_cache: ファイル内容のキャッシュ（省略時は新規作成）
+            ref_cache_ttl: ブランチ名から解決したコミットIDを再利用する秒数（デフォルト: 30）
+            pool: 組織ごとの接続と同時リクエスト数の上限（省略時は新規作成。同じPATのクライアント間で共有可能）
+            blob_store: objectIdをキーとするblobのディスクストア（省略時はディスクに保存しない）
+            trees: コミットごとのファイル一覧のキャッシュ（省略時は新規作成）
         """
         self.pat = pat
-        self.creds = BasicAuthentication("", pat)
-        self._clients = {}
+        self._creds = None
+        self.blob_cache = blob_cache or BlobCache()
+        self.blob_store = blob_store
+        self.trees = trees or FileTreeCache()
+        self.pool = pool or OrganizationPool()
+        self._clients = self.pool.git_clients
+        self._clients_lock = self.pool.git_clients_lock
+        self.ref_cache_ttl = ref_cache_ttl
+        # (organization, project, repo_id, ブランチ名) -> (コミットID, 有効期限)
+        self._refs: Dict[Tuple[str, str, str, str], Tuple[str, float]] = {}
+        self._refs_lock = threading.Lock()
+
+    @property
+    def creds(self):
+        """PATによる認証情報（msrestの読み込みを遅延させるため初回アクセス時に作成）"""
+        if self._creds is None:
+            from msrest.authentication import BasicAuthentication
+            self._creds = BasicAuthentication("", self.pat)
+        return self._creds
 
     def _get_git_client(self, organization: str):
         """組織ごとのGitクライアントを取得または作成
@@ -23,11 +160,14 @@ class AzureReposClient:
         Returns:
             Azure DevOps Gitクライアント
         """
-        if organization not in self._clients:
-            organization_url = f"https://dev.azure.com/{organization}"
-            connection = Connection(base_url=organization_url, creds=self.creds)
-            self._clients[organization] = connection.clients.get_git_client()
-        return self._clients[organization]
+        # 複数スレッドから同時に呼ばれても接続は組織ごとに1つだけ作成する
+        with self._clients_lock:
+            if organization not in self._clients:
+                from azure.devops.connection import Connection
+                organization_url = f"https://dev.azure.com/{organization}"
+                connection = Connection(base_url=organization_url, creds=self.creds)
+                self._clients[organization] = connection.clients.get_git_client()
+            return self._clients[organization]
 
     def get_pull_request(self, organization: str, project: str, repo_id: str, pr_id: int) -> Dict:
         """プルリクエストの詳細情報を取得
@@ -42,9 +182,40 @@ class AzureReposClient:
             プルリクエスト情報の辞書
         """
         client = self._get_git_client(organization)
-        pr = client.get_pull_request(repo_id, pr_id, project=project)
+        with self.pool.limit(organization):
+            pr = client.get_pull_request(repo_id, pr_id, project=project)
         return pr.as_dict()
 
+    def list_pull_requests(
+        self,
+        organization: str,
+        project: str,
+        repo_id: str,
+        target_ref_name: str = None,
+        status: str = "active"
+    ) -> List[Dict]:
+        """条件に一致するプルリクエストの一覧を取得
+        
+        Args:
+            organization: Azure DevOps組織名
+            project: プロジェクト名
+            repo_id: リポジトリID
+            target_ref_name: マージ先ブランチ（例: "refs/heads/main"。省略時は全ブランチ）
+            status: プルリクエストの状態（デフォルト: "active"）
+            
+        Returns:
+            プルリクエスト情報の辞書のリスト
+        """
+        from azure.devops.v7_1.git.models import GitPullRequestSearchCriteria
+        client = self._get_git_client(organization)
+        search_criteria = GitPullRequestSearchCriteria(
+            status=status,
+            target_ref_name=target_ref_name
+        )
+        with self.pool.limit(organization):
+            pull_requests = client.get_pull_requests(repo_id, search_criteria, project=project)
+        return [pr.as_dict() for pr in pull_requests]
+
     def get_pull_request_diff(self, organization: str, project: str, repo_id: str, pr_id: int) -> Dict:
         """プルリクエストのコミット差分情報を取得
         
@@ -66,6 +237,29 @@ class AzureReposClient:
         if not source_commit or not target_commit:
              return {"error": "Could not determine source/target commits for diff."}
 
+        return self.get_commit_diffs(organization, project, repo_id, source_commit, target_commit)
+
+    def get_commit_diffs(
+        self,
+        organization: str,
+        project: str,
+        repo_id: str,
+        source_commit: str,
+        target_commit: str
+    ) -> Dict:
+        """2つのコミット間の差分情報を取得
+        
+        Args:
+            organization: Azure DevOps組織名
+            project: プロジェクト名
+            repo_id: リポジトリID
+            source_commit: 変更後（PRのソース）のコミットID
+            target_commit: 変更前（PRのターゲット）のコミットID
+            
+        Returns:
+            コミット差分情報の辞書
+        """
+        from azure.devops.v7_1.git.models import GitBaseVersionDescriptor, GitTargetVersionDescriptor
         client = self._get_git_client(organization)
 
         base_version = GitBaseVersionDescriptor(
@@ -77,18 +271,67 @@ class AzureReposClient:
             target_version_type="commit"
         )
 
-        diffs = client.get_commit_diffs(
-            repository_id=repo_id,
-            project=project,
-            diff_common_commit=True,
-            base_version_descriptor=base_version,
-            target_version_descriptor=target_version
-        )
+        with self.pool.limit(organization):
+            diffs = client.get_commit_diffs(
+                repository_id=repo_id,
+                project=project,
+                diff_common_commit=True,
+                base_version_descriptor=base_version,
+                target_version_descriptor=target_version
+            )
         
         data = diffs.as_dict()
 
         return data
 
+    def get_file_diffs(
+        self,
+        organization: str,
+        project: str,
+        repo_id: str,
+        source_commit: str,
+        target_commit: str,
+        files: List[Tuple[str, str]]
+    ) -> List[Dict]:
+        """サーバー側で計算されたファイルごとの行差分ブロックを取得
+        
+        Args:
+            organization: Azure DevOps組織名
+            project: プロジェクト名
+            repo_id: リポジトリID
+            source_commit: 変更後（PRのソース）のコミットID
+            target_commit: 変更前（PRのターゲット）のコミットID
+            files: (path, original_path) のタプルのリスト
+            
+        Returns:
+            ファイルごとの辞書（path, original_path, line_diff_blocks）のリスト
+            
+        Note:
+            SDKにこのAPIのメソッドがないため、SDKの汎用の送信処理でFileDiffs APIを呼び出します。
+        """
+        from azure.devops.v7_1.git.models import FileDiffParams, FileDiffsCriteria
+        client = self._get_git_client(organization)
+        
+        criteria = FileDiffsCriteria(
+            base_version_commit=target_commit,
+            target_version_commit=source_commit,
+            file_diff_params=[FileDiffParams(path=path, original_path=original_path) for path, original_path in files]
+        )
+        route_values = {
+            "project": client._serialize.url("project", project, "str"),
+            "repositoryId": client._serialize.url("repository_id", repo_id, "str"),
+        }
+        with self.pool.limit(organization):
+            response = client._send(
+                http_method="POST",
+                location_id=FILE_DIFFS_LOCATION_ID,
+                version="7.1-preview.1",
+                route_values=route_values,
+                content=client._serialize.body(criteria, "FileDiffsCriteria")
+            )
+        file_diffs = client._deserialize("[FileDiff]", client._unwrap_collection(response))
+        return [d.as_dict() for d in file_diffs]
+
     def get_comments(self, organization: str, project: str, repo_id: str, pr_id: int) -> List[Dict]:
         """プルリクエストのコメントスレッド一覧を取得
         
@@ -102,12 +345,16 @@ class AzureReposClient:
             コメントスレッドの辞書のリスト
         """
         client = self._get_git_client(organization)
-        threads = client.get_threads(repo_id, pr_id, project=project)
+        with self.pool.limit(organization):
+            threads = client.get_threads(repo_id, pr_id, project=project)
         return [t.as_dict() for t in threads]
 
     def get_file_content(self, organization: str, project: str, repo_id: str, path: str, version: str = None) -> str:
         """リポジトリのファイル内容を取得
         
+        ブランチ名はコミットIDに解決してから取得するため、同じブランチの同じファイルは
+        ブランチが更新されるまでblob_cacheから返されます。
+        
         Args:
             organization: Azure DevOps組織名
             project: プロジェクト名
@@ -118,18 +365,231 @@ class AzureReposClient:
         Returns:
             ファイル内容の文字列
         """
+        try:
+            commit_id = self.resolve_commit(organization, project, repo_id, version)
+        except RefNotFoundError:
+            # タグ名などブランチとして解決できないバージョンは、そのままAPIに渡す
+            return self._fetch_item_content(organization, project, repo_id, path, version)
+        return self._get_item_at_commit(organization, project, repo_id, path, commit_id)
+
+    def resolve_commit(self, organization: str, project: str, repo_id: str, version: str = None) -> str:
+        """ブランチ名をコミットIDに解決
+        
+        解決結果はref_cache_ttl秒の間再利用します。"main" と "refs/heads/main" は同じブランチとして扱い、
+        解決できなかったバージョンもref_cache_ttl秒の間は問い合わせずにRefNotFoundErrorを送出します。
+        コミットIDが指定された場合はそのまま返します。
+        
+        Args:
+            organization: Azure DevOps組織名
+            project: プロジェクト名
+            repo_id: リポジトリID
+            version: ブランチ名（"main" または "refs/heads/main"）またはコミットID。省略時はデフォルトブランチ
+            
+        Returns:
+            コミットID
+        
+        Raises:
+            RefNotFoundError: ブランチとして解決できない場合（タグ名や存在しないブランチ）
+        """
+        if version and COMMIT_ID_PATTERN.fullmatch(version):
+            return version.lower()
+        if version and version.startswith("refs/") and not version.startswith("refs/heads/"):
+            # タグなどブランチ以外のrefはブランチのAPIでは解決できない
+            raise RefNotFoundError(f"Not a branch: {version}")
+        
+        branch = version[len("refs/heads/"):] if version and version.startswith("refs/heads/") else version
+        key = (organization, project, repo_id, branch or "")
+        now = time.monotonic()
+        with self._refs_lock:
+            entry = self._refs.get(key)
+            if entry is not None and now < entry[1]:
+                if entry[0] is None:
+                    raise RefNotFoundError(f"Branch not found: {version}")
+                return entry[0]
+        
+        if not branch:
+            branch = self._fetch_default_branch(organization, project, repo_id)
+            if branch.startswith("refs/heads/"):
+                branch = branch[len("refs/heads/"):]
+        try:
+            commit_id = self._fetch_branch_commit(organization, project, repo_id, branch)
+        except RefNotFoundError:
+            commit_id = None
+        with self._refs_lock:
+            self._refs[key] = (commit_id, now + self.ref_cache_ttl)
+        if commit_id is None:
+            raise RefNotFoundError(f"Branch not found: {version}")
+        return commit_id
+
+    def _fetch_default_branch(self, organization: str, project: str, repo_id: str) -> str:
+        """リポジトリのデフォルトブランチ名（例: "refs/heads/main"）をAPIから取得"""
+        client = self._get_git_client(organization)
+        with self.pool.limit(organization):
+            return client.get_repository(repo_id, project=project).default_branch
+
+    def _fetch_branch_commit(self, organization: str, project: str, repo_id: str, branch: str) -> str:
+        """ブランチの先頭のコミットIDをAPIから取得（branchは "refs/heads/" を除いた名前）
+
+        Raises:
+            RefNotFoundError: ブランチが存在しない場合（認証・スロットリング・通信のエラーはそのまま送出）
+        """
+        from azure.devops.exceptions import AzureDevOpsClientRequestError
         client = self._get_git_client(organization)
+        try:
+            with self.pool.limit(organization):
+                return client.get_branch(repo_id, branch, project=project).commit.commit_id
+        except AzureDevOpsClientRequestError as e:
+            if getattr(e, "type_key", None) in REF_NOT_FOUND_TYPE_KEYS or "404 status code" in str(e):
+                raise RefNotFoundError(f"Branch not found: {branch}") from e
+            raise
+
+    def get_tree(self, organization: str, project: str, repo_id: str, version: str = None) -> Tuple[str, FileTree]:
+        """コミットの全ファイルの一覧を取得
         
-        version_descriptor = GitVersionDescriptor(version=version) if version else None
+        コミットIDは不変のため、一覧はtreesにコミットIDをキーとして保持し、以降の一覧と
+        存在確認（get_file_content_at_commit）はAPIを呼び出さずに答えます。
+        
+        Args:
+            organization: Azure DevOps組織名
+            project: プロジェクト名
+            repo_id: リポジトリID
+            version: ブランチ名またはコミットID（省略時はデフォルトブランチ）
+            
+        Returns:
+            (コミットID, ファイル一覧) のタプル
+        """
+        commit_id = self.resolve_commit(organization, project, repo_id, version)
+        key = (organization, project, repo_id, commit_id)
+        tree = self.trees.get(key)
+        if tree is None:
+            tree = FileTree(self._fetch_tree_paths(organization, project, repo_id, commit_id))
+            self.trees.put(key, tree)
+        return commit_id, tree
 
-        content_generator = client.get_item_content(
-            repository_id=repo_id,
-            path=path,
-            project=project,
-            version_descriptor=version_descriptor
-        )
+    def _fetch_tree_paths(self, organization: str, project: str, repo_id: str, commit_id: str) -> List[str]:
+        """コミットの全ファイル（フォルダを除く）のパスをAPIから再帰的に取得"""
+        from azure.devops.v7_1.git.models import GitVersionDescriptor
+        client = self._get_git_client(organization)
+        with self.pool.limit(organization):
+            items = client.get_items(
+                repo_id,
+                project=project,
+                scope_path="/",
+                recursion_level="full",
+                version_descriptor=GitVersionDescriptor(version=commit_id, version_type="commit")
+            )
+        return [item.path for item in items if not item.is_folder]
+
+    def get_tree_blob_ids(self, organization: str, project: str, repo_id: str, commit_id: str) -> Dict[str, str]:
+        """コミットの全ファイルのパスとblobのobjectIdを1回の一覧で取得
+        
+        取得した一覧はget_treeと同じくtreesにも保持します。
+        
+        Returns:
+            パス -> objectId の辞書
+        """
+        with tracing.span("get_tree_blob_ids", commit_id=commit_id) as span:
+            blob_ids = self._fetch_tree_blob_ids(organization, project, repo_id, commit_id)
+            span.set(files=len(blob_ids))
+        self.trees.put((organization, project, repo_id, commit_id), FileTree(list(blob_ids)))
+        return blob_ids
+
+    def _fetch_tree_blob_ids(self, organization: str, project: str, repo_id: str, commit_id: str) -> Dict[str, str]:
+        """コミットの全ファイル（フォルダを除く）のパスとobjectIdをAPIから再帰的に取得"""
+        from azure.devops.v7_1.git.models import GitVersionDescriptor
+        client = self._get_git_client(organization)
+        with self.pool.limit(organization):
+            items = client.get_items(
+                repo_id,
+                project=project,
+                scope_path="/",
+                recursion_level="full",
+                version_descriptor=GitVersionDescriptor(version=commit_id, version_type="commit")
+            )
+        return {item.path: item.object_id for item in items if not item.is_folder}
+
+    def get_blobs(self, organization: str, project: str, repo_id: str, object_ids: List[str]) -> Dict[str, str]:
+        """複数のblobの内容をobjectIdでまとめて取得
+        
+        blob_cacheとblob_storeにないものだけを、BLOBS_BATCH_SIZE個ずつ1回のリクエストで取得します。
+        get_file_content_at_commitと異なり、取得できないblobがあれば例外を送出します。
+        
+        Returns:
+            objectId -> 内容 の辞書
+        
+        Raises:
+            FileNotFoundError: 応答に含まれないblobがある場合
+        """
+        contents = {}
+        missing = []
+        for object_id in dict.fromkeys(object_ids):
+            content = self.blob_cache.get(("blob", object_id))
+            if content is None and self.blob_store is not None:
+                content = self.blob_store.get(object_id)
+            if content is None:
+                missing.append(object_id)
+            else:
+                contents[object_id] = content
+        
+        for start in range(0, len(missing), self.BLOBS_BATCH_SIZE):
+            batch = missing[start:start + self.BLOBS_BATCH_SIZE]
+            with tracing.span("get_blobs", blobs=len(batch)):
+                fetched = self._fetch_blobs(organization, project, repo_id, batch)
+            for object_id in batch:
+                content = fetched.get(object_id)
+                if content is None:
+                    raise FileNotFoundError(f"Blob not found: {object_id}")
+                self.blob_cache.put(("blob", object_id), content)
+                if self.blob_store is not None:
+                    self.blob_store.put(object_id, content)
+                contents[object_id] = content
+        return contents
+
+    def _fetch_blobs(self, organization: str, project: str, repo_id: str, object_ids: List[str]) -> Dict[str, str]:
+        """複数のblobをzipで1回のリクエストで取得"""
+        client = self._get_git_client(organization)
+        with self.pool.limit(organization):
+            stream = client.get_blobs_zip(object_ids, repo_id, project=project)
+            data = b"".join(stream)
+        return read_blobs_zip(data)
+
+    def _fetch_item_content(
+        self,
+        organization: str,
+        project: str,
+        repo_id: str,
+        path: str,
+        version: str = None,
+        version_type: str = None
+    ) -> str:
+        """ファイル内容をAPIから取得（キャッシュを介さない）
         
-        content = "".join([chunk.decode("utf-8") for chunk in content_generator])
+        Args:
+            organization: Azure DevOps組織名
+            project: プロジェクト名
+            repo_id: リポジトリID
+            path: ファイルパス
+            version: バージョン情報（省略時はデフォルトブランチ）
+            version_type: バージョンの種類（"commit"、"branch"など。省略時はサーバー側で判定）
+            
+        Returns:
+            ファイル内容の文字列
+        """
+        from azure.devops.v7_1.git.models import GitVersionDescriptor
+        client = self._get_git_client(organization)
+        
+        version_descriptor = GitVersionDescriptor(version=version, version_type=version_type) if version else None
+
+        # 内容のストリームを読み終えるまでを1回のリクエストとして数える
+        with self.pool.limit(organization):
+            content_generator = client.get_item_content(
+                repository_id=repo_id,
+                path=path,
+                project=project,
+                version_descriptor=version_descriptor
+            )
+            
+            content = "".join([chunk.decode("utf-8") for chunk in content_generator])
         return content
 
     def get_file_content_at_commit(
@@ -138,7 +598,8 @@ class AzureReposClient:
         project: str,
         repo_id: str,
         path: str,
-        commit_id: str
+        commit_id: str,
+        object_id: str = None
     ) -> str:
         """特定のコミットでのファイル内容を取得
         
@@ -148,6 +609,7 @@ class AzureReposClient:
             repo_id: リポジトリID
             path: ファイルパス
             commit_id: コミットID
+            object_id: blobのobjectId（分かっている場合。キャッシュキーに使用）
         
         Returns:
             ファイル内容（ファイルが存在しない場合は空文字列）
@@ -155,26 +617,55 @@ class AzureReposClient:
         Note:
             ファイルが存在しない場合（新規追加または削除されたファイル）は
             空文字列を返します。これにより、呼び出し側で新規/削除の判定が可能です。
+            
+            コミットIDとobjectIdはどちらも不変のため、取得結果はblob_cacheに保持されます。
+            objectIdが分かっている場合はそれをキーにするため、異なるコミット・PR間で
+            同じ内容のblobが共有されます。
         """
-        client = self._get_git_client(organization)
-        
-        version_descriptor = GitVersionDescriptor(
-            version=commit_id,
-            version_type="commit"
-        )
-        
         try:
-            content_generator = client.get_item_content(
-                repository_id=repo_id,
-                path=path,
-                project=project,
-                version_descriptor=version_descriptor
-            )
-            
-            content = "".join([chunk.decode("utf-8") for chunk in content_generator])
-            return content
+            return self._get_item_at_commit(organization, project, repo_id, path, commit_id, object_id)
             
         except Exception as e:
             # ファイルが存在しない場合（404など）は空文字列を返す
             # これは新規追加または削除されたファイルの場合に発生する
             return ""
+
+    def _get_item_at_commit(
+        self,
+        organization: str,
+        project: str,
+        repo_id: str,
+        path: str,
+        commit_id: str,
+        object_id: str = None
+    ) -> str:
+        """特定のコミットでのファイル内容をblob_cacheを介して取得（存在しない場合は例外を送出）"""
+        # コミットのファイル一覧を取得済みであれば、存在しないパスはAPIを呼ばずに判定する
+        tree = self.trees.peek((organization, project, repo_id, commit_id))
+        if tree is not None and path not in tree:
+            raise FileNotFoundError(f"{path} does not exist at {commit_id}")
+        # 取得元（memory: blob_cache（別スレッドの取得を待った場合を含む）、disk: blob_store、api）
+        source = "memory"
+        
+        def load() -> str:
+            nonlocal source
+            # objectIdが分かっている場合は、ディスクに保存済みのblobをAPIより優先する
+            if object_id and self.blob_store is not None:
+                content = self.blob_store.get(object_id)
+                if content is not None:
+                    source = "disk"
+                    return content
+            source = "api"
+            content = self._fetch_item_content(organization, project, repo_id, path, commit_id, "commit")
+            if object_id and self.blob_store is not None:
+                self.blob_store.put(object_id, content)
+            return content
+        
+        if object_id:
+            cache_key = ("blob", object_id)
+        else:
+            cache_key = ("item", organization, project, repo_id, commit_id, path)
+        with tracing.span("get_blob", path=path, object_id=object_id) as span:
+            content = self.blob_cache.get_or_load(cache_key, load)
+            span.set(bytes=len(content), cache_hit=source == "memory", source=source)
+        return content
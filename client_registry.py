@@ -0,0 +1,90 @@
+import threading
+from typing import Any, Callable, Dict, Iterator, Tuple
+
+from azure_arbiter import AzureReposArbiter
+from blob_cache import BlobCache
+from client import OrganizationPool
+from prefetcher import BlobPrefetcher
+from search_index import SearchIndexCache
+
+# (organization, project, repo_id)
+RepositoryKey = Tuple[str, str, str]
+
+
+class ClientRegistry:
+    """リポジトリごとのAzureReposArbiterを管理するレジストリ
+
+    1つのプロセスで複数の組織・プロジェクト・リポジトリを扱うために使用します。
+    Arbiter（とクライアント）はリポジトリごとに初回アクセス時に作成し、組織ごとの接続と
+    同時リクエスト数の上限（OrganizationPool）は作成関数の側で共有します。blobキャッシュと
+    検索索引も作成関数の側で全リポジトリに共有させると、扱うリポジトリの数によらず
+    それぞれの上限のサイズまでしか保持しません。
+    """
+
+    def __init__(
+        self,
+        create_arbiter: Callable[[str, str, str], AzureReposArbiter],
+        pat: str = None,
+        pool: OrganizationPool = None,
+        prefetcher: BlobPrefetcher = None,
+        blob_cache: BlobCache = None,
+        search_indexes: SearchIndexCache = None
+    ):
+        """
+        Args:
+            create_arbiter: (organization, project, repo_id) からArbiterを作成する関数
+            pat: このレジストリのクライアントが使用するPAT（PATの変更の検知に使用）
+            pool: 全リポジトリで共有する組織ごとの接続（統計の報告に使用）
+            prefetcher: 全リポジトリで共有する先読み器（close時に停止する）
+            blob_cache: 全リポジトリで共有するblobキャッシュ（統計の報告に使用。省略時はリポジトリごとに報告）
+            search_indexes: 全リポジトリで共有する検索索引（統計の報告に使用。省略時はリポジトリごとに報告）
+        """
+        self.pat = pat
+        self.pool = pool
+        self.prefetcher = prefetcher
+        self.blob_cache = blob_cache
+        self.search_indexes = search_indexes
+        self._create_arbiter = create_arbiter
+        self._arbiters: Dict[RepositoryKey, AzureReposArbiter] = {}
+        self._lock = threading.Lock()
+
+    def get(self, organization: str, project: str, repo_id: str) -> AzureReposArbiter:
+        """リポジトリのArbiterを取得（初回は作成する）"""
+        key = (organization, project, repo_id)
+        with self._lock:
+            arbiter = self._arbiters.get(key)
+            if arbiter is None:
+                arbiter = self._arbiters[key] = self._create_arbiter(organization, project, repo_id)
+            return arbiter
+
+    def items(self) -> Iterator[Tuple[RepositoryKey, AzureReposArbiter]]:
+        """作成済みの (リポジトリのキー, Arbiter) を列挙"""
+        with self._lock:
+            return iter(list(self._arbiters.items()))
+
+    def close(self) -> None:
+        """先読みを停止し、レジストリを空にする"""
+        with self._lock:
+            self._arbiters.clear()
+        if self.prefetcher is not None:
+            self.prefetcher.shutdown()
+
+    def stats(self) -> Dict[str, Any]:
+        """リポジトリごとのファイル一覧・GUID索引・宣言の索引（"organization/project/repo_id" がキー）と共有資源の統計を返す
+
+        blobキャッシュと検索索引は、共有している場合はその統計を、そうでなければリポジトリごとの統計を返します。
+        """
+        stats: Dict[str, Any] = {
+            "blobs": self.blob_cache.stats() if self.blob_cache is not None else
+                {"/".join(key): arbiter.client.blob_cache.stats() for key, arbiter in self.items()},
+            "trees": {"/".join(key): arbiter.client.trees.stats() for key, arbiter in self.items()},
+            "search": self.search_indexes.stats() if self.search_indexes is not None else
+                {"/".join(key): arbiter.search_indexes.stats() for key, arbiter in self.items()},
+            "guids": {"/".join(key): arbiter.guid_indexes.stats() for key, arbiter in self.items()},
+            "symbols": {"/".join(key): arbiter.symbol_indexes.stats() for key, arbiter in self.items()},
+        }
+        if self.pool is not None:
+            stats["organizations"] = self.pool.stats()
+        if self.prefetcher is not None:
+            stats["prefetch"] = self.prefetcher.stats()
+        return stats
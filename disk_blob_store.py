@@ -0,0 +1,307 @@
+"""gitのobjectIdをキーとしてファイル内容（blob）をディスクに保存するストア
+
+ディレクトリ構成:
+    objects/<objectIdの先頭2文字>/<残り>.zlib   zlibで圧縮したblob
+    objects/<objectIdの先頭2文字>/<残り>.zst    zstdで圧縮したblob（zstandardパッケージが必要）
+    objects/<objectIdの先頭2文字>/<残り>.raw    無圧縮のblob（raw_threshold以上の大きなblob）
+
+Usage:
+    # 現在の圧縮方式への再圧縮・一時ファイルの削除・サイズ上限までの削除
+    python disk_blob_store.py compact <directory> [--compression zstd] [--max-mb 2048]
+"""
+import argparse
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:  # zstdは任意（未インストールの場合はzlibのみ使用できる）
+    zstandard = None
+
+COMPRESSIONS = ("zlib", "zstd", "none")
+
+_SUFFIXES = {"zlib": ".zlib", "zstd": ".zst", "raw": ".raw"}
+_CODECS = {suffix: codec for codec, suffix in _SUFFIXES.items()}
+
+# objectId（SHA-1、SHA-256）のみを受け付け、パスとして安全なことを保証する
+_OBJECT_ID_PATTERN = re.compile(r"[0-9a-f]{40}|[0-9a-f]{64}")
+
+
+class DiskBlobStore:
+    """objectIdをキーとするblobのディスクストア
+
+    blobは1件ずつ1ファイルに保存し、小さなblobはzlibまたはzstdで圧縮します。
+    raw_threshold以上の大きなblob（UnityのYAMLや生成されたソースなど）は、読み出しのたびの
+    展開を省くため無圧縮で保存します。
+    合計サイズがmax_bytesを超えた場合は、最終アクセスが古いblobから削除します。
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int = 2 * 1024 * 1024 * 1024,
+        compression: str = "zlib",
+        raw_threshold: int = 1024 * 1024
+    ):
+        """
+        Args:
+            directory: 保存先のディレクトリ
+            max_bytes: 保存するファイルの合計サイズ上限（ディスク上のサイズ、デフォルト: 2GB）
+            compression: 圧縮方式（"zlib"、"zstd"、"none"。デフォルト: "zlib"）
+            raw_threshold: このバイト数以上のblobは無圧縮で保存する（デフォルト: 1MB、0で常に圧縮）
+        """
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown compression: {compression} (expected one of {', '.join(COMPRESSIONS)})")
+        if compression == "zstd" and zstandard is None:
+            raise ValueError("zstd compression requires the 'zstandard' package")
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.compression = compression
+        self.raw_threshold = raw_threshold
+        self._objects = os.path.join(directory, "objects")
+        os.makedirs(self._objects, exist_ok=True)
+
+        self._lock = threading.Lock()
+        # objectId -> (codec, ディスク上のサイズ)。最終アクセスが古い順
+        self._entries: "OrderedDict[str, Tuple[str, int]]" = OrderedDict()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._scan()
+
+    def _scan(self) -> None:
+        """ディレクトリのblobを最終アクセス（mtime）の古い順に索引へ読み込み、書き込み途中の一時ファイルを削除"""
+        found = []
+        for prefix in os.listdir(self._objects):
+            directory = os.path.join(self._objects, prefix)
+            if not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                path = os.path.join(directory, name)
+                stem, suffix = os.path.splitext(name)
+                object_id = prefix + stem
+                if suffix not in _CODECS or not _OBJECT_ID_PATTERN.fullmatch(object_id):
+                    os.remove(path)
+                    continue
+                stat = os.stat(path)
+                found.append((stat.st_mtime, object_id, _CODECS[suffix], stat.st_size))
+        for _, object_id, codec, size in sorted(found):
+            self._entries[object_id] = (codec, size)
+            self._size += size
+
+    def _path(self, object_id: str, codec: str) -> str:
+        return os.path.join(self._objects, object_id[:2], object_id[2:] + _SUFFIXES[codec])
+
+    @staticmethod
+    def _normalize_object_id(object_id: str) -> Optional[str]:
+        object_id = (object_id or "").lower()
+        return object_id if _OBJECT_ID_PATTERN.fullmatch(object_id) else None
+
+    def _lookup(self, object_id: str) -> Optional[Tuple[str, str]]:
+        """索引を引いて (codec, パス) を返し、最終アクセスを更新する"""
+        object_id = self._normalize_object_id(object_id)
+        with self._lock:
+            entry = self._entries.get(object_id) if object_id else None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(object_id)
+            self.hits += 1
+        path = self._path(object_id, entry[0])
+        try:
+            # 再起動後もLRUの順序を保つため、最終アクセスをmtimeに記録する
+            os.utime(path)
+        except FileNotFoundError:
+            self._forget(object_id)
+            return None
+        return entry[0], path
+
+    def _forget(self, object_id: str) -> None:
+        with self._lock:
+            entry = self._entries.pop(object_id, None)
+            if entry is not None:
+                self._size -= entry[1]
+
+    def _decode(self, codec: str, data: bytes) -> bytes:
+        if codec == "zlib":
+            return zlib.decompress(data)
+        if codec == "zstd":
+            if zstandard is None:
+                raise ValueError("zstd compressed blob requires the 'zstandard' package")
+            return zstandard.ZstdDecompressor().decompress(data)
+        return data
+
+    def contains(self, object_id: str) -> bool:
+        """blobが保存されているかを返す（最終アクセスは更新しない）"""
+        object_id = self._normalize_object_id(object_id)
+        with self._lock:
+            return object_id in self._entries
+
+    def get(self, object_id: str) -> Optional[str]:
+        """blobの内容を文字列として返す（保存されていない場合はNone）"""
+        found = self._lookup(object_id)
+        if found is None:
+            return None
+        codec, path = found
+        try:
+            with open(path, "rb") as f:
+                return self._decode(codec, f.read()).decode("utf-8")
+        except (OSError, zlib.error, ValueError):
+            self._forget(self._normalize_object_id(object_id))
+            return None
+
+    def _encode(self, data: bytes, compression: str) -> Tuple[str, bytes]:
+        """保存する (codec, バイト列) を決める"""
+        if compression == "none" or (self.raw_threshold and len(data) >= self.raw_threshold):
+            return "raw", data
+        if compression == "zstd":
+            return "zstd", zstandard.ZstdCompressor().compress(data)
+        return "zlib", zlib.compress(data, 6)
+
+    def _write(self, object_id: str, codec: str, data: bytes) -> int:
+        """一時ファイルに書き込んでから置き換え、読み出し中のプロセスに書きかけの内容を見せない"""
+        path = self._path(object_id, codec)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary, "wb") as f:
+            f.write(data)
+        os.replace(temporary, path)
+        return len(data)
+
+    def put(self, object_id: str, content: str) -> None:
+        """blobを保存する（objectIdとして不正な値や、既に保存されているblobは何もしない）"""
+        object_id = self._normalize_object_id(object_id)
+        if object_id is None or self.contains(object_id):
+            return
+        codec, data = self._encode(content.encode("utf-8"), self.compression)
+        if len(data) > self.max_bytes:
+            return
+        size = self._write(object_id, codec, data)
+        with self._lock:
+            old = self._entries.pop(object_id, None)
+            if old is not None:
+                self._size -= old[1]
+            self._entries[object_id] = (codec, size)
+            self._size += size
+        self._evict(self.max_bytes)
+
+    def _evict(self, max_bytes: int) -> int:
+        """合計サイズがmax_bytes以下になるまで最終アクセスが古いblobを削除し、削除した件数を返す"""
+        evicted = 0
+        while True:
+            with self._lock:
+                if self._size <= max_bytes or not self._entries:
+                    return evicted
+                object_id, (codec, size) = self._entries.popitem(last=False)
+                self._size -= size
+                self.evictions += 1
+            evicted += 1
+            try:
+                os.remove(self._path(object_id, codec))
+            except FileNotFoundError:
+                pass
+
+    def compact(self, compression: str = None, max_bytes: int = None) -> Dict[str, int]:
+        """ストアを整理する
+
+        - 圧縮方式・raw_thresholdの設定と異なる形式のblobを再圧縮（または展開）する
+        - 読み出せないblobと空のディレクトリを削除する
+        - 合計サイズがmax_bytes以下になるまで最終アクセスが古いblobを削除する
+
+        Args:
+            compression: 再圧縮に使用する圧縮方式（省略時は現在の設定）
+            max_bytes: 削除の基準とする合計サイズ（省略時は現在の設定）
+
+        Returns:
+            再圧縮・削除した件数と整理前後の合計サイズ
+        """
+        compression = compression or self.compression
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown compression: {compression} (expected one of {', '.join(COMPRESSIONS)})")
+        if compression == "zstd" and zstandard is None:
+            raise ValueError("zstd compression requires the 'zstandard' package")
+        bytes_before = self._size
+        rewritten = removed = 0
+        with self._lock:
+            entries = list(self._entries.items())
+        for object_id, (codec, _) in entries:
+            path = self._path(object_id, codec)
+            try:
+                with open(path, "rb") as f:
+                    data = self._decode(codec, f.read())
+            except (OSError, zlib.error, ValueError):
+                self._forget(object_id)
+                removed += 1
+                continue
+            new_codec, encoded = self._encode(data, compression)
+            if new_codec == codec:
+                continue
+            mtime = os.stat(path).st_mtime
+            size = self._write(object_id, new_codec, encoded)
+            # 最終アクセスの順序を保つ
+            os.utime(self._path(object_id, new_codec), (mtime, mtime))
+            os.remove(path)
+            with self._lock:
+                old = self._entries.get(object_id)
+                if old is not None:
+                    self._entries[object_id] = (new_codec, size)
+                    self._size += size - old[1]
+            rewritten += 1
+        removed += self._evict(self.max_bytes if max_bytes is None else max_bytes)
+        for prefix in os.listdir(self._objects):
+            directory = os.path.join(self._objects, prefix)
+            if os.path.isdir(directory) and not os.listdir(directory):
+                os.rmdir(directory)
+        return {
+            "rewritten": rewritten,
+            "removed": removed,
+            "bytes_before": bytes_before,
+            "bytes_after": self._size,
+        }
+
+    def stats(self) -> Dict[str, int]:
+        """ヒット数・ミス数・削除数と、保存しているblobの件数・合計サイズを返す"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "raw_entries": sum(1 for codec, _ in self._entries.values() if codec == "raw"),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+            }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    compact = subparsers.add_parser("compact", help="再圧縮・不要なファイルの削除・サイズ上限までの削除")
+    compact.add_argument("directory")
+    compact.add_argument("--compression", choices=COMPRESSIONS, default="zlib")
+    compact.add_argument("--max-mb", type=int, default=2048)
+    compact.add_argument("--raw-threshold-kb", type=int, default=1024)
+
+    args = parser.parse_args()
+    if args.command == "compact":
+        store = DiskBlobStore(
+            args.directory,
+            max_bytes=args.max_mb * 1024 * 1024,
+            compression=args.compression,
+            raw_threshold=args.raw_threshold_kb * 1024
+        )
+        result = store.compact()
+        print(
+            f"Rewrote {result['rewritten']} blobs, removed {result['removed']}: "
+            f"{result['bytes_before'] / 1024 / 1024:.1f}MB -> {result['bytes_after'] / 1024 / 1024:.1f}MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
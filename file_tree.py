@@ -0,0 +1,106 @@
+import bisect
+import fnmatch
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+
+class FileTree:
+    """1つのコミットのファイルパス（"/" 始まり）を並べ替えた配列として保持する索引
+
+    コミットの内容は変わらないため、一度取得すれば一覧・存在確認は二分探索だけで答えられます。
+    ディレクトリのエントリは持たず、ディレクトリはその下のファイルのパスの接頭辞として判定します。
+    """
+
+    def __init__(self, paths: Iterable[str]):
+        self.paths: List[str] = sorted({path if path.startswith("/") else "/" + path for path in paths})
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def __contains__(self, path: str) -> bool:
+        path = path if path.startswith("/") else "/" + path
+        index = bisect.bisect_left(self.paths, path)
+        return index < len(self.paths) and self.paths[index] == path
+
+    def _range(self, directory: str) -> Tuple[int, int]:
+        """directory以下のファイルの添字の範囲"""
+        prefix = "/" + directory.strip("/") + "/" if directory.strip("/") else "/"
+        # "/" の次の文字（"0"）で始まるパスの手前までが prefix で始まるパス
+        return bisect.bisect_left(self.paths, prefix), bisect.bisect_left(self.paths, prefix[:-1] + "0")
+
+    def is_dir(self, path: str) -> bool:
+        """pathの下にファイルがあるか"""
+        start, end = self._range(path)
+        return start < end
+
+    def list(self, directory: str = "/", pattern: str = None, max_results: int = None) -> Tuple[List[str], bool]:
+        """directory以下（再帰的）のファイルを列挙
+
+        Args:
+            directory: 列挙するディレクトリ（デフォルト: ルート）
+            pattern: 先頭の "/" を除いたパスに対するglob（例: "*.cs"、"Assets/Scripts/*"。"*" は "/" にも一致）
+            max_results: 返すパスの最大数（省略時は制限しない）
+
+        Returns:
+            (パスのリスト, 打ち切ったか) のタプル
+        """
+        start, end = self._range(directory)
+        paths = self.paths[start:end]
+        if pattern:
+            paths = [path for path in paths if fnmatch.fnmatchcase(path[1:], pattern)]
+        if max_results is not None and len(paths) > max_results:
+            return paths[:max_results], True
+        return paths, False
+
+
+class FileTreeCache:
+    """FileTreeを不変のコミットIDを含むキーごとに保持するLRUキャッシュ"""
+
+    def __init__(self, max_entries: int = 16):
+        """
+        Args:
+            max_entries: 保持するツリーの最大数（デフォルト: 16）
+        """
+        self.max_entries = max_entries
+        self._trees: "OrderedDict[Hashable, FileTree]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[FileTree]:
+        """キャッシュからツリーを取得（存在しない場合はNone）"""
+        with self._lock:
+            tree = self._trees.get(key)
+            if tree is None:
+                self.misses += 1
+                return None
+            self._trees.move_to_end(key)
+            self.hits += 1
+            return tree
+
+    def peek(self, key: Hashable) -> Optional[FileTree]:
+        """統計と最終アクセスを更新せずにツリーを取得（存在確認に使用）"""
+        with self._lock:
+            return self._trees.get(key)
+
+    def put(self, key: Hashable, tree: FileTree) -> None:
+        """ツリーを登録し、上限を超えた分を古い順に追い出す"""
+        if not self.max_entries:
+            return
+        with self._lock:
+            self._trees[key] = tree
+            self._trees.move_to_end(key)
+            while len(self._trees) > self.max_entries:
+                self._trees.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        """ヒット・ミス数、保持しているツリー数とパスの合計数を返す"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._trees),
+                "paths": sum(len(tree) for tree in self._trees.values()),
+                "max_entries": self.max_entries,
+            }
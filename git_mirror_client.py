@@ -0,0 +1,417 @@
+"""ローカルのbareミラーからblob・コミット差分を読み出すバックエンド
+
+PRのメタデータやコメントはAPI用のクライアントから取得し、レビュー対象のPRの
+ソース・ターゲットのrefだけをローカルのbareリポジトリへ差分フェッチします。
+コミット差分はgit diff-treeで、ファイル内容は常駐させたgit cat-file --batchで
+ローカルのオブジェクトデータベースから直接読み出すため、大きなPRでも
+ファイルごとのAPI呼び出しが発生しません。ローカルにないコミットやblobはAPIで取得します。
+
+ミラーは <mirror_root>/<organization>/<project>/<repo_id>.git に作成され、同じパスのミラーは
+プロセス内のすべてのクライアント（PATごとのレジストリ）で1つのインスタンスとロックを共有します。
+"""
+import base64
+import os
+import subprocess
+import threading
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+from client import AzureReposClient
+import tracing
+
+# git diff-tree のステータスとAzure DevOpsのchangeTypeの対応（リネームは類似度で区別する）
+_CHANGE_TYPES = {"A": "add", "D": "delete", "M": "edit", "T": "edit"}
+
+# サブモジュール（gitlink）のファイルモード
+_GITLINK_MODE = "160000"
+
+
+def default_remote_url(organization: str, project: str, repo_id: str) -> str:
+    """Azure ReposのリポジトリのHTTPSのURL"""
+    return f"https://dev.azure.com/{quote(organization)}/{quote(project)}/_git/{quote(repo_id)}"
+
+
+class _GitMirror:
+    """1つのbareミラーと、そのオブジェクトを読み出すgit cat-file --batchのプロセス
+
+    フェッチとcat-fileへの問い合わせは同じロックで直列化します。PATは保持せず、フェッチの
+    呼び出しごとに呼び出し元のクライアントの環境変数で渡します。
+    """
+
+    def __init__(self, path: str, git: str):
+        self.path = path
+        self.git = git
+        # ローカルのオブジェクトの読み出し用の環境変数（認証情報を含まない）
+        self.env = dict(os.environ, GIT_TERMINAL_PROMPT="0")
+        self.lock = threading.Lock()
+        self.fetches = 0
+        self._process: Optional[subprocess.Popen] = None
+        if not os.path.isdir(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            subprocess.run([git, "init", "--bare", "--quiet", path], check=True, capture_output=True, env=self.env)
+
+    def run(self, *args: str, env: Dict[str, str] = None) -> bytes:
+        """ミラーでgitコマンドを実行して標準出力を返す（失敗した場合はCalledProcessErrorを送出）"""
+        return subprocess.run(
+            [self.git, "-C", self.path, *args], check=True, capture_output=True, env=env or self.env
+        ).stdout
+
+    def fetch(self, remote_url: str, refs: List[str], env: Dict[str, str]) -> None:
+        """refsを同名のrefとしてフェッチする（ロックを保持した状態で呼び出す）
+
+        Args:
+            remote_url: フェッチ元のURL
+            refs: フェッチするref
+            env: フェッチ元の認証情報を含むgitコマンドの環境変数
+        """
+        self.run("fetch", "--quiet", "--no-tags", "--no-write-fetch-head", remote_url,
+                 *[f"+{ref}:{ref}" for ref in refs], env=env)
+        self.fetches += 1
+        # 新しいpackを確実に参照させるため、cat-fileのプロセスは次の読み出し時に起動し直す
+        self.close_reader()
+
+    def read_object(self, name: str) -> Optional[Tuple[str, bytes]]:
+        """オブジェクトの種類と内容を返す（存在しない場合はNone。ロックを保持した状態で呼び出す）
+
+        Args:
+            name: オブジェクト名（objectId、または "<コミットID>:<パス>"）
+        """
+        if self._process is None or self._process.poll() is not None:
+            self._process = subprocess.Popen(
+                [self.git, "-C", self.path, "cat-file", "--batch"],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, env=self.env
+            )
+        process = self._process
+        process.stdin.write(name.encode("utf-8") + b"\n")
+        process.stdin.flush()
+        header = process.stdout.readline().rstrip(b"\n").split(b" ")
+        if len(header) != 3:
+            # "<name> missing" や "<name> ambiguous"
+            return None
+        size = int(header[2])
+        data = process.stdout.read(size)
+        process.stdout.read(1)
+        return header[1].decode(), data
+
+    def close_reader(self) -> None:
+        """cat-fileのプロセスを終了する"""
+        if self._process is not None:
+            self._process.stdin.close()
+            self._process.wait()
+            self._process = None
+
+
+# ミラーのパス -> ミラー。PATごとのクライアントが同じリポジトリのミラーを同時に更新・読み出ししないよう、
+# プロセス内で1つのインスタンス（とそのロック）を共有する
+_shared_mirrors: Dict[str, _GitMirror] = {}
+_shared_mirrors_lock = threading.Lock()
+
+
+def _open_mirror(path: str, git: str) -> _GitMirror:
+    """パスのミラーを取得または作成（同じパスにはプロセス内で同じインスタンスを返す）"""
+    key = os.path.realpath(path)
+    with _shared_mirrors_lock:
+        mirror = _shared_mirrors.get(key)
+        if mirror is None:
+            mirror = _GitMirror(path, git)
+            _shared_mirrors[key] = mirror
+        return mirror
+
+
+class GitMirrorClient(AzureReposClient):
+    """ローカルのbareミラーからblobとコミット差分を読み出すAzureReposClient
+
+    PR・コメント・ブランチの情報はapi_clientに委譲します。get_pull_requestでPRを取得した際に
+    ソース・ターゲットのコミットがミラーになければ、そのPRのrefだけをフェッチします。
+    サーバー側の行差分ブロック（get_file_diffs）は提供しないため（SERVER_SIDE_DIFFS = False）、
+    差分は常にdifflibで生成されます。
+    """
+
+    SERVER_SIDE_DIFFS = False
+
+    def __init__(
+        self,
+        api_client: AzureReposClient,
+        mirror_root: str,
+        remote_url: Callable[[str, str, str], str] = None,
+        git: str = "git"
+    ):
+        """
+        Args:
+            api_client: PRのメタデータの取得と、ミラーにないオブジェクトの取得に使うクライアント
+            mirror_root: ミラーを作成するディレクトリ
+            remote_url: (organization, project, repo_id) からフェッチ元のURLを返す関数
+                （省略時はdev.azure.comのHTTPSのURL）
+            git: gitコマンドのパス
+        """
+        super().__init__(api_client.pat, blob_cache=api_client.blob_cache, pool=api_client.pool)
+        self.api_client = api_client
+        self.mirror_root = mirror_root
+        self.remote_url = remote_url or default_remote_url
+        self.git = git
+        self._mirrors: Dict[Tuple[str, str, str], _GitMirror] = {}
+        self._mirrors_lock = threading.Lock()
+
+    def _git_env(self) -> Dict[str, str]:
+        """gitコマンドの環境変数（PATはコマンドライン引数に含めず、設定の環境変数で渡す）"""
+        env = dict(os.environ, GIT_TERMINAL_PROMPT="0")
+        if self.pat:
+            token = base64.b64encode(f":{self.pat}".encode()).decode()
+            env.update({
+                "GIT_CONFIG_COUNT": "1",
+                "GIT_CONFIG_KEY_0": "http.extraHeader",
+                "GIT_CONFIG_VALUE_0": f"Authorization: Basic {token}",
+            })
+        return env
+
+    def _get_mirror(self, organization: str, project: str, repo_id: str) -> _GitMirror:
+        """リポジトリのミラーを取得または作成（同じパスのミラーは他のクライアントと共有）"""
+        key = (organization, project, repo_id)
+        with self._mirrors_lock:
+            mirror = self._mirrors.get(key)
+            if mirror is None:
+                path = os.path.join(self.mirror_root, *[quote(part, safe=" ") for part in key]) + ".git"
+                mirror = _open_mirror(path, self.git)
+                self._mirrors[key] = mirror
+            return mirror
+
+    def _has_commits(self, mirror: _GitMirror, commits: List[str]) -> bool:
+        """commitsがすべてミラーにあるか（ロックを保持した状態で呼び出す）"""
+        for commit in commits:
+            found = mirror.read_object(commit)
+            if found is None or found[0] != "commit":
+                return False
+        return True
+
+    def sync_pull_request(self, organization: str, project: str, repo_id: str, pr: Dict) -> bool:
+        """PRのソース・ターゲットのコミットがミラーになければ、そのPRのrefをフェッチ
+
+        Returns:
+            両方のコミットがミラーにあればTrue（フェッチに失敗した場合はFalse）
+        """
+        source_commit, target_commit = self._pull_request_commits(pr)
+        if not source_commit or not target_commit:
+            return False
+        mirror = self._get_mirror(organization, project, repo_id)
+        with mirror.lock:
+            if self._has_commits(mirror, [source_commit, target_commit]):
+                return True
+            refs = [
+                ref for ref in (pr.get("source_ref_name") or pr.get("sourceRefName"),
+                                pr.get("target_ref_name") or pr.get("targetRefName"))
+                if ref
+            ]
+            pr_id = pr.get("pull_request_id") or pr.get("pullRequestId")
+            # ソースブランチが削除済みでも、PRのマージ用のrefはソースのコミットを親に持つ
+            attempts = [refs, [f"refs/pull/{pr_id}/merge"]] if pr_id else [refs]
+            remote_url = self.remote_url(organization, project, repo_id)
+            env = self._git_env()
+            for attempt in attempts:
+                try:
+                    mirror.fetch(remote_url, attempt, env)
+                except subprocess.CalledProcessError:
+                    continue
+                if self._has_commits(mirror, [source_commit, target_commit]):
+                    return True
+            return False
+
+    @staticmethod
+    def _pull_request_commits(pr: Dict) -> Tuple[Optional[str], Optional[str]]:
+        """PRのマージ元・マージ先のコミットIDを取得"""
+        source_commit = pr.get("last_merge_source_commit", {}).get("commit_id") or \
+                        pr.get("lastMergeSourceCommit", {}).get("commitId")
+        target_commit = pr.get("last_merge_target_commit", {}).get("commit_id") or \
+                        pr.get("lastMergeTargetCommit", {}).get("commitId")
+        return source_commit, target_commit
+
+    def get_pull_request(self, organization: str, project: str, repo_id: str, pr_id: int) -> Dict:
+        """プルリクエストの詳細情報をAPIから取得し、ミラーをPRのコミットまで更新"""
+        pr = self.api_client.get_pull_request(organization, project, repo_id, pr_id)
+        self.sync_pull_request(organization, project, repo_id, pr)
+        return pr
+
+    def list_pull_requests(self, *args, **kwargs) -> List[Dict]:
+        return self.api_client.list_pull_requests(*args, **kwargs)
+
+    def get_comments(self, organization: str, project: str, repo_id: str, pr_id: int) -> List[Dict]:
+        return self.api_client.get_comments(organization, project, repo_id, pr_id)
+
+    def get_commit_diffs(
+        self,
+        organization: str,
+        project: str,
+        repo_id: str,
+        source_commit: str,
+        target_commit: str
+    ) -> Dict:
+        """2つのコミット間の差分情報をミラーから生成
+
+        APIと同様に、ターゲットとソースのマージベースからソースまでの変更を返します。
+        どちらかのコミットがミラーにない場合はAPIから取得します。
+        """
+        mirror = self._get_mirror(organization, project, repo_id)
+        with mirror.lock:
+            if not self._has_commits(mirror, [source_commit, target_commit]):
+                mirror = None
+        if mirror is None:
+            return self.api_client.get_commit_diffs(organization, project, repo_id, source_commit, target_commit)
+
+        try:
+            base = mirror.run("merge-base", target_commit, source_commit).decode().strip()
+        except subprocess.CalledProcessError:
+            # 共通の祖先がない場合はターゲットとの直接の差分とする
+            base = target_commit
+        output = mirror.run("diff-tree", "-r", "-z", "-M", "--raw", "--no-abbrev", base, source_commit)
+        changes = self._parse_raw_diff(output)
+        return {
+            "change_counts": dict(Counter(change["changeType"] for change in changes)),
+            "changes": changes,
+            "common_commit": base,
+        }
+
+    @staticmethod
+    def _parse_raw_diff(output: bytes) -> List[Dict]:
+        """git diff-tree -z --raw の出力をcommit diffsのchanges（camelCase）に変換"""
+        fields = output.decode("utf-8").split("\0")
+        changes = []
+        index = 0
+        while index < len(fields) and fields[index].startswith(":"):
+            old_mode, new_mode, old_id, new_id, status = fields[index][1:].split(" ")
+            path = fields[index + 1]
+            index += 2
+            source_path = None
+            if status.startswith("R"):
+                source_path, path = path, fields[index]
+                index += 1
+            if _GITLINK_MODE in (old_mode, new_mode):
+                continue
+
+            item = {"path": "/" + path, "gitObjectType": "blob"}
+            if status.startswith("R"):
+                change_type = "rename" if status == "R100" else "edit, rename"
+            else:
+                change_type = _CHANGE_TYPES.get(status[0], "edit")
+            if change_type != "add":
+                item["originalObjectId"] = old_id
+            if change_type != "delete":
+                item["objectId"] = new_id
+            change = {"changeType": change_type, "item": item}
+            if source_path is not None:
+                change["sourceServerItem"] = "/" + source_path
+            changes.append(change)
+        return changes
+
+    def _fetch_default_branch(self, organization: str, project: str, repo_id: str) -> str:
+        return self.api_client._fetch_default_branch(organization, project, repo_id)
+
+    def _fetch_branch_commit(self, organization: str, project: str, repo_id: str, branch: str) -> str:
+        return self.api_client._fetch_branch_commit(organization, project, repo_id, branch)
+
+    def _fetch_tree_paths(self, organization: str, project: str, repo_id: str, commit_id: str) -> List[str]:
+        """コミットの全ファイルのパスをミラーから取得（コミットがミラーにない場合はAPIから取得）"""
+        mirror = self._get_mirror(organization, project, repo_id)
+        with mirror.lock:
+            found = self._has_commits(mirror, [commit_id])
+        if not found:
+            return self.api_client._fetch_tree_paths(organization, project, repo_id, commit_id)
+        output = mirror.run("ls-tree", "-r", "-z", "--name-only", commit_id)
+        return ["/" + path for path in output.decode("utf-8").split("\0") if path]
+
+    def _fetch_tree_blob_ids(self, organization: str, project: str, repo_id: str, commit_id: str) -> Dict[str, str]:
+        """コミットの全ファイルのパスとobjectIdをミラーから取得（コミットがミラーにない場合はAPIから取得）"""
+        mirror = self._get_mirror(organization, project, repo_id)
+        with mirror.lock:
+            found = self._has_commits(mirror, [commit_id])
+        if not found:
+            return self.api_client._fetch_tree_blob_ids(organization, project, repo_id, commit_id)
+        output = mirror.run("ls-tree", "-r", "-z", "--full-tree", commit_id)
+        blob_ids = {}
+        for entry in output.decode("utf-8").split("\0"):
+            if not entry:
+                continue
+            info, path = entry.split("\t", 1)
+            _, object_type, object_id = info.split(" ")
+            if object_type == "blob":
+                blob_ids["/" + path] = object_id
+        return blob_ids
+
+    def _fetch_blobs(self, organization: str, project: str, repo_id: str, object_ids: List[str]) -> Dict[str, str]:
+        """blobをミラーから読み出す（ミラーにないものはAPIからまとめて取得）"""
+        mirror = self._get_mirror(organization, project, repo_id)
+        contents = {}
+        with mirror.lock:
+            for object_id in object_ids:
+                found = mirror.read_object(object_id)
+                if found is not None and found[0] == "blob":
+                    contents[object_id] = found[1].decode("utf-8")
+        missing = [object_id for object_id in object_ids if object_id not in contents]
+        if missing:
+            contents.update(self.api_client._fetch_blobs(organization, project, repo_id, missing))
+        return contents
+
+    def _fetch_item_content(
+        self,
+        organization: str,
+        project: str,
+        repo_id: str,
+        path: str,
+        version: str = None,
+        version_type: str = None
+    ) -> str:
+        return self.api_client._fetch_item_content(organization, project, repo_id, path, version, version_type)
+
+    def _get_item_at_commit(
+        self,
+        organization: str,
+        project: str,
+        repo_id: str,
+        path: str,
+        commit_id: str,
+        object_id: str = None
+    ) -> str:
+        """特定のコミットでのファイル内容をミラーから読み出す（存在しない場合は例外を送出）
+
+        コミットがミラーにあってパスが存在しない場合はFileNotFoundErrorを送出し、
+        コミットやblobがミラーにない場合はAPIから取得します。
+        """
+        mirror = self._get_mirror(organization, project, repo_id)
+        # 取得元（memory: blob_cache、mirror: ローカルのミラー、api）
+        source = "memory"
+
+        def load() -> str:
+            nonlocal source
+            with mirror.lock:
+                found = mirror.read_object(object_id) if object_id else None
+                if found is None:
+                    found = mirror.read_object(f"{commit_id}:{path.lstrip('/')}")
+                    if found is None and self._has_commits(mirror, [commit_id]):
+                        raise FileNotFoundError(f"{path} does not exist at {commit_id}")
+            if found is None or found[0] != "blob":
+                source = "api"
+                return self._fetch_item_content(organization, project, repo_id, path, commit_id, "commit")
+            source = "mirror"
+            return found[1].decode("utf-8")
+
+        if object_id:
+            cache_key = ("blob", object_id)
+        else:
+            cache_key = ("item", organization, project, repo_id, commit_id, path)
+        with tracing.span("get_blob", path=path, object_id=object_id) as span:
+            content = self.blob_cache.get_or_load(cache_key, load)
+            span.set(bytes=len(content), cache_hit=source == "memory", source=source)
+        return content
+
+    def stats(self) -> Dict[str, int]:
+        """このクライアントが使うミラーの数と、それらのフェッチ回数（共有する他のクライアントの分を含む）を返す"""
+        with self._mirrors_lock:
+            mirrors = list(self._mirrors.values())
+        return {"mirrors": len(mirrors), "fetches": sum(mirror.fetches for mirror in mirrors)}
+
+    def close(self) -> None:
+        """このクライアントが使うミラーのcat-fileのプロセスを終了する（共有する他のクライアントでは次の読み出し時に起動し直す）"""
+        with self._mirrors_lock:
+            mirrors = list(self._mirrors.values())
+        for mirror in mirrors:
+            with mirror.lock:
+                mirror.close_reader()
@@ -0,0 +1,150 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Tuple
+
+# .metaファイルのアセットGUIDの行（例: "guid: 0123456789abcdef0123456789abcdef"）
+META_GUID_PATTERN = re.compile(r"^guid: ([0-9a-f]{32})\s*$", re.MULTILINE)
+
+# UnityのYAML（prefab・scene・materialなど）に現れるGUIDの参照（例: "{fileID: 11400000, guid: ..., type: 2}"）
+GUID_REFERENCE_PATTERN = re.compile(r"\bguid: ([0-9a-f]{32})\b")
+
+
+def parse_meta_guid(content: str) -> Optional[str]:
+    """.metaファイルの内容からアセットのGUIDを取得（見つからない場合はNone）"""
+    match = META_GUID_PATTERN.search(content)
+    return match.group(1) if match else None
+
+
+class GuidIndex:
+    """1つのコミットでのUnityのアセットGUIDからアセットのパスへの索引
+
+    .metaファイルのパスとその内容から作成し、GUIDの参照はdictの1回の参照で解決します。
+    パスはリポジトリのパス（"/" 始まり）から ".meta" を除いたものです。
+    """
+
+    def __init__(self):
+        self._paths: Dict[str, str] = {}
+        # アセットのパス -> GUID（.metaの削除・変更時に古いGUIDを取り除くために使用）
+        self._guids: Dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+    def copy(self) -> "GuidIndex":
+        """別のコミット用に複製する（元の索引は変更しない）"""
+        index = GuidIndex()
+        index._paths = dict(self._paths)
+        index._guids = dict(self._guids)
+        return index
+
+    def get(self, guid: str) -> Optional[str]:
+        """GUIDのアセットのパス（索引にない場合はNone）"""
+        return self._paths.get(guid)
+
+    def set_meta(self, meta_path: str, content: str) -> None:
+        """.metaファイルの内容を索引に反映（GUIDが変わった場合は古いGUIDを取り除く）"""
+        self.remove_meta(meta_path)
+        guid = parse_meta_guid(content)
+        if guid:
+            asset_path = meta_path[:-len(".meta")]
+            self._paths[guid] = asset_path
+            self._guids[asset_path] = guid
+
+    def remove_meta(self, meta_path: str) -> None:
+        """削除された.metaファイルのGUIDを索引から取り除く"""
+        guid = self._guids.pop(meta_path[:-len(".meta")], None)
+        if guid is not None:
+            self._paths.pop(guid, None)
+
+
+class GuidIndexCache:
+    """GuidIndexを不変のコミットIDを含むキーごとに保持するLRUキャッシュ"""
+
+    def __init__(self, max_entries: int = 8):
+        """
+        Args:
+            max_entries: 保持する索引の最大数（デフォルト: 8）
+        """
+        self.max_entries = max_entries
+        self._indexes: "OrderedDict[Hashable, GuidIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[GuidIndex]:
+        """キャッシュから索引を取得（存在しない場合はNone）"""
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is None:
+                self.misses += 1
+                return None
+            self._indexes.move_to_end(key)
+            self.hits += 1
+            return index
+
+    def latest(self, prefix: Tuple) -> Optional[Tuple[Hashable, GuidIndex]]:
+        """キーが prefix + (コミットID,) の索引のうち最終アクセスが最も新しいもの（差分更新の起点に使用）
+
+        キーがこれより長い索引（PRの変更を反映した索引など）は、1つのコミットの状態ではないため対象外です。
+        """
+        with self._lock:
+            for key in reversed(self._indexes):
+                if len(key) == len(prefix) + 1 and key[:len(prefix)] == prefix:
+                    return key, self._indexes[key]
+        return None
+
+    def put(self, key: Hashable, index: GuidIndex) -> None:
+        """索引を登録し、上限を超えた分を古い順に追い出す"""
+        if not self.max_entries:
+            return
+        with self._lock:
+            self._indexes[key] = index
+            self._indexes.move_to_end(key)
+            while len(self._indexes) > self.max_entries:
+                self._indexes.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        """ヒット・ミス数、索引数、索引しているGUIDの合計数を返す"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._indexes),
+                "guids": sum(len(index) for index in self._indexes.values()),
+                "max_entries": self.max_entries,
+            }
+
+
+def annotate_guids(file_diff: str, source_index: GuidIndex, target_index: GuidIndex) -> str:
+    """ファイルの差分に現れるGUIDの参照先のアセットを、差分の末尾にコメント行として追加
+
+    差分の行は変更しないため、パッチとしての形式は保たれます。変更後の索引にないGUIDは
+    変更前の索引から解決して "(deleted)" を付け、どちらにもないGUID（組み込みアセットなど）は省略します。
+
+    Args:
+        file_diff: 1ファイルのUnified Diff
+        source_index: 変更後（PRのソース）のコミットの索引
+        target_index: 変更前（PRのターゲット）のコミットの索引
+
+    Returns:
+        注記を追加した差分（参照が解決できない場合はそのまま）
+    """
+    lines: List[str] = []
+    seen = set()
+    for guid in GUID_REFERENCE_PATTERN.findall(file_diff):
+        if guid in seen:
+            continue
+        seen.add(guid)
+        path = source_index.get(guid)
+        if path is not None:
+            lines.append(f"#   {guid}: {path.lstrip('/')}\n")
+            continue
+        path = target_index.get(guid)
+        if path is not None:
+            lines.append(f"#   {guid}: {path.lstrip('/')} (deleted)\n")
+    if not lines:
+        return file_diff
+    if not file_diff.endswith("\n"):
+        file_diff += "\n"
+    return file_diff + "# Unity GUIDs:\n" + "".join(lines)
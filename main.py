@@ -1,9 +1,26 @@
+import contextlib
+import functools
+import hashlib
 import os
+import threading
+from collections import OrderedDict
+import anyio
 from dotenv import load_dotenv
-from mcp.server.fastmcp import FastMCP
-from typing import List
-from client import AzureReposClient
-from azure_arbiter import AzureReposArbiter
+from mcp import types
+from mcp.server.fastmcp import Context, FastMCP
+from typing import Callable, ContextManager, List, Optional, Tuple
+from blob_cache import BlobCache
+from client import AzureReposClient, OrganizationPool, warm_up
+from client_registry import ClientRegistry
+from disk_blob_store import DiskBlobStore
+from azure_arbiter import AzureReposArbiter, pull_request_scope
+from memory_budget import MemoryBudget
+from prefetcher import BlobPrefetcher
+from response_cache import ResponseCache
+from search_index import SearchIndexCache
+from snapshot_store import SnapshotStore
+from tracing import Tracer
+from unified_diff_generator import UnifiedDiffGenerator
 
 # Load environment variables
 load_dotenv()
@@ -11,22 +28,250 @@ load_dotenv()
 ORGANIZATION = os.getenv("AZURE_DEVOPS_ORGANIZATION")
 PROJECT = os.getenv("AZURE_DEVOPS_PROJECT")
 REPOSITORY_ID = os.getenv("AZURE_DEVOPS_REPOSITORY_ID")
+MAX_WORKERS = int(os.getenv("AZURE_DEVOPS_MAX_WORKERS", "4"))
+SNAPSHOT_PATH = os.getenv("AZURE_DEVOPS_SNAPSHOT_PATH")
+SNAPSHOT_MAX_MB = int(os.getenv("AZURE_DEVOPS_SNAPSHOT_MAX_MB", "512"))
+WARMUP = os.getenv("AZURE_DEVOPS_WARMUP", "1") != "0"
+BACKEND = os.getenv("AZURE_DEVOPS_BACKEND", "sdk")
+SERVER_DIFF_THRESHOLD_KB = int(os.getenv("AZURE_DEVOPS_SERVER_DIFF_THRESHOLD_KB", "256"))
+PREFETCH = os.getenv("AZURE_DEVOPS_PREFETCH", "0") == "1"
+PREFETCH_MAX_MB = int(os.getenv("AZURE_DEVOPS_PREFETCH_MAX_MB", "64"))
+MAX_REQUESTS_PER_ORG = int(os.getenv("AZURE_DEVOPS_MAX_REQUESTS_PER_ORG", "8"))
+ADAPTIVE_CONCURRENCY = os.getenv("AZURE_DEVOPS_ADAPTIVE_CONCURRENCY", "0") == "1"
+MAX_ADAPTIVE_REQUESTS_PER_ORG = int(os.getenv("AZURE_DEVOPS_MAX_ADAPTIVE_REQUESTS_PER_ORG", "64"))
+BLOB_CACHE_MB = int(os.getenv("AZURE_DEVOPS_BLOB_CACHE_MB", "256"))
+RESPONSE_CACHE_ENTRIES = int(os.getenv("AZURE_DEVOPS_RESPONSE_CACHE_ENTRIES", "256"))
+RESPONSE_CACHE_TTL = float(os.getenv("AZURE_DEVOPS_RESPONSE_CACHE_TTL", "30"))
+RESPONSE_CACHE_MB = int(os.getenv("AZURE_DEVOPS_RESPONSE_CACHE_MB", "64"))
+TRANSPORT = os.getenv("AZURE_DEVOPS_TRANSPORT", "stdio")
+HTTP_HOST = os.getenv("AZURE_DEVOPS_HTTP_HOST", "127.0.0.1")
+HTTP_PORT = int(os.getenv("AZURE_DEVOPS_HTTP_PORT", "8000"))
+TOOL_WORKERS = int(os.getenv("AZURE_DEVOPS_TOOL_WORKERS", "8"))
+MAX_SESSION_PATS = int(os.getenv("AZURE_DEVOPS_MAX_SESSION_PATS", "16"))
+BLOB_STORE_PATH = os.getenv("AZURE_DEVOPS_BLOB_STORE_PATH")
+BLOB_STORE_MAX_MB = int(os.getenv("AZURE_DEVOPS_BLOB_STORE_MAX_MB", "2048"))
+BLOB_STORE_COMPRESSION = os.getenv("AZURE_DEVOPS_BLOB_STORE_COMPRESSION", "zlib")
+MEMORY_BUDGET_MB = int(os.getenv("AZURE_DEVOPS_MEMORY_BUDGET_MB", "1024"))
+MEMORY_WAIT_SECONDS = float(os.getenv("AZURE_DEVOPS_MEMORY_WAIT_SECONDS", "30"))
+GIT_MIRROR_PATH = os.getenv("AZURE_DEVOPS_GIT_MIRROR_PATH")
+SEARCH_INDEX_MB = int(os.getenv("AZURE_DEVOPS_SEARCH_INDEX_MB", "64"))
+TRACE_PATH = os.getenv("AZURE_DEVOPS_TRACE_PATH")
+TRACE_FORMAT = os.getenv("AZURE_DEVOPS_TRACE_FORMAT", "chrome")
+
+# HTTPモード（sse / streamable-http）でセッションごとのPATを受け取るリクエストヘッダー
+PAT_HEADER = "X-Azure-DevOps-PAT"
 
 # Create an MCP server
-mcp = FastMCP("azure-repos-review-support")
+mcp = FastMCP("azure-repos-review-support", host=HTTP_HOST, port=HTTP_PORT)
+
+def on_initialized(server: FastMCP, callback: Callable[[], None]) -> None:
+    """MCPハンドシェイクの完了（クライアントからのinitialized通知）時にcallbackを呼ぶよう登録
+
+    FastMCPはinitialized通知を受け取る公開フックを持たないため（mcp 1.30.0時点）、
+    低レベルサーバー（FastMCP._mcp_server）の notification_handlers に直接登録します。
+    private属性に依存するのはこの関数のみです。
+    """
+    async def handler(notification: types.InitializedNotification) -> None:
+        callback()
+
+    server._mcp_server.notification_handlers[types.InitializedNotification] = handler
+
+def start_warm_up() -> None:
+    """azure-devops SDKの読み込みをバックグラウンドのスレッドで開始"""
+    threading.Thread(target=warm_up, name="sdk-warm-up", daemon=True).start()
+
+if WARMUP:
+    on_initialized(mcp, start_warm_up)
+
+# 接続とblobキャッシュをツール呼び出し・セッション間で共有するため、レジストリはPATごとに1つだけ作成する
+_registries: "OrderedDict[str, ClientRegistry]" = OrderedDict()
+_registry_lock = threading.Lock()
+_tool_limiter = None
+_snapshot_store = None
+_blob_store = None
+_blob_store_lock = threading.Lock()
+
+# 取得中のファイル内容と生成した差分の合計サイズは、全セッション・全リポジトリで1つの予算に収める
+memory_budget = MemoryBudget(max_bytes=MEMORY_BUDGET_MB * 1024 * 1024, wait_timeout=MEMORY_WAIT_SECONDS)
+
+# ツール呼び出しごとのトレース（AZURE_DEVOPS_TRACE_PATH設定時のみ）
+tracer = Tracer(TRACE_PATH, format=TRACE_FORMAT) if TRACE_PATH else None
+
+def get_snapshot_store() -> SnapshotStore:
+    """スナップショットストアを取得（AZURE_DEVOPS_SNAPSHOT_PATH未設定時はNone）"""
+    global _snapshot_store
+    if SNAPSHOT_PATH and _snapshot_store is None:
+        _snapshot_store = SnapshotStore(SNAPSHOT_PATH, max_bytes=SNAPSHOT_MAX_MB * 1024 * 1024)
+    return _snapshot_store
+
+def get_blob_store() -> DiskBlobStore:
+    """blobのディスクストアを取得（AZURE_DEVOPS_BLOB_STORE_PATH未設定時はNone）
 
-def get_client() -> AzureReposArbiter:
-    pat = os.environ.get("AZURE_DEVOPS_PAT")
+    blobはobjectId（内容のハッシュ）で識別されるため、全セッション・全リポジトリで1つを共有します。
+    """
+    global _blob_store
+    with _blob_store_lock:
+        if BLOB_STORE_PATH and _blob_store is None:
+            _blob_store = DiskBlobStore(
+                BLOB_STORE_PATH, max_bytes=BLOB_STORE_MAX_MB * 1024 * 1024, compression=BLOB_STORE_COMPRESSION
+            )
+        return _blob_store
+
+def create_client(pat: str, blob_cache: BlobCache = None, pool: OrganizationPool = None, session=None) -> AzureReposClient:
+    """AZURE_DEVOPS_BACKENDに応じたクライアントを作成"""
+    if BACKEND == "rest":
+        # requestsのインポートを遅延させ、SDKバックエンド使用時の起動を軽くする
+        from rest_client import AzureReposRestClient
+        return AzureReposRestClient(pat, blob_cache=blob_cache, pool=pool, session=session, blob_store=get_blob_store())
+    if BACKEND == "git":
+        # PRのメタデータはSDKで取得し、blobとコミット差分はローカルのミラーから読み出す
+        from git_mirror_client import GitMirrorClient
+        if not GIT_MIRROR_PATH:
+            raise ValueError("AZURE_DEVOPS_GIT_MIRROR_PATH is required when AZURE_DEVOPS_BACKEND is 'git'")
+        return GitMirrorClient(AzureReposClient(pat, blob_cache=blob_cache, pool=pool), GIT_MIRROR_PATH)
+    if BACKEND != "sdk":
+        raise ValueError(f"Unknown AZURE_DEVOPS_BACKEND: {BACKEND} (expected 'sdk', 'rest' or 'git')")
+    return AzureReposClient(pat, blob_cache=blob_cache, pool=pool, blob_store=get_blob_store())
+
+def create_registry(pat: str) -> ClientRegistry:
+    """PATごとのクライアントレジストリを作成
+
+    組織ごとの接続・同時リクエスト数の上限・先読み器・blobキャッシュ・検索索引はレジストリ内の
+    全リポジトリで共有します。キャッシュはサイズの上限を持つため、1つのPATが保持するメモリは
+    扱うリポジトリの数によらずAZURE_DEVOPS_BLOB_CACHE_MB + AZURE_DEVOPS_SEARCH_INDEX_MBまでです。
+    """
+    pool = OrganizationPool(
+        max_requests_per_org=MAX_REQUESTS_PER_ORG,
+        adaptive=ADAPTIVE_CONCURRENCY,
+        max_adaptive_requests=MAX_ADAPTIVE_REQUESTS_PER_ORG
+    )
+    session = None
+    if BACKEND == "rest":
+        from rest_client import AzureReposRestClient
+        session = AzureReposRestClient.create_session(pat)
+    prefetcher = None
+    if PREFETCH:
+        prefetcher = BlobPrefetcher(max_workers=MAX_WORKERS, max_bytes=PREFETCH_MAX_MB * 1024 * 1024)
+    # キーはobjectId、またはリポジトリを含むパス・PRバージョンのため、リポジトリ間で共有しても衝突しない
+    blob_cache = BlobCache(max_bytes=BLOB_CACHE_MB * 1024 * 1024)
+    search_indexes = SearchIndexCache(max_bytes=SEARCH_INDEX_MB * 1024 * 1024)
+
+    def create_arbiter(organization: str, project: str, repo_id: str) -> AzureReposArbiter:
+        return AzureReposArbiter(
+            create_client(pat, blob_cache=blob_cache, pool=pool, session=session),
+            snapshot_store=get_snapshot_store(),
+            server_diff_threshold=SERVER_DIFF_THRESHOLD_KB * 1024,
+            prefetcher=prefetcher,
+            memory_budget=memory_budget,
+            search_indexes=search_indexes
+        )
+
+    return ClientRegistry(
+        create_arbiter, pat=pat, pool=pool, prefetcher=prefetcher, blob_cache=blob_cache, search_indexes=search_indexes
+    )
+
+def resolve_repository(organization: str = None, project: str = None, repository_id: str = None) -> Tuple[str, str, str]:
+    """ツールの引数で指定されたリポジトリ（省略した項目は環境変数の値）を返す"""
+    repository = (organization or ORGANIZATION, project or PROJECT, repository_id or REPOSITORY_ID)
+    if not all(repository):
+        raise ValueError(
+            "Repository not specified: pass organization, project and repository_id, or set "
+            "AZURE_DEVOPS_ORGANIZATION, AZURE_DEVOPS_PROJECT and AZURE_DEVOPS_REPOSITORY_ID."
+        )
+    return repository
+
+def session_pat() -> Optional[str]:
+    """HTTPモードのリクエストヘッダーで指定されたPATを返す（stdioモードや未指定の場合はNone）"""
+    try:
+        request = mcp._mcp_server.request_context.request
+    except LookupError:
+        return None
+    headers = getattr(request, "headers", None)
+    return headers.get(PAT_HEADER) if headers is not None else None
+
+def current_pat() -> str:
+    """ツール呼び出しに使用するPAT（セッションのヘッダーの値、なければAZURE_DEVOPS_PAT）"""
+    pat = session_pat() or os.environ.get("AZURE_DEVOPS_PAT")
     if not pat:
-        raise ValueError("AZURE_DEVOPS_PAT environment variable not set")
-    return AzureReposArbiter(AzureReposClient(pat))
+        raise ValueError(f"AZURE_DEVOPS_PAT environment variable not set (or pass the {PAT_HEADER} header)")
+    return pat
+
+def pat_scope() -> str:
+    """応答キャッシュをPATごとに分けるための識別子（PATそのものはキーに含めない）"""
+    return hashlib.sha256(current_pat().encode("utf-8")).hexdigest()[:16]
 
-def validate_config():
-    if not all([ORGANIZATION, PROJECT, REPOSITORY_ID]):
-        raise ValueError("Server configuration missing: AZURE_DEVOPS_ORGANIZATION, AZURE_DEVOPS_PROJECT, or AZURE_DEVOPS_REPOSITORY_ID not set.")
+def get_registry() -> ClientRegistry:
+    """呼び出し元のPATのレジストリを取得
+
+    同じPATのセッションは接続・blobキャッシュを共有し、異なるPATのセッション間では共有しません。
+    保持するレジストリはMAX_SESSION_PATS個までで、超えると最も長く使われていないものを閉じます。
+    """
+    pat = current_pat()
+    with _registry_lock:
+        registry = _registries.get(pat)
+        if registry is None:
+            registry = _registries[pat] = create_registry(pat)
+            while len(_registries) > MAX_SESSION_PATS:
+                _registries.popitem(last=False)[1].close()
+        _registries.move_to_end(pat)
+        return registry
+
+def get_client(organization: str = None, project: str = None, repository_id: str = None) -> AzureReposArbiter:
+    """指定されたリポジトリのArbiterを取得（省略した項目は環境変数の値）"""
+    return get_registry().get(*resolve_repository(organization, project, repository_id))
+
+def trace_tool(name: str, arguments: dict) -> ContextManager:
+    """ツール呼び出しのトレースを開始（AZURE_DEVOPS_TRACE_PATH未設定時は何もしない）"""
+    if tracer is None:
+        return contextlib.nullcontext()
+    return tracer.trace(f"tool:{name}", **{key: value for key, value in arguments.items() if value is not None})
+
+def tool_limiter() -> anyio.CapacityLimiter:
+    """ツールの処理を実行するワーカースレッド数（TOOL_WORKERS）の上限を返す"""
+    global _tool_limiter
+    if _tool_limiter is None:
+        _tool_limiter = anyio.CapacityLimiter(TOOL_WORKERS)
+    return _tool_limiter
+
+def run_in_worker(fn: Callable) -> Callable:
+    """同期のツール関数を、ワーカースレッド（最大TOOL_WORKERS本）で実行する非同期関数に変換
+
+    イベントループを塞がないため、HTTPモードでは複数のセッションの呼び出しを並行して処理できます。
+    リクエストのコンテキスト（セッションのPATを含む）はワーカースレッドに引き継がれます。
+    トレースが有効な場合は、応答キャッシュの参照を含むツールの処理全体を1つのトレースとして記録します。
+    PRのメタデータは呼び出しの間だけ共有し、応答キャッシュのバージョン確認とツール本体で2回取得しません。
+    """
+    def traced(*args, **kwargs):
+        with trace_tool(fn.__name__, kwargs), pull_request_scope():
+            return fn(*args, **kwargs)
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        return await anyio.to_thread.run_sync(functools.partial(traced, *args, **kwargs), limiter=tool_limiter())
+
+    return wrapper
+
+# 同じ引数のツール呼び出しの応答を再利用する（PATごとに分ける）
+response_cache = ResponseCache(
+    max_entries=RESPONSE_CACHE_ENTRIES, ttl=RESPONSE_CACHE_TTL, scope=pat_scope,
+    max_bytes=RESPONSE_CACHE_MB * 1024 * 1024
+)
+
+def has_no_omitted_files(response) -> bool:
+    """メモリ予算のために差分・行数を省略したファイルを含まない応答のみをキャッシュする"""
+    if isinstance(response, str):
+        return not UnifiedDiffGenerator.has_omitted_files(response)
+    return not any(f.get("omitted") for f in response.get("files", []))
+
+def pull_request_version(arguments: dict) -> str:
+    """PRの先頭コミットを応答キャッシュのバージョンとする（PRメタデータの取得1回で検証）"""
+    repository = resolve_repository(arguments["organization"], arguments["project"], arguments["repository_id"])
+    return get_client(*repository).get_pull_request_version(*repository, arguments["id"])
 
 @mcp.tool()
-def get_pull_request(id: int) -> dict:
+@run_in_worker
+@response_cache.cached("get_pull_request")
+def get_pull_request(id: int, organization: str = None, project: str = None, repository_id: str = None) -> dict:
     """
     Get detailed information for a specific pull request.
     This includes the PR title, description, and status.
@@ -37,22 +282,33 @@ def get_pull_request(id: int) -> dict:
 
     Args:
         id (int): The ID of the pull request.
+        organization (str, optional): Azure DevOps organization. Defaults to AZURE_DEVOPS_ORGANIZATION.
+        project (str, optional): Project name. Defaults to AZURE_DEVOPS_PROJECT.
+        repository_id (str, optional): Repository ID or name. Defaults to AZURE_DEVOPS_REPOSITORY_ID.
 
     Returns:
         dict: A dictionary containing pull request details.
     """
-    validate_config()
-    client = get_client()
-    return client.get_pull_request(ORGANIZATION, PROJECT, REPOSITORY_ID, id)
+    repository = resolve_repository(organization, project, repository_id)
+    return get_client(*repository).get_pull_request(*repository, id)
 
 @mcp.tool()
-def get_pull_request_change_summary(id: int) -> dict:
+@run_in_worker
+@response_cache.cached("get_pull_request_change_summary", version_of=pull_request_version)
+def get_pull_request_change_summary(
+    id: int, compact: bool = False, organization: str = None, project: str = None, repository_id: str = None
+) -> dict:
     """
     Get a summary of changes in a specific pull request, including the list of changed files and their change types.
     This does not include the actual code diff.
 
     Args:
         id (int): The ID of the pull request.
+        compact (bool, optional): Return a compact tabular encoding. Recommended for large pull requests.
+            Defaults to False.
+        organization (str, optional): Azure DevOps organization. Defaults to AZURE_DEVOPS_ORGANIZATION.
+        project (str, optional): Project name. Defaults to AZURE_DEVOPS_PROJECT.
+        repository_id (str, optional): Repository ID or name. Defaults to AZURE_DEVOPS_REPOSITORY_ID.
 
     Returns:
         dict: A dictionary containing:
@@ -67,57 +323,333 @@ def get_pull_request_change_summary(id: int) -> dict:
             
             Note: For renamed files, only the new location entry is included.
             The old location entry (with status="deleted") is automatically filtered out.
+
+        When compact is True, a dictionary containing:
+            - format: "compact"
+            - status_codes: Map of status code to status ("A": "added", "D": "deleted", "M": "modified", "R": "renamed")
+            - columns: Column names of each row in files
+            - dirs: List of directories, referenced by index from files
+            - files: List of rows [dir index, file name, status code, original path (only for renamed files)]
+            The file path is dirs[dir index] + "/" + file name. A file exists in base unless its status is "A",
+            and exists in head unless its status is "D".
     """
-    validate_config()
-    client = get_client()
-    return client.get_pull_request_change_summary(ORGANIZATION, PROJECT, REPOSITORY_ID, id)
+    repository = resolve_repository(organization, project, repository_id)
+    return get_client(*repository).get_pull_request_change_summary(*repository, id, compact=compact)
 
 @mcp.tool()
-def get_pull_request_comments(id: int) -> List[dict]:
+@run_in_worker
+@response_cache.cached("get_pull_request_comments")
+def get_pull_request_comments(id: int, organization: str = None, project: str = None, repository_id: str = None) -> List[dict]:
     """
     Get the comment threads for a specific pull request.
 
     Args:
         id (int): The ID of the pull request.
+        organization (str, optional): Azure DevOps organization. Defaults to AZURE_DEVOPS_ORGANIZATION.
+        project (str, optional): Project name. Defaults to AZURE_DEVOPS_PROJECT.
+        repository_id (str, optional): Repository ID or name. Defaults to AZURE_DEVOPS_REPOSITORY_ID.
 
     Returns:
         List[dict]: A list of comment threads associated with the pull request.
     """
-    validate_config()
-    client = get_client()
-    return client.get_comments(ORGANIZATION, PROJECT, REPOSITORY_ID, id)
+    repository = resolve_repository(organization, project, repository_id)
+    return get_client(*repository).get_comments(*repository, id)
 
 @mcp.tool()
-def get_file_content(path: str, version: str = None) -> str:
+@run_in_worker
+@response_cache.cached("get_file_content")
+def get_file_content(path: str, version: str = None, organization: str = None, project: str = None, repository_id: str = None) -> str:
     """
     Get the content of a file from the repository.
 
     Args:
         path (str): The path to the file.
         version (str, optional): The version string (e.g. branch name or commit info). Defaults to None (default branch).
+        organization (str, optional): Azure DevOps organization. Defaults to AZURE_DEVOPS_ORGANIZATION.
+        project (str, optional): Project name. Defaults to AZURE_DEVOPS_PROJECT.
+        repository_id (str, optional): Repository ID or name. Defaults to AZURE_DEVOPS_REPOSITORY_ID.
 
     Returns:
         str: The content of the file.
     """
-    validate_config()
-    client = get_client()
-    return client.get_file_content(ORGANIZATION, PROJECT, REPOSITORY_ID, path, version)
+    repository = resolve_repository(organization, project, repository_id)
+    return get_client(*repository).get_file_content(*repository, path, version)
+
+@mcp.tool()
+@run_in_worker
+@response_cache.cached("list_files")
+def list_files(
+    version: str = None, path: str = None, pattern: str = None, max_results: int = 1000,
+    organization: str = None, project: str = None, repository_id: str = None
+) -> dict:
+    """
+    List the files of the repository at a branch or commit, recursively.
+    Use this instead of probing paths with get_file_content: the full tree is fetched once per commit,
+    and later listings and existence checks for the same commit need no network.
+
+    Args:
+        version (str, optional): Branch name or commit ID. Defaults to None (default branch).
+        path (str, optional): Directory to list. Defaults to the repository root.
+        pattern (str, optional): Glob matched against the path without the leading "/" (e.g. "*.cs", "Assets/Scripts/*").
+            "*" also matches "/".
+        max_results (int): Maximum number of paths to return. Defaults to 1000.
+        organization (str, optional): Azure DevOps organization. Defaults to AZURE_DEVOPS_ORGANIZATION.
+        project (str, optional): Project name. Defaults to AZURE_DEVOPS_PROJECT.
+        repository_id (str, optional): Repository ID or name. Defaults to AZURE_DEVOPS_REPOSITORY_ID.
+
+    Returns:
+        dict: A dictionary containing:
+            - commit_id: The commit the listing was taken from
+            - files: Sorted file paths (folders are not listed)
+            - truncated: True when more than max_results files matched
+    """
+    repository = resolve_repository(organization, project, repository_id)
+    return get_client(*repository).list_files(
+        *repository, version=version, path=path, pattern=pattern, max_results=max_results
+    )
 
 @mcp.tool()
-def get_pull_request_unified_diff(id: int) -> str:
+@run_in_worker
+@response_cache.cached("get_symbol")
+def get_symbol(
+    path: str, name: str, version: str = None,
+    organization: str = None, project: str = None, repository_id: str = None
+) -> dict:
+    """
+    Get only the declaration of one method, property or type from a C# file instead of the whole file.
+    Unified diff hunk headers of C# files name the enclosing declaration (e.g. "@@ -10,7 +10,7 @@ public void Update()"),
+    which can be passed here as the name.
+
+    Args:
+        path (str): The path to the C# file.
+        name (str): The declaration name, or a qualified suffix of it (e.g. "Update", "Player.Update").
+        version (str, optional): Branch name or commit ID. Defaults to None (default branch).
+        organization (str, optional): Azure DevOps organization. Defaults to AZURE_DEVOPS_ORGANIZATION.
+        project (str, optional): Project name. Defaults to AZURE_DEVOPS_PROJECT.
+        repository_id (str, optional): Repository ID or name. Defaults to AZURE_DEVOPS_REPOSITORY_ID.
+
+    Returns:
+        dict: A dictionary containing:
+            - path: The file path
+            - commit_id: The commit the file was read from
+            - symbols: Matching declarations (all overloads), each with name (qualified), kind,
+              start_line, end_line (1-based, inclusive; attributes included) and content
+            - available: Qualified names of all declarations in the file (only when nothing matched)
+    """
+    repository = resolve_repository(organization, project, repository_id)
+    return get_client(*repository).get_symbol(*repository, path, name, version=version)
+
+@mcp.tool()
+@run_in_worker
+@response_cache.cached(
+    "get_pull_request_unified_diff", version_of=pull_request_version, cacheable=has_no_omitted_files
+)
+def get_pull_request_unified_diff(
+    id: int, ignore_whitespace: bool = False, ignore_eol: bool = False, annotate_unity_guids: bool = False,
+    organization: str = None, project: str = None, repository_id: str = None
+) -> str:
     """
     Get the unified diff format for a specific pull request.
 
     Args:
         id (int): The ID of the pull request.
+        ignore_whitespace (bool): Ignore changes in whitespace (indentation, spacing within lines).
+            Hunks still show the original text.
+        ignore_eol (bool): Ignore changes in line endings (CRLF vs LF).
+        annotate_unity_guids (bool): Append a "# Unity GUIDs:" block to each file diff that maps the
+            asset GUIDs referenced in it (e.g. in prefabs and scenes) to asset paths, resolved from .meta files.
+        organization (str, optional): Azure DevOps organization. Defaults to AZURE_DEVOPS_ORGANIZATION.
+        project (str, optional): Project name. Defaults to AZURE_DEVOPS_PROJECT.
+        repository_id (str, optional): Repository ID or name. Defaults to AZURE_DEVOPS_REPOSITORY_ID.
 
     Returns:
         str: The unified diff format of all changed files in the pull request.
              This format is compatible with standard diff tools and AI code review systems.
+             Files that did not fit in the server memory budget contain only the "---"/"+++" lines
+             followed by a "# Diff omitted: ..." line.
+             Hunk headers of C# files are followed by the line of the declaration enclosing the first change
+             (as in git diff), which can be passed to get_symbol.
+    """
+    repository = resolve_repository(organization, project, repository_id)
+    return get_client(*repository).get_pull_request_unified_diff(
+        *repository, id, ignore_whitespace=ignore_whitespace, ignore_eol=ignore_eol,
+        annotate_unity_guids=annotate_unity_guids
+    )
+
+@mcp.tool()
+@run_in_worker
+@response_cache.cached(
+    "get_pull_request_diff_stats", version_of=pull_request_version, cacheable=has_no_omitted_files
+)
+def get_pull_request_diff_stats(id: int, organization: str = None, project: str = None, repository_id: str = None) -> dict:
+    """
+    Get the number of added and removed lines for each file in a specific pull request.
+    This is much cheaper than get_pull_request_unified_diff; use it to decide which files to look at.
+
+    Args:
+        id (int): The ID of the pull request.
+        organization (str, optional): Azure DevOps organization. Defaults to AZURE_DEVOPS_ORGANIZATION.
+        project (str, optional): Project name. Defaults to AZURE_DEVOPS_PROJECT.
+        repository_id (str, optional): Repository ID or name. Defaults to AZURE_DEVOPS_REPOSITORY_ID.
+
+    Returns:
+        dict: A dictionary containing:
+            - files: List of files with:
+                - path: File path in the PR
+                - status: Normalized status ("added", "deleted", "modified", "renamed")
+                - added: Number of added lines (null when omitted)
+                - removed: Number of removed lines (null when omitted)
+                - omitted: True when the file did not fit in the server memory budget (only when set)
+            - total_added: Total number of added lines
+            - total_removed: Total number of removed lines
+    """
+    repository = resolve_repository(organization, project, repository_id)
+    return get_client(*repository).get_pull_request_diff_stats(*repository, id)
+
+@mcp.tool()
+@run_in_worker
+@response_cache.cached("search_pull_request", version_of=pull_request_version)
+def search_pull_request(
+    id: int, query: str, include_base: bool = False, case_sensitive: bool = True, max_results: int = 100,
+    organization: str = None, project: str = None, repository_id: str = None
+) -> dict:
     """
-    validate_config()
-    client = get_client()
-    return client.get_pull_request_unified_diff(ORGANIZATION, PROJECT, REPOSITORY_ID, id)
+    Search the changed files of a specific pull request for a literal string (e.g. "where else is this method called?").
+    The files are indexed once per pull request version, so repeated searches do not fetch any file.
+
+    Args:
+        id (int): The ID of the pull request.
+        query (str): The text to search for (not a regular expression).
+        include_base (bool): Also search the files before the change (target branch side).
+        case_sensitive (bool): Match case. Defaults to True.
+        max_results (int): Maximum number of matching lines to return. Defaults to 100.
+        organization (str, optional): Azure DevOps organization. Defaults to AZURE_DEVOPS_ORGANIZATION.
+        project (str, optional): Project name. Defaults to AZURE_DEVOPS_PROJECT.
+        repository_id (str, optional): Repository ID or name. Defaults to AZURE_DEVOPS_REPOSITORY_ID.
+
+    Returns:
+        dict: A dictionary containing:
+            - matches: List of matching lines with:
+                - side: "head" (after the change) or "base" (before the change)
+                - path: File path
+                - line: Line number (1-based)
+                - text: The whole line
+            - truncated: True when more than max_results lines matched
+            - files_searched: Number of files searched
+    """
+    repository = resolve_repository(organization, project, repository_id)
+    return get_client(*repository).search_pull_request(
+        *repository, id, query, include_base=include_base, case_sensitive=case_sensitive, max_results=max_results
+    )
+
+@mcp.tool()
+def get_cache_stats() -> dict:
+    """
+    Get hit/miss statistics of the server's caches. Useful for diagnosing performance.
+
+    Returns:
+        dict: A dictionary containing:
+            - responses: Tool response cache (hits, misses, entries, max_entries, bytes, max_bytes)
+            - memory: Process-wide budget for file contents and diffs being held
+              (current_bytes, peak_bytes, max_bytes, waits, rejected)
+            - blobs: In-memory file content cache per repository ("organization/project/repository_id") of the caller's PAT
+              (hits, misses, entries, bytes, max_bytes)
+            - trees: Cached file listings per repository (hits, misses, entries, paths, max_entries)
+            - guids: Unity GUID-to-asset-path indexes per repository (hits, misses, entries, guids, max_entries)
+            - symbols: C# declaration indexes per file content per repository (hits, misses, entries, symbols, max_entries)
+            - search: Trigram indexes of pull request files per repository (hits, misses, entries, files, bytes, max_bytes)
+            - organizations: Shared connections (organizations, max_requests_per_org, and the current
+              per-organization request window when adaptive concurrency is enabled)
+            - sessions: Per-PAT client registries (pats, max_pats, tool_workers)
+            - snapshots: On-disk pull request snapshot store (only when AZURE_DEVOPS_SNAPSHOT_PATH is set)
+            - blob_store: On-disk compressed blob store (only when AZURE_DEVOPS_BLOB_STORE_PATH is set)
+            - prefetch: Background prefetch of changed files (only when AZURE_DEVOPS_PREFETCH is enabled)
+            - tracing: Written traces (format, traces, spans, last_path; only when AZURE_DEVOPS_TRACE_PATH is set)
+    """
+    stats = {"responses": response_cache.stats(), "memory": memory_budget.stats()}
+    pat = session_pat() or os.environ.get("AZURE_DEVOPS_PAT")
+    with _registry_lock:
+        registry = _registries.get(pat)
+        stats["sessions"] = {"pats": len(_registries), "max_pats": MAX_SESSION_PATS, "tool_workers": TOOL_WORKERS}
+    if registry is not None:
+        stats.update(registry.stats())
+    if _snapshot_store is not None:
+        stats["snapshots"] = _snapshot_store.stats()
+    if _blob_store is not None:
+        stats["blob_store"] = _blob_store.stats()
+    if tracer is not None:
+        stats["tracing"] = tracer.stats()
+    return stats
+
+@mcp.tool()
+async def review_pull_requests(
+    ids: List[int] = None,
+    target_branch: str = None,
+    include_diff: bool = True,
+    compact: bool = False,
+    organization: str = None,
+    project: str = None,
+    repository_id: str = None,
+    ctx: Context = None
+) -> List[dict]:
+    """
+    Get the change summary and unified diff for multiple pull requests in one call.
+    Pull requests are processed in parallel; a progress notification is sent as each one completes.
+
+    Args:
+        ids (List[int], optional): The IDs of the pull requests to review. Duplicate IDs are reviewed once.
+        target_branch (str, optional): Review all active pull requests targeting this branch
+            (e.g. "main" or "refs/heads/main"). Used when ids is not given.
+        include_diff (bool, optional): Include the unified diff for each pull request. Defaults to True.
+        compact (bool, optional): Return each summary in the compact encoding of
+            get_pull_request_change_summary. Defaults to False.
+        organization (str, optional): Azure DevOps organization. Defaults to AZURE_DEVOPS_ORGANIZATION.
+        project (str, optional): Project name. Defaults to AZURE_DEVOPS_PROJECT.
+        repository_id (str, optional): Repository ID or name. Defaults to AZURE_DEVOPS_REPOSITORY_ID.
+
+    Returns:
+        List[dict]: One entry per pull request, in completion order, containing:
+            - pull_request_id: The ID of the pull request
+            - summary: Same as get_pull_request_change_summary
+            - unified_diff: Same as get_pull_request_unified_diff (only when include_diff is True)
+            - error: Error message (only when the pull request could not be processed)
+    """
+    repository = resolve_repository(organization, project, repository_id)
+    if not ids and not target_branch:
+        raise ValueError("Either ids or target_branch must be specified.")
+    client = get_client(*repository)
+    if not ids:
+        ids = await anyio.to_thread.run_sync(
+            client.list_active_pull_request_ids, *repository, target_branch, limiter=tool_limiter()
+        )
+    # 重複したIDは1度だけ処理されるため、進捗の合計も重複を除いた件数にする
+    ids = list(dict.fromkeys(ids))
+
+    reviews = client.iter_pull_request_reviews(
+        *repository, ids, include_diff=include_diff,
+        max_workers=MAX_WORKERS, compact=compact
+    )
+    results = []
+    # PRごとの処理は一括レビューのトレースの子スパンとして記録する（ワーカースレッドにはコンテキストが引き継がれる）
+    with trace_tool("review_pull_requests", {"ids": ids, "include_diff": include_diff}):
+        try:
+            while True:
+                # 完了したPRから順に受け取り、進捗通知で逐次クライアントへ知らせる
+                review = await anyio.to_thread.run_sync(next, reviews, None, limiter=tool_limiter())
+                if review is None:
+                    break
+                results.append(review)
+                if ctx is not None:
+                    state = "failed" if "error" in review else "done"
+                    await ctx.report_progress(
+                        len(results), len(ids), message=f"PR {review['pull_request_id']} {state}"
+                    )
+        finally:
+            # 取り消された場合も実行中のnextの完了を待ってから、ワーカースレッドでジェネレーターを閉じる
+            # （閉じると未着手のPRが取り消され、ジェネレーターのスレッドプールが終了する）
+            with anyio.CancelScope(shield=True):
+                await anyio.to_thread.run_sync(reviews.close, limiter=tool_limiter())
+    return results
 
 if __name__ == "__main__":
-    mcp.run()
+    mcp.run(transport=TRANSPORT)
@@ -0,0 +1,133 @@
+import threading
+import time
+from typing import Dict
+
+
+class MemoryBudgetExceeded(Exception):
+    """メモリ予算に空きがなく、処理を取りやめた場合に送出"""
+
+
+class MemoryBudget:
+    """プロセス全体で共有する、処理中の内容（ファイル内容や生成した差分）のサイズの予算
+
+    同時に進むファイル内容の取得と差分の生成は、保持するサイズをこの予算から確保します。
+    予算に空きがない間は解放されるまで待ち（バックプレッシャー）、待ちきれない場合や
+    1件で予算を超える場合は確保に失敗します。呼び出し側はそのファイルを概要のみにするなどして縮退します。
+    内容のサイズは取得するまで分からないため、呼び出し側は見積もりを先に確保し、取得後に実際のサイズに合わせます。
+    """
+
+    def __init__(self, max_bytes: int = 1024 * 1024 * 1024, wait_timeout: float = 30.0):
+        """
+        Args:
+            max_bytes: 同時に保持できる内容の合計サイズ（文字数換算、デフォルト: 1GB）
+            wait_timeout: 空きを待つ最大秒数（デフォルト: 30）
+        """
+        self.max_bytes = max_bytes
+        self.wait_timeout = wait_timeout
+        self._condition = threading.Condition()
+        self._current = 0
+        self.peak = 0
+        self.waits = 0
+        self.rejected = 0
+
+    def _wait(self, fits, timeout: float) -> bool:
+        """fits() が真になるまで待つ（_conditionを保持した状態で呼び出す）"""
+        if fits():
+            return True
+        self.waits += 1
+        deadline = time.monotonic() + (self.wait_timeout if timeout is None else timeout)
+        while not fits():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            self._condition.wait(remaining)
+        return True
+
+    def reserve(self, size: int, timeout: float = None) -> bool:
+        """sizeを予算から確保する（確保したサイズは必ずreleaseで解放する）
+
+        Args:
+            size: 確保するサイズ
+            timeout: 空きを待つ最大秒数（省略時はwait_timeout、0で待たない）
+
+        Returns:
+            確保できればTrue。1件で予算を超える場合は待たずに、待ちきれなかった場合は待った後にFalse
+        """
+        with self._condition:
+            if size > self.max_bytes or not self._wait(lambda: self._current + size <= self.max_bytes, timeout):
+                self.rejected += 1
+                return False
+            self._current += size
+            self.peak = max(self.peak, self._current)
+            return True
+
+    def release(self, size: int) -> None:
+        """reserveで確保したサイズを解放し、待っている処理を再開させる"""
+        with self._condition:
+            self._current -= size
+            self._condition.notify_all()
+
+    def stats(self) -> Dict[str, int]:
+        """現在とピークの使用量、上限、待った回数、確保に失敗した回数を返す"""
+        with self._condition:
+            return {
+                "current_bytes": self._current,
+                "peak_bytes": self.peak,
+                "max_bytes": self.max_bytes,
+                "waits": self.waits,
+                "rejected": self.rejected,
+            }
+
+
+class MemoryReservation:
+    """1回の処理（ツール呼び出しなど）でMemoryBudgetから確保したサイズを管理するヘルパー
+
+    with文を抜けると、解放していない分をまとめて解放します。一度空きを待ちきれなかった後は待たずに判定し、
+    自身が保持している分の解放を待ち続けることを避けます。budgetがNoneの場合は常に確保に成功します。
+    """
+
+    def __init__(self, budget: MemoryBudget = None, timeout: float = None):
+        """
+        Args:
+            budget: 確保元の予算（Noneの場合は制限しない）
+            timeout: 空きを待つ最大秒数（省略時は予算のwait_timeout、0で待たない）
+        """
+        self.budget = budget
+        self.timeout = timeout
+        self.size = 0
+        # 確保に1回でも失敗したか（呼び出し側が縮退した結果を永続化しないために使用）
+        self.degraded = False
+        self._timed_out = False
+
+    def _timeout(self):
+        return 0 if self._timed_out else self.timeout
+
+    def reserve(self, size: int) -> bool:
+        """sizeを確保する"""
+        if self.budget is None:
+            return True
+        if not self.budget.reserve(size, self._timeout()):
+            self.degraded = True
+            # 1件で予算を超える場合は待たずに失敗するため、以降の待ち方は変えない
+            self._timed_out = self._timed_out or size <= self.budget.max_bytes
+            return False
+        self.size += size
+        return True
+
+    def release(self, size: int) -> None:
+        """reserveで確保したサイズの一部を解放する"""
+        if self.budget is None:
+            return
+        self.size -= size
+        self.budget.release(size)
+
+    def close(self) -> None:
+        """解放していない分をすべて解放する"""
+        if self.size:
+            self.release(self.size)
+
+    def __enter__(self) -> "MemoryReservation":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,151 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Hashable, List, Tuple
+
+
+class PrefetchJob:
+    """1つのPRに対する先読みの進行状況"""
+
+    def __init__(self, key: Hashable, total: int, max_bytes: int):
+        self.key = key
+        self.total = total
+        self.max_bytes = max_bytes
+        self.loaded = 0
+        self.skipped = 0
+        self.bytes = 0
+        self._cancelled = threading.Event()
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        if total == 0:
+            self._done.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self) -> None:
+        """未着手のファイルの先読みを取りやめる（取得中のファイルは完了まで続く）"""
+        self._cancelled.set()
+
+    def wait(self, timeout: float = None) -> bool:
+        """すべてのファイルの処理（取得または取りやめ）が終わるまで待つ"""
+        return self._done.wait(timeout)
+
+    def _run(self, task: Callable[[], int]) -> None:
+        try:
+            if self.cancelled or self.bytes >= self.max_bytes:
+                with self._lock:
+                    self.skipped += 1
+                return
+            size = task()
+            with self._lock:
+                self.loaded += 1
+                self.bytes += size
+        except Exception:
+            with self._lock:
+                self.skipped += 1
+        finally:
+            with self._lock:
+                finished = self.loaded + self.skipped == self.total
+            if finished:
+                self._done.set()
+
+
+class BlobPrefetcher:
+    """PRの変更ファイルの内容をバックグラウンドでblob_cacheに読み込む先読み器
+
+    変更概要を返した直後に先読みを開始し、続くUnified Diffの生成がメモリから行えるようにします。
+    同時に保持するジョブはmax_jobs件までで、それを超えると最も古いジョブを取りやめます。
+    1ジョブで読み込む内容の合計がmax_bytesに達した場合も、残りのファイルは取りやめます。
+    shutdown後のprefetchは例外を送出せず、何も読み込まずに終わったジョブを返します
+    （レジストリが閉じられた後も、それを保持している実行中のツール呼び出しを失敗させないため）。
+    """
+
+    def __init__(self, max_workers: int = 4, max_bytes: int = 64 * 1024 * 1024, max_jobs: int = 2):
+        """
+        Args:
+            max_workers: 先読みに使用するスレッド数（デフォルト: 4）
+            max_bytes: 1ジョブで読み込む内容の合計サイズ上限（文字数換算、デフォルト: 64MB）
+            max_jobs: 同時に進める先読みジョブの最大数（デフォルト: 2）
+        """
+        self.max_bytes = max_bytes
+        self.max_jobs = max_jobs
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self._jobs: "OrderedDict[Hashable, PrefetchJob]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._closed = False
+        self.cancelled_jobs = 0
+
+    def prefetch(self, key: Hashable, tasks: List[Callable[[], int]]) -> PrefetchJob:
+        """先読みジョブを開始する
+
+        同じキーのジョブが既にあれば取りやめて置き換えます。shutdown後はすべてのファイルを取りやめたジョブを返します。
+
+        Args:
+            key: ジョブのキー（PRを識別する値）
+            tasks: 1ファイル分の内容を読み込み、読み込んだサイズを返す関数のリスト
+
+        Returns:
+            開始したジョブ
+        """
+        job = PrefetchJob(key, len(tasks), self.max_bytes)
+        with self._lock:
+            if self._closed:
+                job.cancel()
+                job.skipped = job.total
+                job._done.set()
+                return job
+            superseded: List[PrefetchJob] = []
+            previous = self._jobs.pop(key, None)
+            if previous is not None:
+                superseded.append(previous)
+            self._jobs[key] = job
+            while len(self._jobs) > self.max_jobs:
+                superseded.append(self._jobs.popitem(last=False)[1])
+            for old in superseded:
+                if not old.wait(0):
+                    old.cancel()
+                    self.cancelled_jobs += 1
+            # shutdownと同じロックの中で投入し、停止したスレッドプールへの投入を避ける
+            for task in tasks:
+                self._executor.submit(job._run, task)
+        return job
+
+    def get_job(self, key: Hashable) -> PrefetchJob:
+        """キーに対応するジョブを取得（存在しない場合はNone）"""
+        with self._lock:
+            return self._jobs.get(key)
+
+    def cancel(self, key: Hashable) -> None:
+        """キーに対応するジョブを取りやめる"""
+        with self._lock:
+            job = self._jobs.pop(key, None)
+            if job is not None and not job.wait(0):
+                job.cancel()
+                self.cancelled_jobs += 1
+
+    def shutdown(self) -> None:
+        """すべてのジョブを取りやめ、スレッドを停止する（以降のprefetchは何も読み込まない）"""
+        with self._lock:
+            self._closed = True
+            jobs = list(self._jobs.values())
+            self._jobs.clear()
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        for job in jobs:
+            job.cancel()
+
+    def stats(self) -> Dict[str, int]:
+        """進行中のジョブ数と、保持しているジョブの読み込み件数・サイズの合計を返す"""
+        with self._lock:
+            jobs: List[Tuple[Hashable, PrefetchJob]] = list(self._jobs.items())
+            cancelled_jobs = self.cancelled_jobs
+        return {
+            "jobs": len(jobs),
+            "active_jobs": sum(1 for _, job in jobs if not job.wait(0)),
+            "loaded": sum(job.loaded for _, job in jobs),
+            "skipped": sum(job.skipped for _, job in jobs),
+            "bytes": sum(job.bytes for _, job in jobs),
+            "cancelled_jobs": cancelled_jobs,
+            "max_bytes": self.max_bytes,
+        }
@@ -0,0 +1,453 @@
+"""記録済み、または合成したPRデータをディスクから返すAzureReposClient
+
+ネットワークやPATなしでレビューパイプライン全体を実行できるようにし、
+性能の回帰をオフラインで計測するために使用します。
+
+フィクスチャのディレクトリ構成:
+    pull_requests/<pr_id>.json              プルリクエスト情報（SDKの as_dict() 形式）
+    threads/<pr_id>.json                    コメントスレッドのリスト
+    diffs/<target_commit>..<source_commit>.json  コミット差分情報
+    items.json                              {コミットID: {パス: objectId}}
+    refs.json                               {"default_branch": デフォルトブランチ, "refs": {ブランチ: コミットID}}
+    blobs/<objectId>                        ファイル内容（objectIdごとに1つ）
+
+Usage:
+    # 合成フィクスチャを生成
+    python replay_client.py generate <fixture_dir> --profile medium
+    # 実際のPRを記録（環境変数 AZURE_DEVOPS_* を使用）
+    python replay_client.py record <fixture_dir> <pr_id>
+"""
+import argparse
+import difflib
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Tuple
+
+from blob_cache import BlobCache
+from client import AzureReposClient, RefNotFoundError
+from disk_blob_store import DiskBlobStore
+
+
+class ReplayAzureReposClient(AzureReposClient):
+    """フィクスチャのディレクトリからPRデータを返すAzureReposClient
+
+    呼び出しごとに設定した遅延（latency + 0〜jitter秒）を加え、APIの往復時間を模擬します。
+    呼び出し回数は request_count と request_counts（メソッドごと）で参照できます。
+    """
+
+    def __init__(
+        self,
+        fixture_dir: str,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        blob_cache: BlobCache = None,
+        seed: int = None,
+        blob_store: DiskBlobStore = None
+    ):
+        """
+        Args:
+            fixture_dir: フィクスチャのディレクトリ
+            latency: 1回の呼び出しにかかる固定の遅延（秒）
+            jitter: 遅延に加えるランダムな揺らぎの最大値（秒）
+            blob_cache: ファイル内容のキャッシュ（省略時は新規作成）
+            seed: 揺らぎの乱数シード（省略時は非決定的）
+            blob_store: objectIdをキーとするblobのディスクストア（省略時はディスクに保存しない）
+        """
+        super().__init__("replay", blob_cache=blob_cache, blob_store=blob_store)
+        self.fixture_dir = fixture_dir
+        self.latency = latency
+        self.jitter = jitter
+        self._random = random.Random(seed)
+        self._counter_lock = threading.Lock()
+        self.request_counts = Counter()
+        with open(os.path.join(fixture_dir, "items.json"), "r", encoding="utf-8") as f:
+            self._items: Dict[str, Dict[str, str]] = json.load(f)
+        refs_path = os.path.join(fixture_dir, "refs.json")
+        self._refs_fixture = {"default_branch": "refs/heads/main", "refs": {}}
+        if os.path.exists(refs_path):
+            with open(refs_path, "r", encoding="utf-8") as f:
+                self._refs_fixture = json.load(f)
+
+    @property
+    def request_count(self) -> int:
+        """これまでのAPI呼び出しの合計回数"""
+        with self._counter_lock:
+            return sum(self.request_counts.values())
+
+    def _request(self, name: str) -> None:
+        """呼び出し回数を記録し、設定された遅延を加える"""
+        with self._counter_lock:
+            self.request_counts[name] += 1
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _load_json(self, *parts: str):
+        path = os.path.join(self.fixture_dir, *parts)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Fixture not found: {path}")
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def get_pull_request(self, organization: str, project: str, repo_id: str, pr_id: int) -> Dict:
+        self._request("get_pull_request")
+        return self._load_json("pull_requests", f"{pr_id}.json")
+
+    def list_pull_requests(
+        self,
+        organization: str,
+        project: str,
+        repo_id: str,
+        target_ref_name: str = None,
+        status: str = "active"
+    ) -> List[Dict]:
+        self._request("list_pull_requests")
+        pull_requests = []
+        for name in sorted(os.listdir(os.path.join(self.fixture_dir, "pull_requests"))):
+            pr = self._load_json("pull_requests", name)
+            if status and pr.get("status") != status:
+                continue
+            if target_ref_name and pr.get("target_ref_name") != target_ref_name:
+                continue
+            pull_requests.append(pr)
+        return pull_requests
+
+    def get_commit_diffs(
+        self,
+        organization: str,
+        project: str,
+        repo_id: str,
+        source_commit: str,
+        target_commit: str
+    ) -> Dict:
+        self._request("get_commit_diffs")
+        return self._load_json("diffs", f"{target_commit}..{source_commit}.json")
+
+    def get_file_diffs(
+        self,
+        organization: str,
+        project: str,
+        repo_id: str,
+        source_commit: str,
+        target_commit: str,
+        files: List[Tuple[str, str]]
+    ) -> List[Dict]:
+        # サーバー側の計算を模擬し、フィクスチャのblobから行差分ブロックを求める
+        self._request("get_file_diffs")
+        change_types = {"replace": "edit", "delete": "delete", "insert": "add", "equal": "none"}
+        results = []
+        for path, original_path in files:
+            original = self._read_item(target_commit, original_path or path).splitlines(keepends=True)
+            modified = self._read_item(source_commit, path).splitlines(keepends=True)
+            blocks = [
+                {
+                    "change_type": change_types[tag],
+                    "original_line_number_start": i1 + 1,
+                    "original_lines_count": i2 - i1,
+                    "modified_line_number_start": j1 + 1,
+                    "modified_lines_count": j2 - j1,
+                }
+                for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, original, modified).get_opcodes()
+            ]
+            results.append({"path": path, "original_path": original_path, "line_diff_blocks": blocks})
+        return results
+
+    def get_comments(self, organization: str, project: str, repo_id: str, pr_id: int) -> List[Dict]:
+        self._request("get_comments")
+        return self._load_json("threads", f"{pr_id}.json")
+
+    def _fetch_default_branch(self, organization: str, project: str, repo_id: str) -> str:
+        self._request("get_repository")
+        return self._refs_fixture["default_branch"]
+
+    def _fetch_branch_commit(self, organization: str, project: str, repo_id: str, branch: str) -> str:
+        self._request("get_branch")
+        commit_id = self._refs_fixture["refs"].get(f"refs/heads/{branch}")
+        if commit_id is None:
+            raise RefNotFoundError(f"Branch not found: {branch}")
+        return commit_id
+
+    def _fetch_tree_paths(self, organization: str, project: str, repo_id: str, commit_id: str) -> List[str]:
+        self._request("get_items")
+        # フィクスチャにはPRで変更されたファイルのみが含まれる
+        return list(self._items.get(commit_id, {}))
+
+    def _fetch_tree_blob_ids(self, organization: str, project: str, repo_id: str, commit_id: str) -> Dict[str, str]:
+        self._request("get_items")
+        return dict(self._items.get(commit_id, {}))
+
+    def _fetch_blobs(self, organization: str, project: str, repo_id: str, object_ids: List[str]) -> Dict[str, str]:
+        self._request("get_blobs_zip")
+        contents = {}
+        for object_id in object_ids:
+            path = os.path.join(self.fixture_dir, "blobs", object_id)
+            if os.path.exists(path):
+                with open(path, "r", encoding="utf-8", newline="") as f:
+                    contents[object_id] = f.read()
+        return contents
+
+    def _fetch_item_content(
+        self,
+        organization: str,
+        project: str,
+        repo_id: str,
+        path: str,
+        version: str = None,
+        version_type: str = None
+    ) -> str:
+        self._request("get_item_content")
+        return self._read_item(version, path)
+
+    def _read_item(self, version: str, path: str) -> str:
+        object_id = self._items.get(version or "", {}).get(path)
+        if object_id is None:
+            raise FileNotFoundError(f"Item not found: {path} at {version}")
+        with open(os.path.join(self.fixture_dir, "blobs", object_id), "r", encoding="utf-8", newline="") as f:
+            return f.read()
+
+
+# 合成PRのプロファイル（変更ファイル数、1ファイルの行数、1ファイルあたりの編集箇所数、コメントスレッド数）
+PROFILES = {
+    "small": {"files": 5, "lines": 200, "edits": 2, "threads": 3},
+    "medium": {"files": 100, "lines": 1000, "edits": 5, "threads": 30},
+    "huge": {"files": 1000, "lines": 2000, "edits": 10, "threads": 300},
+}
+
+
+def _object_id(content: str) -> str:
+    """gitと同じ方式でblobのobjectIdを計算"""
+    data = content.encode("utf-8")
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+class _FixtureWriter:
+    """フィクスチャのディレクトリへの書き込みを担当する内部クラス"""
+
+    def __init__(self, fixture_dir: str):
+        self.fixture_dir = fixture_dir
+        for name in ["pull_requests", "threads", "diffs", "blobs"]:
+            os.makedirs(os.path.join(fixture_dir, name), exist_ok=True)
+        items_path = os.path.join(fixture_dir, "items.json")
+        self.items: Dict[str, Dict[str, str]] = {}
+        if os.path.exists(items_path):
+            with open(items_path, "r", encoding="utf-8") as f:
+                self.items = json.load(f)
+        refs_path = os.path.join(fixture_dir, "refs.json")
+        self.refs = {"default_branch": "refs/heads/main", "refs": {}}
+        if os.path.exists(refs_path):
+            with open(refs_path, "r", encoding="utf-8") as f:
+                self.refs = json.load(f)
+
+    def write_json(self, value, *parts: str) -> None:
+        with open(os.path.join(self.fixture_dir, *parts), "w", encoding="utf-8") as f:
+            json.dump(value, f, default=str)
+
+    def add_item(self, commit_id: str, path: str, content: str) -> str:
+        object_id = _object_id(content)
+        blob_path = os.path.join(self.fixture_dir, "blobs", object_id)
+        if not os.path.exists(blob_path):
+            with open(blob_path, "w", encoding="utf-8", newline="") as f:
+                f.write(content)
+        self.items.setdefault(commit_id, {})[path] = object_id
+        return object_id
+
+    def add_ref(self, ref_name: str, commit_id: str) -> None:
+        self.refs["refs"][ref_name] = commit_id
+
+    def close(self) -> None:
+        self.write_json(self.items, "items.json")
+        self.write_json(self.refs, "refs.json")
+
+
+def _synthetic_file(index: int, lines: int) -> List[str]:
+    """C#ファイルを模した行のリストを生成"""
+    body = [f"namespace Game.Module{index // 50}\n", "{\n", f"    public class Component{index}\n", "    {\n"]
+    for i in range(lines - 6):
+        body.append(f"        public int Value{i}() => {index} * {i};\n")
+    body += ["    }\n", "}\n"]
+    return body
+
+
+def generate_fixture(fixture_dir: str, profile: str = "small", pr_id: int = 1, seed: int = 0) -> Dict:
+    """合成したPRのフィクスチャを生成
+
+    変更ファイルの大半は数箇所を編集したもので、追加・削除・リネーム、
+    フォルダ（tree）と.metaファイルも含みます。
+
+    Args:
+        fixture_dir: 出力先のディレクトリ
+        profile: PROFILESのキー（"small", "medium", "huge"）
+        pr_id: プルリクエストID
+        seed: 乱数シード
+
+    Returns:
+        生成したPRのプルリクエスト情報
+    """
+    config = PROFILES[profile]
+    rng = random.Random(seed)
+    writer = _FixtureWriter(fixture_dir)
+    source_commit = hashlib.sha1(f"source-{profile}-{pr_id}-{seed}".encode()).hexdigest()
+    target_commit = hashlib.sha1(f"target-{profile}-{pr_id}-{seed}".encode()).hexdigest()
+
+    changes = [{"changeType": "edit", "item": {"path": "/Assets/Scripts", "gitObjectType": "tree", "isFolder": True}}]
+    for index in range(config["files"]):
+        path = f"/Assets/Scripts/Module{index // 50}/Component{index}.cs"
+        original = _synthetic_file(index, config["lines"])
+        # 1割を追加、1割を削除、残りの一部をリネームとし、他は数箇所の編集とする
+        kind = "add" if index % 10 == 1 else "delete" if index % 10 == 2 else "edit"
+        original_path = path
+        if kind == "edit" and index % 10 == 3:
+            original_path = path.replace(".cs", "Old.cs")
+            kind = "edit, rename"
+
+        modified = list(original)
+        for _ in range(config["edits"]):
+            line = rng.randrange(4, len(modified) - 2)
+            modified[line] = modified[line].replace("=>", "=> 1 +")
+        if kind == "add":
+            original = []
+        if kind == "delete":
+            modified = []
+
+        item = {"path": path, "gitObjectType": "blob"}
+        change = {"changeType": kind, "item": item}
+        if original:
+            item["originalObjectId"] = writer.add_item(target_commit, original_path, "".join(original))
+        if modified:
+            item["objectId"] = writer.add_item(source_commit, path, "".join(modified))
+        if original_path != path:
+            change["sourceServerItem"] = original_path
+        changes.append(change)
+
+        meta_path = path + ".meta"
+        meta_id = writer.add_item(source_commit, meta_path, f"fileFormatVersion: 2\nguid: {index:032x}\n")
+        changes.append({"changeType": "add", "item": {"path": meta_path, "gitObjectType": "blob", "objectId": meta_id}})
+
+    pull_request = {
+        "pull_request_id": pr_id,
+        "title": f"Synthetic {profile} pull request",
+        "description": f"{config['files']} files, {config['lines']} lines each",
+        "status": "active",
+        "source_ref_name": f"refs/heads/feature/{profile}-{pr_id}",
+        "target_ref_name": "refs/heads/main",
+        "url": f"https://dev.azure.com/replay/_apis/git/pullRequests/{pr_id}",
+        "repository": {"id": "replay", "name": "replay"},
+        "last_merge_source_commit": {"commit_id": source_commit},
+        "last_merge_target_commit": {"commit_id": target_commit},
+    }
+    threads = [
+        {
+            "id": i + 1,
+            "status": "active",
+            "published_date": "2024-01-01T00:00:00.000Z",
+            "last_updated_date": "2024-01-01T00:00:00.000Z",
+            "thread_context": {"file_path": f"/Assets/Scripts/Module0/Component{i % config['files']}.cs"},
+            "comments": [
+                {"id": 1, "content": f"Review comment {i}", "comment_type": "text"},
+                {"id": 2, "content": "Updated the pull request", "comment_type": "system"},
+            ],
+        }
+        for i in range(config["threads"])
+    ]
+
+    writer.add_ref(pull_request["source_ref_name"], source_commit)
+    writer.add_ref(pull_request["target_ref_name"], target_commit)
+    writer.write_json(pull_request, "pull_requests", f"{pr_id}.json")
+    writer.write_json(threads, "threads", f"{pr_id}.json")
+    writer.write_json(
+        {"change_counts": {"Edit": len(changes)}, "changes": changes, "common_commit": target_commit},
+        "diffs", f"{target_commit}..{source_commit}.json"
+    )
+    writer.close()
+    return pull_request
+
+
+def record_fixture(
+    client: AzureReposClient,
+    organization: str,
+    project: str,
+    repo_id: str,
+    pr_id: int,
+    fixture_dir: str
+) -> Dict:
+    """実際のPRのデータを取得してフィクスチャとして保存
+
+    Args:
+        client: 記録に使用するAzureReposClient
+        organization: Azure DevOps組織名
+        project: プロジェクト名
+        repo_id: リポジトリID
+        pr_id: プルリクエストID
+        fixture_dir: 出力先のディレクトリ
+
+    Returns:
+        記録したPRのプルリクエスト情報
+    """
+    writer = _FixtureWriter(fixture_dir)
+    pull_request = client.get_pull_request(organization, project, repo_id, pr_id)
+    source_commit = pull_request["last_merge_source_commit"]["commit_id"]
+    target_commit = pull_request["last_merge_target_commit"]["commit_id"]
+    diffs = client.get_commit_diffs(organization, project, repo_id, source_commit, target_commit)
+
+    for change in diffs.get("changes", []):
+        item = change.get("item", {})
+        if item.get("gitObjectType") == "tree" or item.get("isFolder"):
+            continue
+        path = item.get("path", "")
+        original_path = change.get("sourceServerItem") or change.get("originalPath") or path
+        for commit_id, item_path in [(target_commit, original_path), (source_commit, path)]:
+            try:
+                content = client._fetch_item_content(organization, project, repo_id, item_path, commit_id, "commit")
+            except Exception:
+                continue  # そのコミットに存在しないファイル（追加・削除）
+            writer.add_item(commit_id, item_path, content)
+
+    # ブランチの先頭はPRの最終マージ時点のコミットで近似する
+    writer.add_ref(pull_request["source_ref_name"], source_commit)
+    writer.add_ref(pull_request["target_ref_name"], target_commit)
+    writer.write_json(pull_request, "pull_requests", f"{pr_id}.json")
+    writer.write_json(client.get_comments(organization, project, repo_id, pr_id), "threads", f"{pr_id}.json")
+    writer.write_json(diffs, "diffs", f"{target_commit}..{source_commit}.json")
+    writer.close()
+    return pull_request
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    generate = subparsers.add_parser("generate", help="合成フィクスチャを生成")
+    generate.add_argument("fixture_dir")
+    generate.add_argument("--profile", choices=sorted(PROFILES), default="small")
+    generate.add_argument("--pr-id", type=int, default=1)
+    generate.add_argument("--seed", type=int, default=0)
+
+    record = subparsers.add_parser("record", help="実際のPRを記録")
+    record.add_argument("fixture_dir")
+    record.add_argument("pr_id", type=int)
+
+    args = parser.parse_args()
+    if args.command == "generate":
+        pr = generate_fixture(args.fixture_dir, args.profile, pr_id=args.pr_id, seed=args.seed)
+    else:
+        from dotenv import load_dotenv
+        load_dotenv()
+        client = AzureReposClient(os.environ["AZURE_DEVOPS_PAT"])
+        pr = record_fixture(
+            client,
+            os.environ["AZURE_DEVOPS_ORGANIZATION"],
+            os.environ["AZURE_DEVOPS_PROJECT"],
+            os.environ["AZURE_DEVOPS_REPOSITORY_ID"],
+            args.pr_id,
+            args.fixture_dir
+        )
+    print(f"Wrote PR {pr['pull_request_id']} to {args.fixture_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import functools
+import inspect
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+def _size_of(value: Any) -> int:
+    """応答のサイズ（文字数換算。文字列以外はJSONにした長さ）"""
+    if isinstance(value, str):
+        return len(value)
+    return len(json.dumps(value, ensure_ascii=False, default=str))
+
+
+class ResponseCache:
+    """MCPツールの応答のキャッシュ
+
+    同じセッション内で同じ引数のツール呼び出しが繰り返された場合に、処理全体を
+    再実行せずに前回の応答を返します。エントリは2種類あります。
+
+    - バージョン付き: PRの先頭コミットなど、内容を決定するバージョンをキーに含めるもの。
+      バージョンが変われば別のキーになるため、期限なしで保持します。
+    - バージョンなし: ブランチ名で参照する内容やコメントなど、変化を安価に検知できないもの。
+      ttl秒が経過すると無効になります。
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        ttl: float = 30.0,
+        scope: Callable[[], Hashable] = None,
+        max_bytes: int = 64 * 1024 * 1024
+    ):
+        """
+        Args:
+            max_entries: 保持する応答の最大件数（デフォルト: 256、0でキャッシュしない）
+            ttl: バージョンなしの応答を再利用する秒数（デフォルト: 30）
+            scope: 呼び出し元を識別する値を返す関数。キーに含め、異なる呼び出し元（PATなど）の間で
+                応答を共有しないようにします（省略時は全呼び出しで共有）
+            max_bytes: 保持する応答の合計サイズ上限（文字数換算、デフォルト: 64MB）。
+                これを超える単独の応答は保持しません
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.scope = scope
+        self.max_bytes = max_bytes
+        # key -> (応答, 有効期限（バージョン付きの場合はNone）, サイズ)
+        self._entries: "OrderedDict[Hashable, Tuple[Any, Optional[float], int]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(
+        self,
+        key: Hashable,
+        compute: Callable[[], Any],
+        versioned: bool = False,
+        cacheable: Callable[[Any], bool] = None
+    ) -> Any:
+        """キャッシュにあればそれを返し、なければcomputeで応答を求めて登録
+
+        Args:
+            key: 応答のキー（ツール名・引数・バージョンの組など）
+            compute: 応答を求める関数
+            versioned: keyに内容を決定するバージョンが含まれる場合はTrue（期限なしで保持）
+            cacheable: 応答を登録してよいかを判定する関数（縮退した応答を保持しないために使用）
+
+        Returns:
+            応答（computeが例外を送出した場合は何もキャッシュせずにそのまま送出）
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[1] is None or now < entry[1]):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        value = compute()
+        if self.max_entries <= 0 or (cacheable is not None and not cacheable(value)):
+            return value
+        size = _size_of(value)
+        if size > self.max_bytes:
+            return value
+        expires_at = None if versioned else time.monotonic() + self.ttl
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= old[2]
+            self._entries[key] = (value, expires_at, size)
+            self._size += size
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= evicted[2]
+        return value
+
+    def cached(
+        self,
+        tool_name: str,
+        version_of: Callable[[Dict[str, Any]], Optional[str]] = None,
+        cacheable: Callable[[Any], bool] = None
+    ):
+        """ツール関数の応答をキャッシュするデコレーター
+
+        引数は関数のシグネチャで名前に束縛し（既定値を含む）、呼び出し元の識別子とともにキーの一部とします。
+        functools.wraps によりシグネチャとdocstringは元の関数のまま公開されます。
+
+        Args:
+            tool_name: キーに使用するツール名
+            version_of: 束縛した引数の辞書から内容のバージョン（PRの先頭コミットなど）を返す関数。
+                省略時、またはNoneを返した場合はTTLで無効にします。
+            cacheable: 応答を登録してよいかを判定する関数（省略時はすべて登録）
+        """
+        def decorator(fn: Callable) -> Callable:
+            signature = inspect.signature(fn)
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                arguments = dict(bound.arguments)
+                scope = self.scope() if self.scope is not None else None
+                version = version_of(arguments) if version_of is not None else None
+                key = (tool_name, scope, tuple(sorted(arguments.items())), version)
+                return self.get_or_compute(
+                    key, lambda: fn(*args, **kwargs), versioned=version is not None, cacheable=cacheable
+                )
+
+            return wrapper
+
+        return decorator
+
+    def clear(self) -> None:
+        """すべての応答を破棄する"""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> Dict[str, int]:
+        """ヒット数・ミス数と現在のエントリ数とサイズを返す"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+            }
@@ -0,0 +1,232 @@
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple
+from urllib.parse import quote
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from blob_cache import BlobCache
+from client import AzureReposClient, OrganizationPool, RefNotFoundError, read_blobs_zip
+from disk_blob_store import DiskBlobStore
+
+API_VERSION = "7.1"
+
+# プレビュー版のみのAPI（FileDiffs、Blobs: GetBlobsZip）のバージョン
+PREVIEW_API_VERSION = "7.1-preview.1"
+
+# SDKのモデルで型が object（自由形式）として定義されているフィールド。
+# as_dict() はこれらの中身をAPIの応答のまま（camelCase）返すため、変換せずに残す。
+_RAW_FIELDS = frozenset({"changes", "changeCounts", "properties"})
+
+_CAMEL_BOUNDARY = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+
+
+@lru_cache(maxsize=4096)
+def _snake_case(key: str) -> str:
+    """camelCaseのキーをsnake_caseに変換（例: lastMergeSourceCommit -> last_merge_source_commit）"""
+    return _CAMEL_BOUNDARY.sub("_", key).lower()
+
+
+def to_sdk_dict(value: Any) -> Any:
+    """REST APIの応答をSDKの as_dict() と同じキー形式の辞書に変換
+
+    msrestによるモデルへのデシリアライズと as_dict() による辞書への再変換を行わず、
+    キー名の変換だけを行います。
+    """
+    if isinstance(value, dict):
+        return {
+            _snake_case(k): (v if k in _RAW_FIELDS else to_sdk_dict(v))
+            for k, v in value.items()
+        }
+    if isinstance(value, list):
+        return [to_sdk_dict(v) for v in value]
+    return value
+
+
+class AzureReposRestClient(AzureReposClient):
+    """azure-devops SDKを介さず、REST APIを直接呼び出すAzureReposClient
+
+    接続プール付きのHTTPセッションで同じエンドポイントを呼び出し、JSONの応答を
+    SDKと同じ形式の辞書として返します。大きなコミット差分やスレッド一覧で
+    msrestのデシリアライズと as_dict() の二重変換にかかるCPU時間を省きます。
+    """
+
+    def __init__(
+        self,
+        pat: str,
+        blob_cache: BlobCache = None,
+        max_connections: int = 16,
+        pool: OrganizationPool = None,
+        session: requests.Session = None,
+        blob_store: DiskBlobStore = None
+    ):
+        """
+        Args:
+            pat: Azure DevOpsのPersonal Access Token (PAT)
+            blob_cache: ファイル内容のキャッシュ（省略時は新規作成）
+            max_connections: 接続プールの最大接続数（デフォルト: 16）
+            pool: 組織ごとの同時リクエスト数の上限（省略時は新規作成）
+            session: 共有するHTTPセッション（省略時は新規作成。同じPATのクライアント間で共有可能）
+            blob_store: objectIdをキーとするblobのディスクストア（省略時はディスクに保存しない）
+        """
+        super().__init__(pat, blob_cache=blob_cache, pool=pool, blob_store=blob_store)
+        self.session = session or self.create_session(pat, max_connections)
+
+    @staticmethod
+    def create_session(pat: str, max_connections: int = 16) -> requests.Session:
+        """PATで認証する接続プール付きのHTTPセッションを作成"""
+        session = requests.Session()
+        session.auth = ("", pat)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_connections)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def _repo_url(self, organization: str, project: str, repo_id: str) -> str:
+        return (
+            f"https://dev.azure.com/{quote(organization)}/{quote(project)}"
+            f"/_apis/git/repositories/{quote(repo_id)}"
+        )
+
+    def _get_json(self, organization: str, url: str, params: Dict = None) -> Any:
+        params = dict(params or {})
+        params["api-version"] = API_VERSION
+        with self.pool.limit(organization):
+            response = self.session.get(url, params=params, headers={"Accept": "application/json"})
+            response.raise_for_status()
+        return response.json()
+
+    def _post_json(self, organization: str, url: str, body: Any, api_version: str = API_VERSION) -> Any:
+        with self.pool.limit(organization):
+            response = self.session.post(
+                url, params={"api-version": api_version}, json=body, headers={"Accept": "application/json"}
+            )
+            response.raise_for_status()
+        return response.json()
+
+    def get_pull_request(self, organization: str, project: str, repo_id: str, pr_id: int) -> Dict:
+        url = f"{self._repo_url(organization, project, repo_id)}/pullrequests/{pr_id}"
+        return to_sdk_dict(self._get_json(organization, url))
+
+    def list_pull_requests(
+        self,
+        organization: str,
+        project: str,
+        repo_id: str,
+        target_ref_name: str = None,
+        status: str = "active"
+    ) -> List[Dict]:
+        params = {"searchCriteria.status": status}
+        if target_ref_name:
+            params["searchCriteria.targetRefName"] = target_ref_name
+        url = f"{self._repo_url(organization, project, repo_id)}/pullrequests"
+        return to_sdk_dict(self._get_json(organization, url, params).get("value", []))
+
+    def get_commit_diffs(
+        self,
+        organization: str,
+        project: str,
+        repo_id: str,
+        source_commit: str,
+        target_commit: str
+    ) -> Dict:
+        params = {
+            "diffCommonCommit": "true",
+            "baseVersion": target_commit,
+            "baseVersionType": "commit",
+            "targetVersion": source_commit,
+            "targetVersionType": "commit",
+        }
+        url = f"{self._repo_url(organization, project, repo_id)}/diffs/commits"
+        return to_sdk_dict(self._get_json(organization, url, params))
+
+    def get_file_diffs(
+        self,
+        organization: str,
+        project: str,
+        repo_id: str,
+        source_commit: str,
+        target_commit: str,
+        files: List[Tuple[str, str]]
+    ) -> List[Dict]:
+        body = {
+            "baseVersionCommit": target_commit,
+            "targetVersionCommit": source_commit,
+            "fileDiffParams": [
+                {"path": path, "originalPath": original_path} if original_path else {"path": path}
+                for path, original_path in files
+            ],
+        }
+        url = f"{self._repo_url(organization, project, repo_id)}/filediffs"
+        return to_sdk_dict(self._post_json(organization, url, body, PREVIEW_API_VERSION).get("value", []))
+
+    def get_comments(self, organization: str, project: str, repo_id: str, pr_id: int) -> List[Dict]:
+        url = f"{self._repo_url(organization, project, repo_id)}/pullRequests/{pr_id}/threads"
+        return to_sdk_dict(self._get_json(organization, url).get("value", []))
+
+    def _fetch_default_branch(self, organization: str, project: str, repo_id: str) -> str:
+        return self._get_json(organization, self._repo_url(organization, project, repo_id))["defaultBranch"]
+
+    def _fetch_branch_commit(self, organization: str, project: str, repo_id: str, branch: str) -> str:
+        url = f"{self._repo_url(organization, project, repo_id)}/stats/branches"
+        try:
+            return self._get_json(organization, url, {"name": branch})["commit"]["commitId"]
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code == 404:
+                raise RefNotFoundError(f"Branch not found: {branch}") from e
+            raise
+
+    def _fetch_tree_paths(self, organization: str, project: str, repo_id: str, commit_id: str) -> List[str]:
+        params = {
+            "scopePath": "/",
+            "recursionLevel": "Full",
+            "versionDescriptor.version": commit_id,
+            "versionDescriptor.versionType": "commit",
+        }
+        url = f"{self._repo_url(organization, project, repo_id)}/items"
+        items = self._get_json(organization, url, params).get("value", [])
+        return [item["path"] for item in items if not item.get("isFolder")]
+
+    def _fetch_tree_blob_ids(self, organization: str, project: str, repo_id: str, commit_id: str) -> Dict[str, str]:
+        params = {
+            "scopePath": "/",
+            "recursionLevel": "Full",
+            "versionDescriptor.version": commit_id,
+            "versionDescriptor.versionType": "commit",
+        }
+        url = f"{self._repo_url(organization, project, repo_id)}/items"
+        items = self._get_json(organization, url, params).get("value", [])
+        return {item["path"]: item["objectId"] for item in items if not item.get("isFolder")}
+
+    def _fetch_blobs(self, organization: str, project: str, repo_id: str, object_ids: List[str]) -> Dict[str, str]:
+        url = f"{self._repo_url(organization, project, repo_id)}/blobs"
+        with self.pool.limit(organization):
+            response = self.session.post(
+                url,
+                params={"api-version": PREVIEW_API_VERSION},
+                json=list(object_ids),
+                headers={"Accept": "application/zip"}
+            )
+            response.raise_for_status()
+        return read_blobs_zip(response.content)
+
+    def _fetch_item_content(
+        self,
+        organization: str,
+        project: str,
+        repo_id: str,
+        path: str,
+        version: str = None,
+        version_type: str = None
+    ) -> str:
+        params = {"path": path, "includeContent": "true", "api-version": API_VERSION}
+        if version:
+            params["versionDescriptor.version"] = version
+            if version_type:
+                params["versionDescriptor.versionType"] = version_type
+        url = f"{self._repo_url(organization, project, repo_id)}/items"
+        with self.pool.limit(organization):
+            response = self.session.get(url, params=params, headers={"Accept": "application/octet-stream"})
+            response.raise_for_status()
+        return response.content.decode("utf-8")
@@ -0,0 +1,174 @@
+import bisect
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Set, Tuple
+
+
+def _trigrams(text: str) -> Set[Tuple[str, str, str]]:
+    """テキストに含まれる連続した3文字の集合（大文字・小文字を区別しない）
+
+    部分文字列を切り出すより、3つずらした文字の組を作るほうが約2倍速いため、トライグラムはタプルで表します。
+    """
+    text = text.lower()
+    return set(zip(text, text[1:], text[2:]))
+
+
+class TrigramIndex:
+    """1つのPRバージョン（ソース・ターゲットのコミットの組）のファイル内容に対するトライグラム索引
+
+    ファイルは取得したものから1件ずつ追加でき（インクリメンタル）、検索では問い合わせ文字列の
+    トライグラムをすべて含むファイルだけを走査します。索引は小文字化した内容から作るため、
+    大文字・小文字を区別する検索でも区別しない検索でも同じ索引で候補を絞り込めます。
+    """
+
+    def __init__(self):
+        # ファイル番号 -> (side, path)、内容、行頭の位置（初回の検索時に計算）
+        self._files: List[Tuple[str, str]] = []
+        self._contents: List[str] = []
+        self._line_starts: List[Optional[List[int]]] = []
+        self._postings: Dict[Tuple[str, str, str], Set[int]] = {}
+        self._ids: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+        self.size = 0
+
+    def __contains__(self, file: Tuple[str, str]) -> bool:
+        with self._lock:
+            return file in self._ids
+
+    def add(self, side: str, path: str, content: str) -> None:
+        """ファイルの内容を索引に追加（追加済みのファイルは無視する）
+
+        Args:
+            side: "head"（PRのソース側）または "base"（ターゲット側）
+            path: ファイルパス
+            content: ファイル内容
+        """
+        trigrams = _trigrams(content)
+        with self._lock:
+            if (side, path) in self._ids:
+                return
+            file_id = len(self._files)
+            self._ids[(side, path)] = file_id
+            self._files.append((side, path))
+            self._contents.append(content)
+            self._line_starts.append(None)
+            for trigram in trigrams:
+                self._postings.setdefault(trigram, set()).add(file_id)
+            self.size += len(content)
+
+    def _candidates(self, query: str) -> List[int]:
+        """queryを含み得るファイル番号（_lockを保持した状態で呼び出す）"""
+        if len(query) < 3:
+            return list(range(len(self._files)))
+        postings = sorted((self._postings.get(t, set()) for t in _trigrams(query)), key=len)
+        candidates = set(postings[0]).intersection(*postings[1:])
+        return sorted(candidates)
+
+    def _line_number(self, file_id: int, offset: int) -> Tuple[int, int]:
+        """offsetを含む行の番号（1始まり）と行頭の位置（_lockを保持した状態で呼び出す）"""
+        starts = self._line_starts[file_id]
+        if starts is None:
+            content = self._contents[file_id]
+            starts = [0] + [m.end() for m in re.finditer("\n", content)]
+            self._line_starts[file_id] = starts
+        index = bisect.bisect_right(starts, offset) - 1
+        return index + 1, starts[index]
+
+    def search(
+        self,
+        query: str,
+        case_sensitive: bool = True,
+        max_results: int = 100,
+        sides: Tuple[str, ...] = ("head", "base")
+    ) -> Tuple[List[Dict], bool]:
+        """queryを含む行を検索
+
+        Args:
+            query: 検索する文字列（正規表現ではなくそのままの文字列として扱う）
+            case_sensitive: 大文字・小文字を区別する（デフォルト: True）
+            max_results: 返す一致行の最大数（デフォルト: 100）
+            sides: 検索する側（デフォルト: 両方）
+
+        Returns:
+            (一致行のリスト, 打ち切ったか) のタプル。一致行は side, path, line, text を含む辞書で、
+            1行に複数回一致しても1件として返します
+        """
+        if not query:
+            return [], False
+        pattern = re.compile(re.escape(query), 0 if case_sensitive else re.IGNORECASE)
+        matches = []
+        with self._lock:
+            for file_id in self._candidates(query):
+                side, path = self._files[file_id]
+                if side not in sides:
+                    continue
+                content = self._contents[file_id]
+                last_line = 0
+                for match in pattern.finditer(content):
+                    line, start = self._line_number(file_id, match.start())
+                    if line == last_line:
+                        continue
+                    last_line = line
+                    if len(matches) >= max_results:
+                        return matches, True
+                    end = content.find("\n", start)
+                    text = content[start:end if end >= 0 else len(content)].rstrip("\r")
+                    matches.append({"side": side, "path": path, "line": line, "text": text})
+        return matches, False
+
+    def stats(self) -> Dict[str, int]:
+        """索引したファイル数・トライグラム数・内容の合計サイズを返す"""
+        with self._lock:
+            return {"files": len(self._files), "trigrams": len(self._postings), "bytes": self.size}
+
+
+class SearchIndexCache:
+    """TrigramIndexをPRバージョンのキーごとに保持するLRUキャッシュ
+
+    キーにはソース・ターゲットのコミットIDを含めるため、PRが更新されると新しい索引が作られ、
+    古い索引は上限を超えたときに追い出されます。
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        """
+        Args:
+            max_bytes: 全索引が保持する内容の合計サイズ上限（文字数換算、デフォルト: 64MB）
+        """
+        self.max_bytes = max_bytes
+        self._indexes: "OrderedDict[Hashable, TrigramIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> TrigramIndex:
+        """キーの索引を取得（なければ空の索引を作成）"""
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is not None:
+                self._indexes.move_to_end(key)
+                self.hits += 1
+                return index
+            self.misses += 1
+            index = self._indexes[key] = TrigramIndex()
+            return index
+
+    def trim(self) -> None:
+        """合計サイズが上限を超えている間、最終アクセスが古い索引から追い出す（最新の索引は残す）"""
+        with self._lock:
+            while len(self._indexes) > 1 and sum(i.size for i in self._indexes.values()) > self.max_bytes:
+                self._indexes.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        """ヒット・ミス数、索引数、索引したファイル数と内容の合計サイズを返す"""
+        with self._lock:
+            indexes = list(self._indexes.values())
+        index_stats = [i.stats() for i in indexes]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(indexes),
+            "files": sum(s["files"] for s in index_stats),
+            "bytes": sum(s["bytes"] for s in index_stats),
+            "max_bytes": self.max_bytes,
+        }
@@ -0,0 +1,159 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, NamedTuple, Optional
+
+
+class SnapshotKey(NamedTuple):
+    """スナップショットを識別するキー
+
+    コミットIDは不変のため、同じキーに対するスナップショットは常に同じ内容になります。
+    コミットに依存しないデータ（コメントスレッドなど）はコミットIDを空文字列にします。
+    """
+    organization: str
+    project: str
+    repo_id: str
+    pr_id: int
+    source_commit: str = ""
+    target_commit: str = ""
+
+
+class SnapshotStore:
+    """PRのスナップショットをSQLiteに永続化するストア
+
+    MCPサーバーの再起動後も、変更一覧（commit diffsと正規化した変更一覧）・ファイルごとの差分・
+    コメントスレッドをネットワークを介さずにディスクから読み出せるようにします。PRのメタデータは
+    現在のコミットの組を知るために毎回APIから取得するため保存しません。
+    値はJSONをzlib圧縮して保存し、合計サイズが上限を超えた場合は最終アクセスが古い順に削除します。
+    """
+
+    def __init__(self, path: str, max_bytes: int = 512 * 1024 * 1024):
+        """
+        Args:
+            path: SQLiteデータベースファイルのパス
+            max_bytes: 保存する圧縮済みデータの合計サイズ上限（デフォルト: 512MB）
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS snapshots (
+                key TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                data BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (key, kind)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_snapshots_accessed ON snapshots (accessed_at)")
+        self._conn.commit()
+        self._size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM snapshots").fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _encode_key(key: SnapshotKey) -> str:
+        return "\x1f".join(str(part) for part in key)
+
+    def get(self, key: SnapshotKey, kind: str, max_age: float = None) -> Optional[Any]:
+        """スナップショットを読み出す
+
+        Args:
+            key: スナップショットのキー
+            kind: データの種類（例: "commit_diffs", "file_diffs", "threads"）
+            max_age: 許容する経過秒数（省略時は無期限）
+
+        Returns:
+            保存されている値（存在しない、または古すぎる場合はNone）
+        """
+        now = time.time()
+        encoded_key = self._encode_key(key)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data, created_at FROM snapshots WHERE key = ? AND kind = ?",
+                (encoded_key, kind)
+            ).fetchone()
+            if row is None or (max_age is not None and now - row[1] > max_age):
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE snapshots SET accessed_at = ? WHERE key = ? AND kind = ?",
+                (now, encoded_key, kind)
+            )
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(zlib.decompress(row[0]))
+
+    def put(self, key: SnapshotKey, kind: str, value: Any) -> None:
+        """スナップショットを保存し、上限を超えた分を最終アクセスが古い順に削除する
+
+        Args:
+            key: スナップショットのキー
+            kind: データの種類
+            value: JSONシリアライズ可能な値
+        """
+        data = zlib.compress(json.dumps(value, default=str).encode("utf-8"), 1)
+        size = len(data)
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        encoded_key = self._encode_key(key)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size FROM snapshots WHERE key = ? AND kind = ?", (encoded_key, kind)
+            ).fetchone()
+            if row is not None:
+                self._size -= row[0]
+            self._conn.execute(
+                "INSERT OR REPLACE INTO snapshots (key, kind, data, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (encoded_key, kind, data, size, now, now)
+            )
+            self._size += size
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """合計サイズが上限以下になるまで最終アクセスが古いスナップショットを削除（ロック取得済みで呼ぶ）"""
+        while self._size > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT key, kind, size FROM snapshots ORDER BY accessed_at LIMIT 64"
+            ).fetchall()
+            if not rows:
+                self._size = 0
+                break
+            for encoded_key, kind, size in rows:
+                self._conn.execute("DELETE FROM snapshots WHERE key = ? AND kind = ?", (encoded_key, kind))
+                self._size -= size
+                if self._size <= self.max_bytes:
+                    break
+
+    def stats(self) -> Dict[str, int]:
+        """ヒット数・ミス数・保存件数と合計サイズを返す"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM snapshots").fetchone()[0]
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": entries,
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+            }
+
+    def close(self) -> None:
+        """データベース接続を閉じる"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,350 @@
+import bisect
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# シンボルを索引するファイルの拡張子（C#のみ）
+SUPPORTED_EXTENSIONS = (".cs",)
+
+# コメント・文字列・文字リテラル・プリプロセッサ行（中の括弧や ; を構文として数えないように空白に置き換える）
+_LITERAL_PATTERN = re.compile(
+    r'//[^\n]*'
+    r'|/\*.*?\*/'
+    r'|\$*"""(?:.|\n)*?"""'
+    r'|(?:\$@|@\$?)"(?:[^"]|"")*"'
+    r'|\$?"(?:[^"\\\n]|\\.)*"'
+    r"|'(?:[^'\\\n]|\\.)*'"
+    r'|^[ \t]*#[^\n]*',
+    re.DOTALL | re.MULTILINE,
+)
+_NOT_NEWLINE = re.compile(r"[^\n]")
+# 1行の中のコメント・文字列・文字リテラル・プリプロセッサ行（enclosing_headerで使用）
+_LINE_LITERAL_PATTERN = re.compile(
+    r'//.*'
+    r'|/\*.*?(?:\*/|$)'
+    r'|(?:\$@|@\$?)"(?:[^"]|"")*"'
+    r'|\$?"(?:[^"\\]|\\.)*"'
+    r"|'(?:[^'\\]|\\.)*'"
+    r'|^[ \t]*#.*'
+)
+_FILE_NAMESPACE_PATTERN = re.compile(r"\s*namespace\s+@?[A-Za-z_][\w.]*\s*;")
+
+# enclosing_headerで { の直前の宣言として遡る最大行数（複数行の引数リスト・属性を含む）
+DECLARATION_LINES = 20
+
+# 入れ子3段までの型引数（例: "<string, List<int>>"）
+_GENERIC = r"<(?:[^<>()]|<(?:[^<>()]|<[^<>()]*>)*>)*>"
+_TYPE_PATTERN = re.compile(r"\b(namespace|class|struct|interface|enum|record)\s+(@?[A-Za-z_][\w.]*)")
+_OPERATOR_PATTERN = re.compile(r"\boperator\s*([^\s\w(]+|true|false)\s*\(")
+_METHOD_PATTERN = re.compile(
+    rf"(?<![\w.@~])((?:@?[A-Za-z_]\w*\s*(?:{_GENERIC})?\s*\.\s*)*~?@?[A-Za-z_]\w*)\s*(?:{_GENERIC})?\s*\("
+)
+_NAME_AT_END = re.compile(r"(@?[A-Za-z_][\w.]*)\s*$")
+_PARENTHESES = re.compile(r"\((?:[^()]|\(\))*\)")
+_ATTRIBUTES_PATTERN = re.compile(r"(?:\[[^\[\]]*(?:\[[^\[\]]*\][^\[\]]*)*\]\s*)+")
+
+# 宣言の名前や先頭にはならない語（制御構文・式の一部）
+_KEYWORDS = frozenset((
+    "if", "else", "for", "foreach", "while", "do", "switch", "case", "default", "try", "catch", "finally",
+    "when", "using", "lock", "fixed", "unsafe", "checked", "unchecked", "return", "yield", "throw", "await",
+    "new", "nameof", "typeof", "sizeof", "stackalloc", "delegate", "base", "this", "get", "set", "init",
+    "add", "remove", "goto", "break", "continue", "in", "is", "as",
+))
+
+_TYPE_KINDS = frozenset(("class", "struct", "interface", "record"))
+
+
+class Symbol(NamedTuple):
+    """ファイル内の1つの宣言（名前空間・型・メソッド・プロパティ）の範囲"""
+    kind: str
+    name: str
+    # 名前空間・外側の型を "." でつないだ名前（例: "Game.Module0.Component0.Value3"）
+    qualified_name: str
+    # 属性を含む宣言の先頭行から閉じ括弧（式形式のメンバーでは ;）の行まで（1始まり、両端を含む）
+    start_line: int
+    end_line: int
+    # 宣言の行（属性を除く）の前後の空白を除いたもの
+    header: str
+
+
+def supports(path: str) -> bool:
+    """シンボルを索引できるファイルか（拡張子で判定）"""
+    return path.lower().endswith(SUPPORTED_EXTENSIONS)
+
+
+def _blank(match: "re.Match") -> str:
+    """改行以外を空白に置き換える（位置と行番号を保つ）"""
+    return _NOT_NEWLINE.sub(" ", match.group())
+
+
+def _without_parentheses(text: str) -> str:
+    """括弧の中身を取り除いたテキスト（引数の既定値などを判定の対象外にする）"""
+    while True:
+        stripped = _PARENTHESES.sub("()", text)
+        if stripped == text:
+            return text
+        text = stripped
+
+
+def _classify(text: str, in_type: bool) -> Optional[Tuple[str, str]]:
+    """{ または => の直前までの宣言のテキストから (種類, 名前) を求める（宣言でなければNone）"""
+    match = _TYPE_PATTERN.search(text)
+    if match and "(" not in text[:match.start()] and "=" not in text[:match.start()]:
+        return match.group(1), match.group(2)
+    if "=" in _without_parentheses(text).replace("=>", ""):
+        # 代入・初期化子（オブジェクト初期化子やラムダ式の本体）
+        return None
+    match = _OPERATOR_PATTERN.search(text)
+    if match:
+        return "method", "operator " + match.group(1)
+    match = _METHOD_PATTERN.search(text)
+    if match:
+        name = match.group(1)
+        simple_name = re.sub(r"\s+", "", name).rsplit(".", 1)[-1]
+        prefix = text[:match.start()].split()
+        # new は修飾子（メンバーの隠蔽）としても使われるため、名前の直前にある場合だけオブジェクトの作成とみなす
+        if simple_name in _KEYWORDS or any(token in _KEYWORDS for token in prefix if token != "new"):
+            return None
+        if prefix and prefix[-1] == "new":
+            return None
+        # 修飾子も戻り値の型もないものは、型の直下のコンストラクターのみ（メソッドの呼び出しを除く）
+        if not prefix and (not in_type or "." in name):
+            return None
+        if text.rstrip().endswith("=>"):
+            return None
+        return "method", simple_name
+    if re.search(r"[();:]", text):
+        return None
+    if re.search(r"\bthis\s*\[", text):
+        return "property", "this[]"
+    match = _NAME_AT_END.search(text)
+    if match and text[:match.start()].strip() and text.split()[0] not in _KEYWORDS:
+        name = match.group(1).rsplit(".", 1)[-1]
+        if name not in _KEYWORDS:
+            return "property", name
+    return None
+
+
+def scan_symbols(content: str) -> List[Symbol]:
+    """C#のソースから宣言の範囲を求める軽量なスキャナー
+
+    構文解析は行わず、コメントと文字列を除いたうえで { } ; の位置と直前のテキストだけから
+    名前空間・型・メソッド（コンストラクター・演算子を含む）・プロパティを判定します。
+    式形式のメンバー（"=> ...;"）とファイルスコープの名前空間にも対応します。
+
+    Args:
+        content: ファイル内容
+
+    Returns:
+        宣言の先頭行の順に並べたSymbolのリスト
+    """
+    masked = _LITERAL_PATTERN.sub(_blank, content)
+    line_starts = [0] + [m.end() for m in re.finditer("\n", content)]
+    lines = content.splitlines()
+
+    def line_of(offset: int) -> int:
+        return bisect.bisect_right(line_starts, offset)
+
+    symbols: List[Symbol] = []
+    # 開いている { ごとの (シンボルの添字またはNone, 外側の名前, 外側の種類)
+    stack: List[Tuple[Optional[int], str, str]] = []
+    file_namespace = ""
+    start = 0
+
+    def add(kind: str, name: str, offset: int, declaration: int, end_line: int) -> int:
+        outer = stack[-1][1] if stack else file_namespace
+        header_line = line_of(declaration)
+        symbols.append(Symbol(
+            kind, name, f"{outer}.{name}" if outer else name,
+            line_of(offset), end_line, lines[header_line - 1].strip() if header_line <= len(lines) else ""
+        ))
+        return len(symbols) - 1
+
+    for match in re.finditer(r"[{};]", masked):
+        position = match.start()
+        token = masked[position]
+        text = masked[start:position]
+        start = position + 1
+        if token == "}":
+            if stack:
+                index = stack.pop()[0]
+                if index is not None:
+                    symbols[index] = symbols[index]._replace(end_line=line_of(position))
+            continue
+
+        stripped = text.lstrip()
+        offset = position - len(text) + (len(text) - len(stripped))
+        attributes = _ATTRIBUTES_PATTERN.match(stripped)
+        declaration = offset + (attributes.end() if attributes else 0)
+        text = masked[declaration:position].strip()
+        outer_kind = stack[-1][2] if stack else "namespace"
+        in_type = outer_kind in _TYPE_KINDS
+
+        if token == "{":
+            classified = _classify(text, in_type) if text else None
+            if classified is None:
+                outer = stack[-1] if stack else (None, file_namespace, "namespace")
+                stack.append((None, outer[1], "block"))
+                continue
+            kind, name = classified
+            index = add(kind, name, offset, declaration, 0)
+            stack.append((index, symbols[index].qualified_name, kind))
+            continue
+
+        # ; で終わる宣言（ファイルスコープの名前空間と式形式のメンバー）
+        if not stack and text.startswith("namespace "):
+            classified = _classify(text, False)
+            if classified is not None:
+                add("namespace", classified[1], offset, declaration, len(lines))
+                file_namespace = classified[1]
+            continue
+        arrow = text.find("=>")
+        if arrow > 0:
+            classified = _classify(text[:arrow], in_type)
+            if classified is not None and classified[0] in ("method", "property"):
+                add(classified[0], classified[1], offset, declaration, line_of(position))
+
+    # 閉じられていない宣言はファイルの末尾までとする
+    symbols = [s if s.end_line else s._replace(end_line=len(lines)) for s in symbols]
+    symbols.sort(key=lambda s: s.start_line)
+    return symbols
+
+
+def _declaration_header(lines: List[str], line_index: int, before: str) -> Optional[str]:
+    """lines[line_index] の { の直前のテキスト（before、マスク済み）から遡って宣言を求め、その行を返す"""
+    # { の直前の宣言は、直前の ; { } の後から始まる（複数行にわたる引数リストを含めて最大 DECLARATION_LINES 行）
+    texts = [before]
+    first = line_index
+    while not re.search(r"[{};]", texts[0]) and first > 0 and line_index - first < DECLARATION_LINES:
+        first -= 1
+        texts.insert(0, _LINE_LITERAL_PATTERN.sub(_blank, lines[first].rstrip("\r\n")))
+    separator = max(texts[0].rfind(token) for token in "{};")
+    texts[0] = " " * (separator + 1) + texts[0][separator + 1:]
+    joined = "\n".join(texts)
+    stripped = joined.lstrip()
+    attributes = _ATTRIBUTES_PATTERN.match(stripped)
+    offset = len(joined) - len(stripped) + (attributes.end() if attributes else 0)
+    text = joined[offset:].strip()
+    # 外側の種類は求めないため、修飾子のない名前はコンストラクターとみなす
+    if not text or _classify(text, True) is None:
+        return None
+    return lines[first + joined.count("\n", 0, offset)].strip()
+
+
+def enclosing_header(lines: List[str], line_index: int) -> Optional[str]:
+    """lines[line_index] を含む最も内側の宣言の行を、その行から遡って求める
+
+    ファイル全体は走査せず、行を遡りながら { } の対応を数え、対応する } のない { の直前が
+    宣言であればその行を返します（制御構文や初期化子のブロックはさらに外側を探します）。
+    { } を含まない行は文字列の比較だけで読み飛ばすため、遡る行数に比例した軽い処理です。
+    コメントと文字列は行ごとに除くため、複数行にわたるコメント・文字列の中の括弧は数えてしまいます。
+
+    Args:
+        lines: ファイル内容の行のリスト（改行を含んでもよい）
+        line_index: 行の添字（0始まり）
+
+    Returns:
+        宣言の行の前後の空白を除いたもの（ファイルスコープの名前空間を含む。見つからなければNone）
+    """
+    depth = 0
+    for index in range(min(line_index, len(lines) - 1), -1, -1):
+        line = lines[index]
+        if "{" not in line and "}" not in line:
+            if "namespace" in line and depth == 0 and _FILE_NAMESPACE_PATTERN.match(line):
+                return line.strip()
+            continue
+        masked = _LINE_LITERAL_PATTERN.sub(_blank, line.rstrip("\r\n"))
+        for position in range(len(masked) - 1, -1, -1):
+            token = masked[position]
+            if token == "}":
+                depth += 1
+            elif token == "{":
+                if depth:
+                    depth -= 1
+                    continue
+                header = _declaration_header(lines, index, masked[:position])
+                if header is not None:
+                    return header
+    return None
+
+
+class SymbolIndex:
+    """1つのファイル内容の宣言の索引"""
+
+    def __init__(self, symbols: List[Symbol]):
+        self.symbols = symbols
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def find(self, name: str) -> List[Symbol]:
+        """名前が一致する宣言（オーバーロードはすべて）
+
+        Args:
+            name: 宣言の名前、または末尾が一致する修飾名（例: "Value3"、"Component0.Value3"）
+        """
+        suffix = "." + name
+        return [s for s in self.symbols if s.qualified_name == name or s.qualified_name.endswith(suffix)]
+
+
+def blob_object_id(content: str) -> str:
+    """内容のgitのblobのobjectId（"blob <サイズ>\\0" に続けた内容のSHA-1）"""
+    data = content.encode("utf-8")
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+class SymbolIndexCache:
+    """SymbolIndexをblobのobjectIdごとに保持するLRUキャッシュ
+
+    キーはblob_cache・blob_storeと同じgitのobjectIdで、内容そのものは保持しません
+    （内容の保持はblob_cacheの上限に任せ、索引の宣言の一覧だけを保持します）。
+    異なるコミット・PR間で同じ内容のファイルも索引を共有します。
+    """
+
+    def __init__(self, max_entries: int = 256):
+        """
+        Args:
+            max_entries: 保持する索引の最大数（デフォルト: 256）
+        """
+        self.max_entries = max_entries
+        self._indexes: "OrderedDict[str, SymbolIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, content: str, object_id: str = None) -> SymbolIndex:
+        """内容の索引を取得（なければ走査して登録）
+
+        Args:
+            content: ファイル内容
+            object_id: 内容のblobのobjectId（省略時は内容から求める）
+        """
+        key = object_id or blob_object_id(content)
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is not None:
+                self._indexes.move_to_end(key)
+                self.hits += 1
+                return index
+            self.misses += 1
+        index = SymbolIndex(scan_symbols(content))
+        if self.max_entries:
+            with self._lock:
+                self._indexes[key] = index
+                self._indexes.move_to_end(key)
+                while len(self._indexes) > self.max_entries:
+                    self._indexes.popitem(last=False)
+        return index
+
+    def stats(self) -> Dict[str, int]:
+        """ヒット・ミス数、索引数、索引している宣言の合計数を返す"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._indexes),
+                "symbols": sum(len(index) for index in self._indexes.values()),
+                "max_entries": self.max_entries,
+            }
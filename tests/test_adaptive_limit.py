@@ -0,0 +1,193 @@
+import heapq
+import pytest
+from adaptive_limit import AdaptiveLimit, parse_retry_after, throttle_delay
+from client import OrganizationPool
+
+
+class FakeClock:
+    """テストで進める時刻"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class HTTPError(Exception):
+    """requestsのHTTPErrorと同じく応答を持つ例外"""
+
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"{status_code} Client Error")
+        self.response = type("Response", (), {"status_code": status_code, "headers": headers or {}})()
+
+
+class SimulatedBackend:
+    """同時に処理できるリクエスト数に上限があるAPIを、時刻を進めるだけで再現する離散イベントシミュレーション
+
+    リクエストは常に待っている（クライアント側の需要は無制限）ものとし、リミッターが許す限り開始します。
+    上限を超えたリクエストは、queueing=False では遅延の1/10で429（Retry-After付き）になり、
+    queueing=True ではサーバーの待ち行列に入り、同時リクエスト数に比例して遅くなります。
+    """
+
+    def __init__(self, limiter, clock, capacity, latency=0.1, retry_after=0.0, queueing=False):
+        self.limiter = limiter
+        self.clock = clock
+        self.capacity = capacity
+        self.latency = latency
+        self.retry_after = retry_after
+        self.queueing = queueing
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.windows = []
+        self._events = []
+        self._sequence = 0
+
+    def _start(self):
+        while True:
+            started = self.limiter.try_acquire()
+            if started is None:
+                return
+            self.in_flight += 1
+            if self.queueing:
+                latency = self.latency * max(1.0, self.in_flight / self.capacity)
+                outcome = "ok"
+            elif self.in_flight > self.capacity:
+                latency, outcome = self.latency / 10, "throttled"
+            else:
+                latency, outcome = self.latency, "ok"
+            self._sequence += 1
+            # 応答がすべて同時刻にそろわないよう、リクエストごとに決まった揺らぎ（最大+10%）を加える
+            latency *= 1 + (self._sequence % 11) / 100
+            heapq.heappush(self._events, (self.clock.now + latency, self._sequence, started, outcome))
+
+    def run(self, duration):
+        """durationの時刻まで実行し、応答ごとのウィンドウを記録"""
+        self._start()
+        while self.clock.now < duration:
+            if self._events:
+                at, _, started, outcome = heapq.heappop(self._events)
+            else:
+                # Retry-Afterでリクエストを開始できない間は時刻だけを進める
+                at, started, outcome = self.clock.now + 0.01, None, None
+            self.clock.now = at
+            if outcome == "ok":
+                self.in_flight -= 1
+                self.completed += 1
+                self.limiter.release(started)
+            elif outcome == "throttled":
+                self.in_flight -= 1
+                self.rejected += 1
+                self.limiter.release(started, throttled=True, retry_after=self.retry_after)
+            self.windows.append((at, self.limiter.limit))
+            self._start()
+
+
+class TestAdaptiveLimit:
+    """AdaptiveLimitのユニットテスト"""
+
+    def test_converges_below_capacity_ceiling(self):
+        """上限の低い初期値から容量まで広げ、429で半分に狭めて容量付近を保つことのテスト"""
+        clock = FakeClock()
+        limiter = AdaptiveLimit(initial=2, max_limit=64, clock=clock)
+        backend = SimulatedBackend(limiter, clock, capacity=20)
+
+        backend.run(60.0)
+
+        steady = [window for at, window in backend.windows if at > 10.0]
+        assert max(window for _, window in backend.windows) <= 21
+        assert min(steady) >= 10 and max(steady) == 21
+        # 容量の7割以上を使い、429になったのは全リクエストの5%未満（容量を超えた時の429が戻るまでの分のみ）
+        assert backend.completed > 0.7 * 20 * 60.0 / 0.1
+        assert backend.rejected < 0.05 * backend.completed
+        assert limiter.stats()["throttled"] == backend.rejected
+
+    def test_grows_until_max_without_throttling(self):
+        """スロットリングも遅延の増加もなければ最大値まで広げ、それを超えないことのテスト"""
+        clock = FakeClock()
+        limiter = AdaptiveLimit(initial=1, max_limit=16, clock=clock)
+        backend = SimulatedBackend(limiter, clock, capacity=1000)
+
+        backend.run(10.0)
+
+        assert limiter.stats()["window"] == 16
+        assert backend.rejected == 0
+
+    def test_latency_spike_shrinks_window(self):
+        """容量を超えて待ち行列で遅くなるサーバーでは、遅延の急増で狭め、遅延が基準の2倍になる容量の2倍程度に留めることのテスト"""
+        clock = FakeClock()
+        limiter = AdaptiveLimit(initial=4, max_limit=64, clock=clock)
+        backend = SimulatedBackend(limiter, clock, capacity=10, queueing=True)
+
+        backend.run(60.0)
+
+        steady = [window for at, window in backend.windows if at > 10.0]
+        assert limiter.stats()["latency_spikes"] > 0
+        assert 10 <= min(steady) and max(steady) <= 25
+        assert limiter.stats()["throttled"] == 0
+
+    def test_retry_after_blocks_new_requests(self):
+        """Retry-Afterの時刻までは枠が空いていても開始せず、1回の過負荷では1度だけ狭めることのテスト"""
+        clock = FakeClock()
+        limiter = AdaptiveLimit(initial=8, clock=clock)
+        started = [limiter.try_acquire() for _ in range(3)]
+
+        clock.now = 1.0
+        limiter.release(started[0], throttled=True, retry_after=2.0)
+        limiter.release(started[1], throttled=True, retry_after=2.0)
+
+        assert limiter.limit == 4
+        assert limiter.try_acquire() is None
+        clock.now = 3.5
+        assert limiter.try_acquire() == 3.5
+        assert limiter.stats()["in_flight"] == 2
+
+    def test_slot_classifies_errors(self):
+        """with文を抜けた例外のうち、429・503とSDKのスロットリングのメッセージだけで狭めることのテスト"""
+        clock = FakeClock()
+        limiter = AdaptiveLimit(initial=8, clock=clock)
+
+        with pytest.raises(KeyError):
+            with limiter.slot():
+                raise KeyError("not found")
+        with pytest.raises(HTTPError):
+            with limiter.slot():
+                raise HTTPError(404)
+        assert limiter.limit == 8
+
+        with pytest.raises(RuntimeError):
+            with limiter.slot():
+                raise RuntimeError("Operation returned a 429 status code.")
+
+        assert limiter.limit == 4
+        assert limiter.stats()["in_flight"] == 0
+
+    def test_throttle_delay_and_retry_after(self):
+        """429・503の判定とRetry-After（秒数・HTTP日付）の解釈のテスト"""
+        assert throttle_delay(HTTPError(429, {"Retry-After": "7"})) == 7.0
+        assert throttle_delay(HTTPError(503)) == 0.0
+        assert throttle_delay(HTTPError(500)) is None
+        assert throttle_delay(ValueError("bad")) is None
+        assert parse_retry_after("Wed, 21 Oct 2015 07:28:30 GMT", now=1445412480.0) == 30.0
+        assert parse_retry_after("soon") == 0.0
+
+
+class TestOrganizationPoolAdaptive:
+    """OrganizationPoolのadaptiveのテスト"""
+
+    def test_stats_expose_current_window(self):
+        """adaptiveの場合、組織ごとの現在のウィンドウを統計情報に含めることのテスト"""
+        pool = OrganizationPool(max_requests_per_org=4, adaptive=True, max_adaptive_requests=32)
+
+        with pytest.raises(HTTPError):
+            with pool.limit("org"):
+                raise HTTPError(429)
+        with pool.limit("other"):
+            pass
+
+        stats = pool.stats()
+        assert stats["organizations"] == 2
+        assert stats["adaptive"]["org"]["window"] == 2
+        assert stats["adaptive"]["other"]["max"] == 32
+        assert "adaptive" not in OrganizationPool(max_requests_per_org=4).stats()
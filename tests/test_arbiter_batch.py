@@ -0,0 +1,153 @@
+import threading
+from azure_arbiter import AzureReposArbiter
+from blob_cache import BlobCache
+
+
+class FakeBatchClient:
+    """複数PRのバッチ処理を検証するための、スタックされたPRを返す偽クライアント"""
+    
+    def __init__(self):
+        self.blob_cache = BlobCache()
+        self.blob_fetches = []
+        self.pull_request_fetches = []
+        # PRのIDを登録すると、そのPRのメタデータの取得をイベントがセットされるまで止める（止めた時点でgatedをセット）
+        self.gates = {}
+        self.gated = threading.Event()
+        self._lock = threading.Lock()
+        # PR 2 は PR 1 の上に積まれており、shared.cs の変更前blobを共有する
+        self.pull_requests = {
+            1: {"source": "s1", "target": "t0", "changes": [("/shared.cs", "o-shared", "n-shared-1")]},
+            2: {"source": "s2", "target": "t0", "changes": [("/shared.cs", "o-shared", "n-shared-2")]},
+        }
+    
+    def list_pull_requests(self, organization, project, repo_id, target_ref_name=None, status="active"):
+        assert target_ref_name == "refs/heads/main"
+        return [{"pull_request_id": pr_id} for pr_id in self.pull_requests]
+    
+    def get_pull_request(self, organization, project, repo_id, pr_id):
+        with self._lock:
+            self.pull_request_fetches.append(pr_id)
+        if pr_id in self.gates:
+            self.gated.set()
+            self.gates[pr_id].wait(5)
+        if pr_id not in self.pull_requests:
+            raise ValueError(f"PR {pr_id} not found")
+        pr = self.pull_requests[pr_id]
+        return {
+            "pull_request_id": pr_id,
+            "last_merge_source_commit": {"commit_id": pr["source"]},
+            "last_merge_target_commit": {"commit_id": pr["target"]},
+        }
+    
+    def get_commit_diffs(self, organization, project, repo_id, source_commit, target_commit):
+        pr_id = next(i for i, pr in self.pull_requests.items() if pr["source"] == source_commit)
+        changes = [
+            {
+                "change_type": "edit",
+                "item": {"path": path, "git_object_type": "blob", "object_id": new, "original_object_id": old},
+            }
+            for path, old, new in self.pull_requests[pr_id]["changes"]
+        ]
+        return {"changes": changes}
+    
+    def get_file_content_at_commit(self, organization, project, repo_id, path, commit_id, object_id=None):
+        def load():
+            with self._lock:
+                self.blob_fetches.append(object_id)
+            return f"content of {object_id}\n"
+        return self.blob_cache.get_or_load(("blob", object_id), load)
+
+
+class TestPullRequestBatchReview:
+    """AzureReposArbiterのバッチレビュー機能のユニットテスト"""
+    
+    def setup_method(self):
+        self.client = FakeBatchClient()
+        self.arbiter = AzureReposArbiter(self.client)
+    
+    def test_reviews_all_pull_requests(self):
+        """全PRの概要と差分が返されることのテスト"""
+        results = list(self.arbiter.iter_pull_request_reviews("org", "proj", "repo", [1, 2]))
+        
+        assert sorted(r["pull_request_id"] for r in results) == [1, 2]
+        for result in results:
+            assert result["summary"]["changes"][0]["path"] == "/shared.cs"
+            assert "-content of o-shared" in result["unified_diff"]
+    
+    def test_shared_blob_fetched_once(self):
+        """スタックされたPR間で共通のblobが1度だけ取得されることのテスト"""
+        list(self.arbiter.iter_pull_request_reviews("org", "proj", "repo", [1, 2]))
+        
+        assert self.client.blob_fetches.count("o-shared") == 1
+        assert sorted(self.client.blob_fetches) == ["n-shared-1", "n-shared-2", "o-shared"]
+    
+    def test_failed_pull_request_reported_as_error(self):
+        """取得に失敗したPRがエラーとして返され、他のPRは処理されることのテスト"""
+        results = list(self.arbiter.iter_pull_request_reviews("org", "proj", "repo", [1, 99], include_diff=False))
+        by_id = {r["pull_request_id"]: r for r in results}
+        
+        assert "summary" in by_id[1]
+        assert "unified_diff" not in by_id[1]
+        assert "not found" in by_id[99]["error"]
+    
+    def test_closing_early_stops_pending_work(self):
+        """途中でジェネレーターを閉じると、未着手のPRは処理されず、処理中のPRは差分を生成しないことのテスト"""
+        for pr_id in (3, 4):
+            self.client.pull_requests[pr_id] = {
+                "source": f"s{pr_id}", "target": "t0", "changes": [("/shared.cs", "o-shared", f"n-shared-{pr_id}")]
+            }
+        self.client.gates[2] = threading.Event()
+        reviews = self.arbiter.iter_pull_request_reviews("org", "proj", "repo", [1, 2, 3, 4], max_workers=1)
+        
+        assert next(reviews)["pull_request_id"] == 1
+        assert self.client.gated.wait(5)
+        reviews.close()
+        self.client.gates[2].set()
+        for thread in threading.enumerate():
+            if thread.name.startswith("pr-review"):
+                thread.join(5)
+        
+        assert self.client.pull_request_fetches == [1, 2]
+        assert "n-shared-2" not in self.client.blob_fetches
+    
+    def test_list_active_pull_request_ids(self):
+        """ブランチ名からアクティブなPRのIDを解決できることのテスト"""
+        assert self.arbiter.list_active_pull_request_ids("org", "proj", "repo", "main") == [1, 2]
+
+
+class TestReviewPullRequestsTool:
+    """review_pull_requestsツールのジェネレーターの扱いのテスト"""
+    
+    def test_cancel_closes_generator_after_pending_next(self, monkeypatch):
+        """取り消されても実行中のnextの完了を待ち、ワーカースレッドでジェネレーターを閉じることのテスト"""
+        import anyio
+        import main
+        
+        entered, gate = threading.Event(), threading.Event()
+        closed = []
+        
+        def reviews():
+            try:
+                yield {"pull_request_id": 1}
+                entered.set()
+                gate.wait()
+                yield {"pull_request_id": 2}
+            finally:
+                closed.append(threading.current_thread() is not threading.main_thread())
+        
+        class FakeArbiter:
+            def iter_pull_request_reviews(self, *args, **kwargs):
+                return reviews()
+        
+        monkeypatch.setattr(main, "get_client", lambda *repository: FakeArbiter())
+        
+        async def run():
+            async with anyio.create_task_group() as tg:
+                tg.start_soon(lambda: main.review_pull_requests(ids=[1, 2], organization="o", project="p", repository_id="r"))
+                await anyio.to_thread.run_sync(entered.wait)
+                tg.cancel_scope.cancel()
+                gate.set()
+        
+        anyio.run(run)
+        
+        assert closed == [True]
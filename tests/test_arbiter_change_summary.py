@@ -0,0 +1,69 @@
+import json
+import pytest
+from azure_arbiter import AzureReposArbiter, pull_request_scope
+from replay_client import ReplayAzureReposClient, generate_fixture
+from response_cache import ResponseCache
+
+
+@pytest.fixture(scope="module")
+def arbiter(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("replay"))
+    generate_fixture(path, "medium", pr_id=1)
+    return AzureReposArbiter(ReplayAzureReposClient(path))
+
+
+class TestCompactChangeSummary:
+    """コンパクト形式の変更概要のテスト"""
+    
+    def test_equivalent_to_full_summary(self, arbiter):
+        """コンパクト形式から通常形式と同じパス・ステータス・元のパスを復元できることのテスト"""
+        full = arbiter.get_pull_request_change_summary("org", "proj", "repo", 1)
+        compact = arbiter.get_pull_request_change_summary("org", "proj", "repo", 1, compact=True)
+        
+        decoded = [
+            (compact["dirs"][row[0]] + "/" + row[1], compact["status_codes"][row[2]], row[3] if len(row) > 3 else None)
+            for row in compact["files"]
+        ]
+        expected = [(c["path"], c["status"], c.get("original_path")) for c in full["changes"]]
+        assert decoded == expected
+    
+    def test_smaller_than_full_summary(self, arbiter):
+        """コンパクト形式のシリアライズ後のサイズが通常形式より小さいことのテスト"""
+        full = arbiter.get_pull_request_change_summary("org", "proj", "repo", 1)
+        compact = arbiter.get_pull_request_change_summary("org", "proj", "repo", 1, compact=True)
+        
+        assert len(json.dumps(compact)) * 3 < len(json.dumps(full))
+    
+    def test_error_passed_through(self):
+        """コミットが特定できない場合はエラーがそのまま返されることのテスト"""
+        arbiter = AzureReposArbiter(None)
+        
+        assert arbiter._compact_change_summary({"error": "x"}) == {"error": "x"}
+
+
+class TestPullRequestScope:
+    """ツール呼び出し1回の中でPRのメタデータを共有するテスト"""
+    
+    def test_versioned_cache_miss_fetches_pull_request_once(self, tmp_path):
+        """応答キャッシュのミスでも、バージョン確認とツール本体でPRを1回だけ取得することのテスト"""
+        generate_fixture(str(tmp_path), "small", pr_id=1)
+        client = ReplayAzureReposClient(str(tmp_path))
+        arbiter = AzureReposArbiter(client)
+        cache = ResponseCache()
+        
+        @cache.cached(
+            "summary",
+            version_of=lambda arguments: arbiter.get_pull_request_version("org", "proj", "repo", arguments["id"])
+        )
+        def summary(id: int) -> dict:
+            return arbiter.get_pull_request_change_summary("org", "proj", "repo", id)
+        
+        with pull_request_scope():
+            first = summary(1)
+        assert client.request_counts["get_pull_request"] == 1
+        
+        # スコープの外では取得結果を共有しない（呼び出しごとに最新のPRでバージョンを確認する）
+        with pull_request_scope():
+            assert summary(1) == first
+        arbiter.get_pull_request_version("org", "proj", "repo", 1)
+        assert client.request_counts["get_pull_request"] == 3
@@ -0,0 +1,59 @@
+import pytest
+from azure_arbiter import AzureReposArbiter
+from replay_client import ReplayAzureReposClient, generate_fixture
+
+
+class IdenticalBlobClient:
+    """変更前後のobjectIdが同じファイル（パスのみのリネーム）を含むPRを返す偽クライアント"""
+    
+    def __init__(self):
+        self.fetched = []
+    
+    def get_pull_request(self, organization, project, repo_id, pr_id):
+        return {"last_merge_source_commit": {"commit_id": "src"}, "last_merge_target_commit": {"commit_id": "tgt"}}
+    
+    def get_commit_diffs(self, organization, project, repo_id, source_commit, target_commit):
+        return {"changes": [
+            {"changeType": "rename", "sourceServerItem": "/old.cs",
+             "item": {"path": "/new.cs", "objectId": "same", "originalObjectId": "same"}},
+            {"changeType": "edit", "item": {"path": "/edit.cs", "objectId": "n", "originalObjectId": "o"}},
+        ]}
+    
+    def get_file_content_at_commit(self, organization, project, repo_id, path, commit_id, object_id=None):
+        self.fetched.append(path)
+        return "a\nb\n" if commit_id == "tgt" else "a\nc\nd\n"
+
+
+class TestPullRequestDiffStats:
+    """get_pull_request_diff_statsのテスト"""
+    
+    def test_matches_unified_diff(self, tmp_path):
+        """ファイルごとの行数の合計がUnified Diffの+/-行数と一致することのテスト"""
+        generate_fixture(str(tmp_path), "small")
+        arbiter = AzureReposArbiter(ReplayAzureReposClient(str(tmp_path)))
+        
+        stats = arbiter.get_pull_request_diff_stats("org", "proj", "repo", 1)
+        diff = arbiter.get_pull_request_unified_diff("org", "proj", "repo", 1)
+        lines = [line for line in diff.splitlines() if not line.startswith(("+++ ", "--- "))]
+        
+        assert stats["total_added"] == sum(1 for line in lines if line.startswith("+"))
+        assert stats["total_removed"] == sum(1 for line in lines if line.startswith("-"))
+        assert len(stats["files"]) == 5
+    
+    def test_identical_object_id_skips_download(self):
+        """変更前後のobjectIdが同じファイルは内容を取得しないことのテスト"""
+        client = IdenticalBlobClient()
+        stats = AzureReposArbiter(client).get_pull_request_diff_stats("org", "proj", "repo", 1)
+        
+        assert stats["files"][0] == {"path": "/new.cs", "status": "renamed", "added": 0, "removed": 0}
+        assert stats["files"][1] == {"path": "/edit.cs", "status": "modified", "added": 2, "removed": 1}
+        assert client.fetched == ["/edit.cs", "/edit.cs"]
+    
+    def test_unified_diff_skips_identical_blobs(self):
+        """Unified Diffの生成でもobjectIdが同じファイルは内容を取得しないことのテスト"""
+        client = IdenticalBlobClient()
+        diff = AzureReposArbiter(client).get_pull_request_unified_diff("org", "proj", "repo", 1)
+        
+        # パスのみのリネームはヘッダーのみとなる
+        assert diff.startswith("rename from old.cs\nrename to new.cs\n\n--- a/edit.cs")
+        assert client.fetched == ["/edit.cs", "/edit.cs"]
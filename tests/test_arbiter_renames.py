@@ -0,0 +1,145 @@
+from azure_arbiter import AzureReposArbiter
+
+
+def body(name, lines=20):
+    return "".join(f"public int {name}{i}() => {i};\n" for i in range(lines))
+
+
+class DeleteAddClient:
+    """リネームを削除と追加の組として返す偽クライアント"""
+    
+    def __init__(self, changes, contents):
+        self.changes = changes
+        self.contents = contents
+        self.fetched = []
+    
+    def get_pull_request(self, organization, project, repo_id, pr_id):
+        return {"last_merge_source_commit": {"commit_id": "src"}, "last_merge_target_commit": {"commit_id": "tgt"}}
+    
+    def get_commit_diffs(self, organization, project, repo_id, source_commit, target_commit):
+        return {"changes": self.changes}
+    
+    def get_file_content_at_commit(self, organization, project, repo_id, path, commit_id, object_id=None):
+        self.fetched.append((path, commit_id))
+        return self.contents[object_id]
+
+
+def delete(path, object_id):
+    return {"changeType": "delete", "item": {"path": path, "originalObjectId": object_id}}
+
+
+def add(path, object_id):
+    return {"changeType": "add", "item": {"path": path, "objectId": object_id}}
+
+
+class TestRenameDetection:
+    """削除と追加の組からのリネーム検出のテスト"""
+    
+    def test_similar_delete_and_add_are_diffed_as_rename(self):
+        """類似する削除と追加の組は、移動元との差分になることのテスト"""
+        original = body("Value")
+        modified = original.replace("Value3() => 3", "Value3() => 42")
+        client = DeleteAddClient(
+            [delete("/Old/Player.cs", "o1"), add("/New/Player.cs", "n1")],
+            {"o1": original, "n1": modified}
+        )
+        
+        diff = AzureReposArbiter(client).get_pull_request_unified_diff("org", "proj", "repo", 1)
+        
+        assert diff.startswith("rename from Old/Player.cs\nrename to New/Player.cs\n")
+        assert "--- a/Old/Player.cs\n+++ b/New/Player.cs\n" in diff
+        assert "-public int Value3() => 3;" in diff
+        assert "+public int Value3() => 42;" in diff
+        # 変更のない行は差分に含まれない
+        assert "Value10" not in diff
+    
+    def test_identical_object_id_is_pure_rename(self):
+        """objectIdが一致する削除と追加の組は、内容を取得せずにヘッダーのみとなることのテスト"""
+        client = DeleteAddClient(
+            [delete("/Old/Enemy.cs", "same"), add("/New/Enemy.cs", "same")],
+            {"same": body("Value")}
+        )
+        arbiter = AzureReposArbiter(client)
+        
+        diff = arbiter.get_pull_request_unified_diff("org", "proj", "repo", 1)
+        stats = arbiter.get_pull_request_diff_stats("org", "proj", "repo", 1)
+        
+        assert diff == "rename from Old/Enemy.cs\nrename to New/Enemy.cs\n"
+        assert stats["files"] == [{"path": "/New/Enemy.cs", "status": "renamed", "added": 0, "removed": 0}]
+        assert client.fetched == []
+    
+    def test_dissimilar_files_are_not_paired(self):
+        """類似しない削除と追加は、それぞれ削除・追加のままとなることのテスト"""
+        client = DeleteAddClient(
+            [delete("/Old.cs", "o1"), add("/New.cs", "n1")],
+            {"o1": body("Alpha"), "n1": body("Beta")}
+        )
+        arbiter = AzureReposArbiter(client)
+        
+        diff = arbiter.get_pull_request_unified_diff("org", "proj", "repo", 1)
+        stats = arbiter.get_pull_request_diff_stats("org", "proj", "repo", 1)
+        
+        assert "rename from" not in diff
+        assert [f["status"] for f in stats["files"]] == ["deleted", "added"]
+        assert stats["total_added"] == 20 and stats["total_removed"] == 20
+    
+    def test_most_similar_source_is_chosen(self):
+        """複数の候補がある場合は、最も類似する削除ファイルと対応付けることのテスト"""
+        base = body("Value")
+        near = base.replace("Value1() => 1", "Value1() => -1")
+        far = "".join(line for i, line in enumerate(base.splitlines(keepends=True)) if i % 3) + body("Other", 5)
+        client = DeleteAddClient(
+            [delete("/Far.cs", "far"), delete("/Near.cs", "near"), add("/Moved.cs", "moved")],
+            {"far": far, "near": near, "moved": base}
+        )
+        
+        stats = AzureReposArbiter(client).get_pull_request_diff_stats("org", "proj", "repo", 1)
+        
+        assert stats["files"] == [
+            {"path": "/Far.cs", "status": "deleted", "added": 0, "removed": len(far.splitlines())},
+            {"path": "/Moved.cs", "status": "renamed", "added": 1, "removed": 1},
+        ]
+    
+    def test_change_summary_pairs_identical_contents_only(self):
+        """変更概要は内容を取得せずobjectIdが一致する組のみをリネームとし、類似度による検出は行数・Unified Diffで行うことのテスト"""
+        original = body("Value")
+        client = DeleteAddClient(
+            [
+                delete("/Old/Player.cs", "o1"), add("/New/Player.cs", "n1"),
+                delete("/Old/Enemy.cs", "same"), add("/New/Enemy.cs", "same"),
+                delete("/Gone.cs", "g1"),
+            ],
+            {"o1": original, "n1": original.replace("Value3() => 3", "Value3() => 42"), "same": body("Enemy"), "g1": body("Gone")}
+        )
+        arbiter = AzureReposArbiter(client)
+        
+        summary = arbiter.get_pull_request_change_summary("org", "proj", "repo", 1)
+        assert client.fetched == []
+        stats = arbiter.get_pull_request_diff_stats("org", "proj", "repo", 1)
+        diff = arbiter.get_pull_request_unified_diff("org", "proj", "repo", 1)
+        
+        assert [(c["path"], c["status"], c.get("original_path")) for c in summary["changes"]] == [
+            ("/Old/Player.cs", "deleted", None),
+            ("/New/Player.cs", "added", None),
+            ("/New/Enemy.cs", "renamed", "/Old/Enemy.cs"),
+            ("/Gone.cs", "deleted", None),
+        ]
+        # 類似度によるリネームは内容を取得する行数・Unified Diffでのみ検出する
+        assert [(f["path"], f["status"]) for f in stats["files"]] == [
+            ("/New/Player.cs", "renamed"), ("/New/Enemy.cs", "renamed"), ("/Gone.cs", "deleted")
+        ]
+        assert "rename from Old/Player.cs\nrename to New/Player.cs\n" in diff
+        assert "rename from Old/Enemy.cs\nrename to New/Enemy.cs\n" in diff
+    
+    def test_source_server_item_is_used_as_original_path(self):
+        """originalPathがないリネームでは、sourceServerItemのパスから変更前の内容を取得することのテスト"""
+        client = DeleteAddClient(
+            [{"changeType": "edit, rename", "sourceServerItem": "/Old.cs",
+              "item": {"path": "/New.cs", "objectId": "n1", "originalObjectId": "o1"}}],
+            {"o1": "a\nb\n", "n1": "a\nc\n"}
+        )
+        
+        diff = AzureReposArbiter(client).get_pull_request_unified_diff("org", "proj", "repo", 1)
+        
+        assert diff.startswith("rename from Old.cs\nrename to New.cs\n--- a/Old.cs\n+++ b/New.cs\n")
+        assert ("/Old.cs", "tgt") in client.fetched
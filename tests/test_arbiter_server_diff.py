@@ -0,0 +1,46 @@
+import pytest
+from azure_arbiter import AzureReposArbiter
+from replay_client import ReplayAzureReposClient, generate_fixture
+
+
+@pytest.fixture(scope="module")
+def fixture_dir(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("replay"))
+    generate_fixture(path, "medium", pr_id=1)
+    return path
+
+
+class TestServerSideDiff:
+    """サーバー側の行差分ブロックを使用した差分生成のテスト"""
+    
+    def test_same_output_as_local_diff(self, fixture_dir):
+        """行差分ブロックを使用した場合もdifflibの場合と同じ差分になることのテスト"""
+        local = AzureReposArbiter(ReplayAzureReposClient(fixture_dir), server_diff_threshold=0)
+        client = ReplayAzureReposClient(fixture_dir)
+        server = AzureReposArbiter(client, server_diff_threshold=1)
+        
+        assert server.get_pull_request_unified_diff("org", "proj", "repo", 1) == \
+            local.get_pull_request_unified_diff("org", "proj", "repo", 1)
+        # 両側に内容があるファイルを50件ずつのバッチで問い合わせる
+        assert client.request_counts["get_file_diffs"] == 2
+    
+    def test_small_files_use_local_diff(self, fixture_dir):
+        """しきい値未満のファイルではFileDiffs APIを呼び出さないことのテスト"""
+        client = ReplayAzureReposClient(fixture_dir)
+        AzureReposArbiter(client).get_pull_request_unified_diff("org", "proj", "repo", 1)
+        
+        assert client.request_counts["get_file_diffs"] == 0
+    
+    def test_falls_back_when_api_fails(self, fixture_dir):
+        """FileDiffs APIが失敗した場合はdifflibで比較することのテスト"""
+        client = ReplayAzureReposClient(fixture_dir)
+        
+        def failing_get_file_diffs(*args, **kwargs):
+            raise RuntimeError("not supported")
+        
+        client.get_file_diffs = failing_get_file_diffs
+        fallback = AzureReposArbiter(client, server_diff_threshold=1)
+        local = AzureReposArbiter(ReplayAzureReposClient(fixture_dir), server_diff_threshold=0)
+        
+        assert fallback.get_pull_request_unified_diff("org", "proj", "repo", 1) == \
+            local.get_pull_request_unified_diff("org", "proj", "repo", 1)
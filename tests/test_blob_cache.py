@@ -0,0 +1,73 @@
+import threading
+import time
+import pytest
+from blob_cache import BlobCache
+
+
+class TestBlobCache:
+    """BlobCacheのユニットテスト"""
+    
+    def test_get_and_put(self):
+        """登録した内容を取得できることのテスト"""
+        cache = BlobCache()
+        cache.put("a", "content")
+        
+        assert cache.get("a") == "content"
+        assert cache.get("b") is None
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+    
+    def test_lru_eviction(self):
+        """上限を超えた場合に最も古いエントリが追い出されることのテスト"""
+        cache = BlobCache(max_bytes=10)
+        cache.put("a", "12345")
+        cache.put("b", "12345")
+        cache.get("a")  # aを最近使用したものにする
+        cache.put("c", "12345")
+        
+        assert cache.get("a") == "12345"
+        assert cache.get("b") is None
+        assert cache.get("c") == "12345"
+        assert cache.stats()["bytes"] == 10
+    
+    def test_oversized_value_not_cached(self):
+        """上限より大きい内容はキャッシュされないことのテスト"""
+        cache = BlobCache(max_bytes=3)
+        cache.put("a", "12345")
+        
+        assert cache.get("a") is None
+    
+    def test_get_or_load_single_flight(self):
+        """同じキーの同時取得が1回の読み込みにまとめられることのテスト"""
+        cache = BlobCache()
+        calls = []
+        
+        def loader():
+            calls.append(1)
+            time.sleep(0.05)
+            return "loaded"
+        
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(cache.get_or_load("k", loader)))
+            for _ in range(8)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        
+        assert results == ["loaded"] * 8
+        assert len(calls) == 1
+    
+    def test_get_or_load_error_not_cached(self):
+        """読み込みに失敗した場合は何もキャッシュされないことのテスト"""
+        cache = BlobCache()
+        
+        def failing_loader():
+            raise IOError("network error")
+        
+        with pytest.raises(IOError):
+            cache.get_or_load("k", failing_loader)
+        
+        assert cache.get_or_load("k", lambda: "ok") == "ok"
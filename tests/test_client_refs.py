@@ -0,0 +1,105 @@
+import time
+import pytest
+from azure.devops.exceptions import AzureDevOpsAuthenticationError, AzureDevOpsClientRequestError
+from client import AzureReposClient, RefNotFoundError
+from replay_client import ReplayAzureReposClient, generate_fixture
+
+
+@pytest.fixture(scope="module")
+def fixture_dir(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("refs"))
+    generate_fixture(path, "small", pr_id=1)
+    return path
+
+
+PATH = "/Assets/Scripts/Module0/Component0.cs"
+
+
+class TestBranchResolution:
+    """ブランチ名をコミットIDに解決してファイル内容を取得するテスト（ネットワーク不要）"""
+    
+    def test_branch_reads_are_cached(self, fixture_dir):
+        """同じブランチのファイルは、2回目以降はブランチの解決も内容の取得も行わないことのテスト"""
+        client = ReplayAzureReposClient(fixture_dir)
+        
+        first = client.get_file_content("org", "proj", "repo", PATH, "main")
+        second = client.get_file_content("org", "proj", "repo", PATH, "refs/heads/main")
+        third = client.get_file_content("org", "proj", "repo", PATH, "main")
+        
+        assert first == second == third
+        assert "Component0" in first
+        # "main" と "refs/heads/main" は同じブランチとして1回だけ解決する
+        assert client.request_counts["get_branch"] == 1
+        assert client.request_counts["get_item_content"] == 1
+    
+    def test_default_branch(self, fixture_dir):
+        """バージョン省略時はデフォルトブランチを解決することのテスト"""
+        client = ReplayAzureReposClient(fixture_dir)
+        
+        assert client.get_file_content("org", "proj", "repo", PATH) == \
+            client.get_file_content("org", "proj", "repo", PATH, "main")
+        assert client.request_counts["get_repository"] == 1
+    
+    def test_commit_id_is_not_resolved(self, fixture_dir):
+        """コミットIDが指定された場合はブランチの解決を行わないことのテスト"""
+        client = ReplayAzureReposClient(fixture_dir)
+        commit_id = client.resolve_commit("org", "proj", "repo", "main")
+        
+        assert client.resolve_commit("org", "proj", "repo", commit_id.upper()) == commit_id
+        assert client.request_counts["get_branch"] == 1
+    
+    def test_resolution_expires(self, fixture_dir):
+        """解決結果はTTL経過後に再解決されることのテスト"""
+        client = ReplayAzureReposClient(fixture_dir)
+        client.ref_cache_ttl = 0.05
+        
+        client.resolve_commit("org", "proj", "repo", "main")
+        client.resolve_commit("org", "proj", "repo", "main")
+        time.sleep(0.06)
+        client.resolve_commit("org", "proj", "repo", "main")
+        
+        assert client.request_counts["get_branch"] == 2
+    
+    def test_unknown_branch_falls_back_to_version(self, fixture_dir):
+        """解決できないバージョンはそのままAPIに渡され、解決の失敗もTTLの間は再利用されることのテスト"""
+        client = ReplayAzureReposClient(fixture_dir)
+        
+        for _ in range(2):
+            with pytest.raises(FileNotFoundError):
+                client.get_file_content("org", "proj", "repo", PATH, "v1.0")
+        with pytest.raises(FileNotFoundError):
+            client.get_file_content("org", "proj", "repo", PATH, "refs/tags/v1.0")
+        assert client.request_counts["get_branch"] == 1
+        assert client.request_counts["get_item_content"] == 3
+    
+    def test_other_errors_are_not_treated_as_unknown_branch(self, fixture_dir):
+        """ブランチが存在しない場合以外のエラー（認証・スロットリングなど）はそのまま送出されることのテスト"""
+        client = ReplayAzureReposClient(fixture_dir)
+        
+        def unauthorized(*args, **kwargs):
+            raise PermissionError("401")
+        client._fetch_branch_commit = unauthorized
+        
+        with pytest.raises(PermissionError):
+            client.get_file_content("org", "proj", "repo", PATH, "main")
+        assert client.request_counts["get_item_content"] == 0
+
+    def test_sdk_errors(self):
+        """SDKの404だけをブランチが存在しないものとし、認証エラーはそのまま送出することのテスト"""
+        class FakeGitClient:
+            def __init__(self, error):
+                self.error = error
+            
+            def get_branch(self, repo_id, branch, project=None):
+                raise self.error
+        
+        client = AzureReposClient("pat")
+        client._get_git_client = lambda organization: FakeGitClient(
+            AzureDevOpsClientRequestError("Operation returned a 404 status code.")
+        )
+        with pytest.raises(RefNotFoundError):
+            client._fetch_branch_commit("org", "proj", "repo", "missing")
+        
+        client._get_git_client = lambda organization: FakeGitClient(AzureDevOpsAuthenticationError("401"))
+        with pytest.raises(AzureDevOpsAuthenticationError):
+            client.resolve_commit("org", "proj", "repo", "main")
@@ -0,0 +1,110 @@
+import threading
+import time
+import pytest
+from azure_arbiter import AzureReposArbiter
+from blob_cache import BlobCache
+from client import OrganizationPool
+from client_registry import ClientRegistry
+from replay_client import ReplayAzureReposClient, generate_fixture
+
+
+@pytest.fixture(scope="module")
+def fixture_dir(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("registry"))
+    generate_fixture(path, "small", pr_id=1)
+    return path
+
+
+class TestClientRegistry:
+    """ClientRegistryのユニットテスト"""
+
+    def test_arbiter_per_repository(self, fixture_dir):
+        """リポジトリごとにArbiterが1回だけ作成されることのテスト"""
+        created = []
+
+        def create_arbiter(organization, project, repo_id):
+            created.append((organization, project, repo_id))
+            return AzureReposArbiter(ReplayAzureReposClient(fixture_dir, blob_cache=BlobCache()))
+
+        registry = ClientRegistry(create_arbiter)
+        first = registry.get("org", "proj", "repo")
+
+        assert registry.get("org", "proj", "repo") is first
+        assert registry.get("org2", "proj", "repo") is not first
+        assert created == [("org", "proj", "repo"), ("org2", "proj", "repo")]
+
+    def test_blob_cache_isolated_per_repository(self, fixture_dir):
+        """リポジトリ間でblobキャッシュが共有されず、統計がリポジトリごとに返されることのテスト"""
+        pool = OrganizationPool()
+        registry = ClientRegistry(
+            lambda o, p, r: AzureReposArbiter(ReplayAzureReposClient(fixture_dir, blob_cache=BlobCache())),
+            pool=pool
+        )
+
+        registry.get("org", "proj", "a").get_pull_request_unified_diff("org", "proj", "a", 1)
+        registry.get("org", "proj", "b")
+        stats = registry.stats()
+
+        assert stats["blobs"]["org/proj/a"]["entries"] > 0
+        assert stats["blobs"]["org/proj/b"]["entries"] == 0
+        assert stats["organizations"]["max_requests_per_org"] == 8
+
+    def test_shared_caches_are_bounded_across_repositories(self, fixture_dir):
+        """全リポジトリで共有したblobキャッシュは、リポジトリを増やしても上限を超えず、統計も1つにまとまることのテスト"""
+        blob_cache = BlobCache(max_bytes=20000)
+        registry = ClientRegistry(
+            lambda o, p, r: AzureReposArbiter(ReplayAzureReposClient(fixture_dir, blob_cache=blob_cache)),
+            blob_cache=blob_cache
+        )
+
+        for repo_id in ("a", "b", "c"):
+            registry.get("org", "proj", repo_id).get_pull_request_unified_diff("org", "proj", repo_id, 1)
+        stats = registry.stats()
+
+        assert registry.get("org", "proj", "a").client.blob_cache is registry.get("org", "proj", "c").client.blob_cache
+        assert 0 < stats["blobs"]["bytes"] <= 20000
+
+
+class TestOrganizationPool:
+    """OrganizationPoolのユニットテスト"""
+
+    def _max_concurrency(self, pool, organizations, threads_per_org=6):
+        active = {org: 0 for org in organizations}
+        peak = {org: 0 for org in organizations}
+        lock = threading.Lock()
+
+        def request(org):
+            with pool.limit(org):
+                with lock:
+                    active[org] += 1
+                    peak[org] = max(peak[org], active[org])
+                time.sleep(0.02)
+                with lock:
+                    active[org] -= 1
+
+        threads = [
+            threading.Thread(target=request, args=(org,))
+            for org in organizations for _ in range(threads_per_org)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return peak
+
+    def test_limit_per_organization(self):
+        """組織ごとに同時リクエスト数が上限以下に保たれ、組織間では独立していることのテスト"""
+        pool = OrganizationPool(max_requests_per_org=2)
+
+        peak = self._max_concurrency(pool, ["org1", "org2"])
+
+        assert peak == {"org1": 2, "org2": 2}
+        assert pool.stats()["organizations"] == 2
+
+    def test_zero_disables_limit(self):
+        """上限0の場合は同時リクエスト数を制限しないことのテスト"""
+        pool = OrganizationPool(max_requests_per_org=0)
+
+        peak = self._max_concurrency(pool, ["org"])
+
+        assert peak["org"] > 2
@@ -0,0 +1,114 @@
+import os
+import pytest
+from azure_arbiter import AzureReposArbiter
+from disk_blob_store import DiskBlobStore, zstandard
+from replay_client import ReplayAzureReposClient, generate_fixture
+
+OID_A = "a" * 40
+OID_B = "b" * 40
+OID_C = "c" * 40
+
+
+class TestDiskBlobStore:
+    """DiskBlobStoreのユニットテスト"""
+
+    def test_small_blob_is_compressed(self, tmp_path):
+        """小さなblobは圧縮して保存され、同じ内容が読み出せることのテスト"""
+        store = DiskBlobStore(str(tmp_path))
+        content = "public class A {}\n" * 100
+
+        store.put(OID_A, content)
+
+        assert store.get(OID_A) == content
+        assert os.path.exists(tmp_path / "objects" / "aa" / (OID_A[2:] + ".zlib"))
+        assert store.stats()["bytes"] < len(content)
+
+    def test_large_blob_is_stored_raw(self, tmp_path):
+        """raw_threshold以上のblobは無圧縮で保存され、同じ内容が読み出せることのテスト"""
+        store = DiskBlobStore(str(tmp_path), raw_threshold=1024)
+        content = "".join(f"line {i}\n" for i in range(1000))
+        store.put(OID_A, content)
+
+        assert (tmp_path / "objects" / "aa" / (OID_A[2:] + ".raw")).read_bytes() == content.encode("utf-8")
+        assert store.get(OID_A) == content
+        assert store.stats()["raw_entries"] == 1
+
+    def test_invalid_object_id_is_ignored(self, tmp_path):
+        """objectIdとして不正な値はパスに使われず保存されないことのテスト"""
+        store = DiskBlobStore(str(tmp_path))
+
+        store.put("../../etc/passwd", "x")
+
+        assert store.get("../../etc/passwd") is None
+        assert store.stats()["entries"] == 0
+
+    def test_lru_eviction_by_size(self, tmp_path):
+        """合計サイズが上限を超えた場合に最終アクセスが古いblobから削除されることのテスト"""
+        store = DiskBlobStore(str(tmp_path), compression="none", raw_threshold=0, max_bytes=250)
+        store.put(OID_A, "a" * 100)
+        store.put(OID_B, "b" * 100)
+        store.get(OID_A)
+
+        store.put(OID_C, "c" * 100)
+
+        assert store.contains(OID_A)
+        assert not store.contains(OID_B)
+        assert store.contains(OID_C)
+        assert store.stats()["evictions"] == 1
+
+    def test_reopen_keeps_blobs(self, tmp_path):
+        """再作成したストアが保存済みのblobを読み出せることのテスト"""
+        DiskBlobStore(str(tmp_path)).put(OID_A, "content")
+        (tmp_path / "objects" / "aa" / "partial.zlib.1.2.tmp").write_bytes(b"x")
+
+        store = DiskBlobStore(str(tmp_path))
+
+        assert store.get(OID_A) == "content"
+        assert store.stats()["entries"] == 1
+        assert not (tmp_path / "objects" / "aa" / "partial.zlib.1.2.tmp").exists()
+
+    def test_compact_recompresses_and_evicts(self, tmp_path):
+        """compactが設定と異なる形式のblobを再圧縮し、上限までの削除を行うことのテスト"""
+        raw = DiskBlobStore(str(tmp_path), compression="none", raw_threshold=0)
+        raw.put(OID_A, "x" * 10000)
+        raw.put(OID_B, "y" * 10000)
+
+        store = DiskBlobStore(str(tmp_path), compression="zlib")
+        result = store.compact()
+
+        assert result["rewritten"] == 2
+        assert result["bytes_after"] < result["bytes_before"]
+        assert store.get(OID_A) == "x" * 10000
+
+        result = store.compact(max_bytes=store.stats()["bytes"] - 1)
+        assert result["removed"] == 1
+        assert store.stats()["entries"] == 1
+
+    def test_zstd_requires_package(self, tmp_path):
+        """zstdは zstandard パッケージがある場合のみ使用できることのテスト"""
+        if zstandard is None:
+            with pytest.raises(ValueError):
+                DiskBlobStore(str(tmp_path), compression="zstd")
+            return
+        store = DiskBlobStore(str(tmp_path), compression="zstd")
+        store.put(OID_A, "content" * 100)
+        assert store.get(OID_A) == "content" * 100
+
+
+class TestClientBlobStore:
+    """AzureReposClientとDiskBlobStoreの連携のテスト"""
+
+    def test_blob_store_survives_new_client(self, tmp_path):
+        """新しいクライアント（空のblob_cache）でも、ディスクに保存済みのblobはAPIを呼ばずに読み出せることのテスト"""
+        fixture_dir = str(tmp_path / "fixture")
+        generate_fixture(fixture_dir, "small", pr_id=1)
+        store = DiskBlobStore(str(tmp_path / "blobs"))
+
+        first = ReplayAzureReposClient(fixture_dir, blob_store=store)
+        expected = AzureReposArbiter(first).get_pull_request_unified_diff("o", "p", "r", 1)
+        second = ReplayAzureReposClient(fixture_dir, blob_store=DiskBlobStore(str(tmp_path / "blobs")))
+        diff = AzureReposArbiter(second).get_pull_request_unified_diff("o", "p", "r", 1)
+
+        assert diff == expected
+        assert first.request_counts["get_item_content"] > 0
+        assert second.request_counts["get_item_content"] == 0
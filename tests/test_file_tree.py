@@ -0,0 +1,75 @@
+import pytest
+from azure_arbiter import AzureReposArbiter
+from file_tree import FileTree, FileTreeCache
+from replay_client import ReplayAzureReposClient, generate_fixture
+
+PATHS = ["/Assets/a.cs", "/Assets/a.cs.meta", "/Assets/Sub/b.cs", "/Assets-Old/c.cs", "/README.md"]
+
+
+@pytest.fixture(scope="module")
+def fixture_dir(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("tree"))
+    generate_fixture(path, "small", pr_id=1)
+    return path
+
+
+class TestFileTree:
+    """FileTreeのユニットテスト"""
+
+    def test_contains_and_is_dir(self):
+        """ファイルの存在確認とディレクトリの判定のテスト（先頭の "/" は省略可能）"""
+        tree = FileTree(PATHS)
+
+        assert "/Assets/a.cs" in tree
+        assert "Assets/Sub/b.cs" in tree
+        assert "/Assets/missing.cs" not in tree
+        assert tree.is_dir("/Assets") and tree.is_dir("Assets/Sub/")
+        assert not tree.is_dir("/Assets/a.cs")
+
+    def test_list_directory_is_recursive_and_exact(self):
+        """ディレクトリ以下を再帰的に列挙し、同じ接頭辞の別ディレクトリは含めないことのテスト"""
+        tree = FileTree(PATHS)
+
+        assert tree.list("/Assets") == (["/Assets/Sub/b.cs", "/Assets/a.cs", "/Assets/a.cs.meta"], False)
+        assert tree.list("/")[0] == sorted(PATHS)
+
+    def test_list_with_pattern_and_limit(self):
+        """globによる絞り込みとmax_resultsによる打ち切りのテスト"""
+        tree = FileTree(PATHS)
+
+        assert tree.list(pattern="*.cs")[0] == ["/Assets-Old/c.cs", "/Assets/Sub/b.cs", "/Assets/a.cs"]
+        assert tree.list(pattern="Assets/Sub/*")[0] == ["/Assets/Sub/b.cs"]
+        assert tree.list(max_results=2) == (["/Assets-Old/c.cs", "/Assets/Sub/b.cs"], True)
+
+    def test_cache_evicts_oldest(self):
+        """上限を超えると最終アクセスが古いツリーから追い出されることのテスト"""
+        cache = FileTreeCache(max_entries=2)
+        cache.put("a", FileTree(["/a"]))
+        cache.put("b", FileTree(["/b"]))
+        cache.get("a")
+        cache.put("c", FileTree(["/c"]))
+
+        assert cache.peek("b") is None
+        assert cache.stats()["entries"] == 2
+
+
+class TestArbiterListFiles:
+    """AzureReposArbiter.list_filesのテスト"""
+
+    def test_listing_is_fetched_once_per_commit(self, fixture_dir):
+        """同じコミットの一覧と存在確認はAPIを再度呼び出さないことのテスト"""
+        client = ReplayAzureReposClient(fixture_dir)
+        arbiter = AzureReposArbiter(client)
+        commit_id = client.get_pull_request("o", "p", "r", 1)["last_merge_source_commit"]["commit_id"]
+
+        listing = arbiter.list_files("o", "p", "r", commit_id, path="/Assets/Scripts", pattern="*.cs")
+        again = arbiter.list_files("o", "p", "r", commit_id, pattern="*.meta", max_results=1)
+        missing = client.get_file_content_at_commit("o", "p", "r", "/Assets/Scripts/Missing.cs", commit_id)
+
+        assert listing["commit_id"] == commit_id
+        assert "/Assets/Scripts/Module0/Component0.cs" in listing["files"]
+        assert not any(path.endswith(".meta") for path in listing["files"])
+        assert again["truncated"] and len(again["files"]) == 1
+        assert missing == ""
+        assert client.request_counts["get_items"] == 1
+        assert client.request_counts["get_item_content"] == 0
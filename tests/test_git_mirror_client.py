@@ -0,0 +1,213 @@
+import os
+import subprocess
+import pytest
+from azure_arbiter import AzureReposArbiter
+from client import AzureReposClient
+from git_mirror_client import GitMirrorClient
+
+GIT_ENV = dict(
+    os.environ,
+    GIT_AUTHOR_NAME="test", GIT_AUTHOR_EMAIL="test@example.com",
+    GIT_COMMITTER_NAME="test", GIT_COMMITTER_EMAIL="test@example.com",
+)
+
+RENAMED_BODY = "".join(f"    // line {i}\n" for i in range(40))
+
+
+def git(cwd, *args) -> str:
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, env=GIT_ENV, text=True).stdout.strip()
+
+
+def write(repo, path, content):
+    full_path = os.path.join(repo, path)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    with open(full_path, "w") as f:
+        f.write(content)
+
+
+class FakeApiClient(AzureReposClient):
+    """PRのメタデータだけを返し、APIの呼び出しを記録するクライアント"""
+
+    def __init__(self, pr):
+        super().__init__("pat")
+        self.pr = pr
+        self.calls = []
+
+    def get_pull_request(self, organization, project, repo_id, pr_id):
+        self.calls.append("get_pull_request")
+        return dict(self.pr)
+
+    def get_commit_diffs(self, organization, project, repo_id, source_commit, target_commit):
+        self.calls.append("get_commit_diffs")
+        return {"changes": []}
+
+    def _fetch_item_content(self, organization, project, repo_id, path, version=None, version_type=None):
+        self.calls.append("get_item_content")
+        raise FileNotFoundError(path)
+
+
+@pytest.fixture
+def upstream(tmp_path):
+    """main と feature/x ブランチを持つローカルのリポジトリ"""
+    repo = str(tmp_path / "upstream")
+    git(tmp_path, "init", "--quiet", "-b", "main", repo)
+    write(repo, "Assets/Edit.cs", "class Edit\n{\n    int a = 1;\n}\n")
+    write(repo, "Assets/Delete.cs", "class Delete {}\n")
+    write(repo, "Assets/Old.cs", "class Moved\n{\n" + RENAMED_BODY + "}\n")
+    write(repo, "Assets/Edit.cs.meta", "guid: 1\n")
+    git(repo, "add", "-A")
+    git(repo, "commit", "--quiet", "-m", "base")
+    git(repo, "checkout", "--quiet", "-b", "feature/x")
+    write(repo, "Assets/Edit.cs", "class Edit\n{\n    int a = 2;\n}\n")
+    write(repo, "Assets/Add.cs", "class Add {}\n")
+    os.remove(os.path.join(repo, "Assets/Delete.cs"))
+    git(repo, "mv", "Assets/Old.cs", "Assets/New.cs")
+    write(repo, "Assets/New.cs", "class Moved\n{\n" + RENAMED_BODY + "    // added\n}\n")
+    git(repo, "add", "-A")
+    git(repo, "commit", "--quiet", "-m", "feature")
+    return repo
+
+
+def make_pr(repo):
+    return {
+        "pull_request_id": 1,
+        "title": "Feature",
+        "status": "active",
+        "source_ref_name": "refs/heads/feature/x",
+        "target_ref_name": "refs/heads/main",
+        "last_merge_source_commit": {"commit_id": git(repo, "rev-parse", "feature/x")},
+        "last_merge_target_commit": {"commit_id": git(repo, "rev-parse", "main")},
+    }
+
+
+@pytest.fixture
+def mirror_client(upstream, tmp_path):
+    api_client = FakeApiClient(make_pr(upstream))
+    client = GitMirrorClient(api_client, str(tmp_path / "mirrors"), remote_url=lambda *key: upstream)
+    yield client
+    client.close()
+
+
+class TestGitMirrorClient:
+    """GitMirrorClientのテスト（ローカルに作成したリポジトリをフェッチ元とする）"""
+
+    def test_commit_diffs_from_mirror(self, mirror_client):
+        """コミット差分がAPIと同じ形式でミラーから生成されることのテスト"""
+        pr = mirror_client.get_pull_request("o", "p", "r", 1)
+        source = pr["last_merge_source_commit"]["commit_id"]
+        target = pr["last_merge_target_commit"]["commit_id"]
+
+        diffs = mirror_client.get_commit_diffs("o", "p", "r", source, target)
+        changes = {c["item"]["path"]: c for c in diffs["changes"]}
+
+        assert changes["/Assets/Edit.cs"]["changeType"] == "edit"
+        assert changes["/Assets/Add.cs"]["changeType"] == "add"
+        assert "originalObjectId" not in changes["/Assets/Add.cs"]["item"]
+        assert changes["/Assets/Delete.cs"]["changeType"] == "delete"
+        assert "objectId" not in changes["/Assets/Delete.cs"]["item"]
+        assert changes["/Assets/New.cs"]["changeType"] == "edit, rename"
+        assert changes["/Assets/New.cs"]["sourceServerItem"] == "/Assets/Old.cs"
+        assert diffs["common_commit"] == target
+        assert mirror_client.api_client.calls == ["get_pull_request"]
+
+    def test_arbiter_reads_contents_from_mirror(self, mirror_client):
+        """アービターを変更せずに、ファイル内容をAPIを呼ばずにミラーから読み出せることのテスト
+
+        サーバー側の行差分ブロックの閾値を指定しても、ミラーのクライアントではdifflibで比較します。
+        """
+        arbiter = AzureReposArbiter(mirror_client, server_diff_threshold=1)
+        assert not arbiter._use_server_diff("old\n", "new\n")
+
+        diff = arbiter.get_pull_request_unified_diff("o", "p", "r", 1)
+        stats = arbiter.get_pull_request_diff_stats("o", "p", "r", 1)
+
+        assert "\n-    int a = 1;" in diff and "\n+    int a = 2;" in diff
+        assert "\n+class Add {}" in diff
+        assert "\n-class Delete {}" in diff
+        assert "rename from Assets/Old.cs\nrename to Assets/New.cs\n" in diff
+        assert "\n+    // added" in diff
+        assert {f["path"]: f["status"] for f in stats["files"]} == {
+            "/Assets/Edit.cs": "modified",
+            "/Assets/Add.cs": "added",
+            "/Assets/Delete.cs": "deleted",
+            "/Assets/New.cs": "renamed",
+        }
+        assert set(mirror_client.api_client.calls) == {"get_pull_request"}
+
+    def test_fetches_only_when_commits_change(self, mirror_client, upstream):
+        """PRのコミットがミラーにある間は再フェッチせず、ソースが更新されたときだけフェッチすることのテスト"""
+        mirror_client.get_pull_request("o", "p", "r", 1)
+        mirror_client.get_pull_request("o", "p", "r", 1)
+        assert mirror_client.stats() == {"mirrors": 1, "fetches": 1}
+
+        write(upstream, "Assets/Add.cs", "class Add { int b; }\n")
+        git(upstream, "commit", "--quiet", "-am", "update")
+        mirror_client.api_client.pr = make_pr(upstream)
+        pr = mirror_client.get_pull_request("o", "p", "r", 1)
+
+        assert mirror_client.stats()["fetches"] == 2
+        assert mirror_client.get_file_content_at_commit(
+            "o", "p", "r", "/Assets/Add.cs", pr["last_merge_source_commit"]["commit_id"]
+        ) == "class Add { int b; }\n"
+
+    def test_tree_from_mirror(self, mirror_client):
+        """コミットのファイル一覧をミラーから取得することのテスト"""
+        pr = mirror_client.get_pull_request("o", "p", "r", 1)
+
+        _, tree = mirror_client.get_tree("o", "p", "r", pr["last_merge_source_commit"]["commit_id"])
+
+        assert tree.paths == ["/Assets/Add.cs", "/Assets/Edit.cs", "/Assets/Edit.cs.meta", "/Assets/New.cs"]
+
+    def test_blobs_from_mirror(self, mirror_client):
+        """ファイル一覧のobjectIdとblobの内容を、APIを呼ばずにミラーからまとめて読み出すことのテスト"""
+        pr = mirror_client.get_pull_request("o", "p", "r", 1)
+
+        blob_ids = mirror_client.get_tree_blob_ids("o", "p", "r", pr["last_merge_source_commit"]["commit_id"])
+        contents = mirror_client.get_blobs("o", "p", "r", list(blob_ids.values()))
+
+        assert sorted(blob_ids) == ["/Assets/Add.cs", "/Assets/Edit.cs", "/Assets/Edit.cs.meta", "/Assets/New.cs"]
+        assert contents[blob_ids["/Assets/Add.cs"]] == "class Add {}\n"
+        assert mirror_client.api_client.calls == ["get_pull_request"]
+
+    def test_missing_path_is_empty(self, mirror_client):
+        """ミラーにあるコミットに存在しないパスは、APIを呼ばずに空文字列になることのテスト"""
+        pr = mirror_client.get_pull_request("o", "p", "r", 1)
+
+        content = mirror_client.get_file_content_at_commit(
+            "o", "p", "r", "/Assets/Add.cs", pr["last_merge_target_commit"]["commit_id"]
+        )
+
+        assert content == ""
+        assert "get_item_content" not in mirror_client.api_client.calls
+
+    def test_unreachable_remote_falls_back_to_api(self, upstream, tmp_path):
+        """フェッチできずコミットがミラーにない場合は、APIからコミット差分を取得することのテスト"""
+        api_client = FakeApiClient(make_pr(upstream))
+        client = GitMirrorClient(api_client, str(tmp_path / "mirrors"), remote_url=lambda *key: str(tmp_path / "missing"))
+        pr = client.get_pull_request("o", "p", "r", 1)
+
+        client.get_commit_diffs(
+            "o", "p", "r", pr["last_merge_source_commit"]["commit_id"], pr["last_merge_target_commit"]["commit_id"]
+        )
+        client.close()
+
+        assert api_client.calls == ["get_pull_request", "get_commit_diffs"]
+        assert client.stats()["fetches"] == 0
+
+    def test_clients_share_mirror_per_path(self, upstream, tmp_path):
+        """同じリポジトリのミラーは、PATの異なるクライアントの間で1つのインスタンスとロックを共有することのテスト"""
+        clients = [
+            GitMirrorClient(FakeApiClient(make_pr(upstream)), str(tmp_path / "mirrors"), remote_url=lambda *key: upstream)
+            for _ in range(2)
+        ]
+        clients[1].pat = "other"
+
+        mirrors = [client._get_mirror("o", "p", "r") for client in clients]
+        for client in clients:
+            client.get_pull_request("o", "p", "r", 1)
+        for client in clients:
+            client.close()
+
+        assert mirrors[0] is mirrors[1]
+        # 2つ目のクライアントは1つ目がフェッチしたコミットを再フェッチしない
+        assert mirrors[0].fetches == 1
@@ -0,0 +1,207 @@
+import hashlib
+from collections import Counter
+import pytest
+from azure_arbiter import AzureReposArbiter
+from client import AzureReposClient
+from guid_index import GuidIndex, annotate_guids, parse_meta_guid
+
+GUID_A = "a" * 32
+GUID_B = "b" * 32
+GUID_C = "c" * 32
+MAIN1, MAIN2, FEATURE = "1" * 40, "2" * 40, "3" * 40
+
+
+def meta(guid):
+    return f"fileFormatVersion: 2\nguid: {guid}\nTextureImporter:\n"
+
+
+def prefab(*guids):
+    return "".join(f"  m_Sprite: {{fileID: 21300000, guid: {guid}, type: 3}}\n" for guid in guids)
+
+
+# MAIN1 -> MAIN2 -> FEATURE（FEATURE はPRのソース、MAIN2 はターゲット）
+COMMITS = {
+    MAIN1: {"/A.png.meta": meta(GUID_A), "/B.png.meta": meta(GUID_B), "/Hero.prefab": prefab(GUID_A)},
+    MAIN2: {"/A.png.meta": meta(GUID_A), "/Moved/B.png.meta": meta(GUID_B), "/Hero.prefab": prefab(GUID_A)},
+    FEATURE: {"/Moved/B.png.meta": meta(GUID_B), "/C.png.meta": meta(GUID_C), "/Hero.prefab": prefab(GUID_B, GUID_C, GUID_A)},
+}
+PARENTS = {MAIN2: MAIN1, FEATURE: MAIN2}
+
+
+def object_id(content):
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+
+BLOBS = {object_id(content): content for files in COMMITS.values() for content in files.values()}
+
+
+class FakeUnityClient(AzureReposClient):
+    """コミットごとのファイル内容を辞書で持ち、コミット差分を計算して返すクライアント"""
+
+    def __init__(self, incomplete=(), missing=()):
+        """
+        Args:
+            incomplete: 一部の変更しか含まない（allChangesIncluded: false）差分を返す (source, target) の組
+            missing: 取得に失敗するblobのobjectId
+        """
+        super().__init__("pat")
+        self.calls = Counter()
+        self.incomplete = set(incomplete)
+        self.missing = set(missing)
+
+    def get_pull_request(self, organization, project, repo_id, pr_id):
+        return {"last_merge_source_commit": {"commit_id": FEATURE}, "last_merge_target_commit": {"commit_id": MAIN2}}
+
+    def get_commit_diffs(self, organization, project, repo_id, source_commit, target_commit):
+        self.calls["get_commit_diffs"] += 1
+        # target_commit が source_commit の祖先の場合のみ、target_commit をマージベースとする
+        base, commit = None, source_commit
+        while commit is not None:
+            if commit == target_commit:
+                base = target_commit
+            commit = PARENTS.get(commit)
+        before, after = COMMITS[base or target_commit], COMMITS[source_commit]
+        changes = []
+        for path in sorted(set(before) | set(after)):
+            if path not in after:
+                changes.append({"changeType": "delete", "item": {"path": path, "gitObjectType": "blob"}})
+            elif path not in before:
+                changes.append({"changeType": "add", "item": {"path": path, "gitObjectType": "blob", "objectId": object_id(after[path])}})
+            elif before[path] != after[path]:
+                changes.append({"changeType": "edit", "item": {"path": path, "gitObjectType": "blob", "objectId": object_id(after[path])}})
+        all_changes_included = (source_commit, target_commit) not in self.incomplete
+        if not all_changes_included:
+            changes = changes[:1]
+        return {"changes": changes, "common_commit": base, "all_changes_included": all_changes_included}
+
+    def _fetch_tree_paths(self, organization, project, repo_id, commit_id):
+        self.calls["get_items"] += 1
+        return list(COMMITS[commit_id])
+
+    def _fetch_tree_blob_ids(self, organization, project, repo_id, commit_id):
+        self.calls["get_items"] += 1
+        return {path: object_id(content) for path, content in COMMITS[commit_id].items()}
+
+    def _fetch_blobs(self, organization, project, repo_id, object_ids):
+        self.calls["get_blobs"] += 1
+        self.calls["blobs"] += len(object_ids)
+        return {oid: BLOBS[oid] for oid in object_ids if oid not in self.missing}
+
+    def _fetch_item_content(self, organization, project, repo_id, path, version=None, version_type=None):
+        self.calls[path] += 1
+        return COMMITS[version][path]
+
+
+class TestGuidIndex:
+    """GuidIndexと注記のユニットテスト"""
+
+    def test_parse_meta_guid(self):
+        """.metaファイルからGUIDを取得し、GUIDがない内容ではNoneを返すことのテスト"""
+        assert parse_meta_guid(meta(GUID_A)) == GUID_A
+        assert parse_meta_guid("fileFormatVersion: 2\n") is None
+
+    def test_set_and_remove(self):
+        """.metaの追加・GUIDの変更・削除が索引に反映され、複製が元の索引に影響しないことのテスト"""
+        index = GuidIndex()
+        index.set_meta("/A.png.meta", meta(GUID_A))
+        copy = index.copy()
+        index.set_meta("/A.png.meta", meta(GUID_B))
+
+        assert index.get(GUID_A) is None
+        assert index.get(GUID_B) == "/A.png"
+        assert copy.get(GUID_A) == "/A.png"
+        index.remove_meta("/A.png.meta")
+        assert len(index) == 0
+
+    def test_annotate_guids(self):
+        """差分に現れるGUIDを1度ずつ注記し、変更前にしかないものには (deleted) を付けることのテスト"""
+        source, target = GuidIndex(), GuidIndex()
+        source.set_meta("/New.png.meta", meta(GUID_A))
+        target.set_meta("/Old.png.meta", meta(GUID_B))
+        diff = "--- a/Hero.prefab\n+++ b/Hero.prefab\n@@ -1 +1 @@\n" + "-" + prefab(GUID_B) + "+" + prefab(GUID_A) + " " + prefab(GUID_A, GUID_C)
+
+        annotated = annotate_guids(diff, source, target)
+
+        assert annotated == diff + f"# Unity GUIDs:\n#   {GUID_B}: Old.png (deleted)\n#   {GUID_A}: New.png\n"
+        assert annotate_guids("--- a/x.cs\n+++ b/x.cs\n", source, target) == "--- a/x.cs\n+++ b/x.cs\n"
+
+
+class TestArbiterGuidAnnotation:
+    """AzureReposArbiterのGUIDの注記のテスト"""
+
+    def test_diff_is_annotated(self):
+        """ターゲットの索引にPRの.metaの変更を反映して、prefabの差分のGUIDが注記されることのテスト"""
+        arbiter = AzureReposArbiter(FakeUnityClient())
+
+        diff = arbiter.get_pull_request_unified_diff("o", "p", "r", 1, annotate_unity_guids=True)
+
+        assert f"#   {GUID_B}: Moved/B.png\n" in diff
+        assert f"#   {GUID_C}: C.png\n" in diff
+        assert f"#   {GUID_A}: A.png (deleted)\n" in diff
+        assert "# Unity GUIDs:" not in arbiter.get_pull_request_unified_diff("o", "p", "r", 1)
+
+    def test_index_is_updated_incrementally(self):
+        """祖先のコミットの索引があれば、全.metaを取得せずに間の変更だけを反映することのテスト"""
+        client = FakeUnityClient()
+        arbiter = AzureReposArbiter(client)
+
+        full = arbiter._get_guid_index("o", "p", "r", MAIN1)
+        fetched = client.calls["blobs"]
+        updated = arbiter._get_guid_index("o", "p", "r", MAIN2)
+
+        assert full.get(GUID_B) == "/B.png"
+        assert fetched == 2
+        assert updated.get(GUID_B) == "/Moved/B.png"
+        assert updated.get(GUID_A) == "/A.png"
+        assert client.calls["get_items"] == 1
+        # 移動した.metaは内容が同じため、blob_cacheから取得される
+        assert client.calls["blobs"] == 2
+        assert arbiter._get_guid_index("o", "p", "r", MAIN2) is updated
+
+    def test_index_is_built_with_bulk_fetch(self):
+        """全.metaを1回のファイル一覧と1回のblobの一括取得で索引にし、.meta以外は取得しないことのテスト"""
+        client = FakeUnityClient()
+
+        index = AzureReposArbiter(client)._get_guid_index("o", "p", "r", FEATURE)
+
+        assert index.get(GUID_B) == "/Moved/B.png"
+        assert index.get(GUID_C) == "/C.png"
+        assert client.calls["get_items"] == 1
+        assert client.calls["get_blobs"] == 1
+        assert client.calls["blobs"] == 2
+        assert client.calls["/Moved/B.png.meta"] == 0
+
+    def test_fetch_error_does_not_cache_partial_index(self):
+        """.metaを取得できない場合は例外を送出し、不完全な索引を保持しないことのテスト"""
+        client = FakeUnityClient(missing={object_id(meta(GUID_B))})
+        arbiter = AzureReposArbiter(client)
+
+        with pytest.raises(FileNotFoundError):
+            arbiter._get_guid_index("o", "p", "r", MAIN1)
+
+        assert arbiter.guid_indexes.get(("o", "p", "r", MAIN1)) is None
+        client.missing.clear()
+        assert arbiter._get_guid_index("o", "p", "r", MAIN1).get(GUID_B) == "/B.png"
+
+    def test_incomplete_diff_falls_back_to_full_build(self):
+        """間の差分が一部の変更しか含まない場合は、差分を使わずに全.metaから索引を作成することのテスト"""
+        client = FakeUnityClient(incomplete={(MAIN2, MAIN1)})
+        arbiter = AzureReposArbiter(client)
+
+        arbiter._get_guid_index("o", "p", "r", MAIN1)
+        updated = arbiter._get_guid_index("o", "p", "r", MAIN2)
+
+        assert client.calls["get_items"] == 2
+        assert updated.get(GUID_B) == "/Moved/B.png"
+        assert updated.get(GUID_A) == "/A.png"
+
+    def test_incomplete_pull_request_diff_uses_source_index(self):
+        """PRの差分が一部の変更しか含まない場合は、ソースのコミットの索引で変更後のGUIDを注記することのテスト"""
+        client = FakeUnityClient(incomplete={(FEATURE, MAIN2)})
+        arbiter = AzureReposArbiter(client)
+
+        file_diffs = {"/Hero.prefab": "--- a/Hero.prefab\n+++ b/Hero.prefab\n@@ -1 +1 @@\n+" + prefab(GUID_C)}
+        pr = client.get_pull_request("o", "p", "r", 1)
+        annotated = arbiter._annotate_unity_guids("o", "p", "r", pr, 1, FEATURE, MAIN2, file_diffs)
+
+        assert f"#   {GUID_C}: C.png\n" in annotated["/Hero.prefab"]
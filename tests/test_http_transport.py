@@ -0,0 +1,83 @@
+import os
+import socket
+import threading
+import time
+import anyio
+import pytest
+
+os.environ.setdefault("AZURE_DEVOPS_WARMUP", "0")
+
+import uvicorn
+from mcp import ClientSession
+from mcp.client.streamable_http import create_mcp_http_client, streamable_http_client
+
+import main
+from replay_client import ReplayAzureReposClient, generate_fixture
+
+REPOSITORY = {"organization": "org", "project": "proj", "repository_id": "repo"}
+
+
+@pytest.fixture(scope="module")
+def server_url(tmp_path_factory):
+    fixture_dir = str(tmp_path_factory.mktemp("http"))
+    generate_fixture(fixture_dir, "small", pr_id=1)
+    created = []
+
+    def create_client(pat, blob_cache=None, pool=None, session=None):
+        created.append(pat)
+        return ReplayAzureReposClient(fixture_dir, blob_cache=blob_cache)
+
+    original_create_client = main.create_client
+    main.create_client = create_client
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(main.mcp.streamable_http_app(), host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    yield f"http://127.0.0.1:{port}/mcp", created
+    server.should_exit = True
+    thread.join(5)
+    main.create_client = original_create_client
+    with main._registry_lock:
+        main._registries.clear()
+
+
+async def call_tool(url, pat, name, arguments):
+    headers = {main.PAT_HEADER: pat} if pat else {}
+    async with create_mcp_http_client(headers=headers) as http_client:
+        async with streamable_http_client(url, http_client=http_client) as (read, write, _):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                return await session.call_tool(name, arguments)
+
+
+class TestHttpTransport:
+    """streamable-HTTPモードのセッションごとのPATの分離のテスト"""
+
+    def test_sessions_share_registry_per_pat(self, server_url, monkeypatch):
+        """同じPATのセッションはクライアントを共有し、異なるPATのセッションとは共有しないことのテスト"""
+        url, created = server_url
+        monkeypatch.delenv("AZURE_DEVOPS_PAT", raising=False)
+
+        async def run():
+            async with anyio.create_task_group() as group:
+                for pat in ["pat-a", "pat-a", "pat-b"]:
+                    group.start_soon(call_tool, url, pat, "get_pull_request_diff_stats", {"id": 1, **REPOSITORY})
+
+        anyio.run(run)
+
+        assert sorted(created) == ["pat-a", "pat-b"]
+        assert set(main._registries) == {"pat-a", "pat-b"}
+
+    def test_missing_pat_is_rejected(self, server_url, monkeypatch):
+        """PATのヘッダーもAZURE_DEVOPS_PATもない場合はエラーになることのテスト"""
+        url, _ = server_url
+        monkeypatch.delenv("AZURE_DEVOPS_PAT", raising=False)
+
+        result = anyio.run(call_tool, url, None, "get_pull_request", {"id": 1, **REPOSITORY})
+
+        assert result.isError
+        assert main.PAT_HEADER in result.content[0].text
@@ -0,0 +1,159 @@
+import threading
+import time
+import pytest
+from azure_arbiter import AzureReposArbiter
+from prefetcher import BlobPrefetcher
+from memory_budget import MemoryBudget, MemoryReservation
+from replay_client import ReplayAzureReposClient, generate_fixture
+from unified_diff_generator import UnifiedDiffGenerator
+
+
+@pytest.fixture(scope="module")
+def fixture_dir(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("budget"))
+    generate_fixture(path, "small", pr_id=1)
+    return path
+
+
+class TestMemoryBudget:
+    """MemoryBudgetのユニットテスト"""
+
+    def test_reserve_and_release(self):
+        """確保と解放で現在の使用量とピークが更新されることのテスト"""
+        budget = MemoryBudget(max_bytes=100, wait_timeout=0)
+
+        assert budget.reserve(60)
+        assert budget.reserve(40)
+        assert not budget.reserve(1)
+        budget.release(70)
+        stats = budget.stats()
+
+        assert stats["current_bytes"] == 30
+        assert stats["peak_bytes"] == 100
+        assert stats["rejected"] == 1
+
+    def test_oversized_request_is_rejected_without_waiting(self):
+        """1件で予算を超える確保は待たずに失敗することのテスト"""
+        budget = MemoryBudget(max_bytes=100, wait_timeout=10)
+
+        start = time.monotonic()
+        assert not budget.reserve(101)
+
+        assert time.monotonic() - start < 1
+        assert budget.stats()["waits"] == 0
+
+    def test_reserve_waits_for_release(self):
+        """予算に空きがない場合、他スレッドの解放を待ってから確保することのテスト"""
+        budget = MemoryBudget(max_bytes=100, wait_timeout=5)
+        budget.reserve(80)
+        reserved = threading.Event()
+
+        def reserve():
+            if budget.reserve(50):
+                reserved.set()
+
+        thread = threading.Thread(target=reserve)
+        thread.start()
+        time.sleep(0.05)
+        assert not reserved.is_set()
+        budget.release(80)
+        thread.join(5)
+
+        assert reserved.is_set()
+        assert budget.stats()["waits"] == 1
+
+    def test_reservation_releases_on_exit(self):
+        """MemoryReservationがwith文を抜けるときに残りをまとめて解放することのテスト"""
+        budget = MemoryBudget(max_bytes=100, wait_timeout=0)
+
+        with MemoryReservation(budget) as reservation:
+            reservation.reserve(30)
+            reservation.reserve(20)
+            reservation.release(30)
+            assert budget.stats()["current_bytes"] == 20
+
+        assert budget.stats()["current_bytes"] == 0
+        assert not reservation.degraded
+
+
+class TestArbiterMemoryBudget:
+    """AzureReposArbiterのメモリ予算による縮退のテスト"""
+
+    def test_ample_budget_keeps_output(self, fixture_dir):
+        """予算に余裕がある場合は予算なしと同じ差分になり、使用量が0に戻ることのテスト"""
+        budget = MemoryBudget(max_bytes=64 * 1024 * 1024)
+        expected = AzureReposArbiter(ReplayAzureReposClient(fixture_dir)).get_pull_request_unified_diff("o", "p", "r", 1)
+
+        diff = AzureReposArbiter(
+            ReplayAzureReposClient(fixture_dir), memory_budget=budget
+        ).get_pull_request_unified_diff("o", "p", "r", 1)
+
+        assert diff == expected
+        assert budget.stats()["current_bytes"] == 0
+        assert budget.stats()["peak_bytes"] > 0
+
+    def test_exhausted_budget_omits_files(self, fixture_dir):
+        """予算を確保できないファイルは差分を省略したエントリになることのテスト"""
+        budget = MemoryBudget(max_bytes=1, wait_timeout=0)
+        arbiter = AzureReposArbiter(ReplayAzureReposClient(fixture_dir), memory_budget=budget)
+
+        diff = arbiter.get_pull_request_unified_diff("o", "p", "r", 1)
+        stats = arbiter.get_pull_request_diff_stats("o", "p", "r", 1)
+
+        assert UnifiedDiffGenerator.has_omitted_files(diff)
+        assert "+++ b/Assets/Scripts/Module0/Component0.cs\n# Diff omitted: " in diff
+        assert all(f["omitted"] for f in stats["files"] if f["added"] is None)
+        assert stats["total_added"] == 0
+        assert budget.stats()["current_bytes"] == 0
+        assert budget.stats()["rejected"] > 0
+
+    def test_contents_are_reserved_before_fetching(self):
+        """取得前に見積もりを確保するため、同時に取得する呼び出しが予算の上限を超えないことのテスト"""
+        estimate = AzureReposArbiter.CONTENT_SIZE_ESTIMATE
+        budget = MemoryBudget(max_bytes=2 * estimate, wait_timeout=5)
+        in_flight = []
+        lock = threading.Lock()
+
+        class SlowClient:
+            def get_file_content_at_commit(self, organization, project, repo_id, path, commit_id, object_id=None):
+                with lock:
+                    in_flight.append(budget.stats()["current_bytes"])
+                time.sleep(0.02)
+                return "x" * 100
+
+        arbiter = AzureReposArbiter(SlowClient(), memory_budget=budget)
+        change = {"item": {"path": "/a.cs"}}
+
+        def load():
+            with MemoryReservation(budget) as reservation:
+                assert arbiter._load_reserved_contents(reservation, "o", "p", "r", change, "add", "s", "t") == ("", "x" * 100)
+
+        threads = [threading.Thread(target=load) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+
+        assert len(in_flight) == 8
+        assert all(current >= estimate for current in in_flight)
+        assert budget.stats()["peak_bytes"] <= budget.max_bytes
+        assert budget.stats()["current_bytes"] == 0
+
+    def test_prefetch_skips_when_budget_is_full(self, fixture_dir):
+        """予算に空きがない場合、先読みは待たずにファイルを取りやめることのテスト"""
+        budget = MemoryBudget(max_bytes=64 * 1024 * 1024, wait_timeout=5)
+        prefetcher = BlobPrefetcher(max_workers=2)
+        client = ReplayAzureReposClient(fixture_dir)
+        arbiter = AzureReposArbiter(client, prefetcher=prefetcher, memory_budget=budget)
+        budget.reserve(budget.max_bytes)
+        try:
+            pr = client.get_pull_request("o", "p", "r", 1)
+            changes = arbiter._get_commit_diffs("o", "p", "r", pr, 1)["changes"]
+            job = arbiter.prefetch_pull_request_contents("o", "p", "r", pr, 1, changes)
+            assert job.wait(5)
+        finally:
+            budget.release(budget.max_bytes)
+            prefetcher.shutdown()
+
+        assert job.loaded == 0
+        assert client.request_counts["get_item_content"] == 0
@@ -0,0 +1,96 @@
+import threading
+import pytest
+from azure_arbiter import AzureReposArbiter
+from prefetcher import BlobPrefetcher
+from replay_client import ReplayAzureReposClient, generate_fixture
+
+
+@pytest.fixture(scope="module")
+def fixture_dir(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("prefetch"))
+    generate_fixture(path, "small", pr_id=1)
+    return path
+
+
+class TestBlobPrefetcher:
+    """BlobPrefetcherのユニットテスト"""
+    
+    def teardown_method(self):
+        self.prefetcher.shutdown()
+    
+    def test_summary_prefetches_diff_contents(self, fixture_dir):
+        """変更概要の後のUnified Diffが先読みした内容から生成されることのテスト"""
+        self.prefetcher = BlobPrefetcher(max_workers=2)
+        client = ReplayAzureReposClient(fixture_dir)
+        arbiter = AzureReposArbiter(client, prefetcher=self.prefetcher)
+        
+        arbiter.get_pull_request_change_summary("org", "proj", "repo", 1)
+        source_commit, target_commit = arbiter._get_merge_commits(client.get_pull_request("org", "proj", "repo", 1))
+        job = self.prefetcher.get_job(("org", "proj", "repo", 1, source_commit, target_commit))
+        assert job.wait(5)
+        fetched = client.request_counts["get_item_content"]
+        
+        diff = arbiter.get_pull_request_unified_diff("org", "proj", "repo", 1)
+        
+        assert diff
+        assert fetched > 0
+        assert client.request_counts["get_item_content"] == fetched
+        assert self.prefetcher.stats()["loaded"] == 5
+    
+    def test_prefetch_after_shutdown_is_noop(self):
+        """shutdown後のprefetchは例外を送出せず、何も読み込まずに終わることのテスト"""
+        self.prefetcher = BlobPrefetcher(max_workers=1)
+        self.prefetcher.shutdown()
+        loaded = []
+        
+        job = self.prefetcher.prefetch("pr", [lambda: loaded.append(1) or 1, lambda: 1])
+        
+        assert job.wait(0)
+        assert job.cancelled
+        assert job.skipped == 2 and job.loaded == 0
+        assert loaded == []
+    
+    def test_max_bytes_stops_prefetch(self):
+        """読み込んだ合計サイズが上限に達すると残りのファイルを取りやめることのテスト"""
+        self.prefetcher = BlobPrefetcher(max_workers=1, max_bytes=10)
+        
+        job = self.prefetcher.prefetch("pr", [lambda: 6, lambda: 6, lambda: 6])
+        
+        assert job.wait(5)
+        assert job.loaded == 2
+        assert job.skipped == 1
+        assert job.bytes == 12
+    
+    def test_new_job_cancels_oldest(self):
+        """max_jobsを超えると最も古いジョブの未着手の先読みを取りやめることのテスト"""
+        self.prefetcher = BlobPrefetcher(max_workers=1, max_jobs=1)
+        release = threading.Event()
+        started = threading.Event()
+        
+        def blocking() -> int:
+            started.set()
+            release.wait(5)
+            return 1
+        
+        first = self.prefetcher.prefetch("pr1", [blocking, lambda: 1, lambda: 1])
+        started.wait(5)
+        second = self.prefetcher.prefetch("pr2", [lambda: 1])
+        release.set()
+        
+        assert first.wait(5) and second.wait(5)
+        assert first.cancelled
+        assert (first.loaded, first.skipped) == (1, 2)
+        assert second.loaded == 1
+        assert self.prefetcher.stats()["cancelled_jobs"] == 1
+    
+    def test_failed_task_is_skipped(self):
+        """読み込みに失敗したファイルは取りやめとして数えられることのテスト"""
+        self.prefetcher = BlobPrefetcher()
+        
+        def fail() -> int:
+            raise RuntimeError("boom")
+        
+        job = self.prefetcher.prefetch("pr", [fail, lambda: 3])
+        
+        assert job.wait(5)
+        assert (job.loaded, job.skipped, job.bytes) == (1, 1, 3)
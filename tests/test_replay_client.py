@@ -0,0 +1,61 @@
+import time
+import pytest
+from azure_arbiter import AzureReposArbiter
+from replay_client import PROFILES, ReplayAzureReposClient, generate_fixture
+
+
+@pytest.fixture(scope="module")
+def fixture_dir(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("replay"))
+    generate_fixture(path, "small", pr_id=1)
+    return path
+
+
+class TestReplayAzureReposClient:
+    """ReplayAzureReposClientと合成フィクスチャのテスト（ネットワーク不要）"""
+    
+    def test_change_summary(self, fixture_dir):
+        """変更概要から.metaファイルとフォルダが除外されることのテスト"""
+        arbiter = AzureReposArbiter(ReplayAzureReposClient(fixture_dir))
+        summary = arbiter.get_pull_request_change_summary("org", "proj", "repo", 1)
+        
+        paths = [change["path"] for change in summary["changes"]]
+        assert len(paths) == PROFILES["small"]["files"]
+        assert not any(path.endswith(".meta") for path in paths)
+        assert {change["status"] for change in summary["changes"]} == {"added", "deleted", "modified", "renamed"}
+    
+    def test_unified_diff(self, fixture_dir):
+        """Unified Diffが生成され、呼び出し回数が記録されることのテスト"""
+        client = ReplayAzureReposClient(fixture_dir)
+        diff = AzureReposArbiter(client).get_pull_request_unified_diff("org", "proj", "repo", 1)
+        
+        assert "--- a/Assets/Scripts/Module0/Component0.cs" in diff
+        assert "@@ " in diff
+        assert client.request_counts["get_pull_request"] == 1
+        assert client.request_counts["get_commit_diffs"] == 1
+        assert client.request_counts["get_item_content"] > 0
+    
+    def test_comments(self, fixture_dir):
+        """システムコメントが除外されることのテスト"""
+        comments = AzureReposArbiter(ReplayAzureReposClient(fixture_dir)).get_comments("org", "proj", "repo", 1)
+        
+        assert len(comments) == PROFILES["small"]["threads"]
+        assert all(c["comment_type"] == "text" for thread in comments for c in thread["comments"])
+    
+    def test_latency(self, fixture_dir):
+        """設定した遅延が呼び出しごとに加えられることのテスト"""
+        client = ReplayAzureReposClient(fixture_dir, latency=0.02, jitter=0.01, seed=1)
+        
+        start = time.perf_counter()
+        client.get_pull_request("org", "proj", "repo", 1)
+        client.get_comments("org", "proj", "repo", 1)
+        
+        assert time.perf_counter() - start >= 0.04
+        assert client.request_count == 2
+    
+    def test_list_pull_requests(self, fixture_dir):
+        """マージ先ブランチでPRを絞り込めることのテスト"""
+        client = ReplayAzureReposClient(fixture_dir)
+        
+        assert [pr["pull_request_id"] for pr in client.list_pull_requests("o", "p", "r", "refs/heads/main")] == [1]
+        assert client.list_pull_requests("o", "p", "r", "refs/heads/other") == []
@@ -0,0 +1,130 @@
+import time
+import pytest
+from response_cache import ResponseCache
+
+
+class TestResponseCache:
+    """ResponseCacheのユニットテスト"""
+    
+    def test_versioned_entry_is_reused_until_version_changes(self):
+        """バージョン付きの応答はバージョンが変わるまで再利用されることのテスト"""
+        cache = ResponseCache(ttl=0)
+        calls = []
+        
+        @cache.cached("diff", version_of=lambda arguments: versions[arguments["id"]])
+        def diff(id: int, ignore_whitespace: bool = False) -> str:
+            calls.append(id)
+            return f"diff {id} {versions[id]}"
+        
+        versions = {1: "c1", 2: "c9"}
+        assert diff(1) == "diff 1 c1"
+        # 既定値を明示した呼び出しも同じキーになる
+        assert diff(id=1, ignore_whitespace=False) == "diff 1 c1"
+        versions[1] = "c2"
+        assert diff(1) == "diff 1 c2"
+        
+        assert calls == [1, 1]
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 2
+    
+    def test_unversioned_entry_expires(self):
+        """バージョンなしの応答はTTL経過後に再計算されることのテスト"""
+        cache = ResponseCache(ttl=0.05)
+        calls = []
+        
+        @cache.cached("content")
+        def content(path: str, version: str = None) -> str:
+            calls.append(path)
+            return path
+        
+        content("/a.cs")
+        content("/a.cs")
+        time.sleep(0.06)
+        content("/a.cs")
+        
+        assert calls == ["/a.cs", "/a.cs"]
+    
+    def test_lru_eviction(self):
+        """最大件数を超えた場合に最も古い応答が追い出されることのテスト"""
+        cache = ResponseCache(max_entries=2)
+        cache.get_or_compute("a", lambda: 1)
+        cache.get_or_compute("b", lambda: 2)
+        cache.get_or_compute("a", lambda: 0)  # aを最近使用したものにする
+        cache.get_or_compute("c", lambda: 3)
+        
+        assert cache.get_or_compute("a", lambda: -1) == 1
+        assert cache.get_or_compute("b", lambda: -2) == -2
+        assert cache.stats()["entries"] == 2
+    
+    def test_byte_limit_eviction(self):
+        """合計サイズが上限を超えた場合に古い応答から追い出され、上限を超える単独の応答は保持されないことのテスト"""
+        cache = ResponseCache(max_bytes=10)
+        cache.get_or_compute("a", lambda: "aaaa")
+        cache.get_or_compute("b", lambda: {"k": 1})  # {"k": 1} はJSONで8文字
+        cache.get_or_compute("c", lambda: "x" * 11)
+        
+        assert cache.stats()["entries"] == 1
+        assert cache.stats()["bytes"] == 8
+        assert cache.get_or_compute("a", lambda: "recomputed") == "recomputed"
+        assert cache.get_or_compute("c", lambda: "y") == "y"
+    
+    def test_exception_is_not_cached(self):
+        """応答の計算で例外が発生した場合は何もキャッシュされないことのテスト"""
+        cache = ResponseCache()
+        
+        def fail():
+            raise RuntimeError("boom")
+        
+        with pytest.raises(RuntimeError):
+            cache.get_or_compute("a", fail)
+        
+        assert cache.get_or_compute("a", lambda: "ok") == "ok"
+        assert cache.stats()["entries"] == 1
+    
+    def test_wrapper_keeps_signature(self):
+        """デコレーター適用後もシグネチャとdocstringが元の関数のままであることのテスト"""
+        import inspect
+        cache = ResponseCache()
+        
+        @cache.cached("tool")
+        def tool(id: int, compact: bool = False) -> dict:
+            """Tool docstring."""
+            return {}
+        
+        assert list(inspect.signature(tool).parameters) == ["id", "compact"]
+        assert tool.__doc__ == "Tool docstring."
+    
+    def test_scope_separates_callers(self):
+        """scopeが異なる呼び出し元の間で応答が共有されないことのテスト"""
+        caller = {"scope": "pat-a"}
+        cache = ResponseCache(scope=lambda: caller["scope"])
+        calls = []
+        
+        @cache.cached("content")
+        def content(path: str) -> str:
+            calls.append(caller["scope"])
+            return f"{caller['scope']}:{path}"
+        
+        assert content("/a.cs") == "pat-a:/a.cs"
+        caller["scope"] = "pat-b"
+        assert content("/a.cs") == "pat-b:/a.cs"
+        caller["scope"] = "pat-a"
+        assert content("/a.cs") == "pat-a:/a.cs"
+        
+        assert calls == ["pat-a", "pat-b"]
+    
+    def test_uncacheable_response_is_recomputed(self):
+        """cacheableが偽を返す応答は登録されないことのテスト"""
+        cache = ResponseCache()
+        calls = []
+        
+        @cache.cached("diff", cacheable=lambda value: "omitted" not in value)
+        def diff(id: int) -> str:
+            calls.append(id)
+            return "omitted" if len(calls) == 1 else "full"
+        
+        assert diff(1) == "omitted"
+        assert diff(1) == "full"
+        assert diff(1) == "full"
+        
+        assert calls == [1, 1]
@@ -0,0 +1,227 @@
+import io
+import zipfile
+import pytest
+from msrest import Deserializer
+from azure.devops.v7_1.git import models
+from rest_client import AzureReposRestClient, to_sdk_dict
+
+SDK_MODELS = {k: v for k, v in models.__dict__.items() if isinstance(v, type)}
+
+PULL_REQUEST_PAYLOAD = {
+    "pullRequestId": 354,
+    "title": "Add feature",
+    "description": "desc",
+    "status": "active",
+    "creationDate": "2024-01-02T03:04:05.123Z",
+    "sourceRefName": "refs/heads/feature",
+    "targetRefName": "refs/heads/main",
+    "lastMergeSourceCommit": {"commitId": "src"},
+    "lastMergeTargetCommit": {"commitId": "tgt"},
+    "repository": {"id": "1", "name": "repo"},
+    "url": "https://example/pr/354",
+}
+
+COMMIT_DIFFS_PAYLOAD = {
+    "changeCounts": {"Edit": 1},
+    "changes": [
+        {
+            "changeType": "edit, rename",
+            "sourceServerItem": "/old.cs",
+            "item": {"path": "/new.cs", "gitObjectType": "blob", "objectId": "n", "originalObjectId": "o"},
+        }
+    ],
+    "commonCommit": "base",
+}
+
+THREADS_PAYLOAD = {
+    "count": 1,
+    "value": [
+        {
+            "id": 7,
+            "publishedDate": "2024-01-02T03:04:05.123Z",
+            "comments": [{"id": 1, "commentType": "text", "content": "LGTM", "author": {"displayName": "dev"}}],
+            "threadContext": {"filePath": "/new.cs", "rightFileStart": {"line": 3, "offset": 1}},
+            "properties": {"CodeReviewThreadType": {"$type": "System.String", "$value": "Vote"}},
+        }
+    ],
+}
+
+ITEMS_PAYLOAD = {
+    "count": 3,
+    "value": [
+        {"path": "/", "isFolder": True, "gitObjectType": "tree"},
+        {"path": "/src", "isFolder": True, "gitObjectType": "tree"},
+        {"path": "/src/new.cs", "gitObjectType": "blob", "objectId": "n"},
+    ],
+}
+
+FILE_DIFFS_PAYLOAD = {
+    "count": 1,
+    "value": [
+        {
+            "path": "/new.cs",
+            "originalPath": "/old.cs",
+            "lineDiffBlocks": [
+                {
+                    "changeType": "edit",
+                    "originalLineNumberStart": 3,
+                    "originalLinesCount": 1,
+                    "modifiedLineNumberStart": 3,
+                    "modifiedLinesCount": 2,
+                }
+            ],
+        }
+    ],
+}
+
+
+class FakeResponse:
+    def __init__(self, payload=None, content=b""):
+        self._payload = payload
+        self.content = content
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._payload
+
+
+class TestToSdkDict:
+    """to_sdk_dictがSDKの as_dict() と同じ形式を返すことのテスト"""
+    
+    @pytest.mark.parametrize("model, payload", [
+        ("GitPullRequest", PULL_REQUEST_PAYLOAD),
+        ("GitCommitDiffs", COMMIT_DIFFS_PAYLOAD),
+        ("GitPullRequestCommentThread", THREADS_PAYLOAD["value"][0]),
+        ("FileDiff", FILE_DIFFS_PAYLOAD["value"][0]),
+    ])
+    def test_matches_sdk_as_dict(self, model, payload):
+        """msrestでのデシリアライズ後の as_dict() と一致することのテスト"""
+        expected = Deserializer(SDK_MODELS)(model, payload).as_dict()
+        
+        assert to_sdk_dict(payload) == expected
+
+
+class TestAzureReposRestClient:
+    """AzureReposRestClientのユニットテスト（HTTPセッションを差し替えて検証）"""
+    
+    def setup_method(self):
+        self.client = AzureReposRestClient("pat")
+        self.requests = []
+        
+        def fake_get(url, params=None, headers=None):
+            self.requests.append((url, params))
+            if url.endswith("/threads"):
+                return FakeResponse(THREADS_PAYLOAD)
+            if url.endswith("/diffs/commits"):
+                return FakeResponse(COMMIT_DIFFS_PAYLOAD)
+            if url.endswith("/items") and "scopePath" in params:
+                return FakeResponse(ITEMS_PAYLOAD)
+            if url.endswith("/items"):
+                return FakeResponse(content="内容\n".encode("utf-8"))
+            if url.endswith("/stats/branches"):
+                return FakeResponse({"name": params["name"], "commit": {"commitId": "a" * 40}})
+            return FakeResponse(PULL_REQUEST_PAYLOAD)
+        
+        self.client.session.get = fake_get
+    
+    def test_get_pull_request_diff(self):
+        """PRのコミット差分がコミットIDを指定して取得されることのテスト"""
+        diff = self.client.get_pull_request_diff("org", "proj", "repo", 354)
+        
+        assert diff["changes"][0]["sourceServerItem"] == "/old.cs"
+        url, params = self.requests[-1]
+        assert url == "https://dev.azure.com/org/proj/_apis/git/repositories/repo/diffs/commits"
+        assert params["baseVersion"] == "tgt"
+        assert params["targetVersion"] == "src"
+    
+    def test_get_comments(self):
+        """コメントスレッドがSDKと同じキー形式で返されることのテスト"""
+        threads = self.client.get_comments("org", "proj", "repo", 354)
+        
+        assert threads[0]["thread_context"]["file_path"] == "/new.cs"
+        assert threads[0]["comments"][0]["comment_type"] == "text"
+    
+    def test_get_file_content_at_commit(self):
+        """コミット指定のファイル内容が取得・キャッシュされることのテスト"""
+        content = self.client.get_file_content_at_commit("org", "proj", "repo", "/new.cs", "src")
+        again = self.client.get_file_content_at_commit("org", "proj", "repo", "/new.cs", "src")
+        
+        assert content == again == "内容\n"
+        assert len(self.requests) == 1
+        assert self.requests[0][1]["versionDescriptor.versionType"] == "commit"
+    
+    def test_get_file_content_resolves_branch(self):
+        """ブランチ指定のファイル内容がコミットIDに解決して取得されることのテスト"""
+        content = self.client.get_file_content("org", "proj", "repo", "/new.cs", "refs/heads/main")
+        again = self.client.get_file_content("org", "proj", "repo", "/new.cs", "refs/heads/main")
+        
+        assert content == again == "内容\n"
+        assert [url.rsplit("/", 1)[-1] for url, _ in self.requests] == ["branches", "items"]
+        assert self.requests[0][1]["name"] == "main"
+        assert self.requests[1][1]["versionDescriptor.version"] == "a" * 40
+    
+    def test_get_tree(self):
+        """コミットのファイル一覧が1回だけ取得され、存在しないパスはAPIを呼ばずに判定されることのテスト"""
+        commit_id, tree = self.client.get_tree("org", "proj", "repo", "b" * 40)
+        content = self.client.get_file_content_at_commit("org", "proj", "repo", "/missing.cs", commit_id)
+        
+        assert tree.paths == ["/src/new.cs"]
+        assert content == ""
+        assert len(self.requests) == 1
+        assert self.requests[0][1]["recursionLevel"] == "Full"
+    
+    def test_get_blobs(self):
+        """blobがzipでまとめて1回のPOSTで取得され、キャッシュ済みのものは再取得しないことのテスト"""
+        posts = []
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, "w") as f:
+            f.writestr("n", "内容\n")
+        
+        def fake_post(url, params=None, json=None, headers=None):
+            posts.append((url, params, json, headers))
+            return FakeResponse(content=archive.getvalue())
+        
+        self.client.session.post = fake_post
+        assert self.client.get_blobs("org", "proj", "repo", ["n"]) == {"n": "内容\n"}
+        assert self.client.get_blobs("org", "proj", "repo", ["n"]) == {"n": "内容\n"}
+        
+        assert len(posts) == 1
+        url, params, body, headers = posts[0]
+        assert url == "https://dev.azure.com/org/proj/_apis/git/repositories/repo/blobs"
+        assert body == ["n"]
+        assert headers["Accept"] == "application/zip"
+        with pytest.raises(FileNotFoundError):
+            self.client.get_blobs("org", "proj", "repo", ["missing"])
+    
+    def test_get_tree_blob_ids(self):
+        """ファイル一覧がobjectIdとともに取得され、get_treeの一覧としても保持されることのテスト"""
+        blob_ids = self.client.get_tree_blob_ids("org", "proj", "repo", "b" * 40)
+        _, tree = self.client.get_tree("org", "proj", "repo", "b" * 40)
+        
+        assert blob_ids == {"/src/new.cs": "n"}
+        assert tree.paths == ["/src/new.cs"]
+        assert len(self.requests) == 1
+    
+    def test_get_file_diffs(self):
+        """行差分ブロックがFileDiffs APIへの1回のPOSTで取得され、SDKと同じキー形式で返されることのテスト"""
+        posts = []
+        
+        def fake_post(url, params=None, json=None, headers=None):
+            posts.append((url, params, json))
+            return FakeResponse(FILE_DIFFS_PAYLOAD)
+        
+        self.client.session.post = fake_post
+        diffs = self.client.get_file_diffs("org", "proj", "repo", "src", "tgt", [("/new.cs", "/old.cs"), ("/add.cs", None)])
+        
+        assert diffs[0]["original_path"] == "/old.cs"
+        assert diffs[0]["line_diff_blocks"][0]["modified_lines_count"] == 2
+        url, params, body = posts[0]
+        assert url == "https://dev.azure.com/org/proj/_apis/git/repositories/repo/filediffs"
+        assert params["api-version"] == "7.1-preview.1"
+        assert body == {
+            "baseVersionCommit": "tgt",
+            "targetVersionCommit": "src",
+            "fileDiffParams": [{"path": "/new.cs", "originalPath": "/old.cs"}, {"path": "/add.cs"}],
+        }
@@ -0,0 +1,93 @@
+import pytest
+from azure_arbiter import AzureReposArbiter
+from replay_client import ReplayAzureReposClient, generate_fixture
+from search_index import SearchIndexCache, TrigramIndex
+
+
+@pytest.fixture(scope="module")
+def fixture_dir(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("search"))
+    generate_fixture(path, "small", pr_id=1)
+    return path
+
+
+class TestTrigramIndex:
+    """TrigramIndexのユニットテスト"""
+
+    def test_search_returns_line_numbers(self):
+        """一致した行の行番号と行全体を返し、同じ行の複数の一致は1件にまとめることのテスト"""
+        index = TrigramIndex()
+        index.add("head", "/a.cs", "class A\n{\n    void Run() { Run(); }\n}\n")
+        index.add("head", "/b.cs", "class B\n{\n}\n")
+
+        matches, truncated = index.search("Run(")
+
+        assert matches == [{"side": "head", "path": "/a.cs", "line": 3, "text": "    void Run() { Run(); }"}]
+        assert not truncated
+
+    def test_case_insensitive_and_short_queries(self):
+        """大文字・小文字を区別しない検索と、トライグラムより短い問い合わせのテスト"""
+        index = TrigramIndex()
+        index.add("head", "/a.cs", "Foo\nfoo\nbar\n")
+
+        assert [m["line"] for m in index.search("FOO", case_sensitive=False)[0]] == [1, 2]
+        assert [m["line"] for m in index.search("FOO")[0]] == []
+        assert [m["line"] for m in index.search("ar")[0]] == [3]
+
+    def test_max_results_and_sides(self):
+        """max_resultsで打ち切り、sidesで検索する側を絞り込めることのテスト"""
+        index = TrigramIndex()
+        index.add("base", "/a.cs", "x = 1\nx = 2\n")
+        index.add("head", "/a.cs", "x = 1\nx = 3\n")
+
+        matches, truncated = index.search("x = ", max_results=3)
+        head_matches, _ = index.search("x = ", sides=("head",))
+
+        assert len(matches) == 3 and truncated
+        assert [m["side"] for m in head_matches] == ["head", "head"]
+
+    def test_cache_trims_oldest_index(self):
+        """合計サイズが上限を超えると古い索引から追い出されることのテスト"""
+        cache = SearchIndexCache(max_bytes=10)
+        cache.get("old").add("head", "/a", "0123456789")
+        cache.get("new").add("head", "/a", "0123456789")
+
+        cache.trim()
+
+        assert cache.stats()["entries"] == 1
+        assert cache.get("new").stats()["files"] == 1
+
+
+class TestArbiterSearch:
+    """AzureReposArbiter.search_pull_requestのテスト"""
+
+    def test_search_reuses_index(self, fixture_dir):
+        """同じPRバージョンへの2回目の検索ではファイルを取得しないことのテスト"""
+        client = ReplayAzureReposClient(fixture_dir)
+        arbiter = AzureReposArbiter(client)
+
+        result = arbiter.search_pull_request("o", "p", "r", 1, "public class Component0")
+        fetched = client.request_count
+        again = arbiter.search_pull_request("o", "p", "r", 1, "Value3()")
+
+        assert result["matches"] == [{
+            "side": "head", "path": "/Assets/Scripts/Module0/Component0.cs", "line": 3,
+            "text": "    public class Component0",
+        }]
+        assert again["files_searched"] == result["files_searched"]
+        assert again["matches"]
+        # 2回目はPR情報とコミット差分の取得のみ
+        assert client.request_count - fetched == 2
+        assert arbiter.search_indexes.stats()["hits"] == 1
+
+    def test_include_base_searches_deleted_files(self, fixture_dir):
+        """include_baseを指定すると、削除されたファイルの変更前の内容も検索することのテスト"""
+        arbiter = AzureReposArbiter(ReplayAzureReposClient(fixture_dir))
+
+        head = arbiter.search_pull_request("o", "p", "r", 1, "class Component2")
+        both = arbiter.search_pull_request("o", "p", "r", 1, "class Component2", include_base=True)
+
+        assert head["matches"] == []
+        assert [(m["side"], m["path"]) for m in both["matches"]] == [
+            ("base", "/Assets/Scripts/Module0/Component2.cs")
+        ]
@@ -0,0 +1,129 @@
+import pytest
+from azure_arbiter import AzureReposArbiter
+from snapshot_store import SnapshotKey, SnapshotStore
+
+
+class CountingClient:
+    """ネットワーク呼び出し回数を数える偽クライアント"""
+    
+    def __init__(self):
+        self.calls = []
+    
+    def get_pull_request(self, organization, project, repo_id, pr_id):
+        self.calls.append("get_pull_request")
+        return {
+            "pull_request_id": pr_id,
+            "last_merge_source_commit": {"commit_id": "src"},
+            "last_merge_target_commit": {"commit_id": "tgt"},
+        }
+    
+    def get_commit_diffs(self, organization, project, repo_id, source_commit, target_commit):
+        self.calls.append("get_commit_diffs")
+        return {"changes": [{"change_type": "edit", "item": {"path": "/a.cs", "git_object_type": "blob"}}]}
+    
+    def get_file_content_at_commit(self, organization, project, repo_id, path, commit_id, object_id=None):
+        self.calls.append("get_file_content_at_commit")
+        return "old\n" if commit_id == "tgt" else "new\n"
+    
+    def get_comments(self, organization, project, repo_id, pr_id):
+        self.calls.append("get_comments")
+        return [{"id": 1, "comments": [{"content": "LGTM", "comment_type": "text"}]}]
+
+
+class TestSnapshotStore:
+    """SnapshotStoreのユニットテスト"""
+    
+    @pytest.fixture
+    def store_path(self, tmp_path):
+        return str(tmp_path / "snapshots.sqlite3")
+    
+    def test_put_and_get(self, store_path):
+        """保存した値を読み出せることのテスト"""
+        store = SnapshotStore(store_path)
+        key = SnapshotKey("org", "proj", "repo", 1, "src", "tgt")
+        store.put(key, "commit_diffs", {"changes": [1, 2]})
+        
+        assert store.get(key, "commit_diffs") == {"changes": [1, 2]}
+        assert store.get(key, "threads") is None
+        assert store.get(key._replace(source_commit="other"), "commit_diffs") is None
+    
+    def test_persists_across_reopen(self, store_path):
+        """再オープン（サーバー再起動）後も値が残ることのテスト"""
+        key = SnapshotKey("org", "proj", "repo", 1, "src", "tgt")
+        store = SnapshotStore(store_path)
+        store.put(key, "file_diffs", {"/a.cs": "diff"})
+        store.close()
+        
+        reopened = SnapshotStore(store_path)
+        assert reopened.get(key, "file_diffs") == {"/a.cs": "diff"}
+        assert reopened.stats()["bytes"] > 0
+    
+    def test_max_age(self, store_path):
+        """max_ageを過ぎた値が返されないことのテスト"""
+        store = SnapshotStore(store_path)
+        key = SnapshotKey("org", "proj", "repo", 1)
+        store.put(key, "threads", [])
+        
+        assert store.get(key, "threads", max_age=60) == []
+        assert store.get(key, "threads", max_age=-1) is None
+    
+    def test_eviction_by_size(self, store_path):
+        """合計サイズが上限を超えると最終アクセスが古い値から削除されることのテスト"""
+        store = SnapshotStore(store_path, max_bytes=400)
+        keys = [SnapshotKey("org", "proj", "repo", i, "src", "tgt") for i in range(10)]
+        for key in keys:
+            # 圧縮されにくい値にして1件あたりのサイズを確保する
+            store.put(key, "file_diffs", {"diff": f"{key.pr_id}" + "".join(chr(33 + (i * 7 + key.pr_id) % 90) for i in range(100))})
+        
+        assert store.stats()["bytes"] <= 400
+        assert store.get(keys[0], "file_diffs") is None
+        assert store.get(keys[-1], "file_diffs") is not None
+
+
+class TestArbiterWithSnapshotStore:
+    """SnapshotStoreを使用したAzureReposArbiterのテスト"""
+    
+    def test_unified_diff_served_from_disk_after_restart(self, tmp_path):
+        """再起動後のUnified Diff取得がPR情報の取得だけで済むことのテスト"""
+        path = str(tmp_path / "snapshots.sqlite3")
+        first = CountingClient()
+        diff = AzureReposArbiter(first, snapshot_store=SnapshotStore(path)).get_pull_request_unified_diff(
+            "org", "proj", "repo", 1
+        )
+        assert "+new" in diff
+        
+        second = CountingClient()
+        restarted = AzureReposArbiter(second, snapshot_store=SnapshotStore(path))
+        
+        assert restarted.get_pull_request_unified_diff("org", "proj", "repo", 1) == diff
+        assert restarted.get_pull_request_change_summary("org", "proj", "repo", 1)["changes"][0]["path"] == "/a.cs"
+        assert second.calls == ["get_pull_request", "get_pull_request"]
+    
+    def test_normalized_changes_are_persisted(self, tmp_path):
+        """正規化した変更一覧をコミットの組ごとに保存し、再起動後はそれを返すことのテスト"""
+        store = SnapshotStore(str(tmp_path / "snapshots.sqlite3"))
+        key = SnapshotKey("org", "proj", "repo", 1, "src", "tgt")
+        summary = AzureReposArbiter(CountingClient(), snapshot_store=store).get_pull_request_change_summary(
+            "org", "proj", "repo", 1
+        )
+        # commit diffsを消しても、正規化した変更一覧から同じ概要を返す
+        store.put(key, "commit_diffs", {"changes": []})
+        second = CountingClient()
+        restarted = AzureReposArbiter(second, snapshot_store=store)
+
+        assert store.get(key, "changes")["changes"][0]["status"] == "modified"
+        assert store.get(key, "pull_request") is None
+        assert restarted.get_pull_request_change_summary("org", "proj", "repo", 1) == summary
+        assert second.calls == ["get_pull_request"]
+
+    def test_comments_served_from_disk(self, tmp_path):
+        """保存済みのコメントスレッドが再利用されることのテスト"""
+        store = SnapshotStore(str(tmp_path / "snapshots.sqlite3"))
+        client = CountingClient()
+        arbiter = AzureReposArbiter(client, snapshot_store=store)
+        
+        first = arbiter.get_comments("org", "proj", "repo", 1)
+        second = arbiter.get_comments("org", "proj", "repo", 1)
+        
+        assert first == second
+        assert client.calls.count("get_comments") == 1
@@ -0,0 +1,43 @@
+import os
+import subprocess
+import sys
+import threading
+import anyio
+
+os.environ.setdefault("AZURE_DEVOPS_WARMUP", "0")
+
+from mcp.server.fastmcp import FastMCP
+from mcp.shared.memory import create_connected_server_and_client_session
+
+import main
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+class TestStartup:
+    """サーバー起動時のazure-devops SDKの遅延読み込みと事前読み込みのテスト"""
+
+    def test_importing_main_does_not_import_sdk(self):
+        """mainのインポートではazure-devops SDKを読み込まないことのテスト（別プロセスで確認）"""
+        code = "import sys, main; print(sorted(m for m in sys.modules if m.startswith('azure.devops')))"
+        result = subprocess.run(
+            [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, timeout=60, check=True
+        )
+
+        assert result.stdout.strip() == "[]"
+
+    def test_warm_up_runs_after_initialization(self, monkeypatch):
+        """initialized通知を受け取った後にSDKの事前読み込みがバックグラウンドで実行されることのテスト"""
+        called = threading.Event()
+        monkeypatch.setattr(main, "warm_up", called.set)
+        server = FastMCP("startup")
+        main.on_initialized(server, main.start_warm_up)
+        assert not called.is_set()
+
+        async def run():
+            async with create_connected_server_and_client_session(server) as session:
+                await session.list_tools()
+
+        anyio.run(run)
+
+        assert called.wait(5)
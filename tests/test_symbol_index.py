@@ -0,0 +1,190 @@
+from collections import Counter
+from azure_arbiter import AzureReposArbiter
+from client import AzureReposClient
+from symbol_index import SymbolIndex, SymbolIndexCache, blob_object_id, enclosing_header, scan_symbols
+from unified_diff_generator import UnifiedDiffGenerator
+
+COMMIT = "4" * 40
+
+SOURCE = """using System;
+namespace Game.Core
+{
+    /// <summary>"{" in a comment</summary>
+    [Serializable]
+    public class Player : MonoBehaviour
+    {
+        private int _hp = 10;
+        public string Name => "}" + _hp;
+
+        public Player(int hp = 3) : base()
+        {
+            _hp = hp;
+        }
+
+        public void Update()
+        {
+            if (_hp > 0) { Debug.Log($"hp {_hp}"); }
+            var target = new Target(1) { Hp = 2 };
+            items.ForEach(item => { Use(item); });
+        }
+
+        public void Update(float delta)
+        {
+            char brace = '}';
+        }
+    }
+}
+"""
+
+
+class FakeFileClient(AzureReposClient):
+    """1つのコミットのファイル内容を返すクライアント"""
+
+    def __init__(self, files):
+        super().__init__("pat")
+        self.files = files
+        self.calls = Counter()
+
+    def _fetch_item_content(self, organization, project, repo_id, path, version=None, version_type=None):
+        self.calls[path] += 1
+        return self.files[path]
+
+
+class TestScanSymbols:
+    """scan_symbolsとSymbolIndexのユニットテスト"""
+
+    def test_declarations_and_ranges(self):
+        """コメント・文字列・制御構文・初期化子・ラムダ式の括弧を除いて、宣言とその範囲を求めることのテスト"""
+        symbols = [(s.kind, s.qualified_name, s.start_line, s.end_line) for s in scan_symbols(SOURCE)]
+
+        assert symbols == [
+            ("namespace", "Game.Core", 2, 28),
+            ("class", "Game.Core.Player", 5, 27),
+            ("property", "Game.Core.Player.Name", 9, 9),
+            ("method", "Game.Core.Player.Player", 11, 14),
+            ("method", "Game.Core.Player.Update", 16, 21),
+            ("method", "Game.Core.Player.Update", 23, 26),
+        ]
+
+    def test_file_scoped_namespace_and_members(self):
+        """ファイルスコープの名前空間・明示的なインターフェイスの実装・演算子・new修飾子のテスト"""
+        content = (
+            "namespace Game;\n"
+            "public struct Point\n"
+            "{\n"
+            "    public new string ToString() { return \"\"; }\n"
+            "    void IFoo.Run<T>(List<Dictionary<int, string>> a) where T : class\n"
+            "    {\n"
+            "    }\n"
+            "    public static Point operator +(Point a, Point b) => a;\n"
+            "}\n"
+        )
+
+        names = [(s.kind, s.qualified_name) for s in scan_symbols(content)]
+
+        assert names == [
+            ("namespace", "Game"),
+            ("struct", "Game.Point"),
+            ("method", "Game.Point.ToString"),
+            ("method", "Game.Point.Run"),
+            ("method", "Game.Point.operator +"),
+        ]
+
+    def test_find(self):
+        """名前・修飾名の末尾による検索（オーバーロードを含む）のテスト"""
+        index = SymbolIndex(scan_symbols(SOURCE))
+
+        assert [s.start_line for s in index.find("Player.Update")] == [16, 23]
+        assert index.find("layer.Update") == []
+
+    def test_enclosing_header_scans_backward(self):
+        """行から遡って、制御構文・初期化子・ラムダ式のブロックを除いた最も内側の宣言の行を求めることのテスト"""
+        lines = SOURCE.splitlines(keepends=True)
+        content = (
+            "namespace Game;\n"
+            "class Loader\n"
+            "{\n"
+            "    [Obsolete(\"{\")]\n"
+            "    public async Task<int> Load(\n"
+            "        string path,\n"
+            "        int retries)\n"
+            "    {\n"
+            "        return 0;\n"
+            "    }\n"
+            "}\n"
+            "// top level\n"
+        )
+
+        assert enclosing_header(lines, 24) == "public void Update(float delta)"
+        assert enclosing_header(lines, 19) == "public void Update()"
+        assert enclosing_header(lines, 17) == "public void Update()"
+        assert enclosing_header(lines, 14) == "public class Player : MonoBehaviour"
+        assert enclosing_header(lines, 1) is None
+        assert enclosing_header(content.splitlines(), 8) == "public async Task<int> Load("
+        assert enclosing_header(content.splitlines(), 11) == "namespace Game;"
+
+    def test_cache_reuses_index_for_same_content(self):
+        """同じ内容（同じblobのobjectId）の2回目の取得では走査せずに索引を返すことのテスト"""
+        cache = SymbolIndexCache(max_entries=1)
+
+        first = cache.get(SOURCE)
+        again = cache.get("".join(SOURCE))
+        cache.get("class Other { }")
+
+        assert again is first
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["entries"] == 1
+        # objectIdを指定した場合は内容のハッシュを求めずにそのキーで引く
+        assert cache.get("class Other { }", object_id=blob_object_id("class Other { }")) is cache.get("class Other { }")
+
+
+class TestFunctionContext:
+    """hunkヘッダーの宣言の行のテスト"""
+
+    def test_hunk_header_names_enclosing_method(self):
+        """C#ファイルのhunkヘッダーに、最初の変更箇所を含む変更前の宣言の行が付くことのテスト"""
+        modified = SOURCE.replace("char brace = '}';", "char brace = '{';")
+
+        diff = UnifiedDiffGenerator().generate_file_diff(SOURCE, modified, "Player.cs")
+        plain = UnifiedDiffGenerator(function_context=False).generate_file_diff(SOURCE, modified, "Player.cs")
+
+        assert "@@ -22,7 +22,7 @@ public void Update(float delta)\n" in diff
+        assert "@@ -22,7 +22,7 @@\n" in plain
+        assert "@@ -22,7 +22,7 @@\n" in UnifiedDiffGenerator().generate_file_diff(SOURCE, modified, "Player.txt")
+
+    def test_insertion_between_methods_names_class(self):
+        """メソッドの間への挿入では、挿入位置の前後を含む型の宣言の行が付くことのテスト"""
+        modified = SOURCE.replace("        }\n\n        public void Update()", "        }\n\n        void Added() { }\n\n        public void Update()")
+
+        diff = UnifiedDiffGenerator().generate_file_diff(SOURCE, modified, "Player.cs")
+
+        assert "@@ public class Player : MonoBehaviour\n" in diff
+
+
+class TestArbiterGetSymbol:
+    """AzureReposArbiter.get_symbolのテスト"""
+
+    def test_returns_only_matching_declarations(self):
+        """一致した宣言の行だけを返し、同じファイルの2回目の検索では索引を再利用することのテスト"""
+        client = FakeFileClient({"/Player.cs": SOURCE})
+        arbiter = AzureReposArbiter(client)
+
+        arbiter.get_symbol("o", "p", "r", "/Player.cs", "Update", version=COMMIT)
+        result = arbiter.get_symbol("o", "p", "r", "/Player.cs", "Player.Player", version=COMMIT)
+
+        assert result["commit_id"] == COMMIT
+        assert result["symbols"] == [{
+            "name": "Game.Core.Player.Player", "kind": "method", "start_line": 11, "end_line": 14,
+            "content": "        public Player(int hp = 3) : base()\n        {\n            _hp = hp;\n        }\n",
+        }]
+        assert arbiter.symbol_indexes.stats()["hits"] == 1
+
+    def test_unknown_name_and_unsupported_file(self):
+        """一致しない名前ではファイル内の宣言の一覧を返し、C#以外のファイルはエラーを返すことのテスト"""
+        arbiter = AzureReposArbiter(FakeFileClient({"/Player.cs": SOURCE}))
+
+        missing = arbiter.get_symbol("o", "p", "r", "/Player.cs", "Missing", version=COMMIT)
+
+        assert missing["symbols"] == []
+        assert "Game.Core.Player.Name" in missing["available"]
+        assert "error" in arbiter.get_symbol("o", "p", "r", "/README.md", "Missing", version=COMMIT)
@@ -0,0 +1,117 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import tracing
+from azure_arbiter import AzureReposArbiter
+from replay_client import ReplayAzureReposClient, generate_fixture
+from tracing import Trace, Tracer
+
+
+@pytest.fixture(scope="module")
+def fixture_dir(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("tracing"))
+    generate_fixture(path, "small", pr_id=1)
+    return path
+
+
+class TestSpans:
+    """スパンの記録と書き出し形式のユニットテスト"""
+
+    def test_span_outside_trace_records_nothing(self):
+        """トレースを開始していないコンテキストでは、span() は何も記録しないことのテスト"""
+        with tracing.span("orphan", path="/a.cs") as span:
+            span.set(bytes=1)
+
+        assert tracing.bind(len) is len
+
+    def test_bind_keeps_parent_across_threads(self):
+        """bindした関数をスレッドプールで実行しても、呼び出し元のスパンが親になることのテスト"""
+        trace = Trace("root")
+
+        with trace.root:
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                def work(index):
+                    with tracing.span("work", index=index):
+                        pass
+                list(executor.map(tracing.bind(work), range(4)))
+
+        work_spans = [s for s in trace.spans if s.name == "work"]
+        assert len(work_spans) == 4
+        assert all(s.parent is trace.root for s in work_spans)
+
+    def test_chrome_trace_and_collapsed_stacks(self):
+        """trace eventの完了イベントとスレッド名、折り畳んだスタックの自身の時間のテスト"""
+        trace = Trace("root", id=1)
+        with trace.root:
+            with tracing.span("child", path="/a.cs") as child:
+                child.set(cache_hit=True)
+                with tracing.span("leaf"):
+                    pass
+            with tracing.span("child"):
+                pass
+
+        events = trace.to_chrome_trace()["traceEvents"]
+        complete = [e for e in events if e["ph"] == "X"]
+        stacks = dict(line.rsplit(" ", 1) for line in trace.to_collapsed_stacks().splitlines())
+
+        assert [e["name"] for e in complete] == ["root", "child", "leaf", "child"]
+        assert complete[0]["ts"] == 0 and complete[0]["args"] == {"id": 1}
+        assert complete[1]["args"] == {"path": "/a.cs", "cache_hit": True}
+        assert any(e["ph"] == "M" and e["name"] == "thread_name" for e in events)
+        assert set(stacks) == {"root", "root;child", "root;child;leaf"}
+
+    def test_error_is_recorded(self):
+        """例外で終了したスパンに例外の型名が記録されることのテスト"""
+        trace = Trace("root")
+        with pytest.raises(KeyError):
+            with trace.root:
+                with tracing.span("failing"):
+                    raise KeyError("x")
+
+        assert [s.attributes for s in trace.spans] == [{"error": "KeyError"}, {"error": "KeyError"}]
+
+    def test_unknown_format(self, tmp_path):
+        """未知の形式を指定するとValueErrorを送出することのテスト"""
+        with pytest.raises(ValueError):
+            Tracer(str(tmp_path), format="otlp")
+
+
+class TestTracerWithArbiter:
+    """Tracerでの差分生成のトレースのテスト"""
+
+    def test_unified_diff_trace(self, fixture_dir, tmp_path):
+        """PR取得・コミット差分・ファイルごとのblob取得と差分生成が入れ子で記録されることのテスト"""
+        tracer = Tracer(str(tmp_path / "traces"))
+        arbiter = AzureReposArbiter(ReplayAzureReposClient(fixture_dir))
+
+        with tracer.trace("tool:get_pull_request_unified_diff", id=1):
+            arbiter.get_pull_request_unified_diff("o", "p", "r", 1)
+        with tracer.trace("tool:get_pull_request_unified_diff", id=1):
+            arbiter.get_pull_request_unified_diff("o", "p", "r", 1)
+
+        with open(tracer.last_path, encoding="utf-8") as f:
+            events = [e for e in json.load(f)["traceEvents"] if e["ph"] == "X"]
+        names = {e["name"] for e in events}
+        blobs = [e for e in events if e["name"] == "get_blob"]
+
+        assert len(os.listdir(tmp_path / "traces")) == 2
+        assert {"tool:get_pull_request_unified_diff", "get_pull_request", "get_commit_diffs", "file",
+                "get_blob", "generate_file_diff"} <= names
+        assert blobs and all(e["args"]["cache_hit"] and e["args"]["bytes"] >= 0 for e in blobs)
+        assert tracer.stats()["traces"] == 2
+
+    def test_collapsed_trace_nests_blob_under_file(self, fixture_dir, tmp_path):
+        """折り畳んだスタックの形式では、blobの取得がファイルの処理の下にまとまることのテスト"""
+        tracer = Tracer(str(tmp_path), format="collapsed")
+        arbiter = AzureReposArbiter(ReplayAzureReposClient(fixture_dir))
+
+        with tracer.trace("tool:get_pull_request_unified_diff"):
+            arbiter.get_pull_request_unified_diff("o", "p", "r", 1)
+
+        with open(tracer.last_path, encoding="utf-8") as f:
+            stacks = [line.rsplit(" ", 1)[0] for line in f.read().splitlines()]
+
+        assert tracer.last_path.endswith(".folded")
+        assert "tool:get_pull_request_unified_diff;file;get_blob" in stacks
+        assert "tool:get_pull_request_unified_diff;file;generate_file_diff" in stacks
@@ -1,7 +1,24 @@
+import difflib
 import pytest
 from unified_diff_generator import UnifiedDiffGenerator
 
 
+def server_blocks(original, modified):
+    """FileDiffs APIの応答を模擬した行差分ブロックを生成"""
+    change_types = {"replace": "edit", "delete": "delete", "insert": "add", "equal": "none"}
+    matcher = difflib.SequenceMatcher(None, original.splitlines(True), modified.splitlines(True))
+    return [
+        {
+            "change_type": change_types[tag],
+            "original_line_number_start": i1 + 1,
+            "original_lines_count": i2 - i1,
+            "modified_line_number_start": j1 + 1,
+            "modified_lines_count": j2 - j1,
+        }
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes()
+    ]
+
+
 class TestUnifiedDiffGenerator:
     """UnifiedDiffGeneratorのユニットテスト"""
     
@@ -135,3 +152,153 @@ class TestUnifiedDiffGenerator:
         assert diff != ""
         assert "-single line" in diff
         assert "+single line modified" in diff
+    
+    def test_count_changes_matches_diff(self):
+        """count_changesの結果が生成されるdiffの+/-行数と一致することのテスト"""
+        original = "line1\nline2\nline3\nline4\nline5\n"
+        modified = "line1\nline2 modified\nline3\nnew line\nline5"
+        
+        diff = self.generator.generate_file_diff(original, modified, "test.py")
+        lines = diff.splitlines()[2:]
+        
+        assert self.generator.count_changes(original, modified) == (
+            sum(1 for line in lines if line.startswith("+")),
+            sum(1 for line in lines if line.startswith("-")),
+        )
+    
+    def test_count_changes_add_delete_and_identical(self):
+        """追加・削除・変更なしの場合の行数のテスト"""
+        content = "line1\nline2\n"
+        
+        assert self.generator.count_changes("", content) == (2, 0)
+        assert self.generator.count_changes(content, "") == (0, 2)
+        assert self.generator.count_changes(content, content) == (0, 0)
+    
+    @pytest.mark.parametrize("original, modified", [
+        ("line1\nline2\nline3\n", "line1\nline2 modified\nline3\n"),
+        ("".join(f"line{i}\n" for i in range(30)), "".join(f"line{i}\n" for i in range(30) if i not in (3, 20)) + "tail\n"),
+        ("a\nb\n", "x\na\nb\ny"),
+    ])
+    def test_diff_from_blocks_matches_local_diff(self, original, modified):
+        """サーバー側の行差分ブロックから生成した差分がdifflibによる差分と一致することのテスト"""
+        blocks = server_blocks(original, modified)
+        
+        assert self.generator.generate_file_diff_from_blocks(original, modified, "/f.cs", blocks) == \
+            self.generator.generate_file_diff(original, modified, "/f.cs")
+    
+    def test_diff_from_blocks_without_unchanged_blocks(self):
+        """変更のないブロックが省略されていても差分を生成できることのテスト"""
+        original = "a\nb\nc\nd\n"
+        modified = "a\nc\nd\ne\n"
+        blocks = [b for b in server_blocks(original, modified) if b["change_type"] != "none"]
+        
+        assert self.generator.generate_file_diff_from_blocks(original, modified, "f.cs", blocks) == \
+            self.generator.generate_file_diff(original, modified, "f.cs")
+    
+    def test_diff_from_inconsistent_blocks(self):
+        """ファイル内容と整合しないブロックの場合にValueErrorとなることのテスト"""
+        blocks = [{"change_type": "edit", "original_line_number_start": 1, "original_lines_count": 1,
+                   "modified_line_number_start": 1, "modified_lines_count": 1}]
+        
+        with pytest.raises(ValueError):
+            self.generator.generate_file_diff_from_blocks("a\nb\n", "x\ny\n", "f.cs", blocks)
+    
+    def test_ignore_whitespace_only_changes(self):
+        """空白のみの変更を無視するオプションのテスト"""
+        original = "def f():\n    return 1\n"
+        modified = "def f():\n\treturn  1\n"
+        generator = UnifiedDiffGenerator(ignore_whitespace=True)
+        
+        assert self.generator.generate_file_diff(original, modified, "f.py") != ""
+        assert generator.generate_file_diff(original, modified, "f.py") == ""
+        assert generator.count_changes(original, modified) == (0, 0)
+    
+    def test_ignore_eol_only_changes(self):
+        """改行コードのみの変更を無視するオプションのテスト"""
+        original = "line1\r\nline2\r\n"
+        modified = "line1\nline2\n"
+        generator = UnifiedDiffGenerator(ignore_eol=True)
+        
+        assert self.generator.generate_file_diff(original, modified, "f.cs") != ""
+        assert generator.generate_file_diff(original, modified, "f.cs") == ""
+        # 改行コード以外の空白の違いは無視しない
+        assert generator.generate_file_diff(original, "line1\n  line2\n", "f.cs") != ""
+    
+    def test_ignore_whitespace_keeps_original_text(self):
+        """空白を無視しても、hunkには元のテキストが表示されることのテスト"""
+        original = "a\r\n  b\r\nc\r\n"
+        modified = "a\n b\nchanged\n"
+        generator = UnifiedDiffGenerator(ignore_whitespace=True)
+        
+        diff = generator.generate_file_diff(original, modified, "f.cs")
+        
+        assert "-c\r\n" in diff
+        assert "+changed\n" in diff
+        # 空白のみ異なる行はコンテキスト行として変更前のテキストで表示される
+        assert "\n   b\r\n" in diff
+        assert "\n-  b" not in diff and "\n+ b" not in diff
+        assert generator.count_changes(original, modified) == (1, 1)
+    
+    def test_with_options(self):
+        """比較オプションを変更したコピーのテスト"""
+        generator = self.generator.with_options(ignore_whitespace=True)
+        
+        assert generator.ignore_whitespace is True
+        assert generator.ignore_eol is False
+        assert self.generator.ignore_whitespace is False
+        assert generator.context_lines == self.generator.context_lines
+    
+    def test_common_prefix_and_suffix_are_trimmed(self):
+        """先頭・末尾の共通行を除いて比較しても、hunkの行番号がファイル全体の行番号になることのテスト"""
+        original = "".join(f"line{i}\n" for i in range(1000))
+        modified = original.replace("line500\n", "changed\n")
+        
+        diff = self.generator.generate_file_diff(original, modified, "big.cs")
+        
+        assert "@@ -498,7 +498,7 @@" in diff
+        assert "-line500\n" in diff
+        assert "+changed\n" in diff
+        assert " line497\n" in diff and " line503\n" in diff
+        assert " line496\n" not in diff and " line504\n" not in diff
+        assert self.generator.count_changes(original, modified) == (1, 1)
+    
+    @pytest.mark.parametrize("original, modified", [
+        ("a\nb\nc\n", "a\nb\nc\nd\n"),
+        ("a\nb\nc\n", "x\na\nb\nc\n"),
+        ("a\na\na\n", "a\na\n"),
+        ("a\nb\na\n", "a\n"),
+        ("x\ny\n", "x\ny"),
+    ])
+    def test_trimmed_opcodes_reconstruct_modified(self, original, modified):
+        """共通行を除いて求めたopcodeから変更後の内容を復元できることのテスト"""
+        original_lines = self.generator._split_lines(original)
+        modified_lines = self.generator._split_lines(modified)
+        
+        opcodes = self.generator._diff_opcodes(original_lines, modified_lines)
+        
+        assert opcodes[0][1] == 0 and opcodes[0][3] == 0
+        assert opcodes[-1][2] == len(original_lines) and opcodes[-1][4] == len(modified_lines)
+        rebuilt = []
+        for tag, i1, i2, j1, j2 in opcodes:
+            if tag == "equal":
+                assert original_lines[i1:i2] == modified_lines[j1:j2]
+            rebuilt.extend(modified_lines[j1:j2])
+        assert rebuilt == modified_lines
+    
+    def test_rename_header(self):
+        """変更前のパスが異なる場合にリネームのヘッダーを付けることのテスト"""
+        diff = self.generator.generate_file_diff("a\nb\n", "a\nc\n", "/new/f.cs", original_path="/old/f.cs")
+        
+        assert diff.startswith("rename from old/f.cs\nrename to new/f.cs\n--- a/old/f.cs\n+++ b/new/f.cs\n")
+        assert self.generator.generate_file_diff("a\n", "a\n", "/new/f.cs", original_path="/old/f.cs") == \
+            "rename from old/f.cs\nrename to new/f.cs\n"
+        assert self.generator.generate_file_diff("a\n", "a\n", "/f.cs", original_path="/f.cs") == ""
+    
+    def test_similarity(self):
+        """行ハッシュ集合のJaccard係数のテスト"""
+        a = self.generator.line_signature("x\ny\nz\nw\n")
+        b = self.generator.line_signature("  x\ny\nz\nv\n\n")
+        
+        assert self.generator.similarity(a, a) == 1.0
+        assert self.generator.similarity(a, b) == 3 / 5
+        assert self.generator.similarity(a, frozenset()) == 0.0
@@ -0,0 +1,244 @@
+"""ツール呼び出しの処理を入れ子のスパンとして記録するトレース
+
+Tracer.trace でツール呼び出しごとのトレース（ルートのスパン）を開始し、その中で span() を
+呼ぶと、呼び出し時点のスパンを親とするスパンが記録されます。トレースを開始していない
+コンテキストでは span() は何も記録しないため、トレースが無効な場合の負荷は
+ContextVarの参照1回だけです。
+
+スパンはChromeのtrace event形式のJSON（chrome://tracing・Perfetto・speedscopeで表示）、
+または折り畳んだスタックの形式（flamegraph.pl・speedscopeで表示）でファイルに書き出します。
+"""
+import contextlib
+import contextvars
+import itertools
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# 現在のコンテキストで開いているスパン（トレースを開始していない場合はNone）
+_current_span: "contextvars.ContextVar[Optional[Span]]" = contextvars.ContextVar("tracing_span", default=None)
+
+
+class Span:
+    """1つの処理の開始・終了時刻と属性"""
+
+    __slots__ = ("trace", "name", "attributes", "parent", "start_ns", "end_ns", "thread_id", "_token")
+
+    def __init__(self, trace: "Trace", name: str, attributes: Dict[str, Any], parent: Optional["Span"]):
+        self.trace = trace
+        self.name = name
+        self.attributes = attributes
+        self.parent = parent
+        self.start_ns = 0
+        self.end_ns = 0
+        self.thread_id = 0
+        self._token = None
+
+    def set(self, **attributes: Any) -> None:
+        """属性を追加（処理の後で分かる値。例: 取得したサイズ、キャッシュのヒット）"""
+        self.attributes.update(attributes)
+
+    def __enter__(self) -> "Span":
+        self.thread_id = threading.get_ident()
+        self._token = _current_span.set(self)
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.end_ns = time.perf_counter_ns()
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.attributes["error"] = exc_type.__name__
+        self.trace.add(self)
+        return False
+
+
+class _NullSpan:
+    """トレースを開始していないコンテキストで span() が返す、何も記録しないスパン"""
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name: str, **attributes: Any):
+    """現在のスパンの子スパンを開始する（with文で使用。トレース中でなければ何も記録しない）
+
+    Args:
+        name: スパン名（折り畳んだスタックではこの名前でまとめる）
+        **attributes: 属性（パス・サイズなど。JSONに変換できない値は文字列として書き出す）
+    """
+    parent = _current_span.get()
+    if parent is None:
+        return _NULL_SPAN
+    return Span(parent.trace, name, attributes, parent)
+
+
+def bind(fn: Callable) -> Callable:
+    """現在のスパンを親として別スレッドで実行する関数を返す（ThreadPoolExecutorに渡す関数に使用）
+
+    ContextVarはスレッドプールのワーカーに引き継がれないため、スパンの親子関係を保つには
+    この関数で包んでから渡します。トレース中でなければfnをそのまま返します。
+    """
+    parent = _current_span.get()
+    if parent is None:
+        return fn
+
+    def run(*args, **kwargs):
+        token = _current_span.set(parent)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current_span.reset(token)
+
+    return run
+
+
+class Trace:
+    """1回のツール呼び出しで記録したスパンの集合"""
+
+    def __init__(self, name: str, **attributes: Any):
+        self.root = Span(self, name, attributes, None)
+        self.spans: List[Span] = []
+        # スレッドID -> スレッド名（trace eventのレーン名に使用）
+        self.threads: Dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def add(self, span: Span) -> None:
+        """終了したスパンを追加"""
+        with self._lock:
+            self.spans.append(span)
+            self.threads.setdefault(span.thread_id, threading.current_thread().name)
+
+    def to_chrome_trace(self) -> Dict:
+        """Chromeのtrace event形式（完了イベント "X" とスレッド名のメタデータ "M"）に変換
+
+        時刻はルートのスパンの開始からのマイクロ秒です。同じスレッドのスパンは時刻の包含関係で
+        入れ子として表示されるため、並列に処理した箇所と直列化している箇所がスレッドのレーンで分かります。
+        """
+        pid = os.getpid()
+        origin = self.root.start_ns
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s.start_ns)
+            threads = dict(self.threads)
+        events = [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+            for tid, name in threads.items()
+        ]
+        for s in spans:
+            events.append({
+                "name": s.name,
+                "cat": "mcp",
+                "ph": "X",
+                "ts": (s.start_ns - origin) / 1000,
+                "dur": (s.end_ns - s.start_ns) / 1000,
+                "pid": pid,
+                "tid": s.thread_id,
+                "args": s.attributes,
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def to_collapsed_stacks(self) -> str:
+        """折り畳んだスタックの形式（"ルート;子;孫 自身の時間" の行）に変換
+
+        時間はマイクロ秒単位の自身の時間（子スパンの時間を除いたもの）で、同じスタックの行は合計します。
+        別スレッドで並列に実行した子スパンの合計が親より長い場合、親の自身の時間は0とします。
+        """
+        with self._lock:
+            spans = list(self.spans)
+        children: Dict[int, int] = defaultdict(int)
+        for s in spans:
+            if s.parent is not None:
+                children[id(s.parent)] += s.end_ns - s.start_ns
+        totals: Dict[str, int] = defaultdict(int)
+        for s in spans:
+            names = []
+            node = s
+            while node is not None:
+                names.append(node.name.replace(";", ":").replace(" ", "_"))
+                node = node.parent
+            self_ns = max(0, s.end_ns - s.start_ns - children[id(s)])
+            totals[";".join(reversed(names))] += self_ns // 1000
+        return "".join(f"{stack} {micros}\n" for stack, micros in totals.items())
+
+
+class Tracer:
+    """ツール呼び出しごとのトレースを開始し、終了時にファイルへ書き出すクラス"""
+
+    FORMATS = ("chrome", "collapsed")
+
+    def __init__(self, directory: str, format: str = "chrome"):
+        """
+        Args:
+            directory: トレースを書き出すディレクトリ（初回の書き出し時に作成）
+            format: "chrome"（trace eventのJSON、.json）または "collapsed"（折り畳んだスタック、.folded）
+
+        Raises:
+            ValueError: 未知の形式が指定された場合
+        """
+        if format not in self.FORMATS:
+            raise ValueError(f"Unknown trace format: {format} (expected 'chrome' or 'collapsed')")
+        self.directory = directory
+        self.format = format
+        self._sequence = itertools.count(1)
+        self._lock = threading.Lock()
+        self.traces = 0
+        self.spans = 0
+        self.last_path: Optional[str] = None
+
+    @contextlib.contextmanager
+    def trace(self, name: str, **attributes: Any) -> Iterator[Span]:
+        """トレースを開始し、with文を抜けたときに書き出す
+
+        既にトレース中のコンテキスト（ツールから別のツールを呼ぶ場合など）では、新しいトレースを
+        作らずに現在のトレースの子スパンとして記録します。
+        """
+        if _current_span.get() is not None:
+            with span(name, **attributes) as child:
+                yield child
+            return
+        trace = Trace(name, **attributes)
+        try:
+            with trace.root as root:
+                yield root
+        finally:
+            self.write(trace)
+
+    def write(self, trace: Trace) -> str:
+        """トレースを書き出し、そのパスを返す"""
+        os.makedirs(self.directory, exist_ok=True)
+        extension = "json" if self.format == "chrome" else "folded"
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(self.directory, f"{stamp}-{next(self._sequence):06d}-{trace.root.name}.{extension}")
+        if self.format == "chrome":
+            data = json.dumps(trace.to_chrome_trace(), ensure_ascii=False, default=str)
+        else:
+            data = trace.to_collapsed_stacks()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(data)
+        with self._lock:
+            self.traces += 1
+            self.spans += len(trace.spans)
+            self.last_path = path
+        return path
+
+    def stats(self) -> Dict[str, Any]:
+        """書き出したトレース数・スパン数と最後に書き出したファイルのパスを返す"""
+        with self._lock:
+            return {
+                "format": self.format,
+                "traces": self.traces,
+                "spans": self.spans,
+                "last_path": self.last_path,
+            }
@@ -1,5 +1,21 @@
+import copy
 import difflib
-from typing import Optional
+from typing import Callable, Dict, FrozenSet, Iterator, List, Optional, Tuple
+import symbol_index
+
+# difflib.SequenceMatcher.get_opcodes() と同じ形式の (tag, i1, i2, j1, j2)
+Opcode = Tuple[str, int, int, int, int]
+
+
+def _format_range(start: int, stop: int) -> str:
+    """hunkヘッダーの範囲表記（difflibのUnified Diffと同じ形式）"""
+    beginning = start + 1
+    length = stop - start
+    if length == 1:
+        return f"{beginning}"
+    if not length:
+        beginning -= 1
+    return f"{beginning},{length}"
 
 
 class UnifiedDiffGenerator:
@@ -9,12 +25,44 @@ class UnifiedDiffGenerator:
     Azure DevOps APIやその他の外部依存を持たず、純粋な変換ロジックのみを担当します。
     """
     
-    def __init__(self, context_lines: int = 3):
+    # 差分を省略したファイルのエントリで、理由の前に付ける文字列
+    OMITTED_MARKER = "# Diff omitted"
+    
+    # hunkヘッダーに付ける宣言の行の最大文字数（git diffと同じ）
+    FUNCTION_CONTEXT_WIDTH = 80
+    
+    def __init__(
+        self,
+        context_lines: int = 3,
+        ignore_whitespace: bool = False,
+        ignore_eol: bool = False,
+        function_context: bool = True
+    ):
         """
         Args:
             context_lines: 変更箇所の前後に含めるコンテキスト行数（デフォルト: 3）
+            ignore_whitespace: 空白の違い（インデントや行内の空白の増減）を無視する（デフォルト: False）
+            ignore_eol: 改行コードの違い（CRLF/LF）を無視する（デフォルト: False）
+            function_context: C#ファイルのhunkヘッダーの "@@" の後に、変更箇所を含む宣言の行を付ける（デフォルト: True）
         """
         self.context_lines = context_lines
+        self.ignore_whitespace = ignore_whitespace
+        self.ignore_eol = ignore_eol
+        self.function_context = function_context
+    
+    @property
+    def normalizes_lines(self) -> bool:
+        """行を正規化して比較するオプションが有効か"""
+        return self.ignore_whitespace or self.ignore_eol
+    
+    def with_options(self, ignore_whitespace: bool = None, ignore_eol: bool = None) -> "UnifiedDiffGenerator":
+        """比較オプションを変更したコピーを返す（Noneの項目は現在の値を引き継ぐ）"""
+        generator = copy.copy(self)
+        if ignore_whitespace is not None:
+            generator.ignore_whitespace = ignore_whitespace
+        if ignore_eol is not None:
+            generator.ignore_eol = ignore_eol
+        return generator
     
     def generate_file_diff(
         self,
@@ -22,7 +70,8 @@ class UnifiedDiffGenerator:
         modified_content: str,
         file_path: str,
         original_label: str = "a",
-        modified_label: str = "b"
+        modified_label: str = "b",
+        original_path: str = None
     ) -> str:
         """1ファイルのUnified Diffを生成
         
@@ -32,6 +81,8 @@ class UnifiedDiffGenerator:
             file_path: ファイルパス（先頭の/は除く）
             original_label: 変更前のラベル（デフォルト: "a"）
             modified_label: 変更後のラベル（デフォルト: "b"）
+            original_path: 変更前のファイルパス（リネームの場合のみ指定。file_pathと異なる場合は
+                "rename from"/"rename to" のヘッダーを付け、内容が同一ならヘッダーのみを返す）
         
         Returns:
             Unified Diff形式の文字列
@@ -51,35 +102,385 @@ class UnifiedDiffGenerator:
              line3
         """
         # ファイルパスの正規化（先頭の/を除去）
-        normalized_path = file_path
-        if normalized_path.startswith('/'):
-            normalized_path = normalized_path[1:]
+        normalized_path = self._normalize_path(file_path)
+        normalized_original_path = self._normalize_path(original_path) if original_path else normalized_path
+        header = self._rename_header(normalized_original_path, normalized_path)
+        
+        # 内容が同一であれば行に分割せずに返す（モード変更のみ・リネームのみの場合など）
+        if original_content == modified_content:
+            return header
         
         # 行単位に分割（改行を保持）
-        original_lines = original_content.splitlines(keepends=True)
-        modified_lines = modified_content.splitlines(keepends=True)
+        original_lines = self._split_lines(original_content)
+        modified_lines = self._split_lines(modified_content)
         
-        # 改行がない場合の処理
-        if original_content and not original_lines:
-            original_lines = [original_content]
-        if modified_content and not modified_lines:
-            modified_lines = [modified_content]
-        
-        # difflib.unified_diffを使用して差分を生成
-        diff_lines = difflib.unified_diff(
-            original_lines,
-            modified_lines,
-            fromfile=f"{original_label}/{normalized_path}",
-            tofile=f"{modified_label}/{normalized_path}",
-            n=self.context_lines,
-            lineterm=''
+        # 行単位の差分（opcode）を求め、Unified Diff形式に整形
+        opcodes = self._diff_opcodes(original_lines, modified_lines)
+        if opcodes is None:
+            return header
+        return header + self._render(
+            original_lines, modified_lines, opcodes,
+            f"{original_label}/{normalized_original_path}", f"{modified_label}/{normalized_path}",
+            self._function_context(original_lines, modified_content, normalized_path)
+        )
+
+    def generate_file_diff_from_blocks(
+        self,
+        original_content: str,
+        modified_content: str,
+        file_path: str,
+        blocks: List[Dict],
+        original_label: str = "a",
+        modified_label: str = "b",
+        original_path: str = None
+    ) -> str:
+        """サーバー側で計算された行差分ブロックからUnified Diffを生成
+        
+        Azure DevOpsのFileDiffs APIが返すline diff blocksを使用し、difflibによる
+        比較を行わずに generate_file_diff と同じ形式の差分を生成します。
+        
+        Args:
+            original_content: 変更前のファイル内容
+            modified_content: 変更後のファイル内容
+            file_path: ファイルパス（先頭の/は除く）
+            blocks: line diff blocksのリスト（change_type, original_line_number_start,
+                original_lines_count, modified_line_number_start, modified_lines_count）
+            original_label: 変更前のラベル（デフォルト: "a"）
+            modified_label: 変更後のラベル（デフォルト: "b"）
+            original_path: 変更前のファイルパス（リネームの場合のみ指定）
+        
+        Returns:
+            Unified Diff形式の文字列
+        
+        Raises:
+            ValueError: ブロックがファイル内容と整合しない場合（改行コードの解釈の違いなど）
+        """
+        normalized_path = self._normalize_path(file_path)
+        normalized_original_path = self._normalize_path(original_path) if original_path else normalized_path
+        original_lines = self._split_lines(original_content)
+        modified_lines = self._split_lines(modified_content)
+        opcodes = self._opcodes_from_blocks(blocks, original_lines, modified_lines)
+        return self._rename_header(normalized_original_path, normalized_path) + self._render(
+            original_lines, modified_lines, opcodes,
+            f"{original_label}/{normalized_original_path}", f"{modified_label}/{normalized_path}",
+            self._function_context(original_lines, modified_content, normalized_path)
+        )
+
+    def generate_omitted_file_diff(
+        self,
+        file_path: str,
+        reason: str,
+        original_label: str = "a",
+        modified_label: str = "b",
+        original_path: str = None
+    ) -> str:
+        """内容を比較せずに、差分を省略したことを示すファイルヘッダーのみのエントリを生成
+        
+        Args:
+            file_path: ファイルパス（先頭の/は除く）
+            reason: 省略した理由（OMITTED_MARKERに続けて出力する）
+            original_label: 変更前のラベル（デフォルト: "a"）
+            modified_label: 変更後のラベル（デフォルト: "b"）
+            original_path: 変更前のファイルパス（リネームの場合のみ指定）
+        
+        Returns:
+            "---"/"+++" の行と省略の理由の行からなる文字列（リネームの場合はヘッダー付き）
+        """
+        normalized_path = self._normalize_path(file_path)
+        normalized_original_path = self._normalize_path(original_path) if original_path else normalized_path
+        return (
+            self._rename_header(normalized_original_path, normalized_path)
+            + f"--- {original_label}/{normalized_original_path}\n"
+            + f"+++ {modified_label}/{normalized_path}\n"
+            + f"{self.OMITTED_MARKER}: {reason}\n"
+        )
+
+    @classmethod
+    def has_omitted_files(cls, diff: str) -> bool:
+        """generate_omitted_file_diff で生成したエントリを含むかを判定"""
+        return diff.startswith(cls.OMITTED_MARKER) or f"\n{cls.OMITTED_MARKER}" in diff
+
+    @staticmethod
+    def _normalize_path(file_path: str) -> str:
+        """先頭の/を除いたファイルパス"""
+        return file_path[1:] if file_path.startswith('/') else file_path
+
+    @staticmethod
+    def _rename_header(original_path: str, file_path: str) -> str:
+        """リネームの場合に差分の先頭に付けるヘッダー（git diffと同じ形式）"""
+        if original_path == file_path:
+            return ""
+        return f"rename from {original_path}\nrename to {file_path}\n"
+
+    def _line_keys(self, original_lines: List[str], modified_lines: List[str]) -> Tuple[list, list]:
+        """比較に使用する行のキーを求める
+        
+        正規化オプションが無効な場合は行そのものを返します。有効な場合は各行を一度だけ正規化し、
+        正規化後の内容ごとに割り当てた整数IDの列を返します（文字列ではなく整数で比較するため）。
+        """
+        if not self.normalizes_lines:
+            return original_lines, modified_lines
+        
+        ignore_whitespace = self.ignore_whitespace
+        ids: Dict[str, int] = {}
+        
+        def keys(lines: List[str]) -> List[int]:
+            result = []
+            for line in lines:
+                if ignore_whitespace:
+                    # 空白をすべて取り除く（改行も空白として除かれる）
+                    normalized = "".join(line.split())
+                else:
+                    normalized = line.rstrip("\r\n")
+                key = ids.get(normalized)
+                if key is None:
+                    key = ids[normalized] = len(ids)
+                result.append(key)
+            return result
+        
+        return keys(original_lines), keys(modified_lines)
+
+    def _diff_opcodes(self, original_lines: List[str], modified_lines: List[str]) -> Optional[List[Opcode]]:
+        """2つの行リストの差分をopcodeとして求める
+        
+        Returns:
+            opcodeのリスト（比較上同一の場合はNone）
+        """
+        original_keys, modified_keys = self._line_keys(original_lines, modified_lines)
+        # 正規化後の内容が同一であれば比較を行わない
+        if original_keys == modified_keys:
+            return None
+        
+        # 先頭と末尾の共通行を除いた範囲だけをdifflibで比較する
+        # （大きなファイルの小さな変更でも、比較の計算量が変更範囲に比例するようにする）
+        original_count = len(original_keys)
+        modified_count = len(modified_keys)
+        prefix, suffix = self._common_affix(original_keys, modified_keys)
+        original_stop = original_count - suffix
+        modified_stop = modified_count - suffix
+        
+        opcodes: List[Opcode] = []
+        if prefix:
+            opcodes.append(("equal", 0, prefix, 0, prefix))
+        matcher = difflib.SequenceMatcher(
+            None, original_keys[prefix:original_stop], modified_keys[prefix:modified_stop]
         )
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            # 比較範囲内の行番号をファイル全体の行番号に戻す
+            opcodes.append((tag, i1 + prefix, i2 + prefix, j1 + prefix, j2 + prefix))
+        if suffix:
+            opcodes.append(("equal", original_stop, original_count, modified_stop, modified_count))
+        return opcodes
+
+    @staticmethod
+    def _common_affix(original_keys: list, modified_keys: list) -> Tuple[int, int]:
+        """先頭と末尾で一致する行数を求める（両者が重ならないように数える）
+        
+        Returns:
+            (先頭の共通行数, 末尾の共通行数) のタプル
+        """
+        limit = min(len(original_keys), len(modified_keys))
+        prefix = 0
+        while prefix < limit and original_keys[prefix] == modified_keys[prefix]:
+            prefix += 1
+        suffix = 0
+        limit -= prefix
+        while suffix < limit and original_keys[-1 - suffix] == modified_keys[-1 - suffix]:
+            suffix += 1
+        return prefix, suffix
+
+    def _opcodes_from_blocks(
+        self,
+        blocks: List[Dict],
+        original_lines: List[str],
+        modified_lines: List[str]
+    ) -> List[Opcode]:
+        """line diff blocksをdifflib形式のopcodeに変換し、内容との整合性を検証"""
+        opcodes = []
+        i = j = 0
+        changed = []
+        for block in blocks:
+            change_type = block.get("change_type", block.get("changeType"))
+            if change_type in (None, "none", 0):
+                continue
+            changed.append(block)
+        changed.sort(key=lambda b: (b.get("original_line_number_start", 0), b.get("modified_line_number_start", 0)))
+        
+        for block in changed:
+            original_count = block.get("original_lines_count") or 0
+            modified_count = block.get("modified_lines_count") or 0
+            if not original_count and not modified_count:
+                continue
+            # 行数が0の側の開始位置は、直前の一致区間の長さが両側で等しいことから求める
+            if original_count:
+                i1 = block["original_line_number_start"] - 1
+            if modified_count:
+                j1 = block["modified_line_number_start"] - 1
+            if not original_count:
+                i1 = i + (j1 - j)
+            if not modified_count:
+                j1 = j + (i1 - i)
+            i2, j2 = i1 + original_count, j1 + modified_count
+            if i1 < i or i1 - i != j1 - j:
+                raise ValueError("Line diff blocks are inconsistent with file contents")
+            if i1 > i:
+                opcodes.append(("equal", i, i1, j, j1))
+            tag = "replace" if original_count and modified_count else "delete" if original_count else "insert"
+            opcodes.append((tag, i1, i2, j1, j2))
+            i, j = i2, j2
+        
+        if len(original_lines) - i != len(modified_lines) - j:
+            raise ValueError("Line diff blocks are inconsistent with file contents")
+        if i < len(original_lines):
+            opcodes.append(("equal", i, len(original_lines), j, len(modified_lines)))
+        # 一致区間が実際に一致していることを確認する（改行コードの解釈の違いなどを検出）
+        for tag, i1, i2, j1, j2 in opcodes:
+            if tag == "equal" and original_lines[i1:i2] != modified_lines[j1:j2]:
+                raise ValueError("Line diff blocks are inconsistent with file contents")
+        return opcodes
+
+    def _group_opcodes(self, opcodes: List[Opcode]) -> Iterator[List[Opcode]]:
+        """opcodeをコンテキスト行数に基づいてhunkごとにまとめる
+        
+        difflib.SequenceMatcher.get_grouped_opcodes と同じ規則でまとめます。
+        """
+        n = self.context_lines
+        codes = list(opcodes) or [("equal", 0, 1, 0, 1)]
+        if codes[0][0] == "equal":
+            tag, i1, i2, j1, j2 = codes[0]
+            codes[0] = tag, max(i1, i2 - n), i2, max(j1, j2 - n), j2
+        if codes[-1][0] == "equal":
+            tag, i1, i2, j1, j2 = codes[-1]
+            codes[-1] = tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n)
+        
+        group = []
+        for tag, i1, i2, j1, j2 in codes:
+            # 長い一致区間でhunkを区切る
+            if tag == "equal" and i2 - i1 > n + n:
+                group.append((tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n)))
+                yield group
+                group = []
+                i1, j1 = max(i1, i2 - n), max(j1, j2 - n)
+            group.append((tag, i1, i2, j1, j2))
+        if group and not (len(group) == 1 and group[0][0] == "equal"):
+            yield group
+
+    def _function_context(
+        self,
+        original_lines: List[str],
+        modified_content: str,
+        file_path: str
+    ) -> Optional[Callable[[List[Opcode]], str]]:
+        """hunkの最初の変更箇所を含む、変更前の内容での最も内側の宣言の行を返す関数
+        
+        git diffのhunkヘッダーの関数名と同様に、変更前の内容で最初の変更箇所の直前の行から
+        遡って求めます（ファイル全体は走査しません）。追加・削除されたファイルと対象外の言語ではNoneを返します。
+        """
+        if not (self.function_context and original_lines and modified_content and symbol_index.supports(file_path)):
+            return None
         
-        # 結果を結合
-        result = '\n'.join(diff_lines)
+        def context(group: List[Opcode]) -> str:
+            _, i1, _, _, _ = next(code for code in group if code[0] != "equal")
+            # 変更（挿入）された行の直前の行を含む宣言
+            header = symbol_index.enclosing_header(original_lines, i1 - 1) if i1 else None
+            return header[:self.FUNCTION_CONTEXT_WIDTH] if header else ""
+        
+        return context
+    
+    def _render(
+        self,
+        original_lines: List[str],
+        modified_lines: List[str],
+        opcodes: List[Opcode],
+        from_file: str,
+        to_file: str,
+        function_context: Callable[[List[Opcode]], str] = None
+    ) -> str:
+        """opcodeからUnified Diff形式の文字列を生成（difflib.unified_diff と同じ出力）
+        
+        function_contextを指定した場合は、hunkごとにその戻り値をhunkヘッダーの "@@" の後に付けます。
+        """
+        diff_lines = []
+        for group in self._group_opcodes(opcodes):
+            if not diff_lines:
+                diff_lines.append(f"--- {from_file}")
+                diff_lines.append(f"+++ {to_file}")
+            first, last = group[0], group[-1]
+            hunk_header = f"@@ -{_format_range(first[1], last[2])} +{_format_range(first[3], last[4])} @@"
+            text = function_context(group) if function_context else ""
+            diff_lines.append(f"{hunk_header} {text}" if text else hunk_header)
+            for tag, i1, i2, j1, j2 in group:
+                if tag == "equal":
+                    diff_lines.extend(" " + line for line in original_lines[i1:i2])
+                    continue
+                if tag in ("replace", "delete"):
+                    diff_lines.extend("-" + line for line in original_lines[i1:i2])
+                if tag in ("replace", "insert"):
+                    diff_lines.extend("+" + line for line in modified_lines[j1:j2])
         
         # 差分がない場合は空文字列を返す
-        if not result:
+        if not diff_lines:
             return ""
         
-        return result + '\n'
+        return '\n'.join(diff_lines) + '\n'
+
+    def _split_lines(self, content: str) -> List[str]:
+        """内容を行単位に分割（改行を保持）"""
+        lines = content.splitlines(keepends=True)
+        # 改行がない場合の処理
+        if content and not lines:
+            lines = [content]
+        return lines
+
+    @staticmethod
+    def line_signature(content: str) -> FrozenSet[int]:
+        """類似度の推定に使用する、内容の行ハッシュの集合
+        
+        前後の空白を除いた空でない行のハッシュ値の集合です。
+        ファイルごとに一度だけ求めておき、similarityで比較します。
+        """
+        return frozenset(hash(line.strip()) for line in content.splitlines() if line.strip())
+
+    @staticmethod
+    def similarity(original_signature: FrozenSet[int], modified_signature: FrozenSet[int]) -> float:
+        """2つの行ハッシュ集合のJaccard係数（0.0〜1.0）"""
+        if not original_signature or not modified_signature:
+            return 0.0
+        common = len(original_signature & modified_signature)
+        return common / (len(original_signature) + len(modified_signature) - common)
+
+    def count_changes(self, original_content: str, modified_content: str) -> Tuple[int, int]:
+        """追加行数と削除行数のみを数える（hunkのテキストは生成しない）
+        
+        generate_file_diff と同じ行の比較を行うため、結果は生成されるdiffの
+        "+"行・"-"行の数と一致します。
+        
+        Args:
+            original_content: 変更前のファイル内容（空文字列の場合は新規ファイル）
+            modified_content: 変更後のファイル内容（空文字列の場合は削除ファイル）
+        
+        Returns:
+            (added, removed) のタプル
+        """
+        if original_content == modified_content:
+            return 0, 0
+        
+        original_lines = self._split_lines(original_content)
+        modified_lines = self._split_lines(modified_content)
+        
+        # 追加・削除のみのファイルは比較せずに行数を返す
+        if not original_lines or not modified_lines:
+            return len(modified_lines), len(original_lines)
+        
+        opcodes = self._diff_opcodes(original_lines, modified_lines)
+        if opcodes is None:
+            return 0, 0
+        
+        added = 0
+        removed = 0
+        for tag, i1, i2, j1, j2 in opcodes:
+            if tag == "equal":
+                continue
+            removed += i2 - i1
+            added += j2 - j1
+        return added, removed